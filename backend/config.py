@@ -21,6 +21,26 @@ RETRY_MAX_WAIT = float(os.getenv("RETRY_MAX_WAIT", "10"))  # Max wait between re
 RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
 RATE_LIMIT_REQUESTS_PER_MINUTE = int(os.getenv("RATE_LIMIT_REQUESTS_PER_MINUTE", "60"))
 RATE_LIMIT_REQUESTS_PER_HOUR = int(os.getenv("RATE_LIMIT_REQUESTS_PER_HOUR", "1000"))
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory, sqlite (shared per host) or redis
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "/tmp/kraftd_rate_limits.db")
+
+# Extraction Job Queue Configuration
+EXTRACTION_QUEUE_ENABLED = os.getenv("EXTRACTION_QUEUE_ENABLED", "true").lower() == "true"  # false: /extract runs inline
+EXTRACTION_QUEUE_BACKEND = os.getenv("EXTRACTION_QUEUE_BACKEND", "memory")  # memory, sqlite (shared per host) or redis
+EXTRACTION_QUEUE_REDIS_URL = os.getenv("EXTRACTION_QUEUE_REDIS_URL", "redis://localhost:6379/0")
+EXTRACTION_QUEUE_SQLITE_PATH = os.getenv("EXTRACTION_QUEUE_SQLITE_PATH", "/tmp/kraftd_extraction_jobs.db")
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))  # Jobs running at once per API process
+EXTRACTION_WORKER_MODE = os.getenv("EXTRACTION_WORKER_MODE", "process")  # process or thread
+EXTRACTION_JOB_MAX_ATTEMPTS = int(os.getenv("EXTRACTION_JOB_MAX_ATTEMPTS", "3"))
+EXTRACTION_JOB_RETRY_BASE_SECONDS = float(os.getenv("EXTRACTION_JOB_RETRY_BASE_SECONDS", "2"))  # Doubles per attempt
+EXTRACTION_JOB_RETRY_MAX_SECONDS = float(os.getenv("EXTRACTION_JOB_RETRY_MAX_SECONDS", "60"))
+EXTRACTION_JOB_STEP_TIMEOUT = float(os.getenv("EXTRACTION_JOB_STEP_TIMEOUT", "600"))  # Per parse / pipeline step
+
+# Streaming Configuration
+STREAM_PUBSUB_BACKEND = os.getenv("STREAM_PUBSUB_BACKEND", "memory")  # memory (single worker), socket (workers of one host) or redis
+STREAM_PUBSUB_REDIS_URL = os.getenv("STREAM_PUBSUB_REDIS_URL", "redis://localhost:6379/0")
+STREAM_PUBSUB_SOCKET_DIR = os.getenv("STREAM_PUBSUB_SOCKET_DIR", "/tmp/kraftd_stream")
 
 # Monitoring Configuration
 METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
@@ -37,6 +57,8 @@ CONNECTION_POOL_TIMEOUT = float(os.getenv("CONNECTION_POOL_TIMEOUT", "30"))
 # Storage Configuration
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/tmp/kraftd_uploads")
 MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "25"))  # Per MASTER INPUT SPECIFICATION
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # Bytes read per upload chunk
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))  # Files of a batch upload received at once
 
 # Logging Configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
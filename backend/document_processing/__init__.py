@@ -4,6 +4,7 @@ from .word_processor import WordProcessor
 from .excel_processor import ExcelProcessor
 from .image_processor import ImageProcessor
 from .extractor import DocumentExtractor
+from .parsed_document import ParsedDocument, ParsedPage, ParsedTable
 from .schemas import (
     DocumentType, DocumentStatus, ExtractionMethod, LineItem, Party, Contact,
     Address, DocumentMetadata, ProjectContext, Dates, CommercialTerms,
@@ -21,6 +22,9 @@ __all__ = [
     "ExcelProcessor",
     "ImageProcessor",
     "DocumentExtractor",
+    "ParsedDocument",
+    "ParsedPage",
+    "ParsedTable",
     "DocumentType",
     "DocumentStatus",
     "ExtractionMethod",
@@ -1,5 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
+from .parsed_document import ParsedDocument, ParsedPage
+
+# Default text chunk size for iter_chunks()
+CHUNK_CHARS = 20_000
 
 class BaseProcessor(ABC):
     """Base class for all document processors."""
@@ -22,6 +26,45 @@ class BaseProcessor(ABC):
         """Extract raw text from the document."""
         pass
     
+    @property
+    def source_format(self) -> str:
+        """Format name recorded on parsed documents (pdf, word, excel, image)."""
+        return self.__class__.__name__.replace("Processor", "").lower()
+    
+    def parse_document(self) -> ParsedDocument:
+        """Parse the document into a typed ParsedDocument (text, pages, table cells)."""
+        return ParsedDocument.from_parse_result(self.parse(), self.source_format)
+    
+    def iter_pages(self) -> Iterator[ParsedPage]:
+        """
+        Yield the document page by page (sheet by sheet for Excel).
+        
+        Processors override this to read the file once and hand out each page
+        as soon as it is parsed, so callers can start work (e.g. classify)
+        before the last page is read and never hold more than one page of
+        parser state. This default falls back to a full parse.
+        """
+        yield from self.parse_document().pages
+    
+    def iter_chunks(self, chunk_chars: int = CHUNK_CHARS) -> Iterator[str]:
+        """
+        Yield the document text in chunks of about `chunk_chars` characters.
+        
+        Chunks are cut at line boundaries and joining them with newlines gives
+        the same text as parse_document().text.
+        """
+        lines: List[str] = []
+        size = 0
+        for page in self.iter_pages():
+            for line in page.text.split("\n"):
+                lines.append(line)
+                size += len(line) + 1
+                if size >= chunk_chars:
+                    yield "\n".join(lines)
+                    lines, size = [], 0
+        if lines:
+            yield "\n".join(lines)
+    
     def get_document_info(self) -> Dict[str, Any]:
         """Get metadata about the document."""
         return {
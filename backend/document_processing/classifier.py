@@ -14,10 +14,42 @@ Handles:
 
 import re
 from enum import Enum
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, TYPE_CHECKING
 from dataclasses import dataclass
 from datetime import datetime
 
+from .signal_scanner import SignalScanner
+
+if TYPE_CHECKING:
+    from .context import DocumentContext
+
+# Text normalization patterns, compiled once per process
+_WHITESPACE_RE = re.compile(r'\s+')
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0b-\x0c\x0e-\x1f]')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for consistent pattern matching.
+    
+    - Lowercase
+    - Remove extra whitespace
+    - Standardize line breaks
+    """
+    if not text:
+        return ""
+
+    # Lowercase for keyword matching
+    text = text.lower()
+
+    # Normalize whitespace
+    text = _WHITESPACE_RE.sub(' ', text)
+
+    # Remove extra punctuation that interferes with matching
+    text = _CONTROL_CHARS_RE.sub('', text)
+
+    return text.strip()
+
 
 class DocumentTypeEnum(str, Enum):
     """All possible document types"""
@@ -72,16 +104,23 @@ class UniversalClassifier:
     Returns confident classification or UNKNOWN/MIXED.
     """
 
+    # Signal table shared by all instances (read-only)
+    _shared_signals: Optional[Dict] = None
+
     def __init__(self):
-        """Initialize classifier with patterns and weights"""
-        self.signals = self._init_signals()
+        """Initialize classifier with patterns and weights (built once per process)"""
+        if UniversalClassifier._shared_signals is None:
+            UniversalClassifier._shared_signals = self._init_signals()
+        self.signals = UniversalClassifier._shared_signals
+        self._scanner = SignalScanner.for_signals(self.signals)
         self.confidence_threshold = 0.60  # Below this = UNKNOWN
 
     def classify(
         self,
         text: str,
         user_hint: Optional[str] = None,
-        file_name: Optional[str] = None
+        file_name: Optional[str] = None,
+        context: Optional["DocumentContext"] = None
     ) -> ClassificationResult:
         """
         Classify document from normalized text.
@@ -90,12 +129,18 @@ class UniversalClassifier:
             text: Normalized text from any document (no file format bias)
             user_hint: User's suggestion ("RFQ", "Quote", etc.) for validation
             file_name: Original filename (for metadata only, NOT used for classification)
+            context: Optional pipeline context; its normalized view is reused
+                and the result is stored on it
 
         Returns:
             ClassificationResult with type, confidence, signals, reasoning
         """
         # Normalize text for consistent matching
-        normalized_text = self._normalize_text(text)
+        if context is not None:
+            normalized_text = context.normalized_text
+            context.record_pass("classifier", context.normalized_bytes)
+        else:
+            normalized_text = self._normalize_text(text)
 
         # Evaluate all signals
         signal_results = self._evaluate_signals(normalized_text)
@@ -156,31 +201,16 @@ class UniversalClassifier:
             requires_review=requires_review
         )
 
+        if context is not None:
+            context.classification = result
+
         return result
 
     # ==================== TEXT NORMALIZATION ====================
 
     def _normalize_text(self, text: str) -> str:
-        """
-        Normalize text for consistent pattern matching.
-        
-        - Lowercase
-        - Remove extra whitespace
-        - Standardize line breaks
-        """
-        if not text:
-            return ""
-
-        # Lowercase for keyword matching
-        text = text.lower()
-
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text)
-
-        # Remove extra punctuation that interferes with matching
-        text = re.sub(r'[\x00-\x08\x0b-\x0c\x0e-\x1f]', '', text)
-
-        return text.strip()
+        """Normalize text for consistent pattern matching (see normalize_text)"""
+        return normalize_text(text)
 
     # ==================== SIGNAL EVALUATION ====================
 
@@ -406,30 +436,17 @@ class UniversalClassifier:
         """
         results = []
 
-        for signal_name, signal_def in self.signals.items():
-            matched = False
-            evidence = []
-            max_confidence = 0
-
-            # Try all patterns in this signal
-            for pattern in signal_def["patterns"]:
-                matches = re.findall(pattern, text)
-                if matches:
-                    matched = True
-                    evidence.extend(matches[:3])  # Keep first 3 matches
-                    max_confidence = max(max_confidence, 0.8)
-
-            # Create signal result
-            signal_result = ClassificationSignal(
-                signal_name=signal_name,
-                matched=matched,
-                weight=signal_def["weight"],
-                confidence=max_confidence if matched else 0,
-                evidence=evidence
+        for signal_name, matched, evidence in self._scanner.scan(text):
+            results.append(
+                ClassificationSignal(
+                    signal_name=signal_name,
+                    matched=matched,
+                    weight=self._scanner.weights[signal_name],
+                    confidence=0.8 if matched else 0,
+                    evidence=evidence
+                )
             )
 
-            results.append(signal_result)
-
         return results
 
     # ==================== SCORING ====================
@@ -451,11 +468,7 @@ class UniversalClassifier:
         for signal in signals:
             if signal.matched:
                 # Find what type this signal targets
-                target_type = None
-                for sig_name, sig_def in self.signals.items():
-                    if sig_name == signal.signal_name:
-                        target_type = sig_def["target_type"]
-                        break
+                target_type = self._scanner.target_type(signal.signal_name)
 
                 if target_type and target_type in scores:
                     # Add weighted contribution
@@ -623,13 +636,23 @@ class UniversalClassifier:
 
     def _signal_targets_type(self, signal_name: str, doc_type: DocumentTypeEnum) -> bool:
         """Check if a signal targets a specific document type"""
-        if signal_name not in self.signals:
-            return False
-        return self.signals[signal_name]["target_type"] == doc_type
+        return self._scanner.target_type(signal_name) == doc_type
 
 
 # ==================== STANDALONE FUNCTIONS ====================
 
+# Shared classifier (stateless, safe to reuse across threads)
+_classifier: Optional[UniversalClassifier] = None
+
+
+def get_classifier() -> UniversalClassifier:
+    """Get or create the process-wide UniversalClassifier instance (singleton)."""
+    global _classifier
+    if _classifier is None:
+        _classifier = UniversalClassifier()
+    return _classifier
+
+
 def classify_document(
     text: str,
     user_hint: Optional[str] = None,
@@ -642,5 +665,4 @@ def classify_document(
         result = classify_document(normalized_text, user_hint="RFQ")
         print(f"{result.document_type} ({result.confidence:.0%})")
     """
-    classifier = UniversalClassifier()
-    return classifier.classify(text, user_hint, file_name)
+    return get_classifier().classify(text, user_hint, file_name)
@@ -0,0 +1,94 @@
+"""
+Per-Document Processing Context
+
+Carries one document through the extraction pipeline so every stage reuses
+the same precomputed text views and the classifier result instead of
+rebuilding them.
+
+Views are computed lazily on first use and then cached:
+- normalized_text: lowercase, single-spaced text used by the classifier
+- lower_text: lowercase copy of the original text
+- lines: original text split into lines
+
+When the pipeline is given a ParsedDocument, the context also carries its
+table cells so line item extraction can read real columns instead of
+re-splitting text.
+
+The context also keeps an estimate of the text bytes each stage scanned:
+a stage records the size of a text view each time it makes a pass over it
+(the regexes within one pass are not counted one by one). A stage that
+starts re-reading the document (e.g. classifying twice) still shows up in
+the pipeline metrics. It also carries the StageTimer the stages are timed
+with.
+"""
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from .parsed_document import ParsedDocument, ParsedTable
+from .timing import StageTimer
+
+if TYPE_CHECKING:
+    from .classifier import ClassificationResult
+
+
+@dataclass
+class DocumentContext:
+    """Shared state for one document passing through the pipeline"""
+    text: str
+    source_file: Optional[str] = None
+    classification: Optional["ClassificationResult"] = None
+    tables: List[ParsedTable] = field(default_factory=list)
+    bytes_scanned_estimate: Dict[str, int] = field(default_factory=dict)
+    timer: StageTimer = field(default_factory=StageTimer)
+
+    @classmethod
+    def from_parsed(cls, parsed: ParsedDocument, source_file: Optional[str] = None) -> "DocumentContext":
+        """Context for a typed parse result (text plus table cells)"""
+        return cls(parsed.text, source_file=source_file, tables=parsed.tables)
+
+    @cached_property
+    def normalized_text(self) -> str:
+        """Classifier view of the text (lowercase, whitespace collapsed)"""
+        from .classifier import normalize_text
+        return normalize_text(self.text)
+
+    @cached_property
+    def lower_text(self) -> str:
+        """Lowercase copy of the original text"""
+        return self.text.lower()
+
+    @cached_property
+    def lines(self) -> List[str]:
+        """Original text split into lines"""
+        return self.text.split('\n')
+
+    @cached_property
+    def lower_lines(self) -> List[str]:
+        """Lowercase lines, aligned with `lines`"""
+        return self.lower_text.split('\n')
+
+    @cached_property
+    def line_count(self) -> int:
+        """Number of lines in the original text"""
+        return self.text.count('\n') + 1
+
+    @cached_property
+    def text_bytes(self) -> int:
+        """Size of the original text in UTF-8 bytes"""
+        return len(self.text.encode('utf-8'))
+
+    @cached_property
+    def normalized_bytes(self) -> int:
+        """Size of the normalized text in UTF-8 bytes"""
+        return len(self.normalized_text.encode('utf-8'))
+
+    def record_pass(self, stage: str, num_bytes: int) -> None:
+        """Count one pass of a stage over a text view of `num_bytes` bytes"""
+        self.bytes_scanned_estimate[stage] = self.bytes_scanned_estimate.get(stage, 0) + num_bytes
+
+    @property
+    def total_bytes_scanned_estimate(self) -> int:
+        """Estimated bytes scanned across all stages"""
+        return sum(self.bytes_scanned_estimate.values())
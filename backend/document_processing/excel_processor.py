@@ -1,40 +1,68 @@
+import os
 import pandas as pd
 import openpyxl
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from .base_processor import BaseProcessor
+from .parsed_document import ParsedDocument, ParsedPage, ParsedTable
+
+# Per-sheet read limits (0 = no limit); rows beyond the limit are never read
+EXCEL_MAX_ROWS = int(os.getenv("EXCEL_MAX_ROWS", "0"))
+EXCEL_MAX_COLS = int(os.getenv("EXCEL_MAX_COLS", "0"))
 
 class ExcelProcessor(BaseProcessor):
     """Process Excel (.xlsx) documents and extract tables, structured data."""
-    
+
+    def __init__(self, file_path: str, max_rows: Optional[int] = None, max_cols: Optional[int] = None):
+        """
+        Args:
+            file_path: Path to the workbook
+            max_rows: Data rows read per sheet (default EXCEL_MAX_ROWS, 0 = all)
+            max_cols: Columns read per sheet (default EXCEL_MAX_COLS, 0 = all)
+        """
+        super().__init__(file_path)
+        self.max_rows = EXCEL_MAX_ROWS if max_rows is None else max_rows
+        self.max_cols = EXCEL_MAX_COLS if max_cols is None else max_cols
+
     def parse(self) -> Dict[str, Any]:
         """Parse Excel document and return structured data."""
         try:
-            xl_file = pd.ExcelFile(self.file_path)
             result = {
-                "sheet_names": xl_file.sheet_names,
+                "sheet_names": [],
                 "sheets": []
             }
-            
-            for sheet_name in xl_file.sheet_names:
-                df = pd.read_excel(self.file_path, sheet_name=sheet_name)
+
+            for sheet_name, df in self._read_sheets():
+                result["sheet_names"].append(sheet_name)
                 result["sheets"].append({
                     "sheet_name": sheet_name,
                     "rows": len(df),
                     "columns": len(df.columns),
                     "data": df.to_dict(orient="records")
                 })
-            
+
             return result
         except Exception as e:
             return {"error": f"Failed to parse Excel document: {str(e)}"}
-    
+
+    def parse_document(self) -> ParsedDocument:
+        """Parse straight into sheet tables, without building per-row record dicts."""
+        try:
+            return ParsedDocument.from_pages(list(self.iter_pages()), "excel")
+        except Exception as e:
+            return ParsedDocument(text="", source_format="excel", error=f"Failed to parse Excel document: {str(e)}")
+
+    def iter_pages(self) -> Iterator[ParsedPage]:
+        """Yield one page per sheet, reading sheets one at a time from a single open workbook."""
+        for index, (sheet_name, df) in enumerate(self._read_sheets(), 1):
+            table = ParsedTable.from_rows(_frame_rows(df), page_number=index, name=sheet_name)
+            del df
+            yield ParsedPage.for_sheet(index, table)
+
     def extract_tables(self) -> List[List[Dict]]:
         """Extract all tables (sheets) from the Excel document."""
         tables = []
         try:
-            xl_file = pd.ExcelFile(self.file_path)
-            for sheet_name in xl_file.sheet_names:
-                df = pd.read_excel(self.file_path, sheet_name=sheet_name)
+            for sheet_name, df in self._read_sheets():
                 tables.append({
                     "sheet_name": sheet_name,
                     "data": df.to_dict(orient="records"),
@@ -43,24 +71,22 @@ class ExcelProcessor(BaseProcessor):
         except Exception as e:
             return [{"error": f"Failed to extract tables: {str(e)}"}]
         return tables
-    
+
     def extract_text(self) -> str:
         """Extract all text from the Excel document."""
         text = ""
         try:
-            xl_file = pd.ExcelFile(self.file_path)
-            for sheet_name in xl_file.sheet_names:
-                df = pd.read_excel(self.file_path, sheet_name=sheet_name)
+            for sheet_name, df in self._read_sheets():
                 text += f"Sheet: {sheet_name}\n"
                 text += df.to_string() + "\n\n"
         except Exception as e:
             text = f"Error extracting text: {str(e)}"
         return text
-    
+
     def get_sheet_data(self, sheet_name: str) -> Dict[str, Any]:
         """Get data from a specific sheet."""
         try:
-            df = pd.read_excel(self.file_path, sheet_name=sheet_name)
+            _, df = next(self._read_sheets([sheet_name]))
             return {
                 "sheet_name": sheet_name,
                 "rows": len(df),
@@ -69,3 +95,39 @@ class ExcelProcessor(BaseProcessor):
             }
         except Exception as e:
             return {"error": f"Failed to get sheet data: {str(e)}"}
+
+    def _read_sheets(self, sheet_names: Optional[List[str]] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Yield (sheet name, DataFrame) for each sheet from a single open of the workbook.
+
+        Sheets are read one at a time through the open ExcelFile (openpyxl
+        read-only mode for .xlsx), with the row/column limits applied by the
+        reader so cells past them are never loaded. Frames stay columnar;
+        callers decide whether they need records.
+        """
+        with pd.ExcelFile(self.file_path) as xl_file:
+            for sheet_name in sheet_names or xl_file.sheet_names:
+                usecols = self._column_limit(xl_file, sheet_name)
+                df = xl_file.parse(sheet_name, nrows=self.max_rows or None, usecols=usecols)
+                if self.max_cols and usecols is None:
+                    df = df.iloc[:, :self.max_cols]
+                yield sheet_name, df
+
+    def _column_limit(self, xl_file: pd.ExcelFile, sheet_name: str) -> Optional[List[int]]:
+        """Column indices to read under max_cols, when the sheet's width is known up front"""
+        if not self.max_cols:
+            return None
+        book = xl_file.book
+        if not isinstance(book, openpyxl.Workbook):
+            return None
+        # Read-only worksheets report their size from the stored dimension (None if absent)
+        width = book[sheet_name].max_column
+        return list(range(min(self.max_cols, width))) if width else None
+
+
+def _frame_rows(df: pd.DataFrame) -> Iterator[tuple]:
+    """Header plus body rows, pulled out of the frame a column at a time (no per-row Series or dicts)"""
+    if not len(df.columns):
+        return iter(())
+    columns = [[column] + df.iloc[:, i].tolist() for i, column in enumerate(df.columns)]
+    return zip(*columns)
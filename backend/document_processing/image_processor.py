@@ -1,12 +1,30 @@
-import pytesseract
+from collections import deque
+from concurrent.futures import Future
 from PIL import Image
 import pdfplumber
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from .base_processor import BaseProcessor
+from .ocr import OCREngine, get_ocr_engine
+from .parsed_document import ParsedPage
+
+# Pages with less text than this are treated as scanned and OCRed
+MIN_TEXT_CHARS = 50
+OCR_FAILED_TEXT = "Failed to OCR page"
 
 class ImageProcessor(BaseProcessor):
     """Process scanned images and PDFs using OCR to extract text and data."""
-    
+
+    def __init__(self, file_path: str, ocr_engine: Optional[OCREngine] = None):
+        """
+        Args:
+            file_path: Path to the image or scanned PDF
+            ocr_engine: OCR engine to use (default: the shared engine)
+        """
+        super().__init__(file_path)
+        self.ocr = ocr_engine or get_ocr_engine()
+        # Pages from the last complete pass, so extract_text() after parse() does not OCR again
+        self._pages: Optional[List[ParsedPage]] = None
+
     def parse(self) -> Dict[str, Any]:
         """Parse image/scanned PDF and return structured data using OCR."""
         try:
@@ -16,13 +34,14 @@ class ImageProcessor(BaseProcessor):
                 return self._parse_image()
         except Exception as e:
             return {"error": f"Failed to parse image: {str(e)}"}
-    
+
     def _parse_image(self) -> Dict[str, Any]:
         """Parse a single image file."""
         try:
             image = Image.open(self.file_path)
-            text = pytesseract.image_to_string(image)
-            
+            text = self.ocr.recognize(image)
+            self._pages = [ParsedPage(page_number=1, text=text)]
+
             return {
                 "file_type": "image",
                 "text": text,
@@ -31,7 +50,7 @@ class ImageProcessor(BaseProcessor):
             }
         except Exception as e:
             return {"error": f"Failed to parse image: {str(e)}"}
-    
+
     def _parse_scanned_pdf(self) -> Dict[str, Any]:
         """Parse a scanned PDF using OCR."""
         try:
@@ -40,53 +59,84 @@ class ImageProcessor(BaseProcessor):
                 "pages": [],
                 "full_text": ""
             }
-            
-            with pdfplumber.open(self.file_path) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Try to extract text directly first
-                    text = page.extract_text()
-                    
-                    # If minimal text extracted, use OCR on page image
-                    if not text or len(text.strip()) < 50:
-                        try:
-                            image = page.to_image()
-                            text = pytesseract.image_to_string(image.original)
-                        except:
-                            text = "Failed to OCR page"
-                    
-                    result["pages"].append({
-                        "page_number": page_num,
-                        "text": text
-                    })
-                    result["full_text"] += text + "\n"
-            
+
+            for page in self.iter_pages():
+                result["pages"].append({
+                    "page_number": page.page_number,
+                    "text": page.text
+                })
+                result["full_text"] += page.text + "\n"
+
             return result
         except Exception as e:
             return {"error": f"Failed to parse scanned PDF: {str(e)}"}
-    
+
+    def iter_pages(self) -> Iterator[ParsedPage]:
+        """
+        Yield OCR text page by page (a single page for image files), opening the file once.
+
+        Scanned pages are rendered and queued on the OCR pool as they are read,
+        up to two per OCR worker ahead of the page being yielded, so tesseract
+        runs on several pages at once while pages still come out in order.
+        """
+        if self._pages is not None:
+            yield from self._pages
+            return
+
+        pages = []
+        if not self.file_path.lower().endswith('.pdf'):
+            pages.append(ParsedPage(page_number=1, text=self.ocr.recognize(Image.open(self.file_path))))
+            yield pages[0]
+        else:
+            read_ahead = self.ocr.max_workers * 2
+            pending = deque()
+            with pdfplumber.open(self.file_path) as pdf:
+                for page_num, page in enumerate(pdf.pages, 1):
+                    pending.append((page_num, self._submit_page(page)))
+                    page.close()
+                    while len(pending) > read_ahead or (pending and pending[0][1].done()):
+                        pages.append(self._resolve_page(*pending.popleft()))
+                        yield pages[-1]
+            while pending:
+                pages.append(self._resolve_page(*pending.popleft()))
+                yield pages[-1]
+        self._pages = pages
+
+    def _submit_page(self, page) -> "Future[str]":
+        """Text of a PDF page, queuing OCR on the page image when it has (almost) no text layer."""
+        # Try to extract text directly first
+        text = page.extract_text()
+
+        # If minimal text extracted, use OCR on page image
+        if not text or len(text.strip()) < MIN_TEXT_CHARS:
+            try:
+                return self.ocr.submit(self.ocr.render_page(page))
+            except Exception:
+                text = OCR_FAILED_TEXT
+
+        future: Future = Future()
+        future.set_result(text)
+        return future
+
+    @staticmethod
+    def _resolve_page(page_num: int, future: "Future[str]") -> ParsedPage:
+        """Wait for a page's text; failed or timed-out OCR yields a placeholder instead of failing the document"""
+        try:
+            text = future.result()
+        except Exception:
+            text = OCR_FAILED_TEXT
+        return ParsedPage(page_number=page_num, text=text)
+
     def extract_tables(self) -> List[List[Dict]]:
         """Extract tables from OCR'd text (limited capability)."""
         # OCR-based table extraction is limited; recommend pre-processing
         return [{"note": "Table extraction from OCR'd images is limited. Consider pre-processing or manual review."}]
-    
+
     def extract_text(self) -> str:
-        """Extract all text from the image using OCR."""
-        text = ""
+        """Extract all text from the image using OCR (reuses the pages of an earlier parse)."""
         try:
             if self.file_path.lower().endswith('.pdf'):
-                with pdfplumber.open(self.file_path) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if not page_text or len(page_text.strip()) < 50:
-                            try:
-                                image = page.to_image()
-                                page_text = pytesseract.image_to_string(image.original)
-                            except:
-                                pass
-                        text += page_text + "\n"
-            else:
-                image = Image.open(self.file_path)
-                text = pytesseract.image_to_string(image)
+                return "".join(page.text + "\n" for page in self.iter_pages())
+            return self._pages[0].text if self._pages else self.ocr.recognize(Image.open(self.file_path))
         except Exception as e:
-            text = f"Error extracting text with OCR: {str(e)}"
-        return text
+            return f"Error extracting text with OCR: {str(e)}"
@@ -17,15 +17,50 @@ from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, date, timedelta
 from dataclasses import dataclass
 import re
+import time
 import logging
 
 from .schemas import (
     KraftdDocument, LineItem, DocumentType, Currency, Dates,
     CommercialTerms, Party, Contact, Address, ProcessingMetadata, ExtractionMethod
 )
+from .context import DocumentContext
 
 logger = logging.getLogger(__name__)
 
+# Rule patterns, compiled once per process
+_CURRENCY_PATTERNS = {
+    currency: re.compile(pattern, re.IGNORECASE)
+    for currency, pattern in {
+        'SAR': r'\bsar\b|\bريال\b',
+        'USD': r'\busd\b|\b\$\b',
+        'AED': r'\baed\b|درهم',
+        'EUR': r'\beur\b|€',
+        'GBP': r'\bgbp\b|£',
+        'INR': r'\binr\b|₹',
+    }.items()
+}
+
+# Common Incoterms
+_INCOTERMS = {
+    'FOB': 'Free on Board',
+    'CIF': 'Cost, Insurance & Freight',
+    'DAP': 'Delivered at Place',
+    'DDP': 'Delivered Duty Paid',
+    'EXW': 'Ex Works',
+}
+_INCOTERM_PATTERNS = {
+    term: re.compile(rf'\b{term}\b', re.IGNORECASE) for term in _INCOTERMS
+}
+
+_EMAIL_RE = re.compile(r'\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b', re.IGNORECASE)
+_PHONE_RE = re.compile(r'(?:\+|00)?[\d\s\-\(\)]{10,}')
+_DELIVERY_LEAD_TIME_RE = re.compile(r'delivery.*?(\d+)\s*(?:weeks?|days?|months?)', re.IGNORECASE)
+_TIME_UNIT_RE = re.compile(r'weeks?|days?|months?', re.IGNORECASE)
+_DISCOUNT_RE = re.compile(r'(?:discount|off|reduction)[\s:]*(\d+(?:\.\d+)?)\s*%', re.IGNORECASE)
+_ADVANCE_PAYMENT_RE = re.compile(r'advance\s+(?:payment)?[\s:]*(\d+)\s*%', re.IGNORECASE)
+_MILESTONE_PAYMENT_RE = re.compile(r'milestone|progress\s+payment|stage.*payment', re.IGNORECASE)
+
 
 @dataclass
 class InferenceSignal:
@@ -143,17 +178,8 @@ class FieldInferencer:
             return signals
         
         # Look for currency patterns in text
-        currency_patterns = {
-            'SAR': r'\bsar\b|\bريال\b',
-            'USD': r'\busd\b|\b\$\b',
-            'AED': r'\baed\b|درهم',
-            'EUR': r'\beur\b|€',
-            'GBP': r'\bgbp\b|£',
-            'INR': r'\binr\b|₹',
-        }
-        
-        for currency, pattern in currency_patterns.items():
-            if re.search(pattern, text, re.IGNORECASE):
+        for currency, pattern in _CURRENCY_PATTERNS.items():
+            if pattern.search(text):
                 signals.append(InferenceSignal(
                     rule_name='infer_currency',
                     field_name='currency',
@@ -180,8 +206,7 @@ class FieldInferencer:
         signals = []
         
         # Look for email patterns
-        email_pattern = r'\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b'
-        emails = re.findall(email_pattern, text, re.IGNORECASE)
+        emails = _EMAIL_RE.findall(text)
         
         if emails and doc.parties:
             for role, party in doc.parties.items():
@@ -197,8 +222,7 @@ class FieldInferencer:
                     break
         
         # Look for phone patterns
-        phone_pattern = r'(?:\+|00)?[\d\s\-\(\)]{10,}'
-        phones = re.findall(phone_pattern, text)
+        phones = _PHONE_RE.findall(text)
         
         if phones and doc.parties:
             for role, party in doc.parties.items():
@@ -258,10 +282,10 @@ class FieldInferencer:
         # Infer delivery date from lead time if not present
         if doc.dates.issue_date and not doc.dates.delivery_date:
             # Look for delivery timeframe in text
-            delivery_match = re.search(r'delivery.*?(\d+)\s*(?:weeks?|days?|months?)', text, re.IGNORECASE)
+            delivery_match = _DELIVERY_LEAD_TIME_RE.search(text)
             if delivery_match:
                 timeframe = delivery_match.group(1)
-                unit = re.search(r'weeks?|days?|months?', text, re.IGNORECASE).group(0).lower()
+                unit = _TIME_UNIT_RE.search(text).group(0).lower()
                 
                 try:
                     days = int(timeframe)
@@ -289,17 +313,8 @@ class FieldInferencer:
         """Detect Incoterms and delivery conditions"""
         signals = []
         
-        # Common Incoterms
-        incoterms_map = {
-            'FOB': 'Free on Board',
-            'CIF': 'Cost, Insurance & Freight',
-            'DAP': 'Delivered at Place',
-            'DDP': 'Delivered Duty Paid',
-            'EXW': 'Ex Works',
-        }
-        
-        for term, desc in incoterms_map.items():
-            if re.search(rf'\b{term}\b', text, re.IGNORECASE):
+        for term, desc in _INCOTERMS.items():
+            if _INCOTERM_PATTERNS[term].search(text):
                 signals.append(InferenceSignal(
                     rule_name='detect_delivery_terms',
                     field_name='incoterms',
@@ -316,8 +331,7 @@ class FieldInferencer:
         signals = []
         
         # Look for discount patterns
-        discount_pattern = r'(?:discount|off|reduction)[\s:]*(\d+(?:\.\d+)?)\s*%'
-        discount_matches = re.finditer(discount_pattern, text, re.IGNORECASE)
+        discount_matches = _DISCOUNT_RE.finditer(text)
         
         discount_found = False
         for match in discount_matches:
@@ -349,7 +363,7 @@ class FieldInferencer:
             return signals
         
         # Check for advance payment
-        advance_match = re.search(r'advance\s+(?:payment)?[\s:]*(\d+)\s*%', text, re.IGNORECASE)
+        advance_match = _ADVANCE_PAYMENT_RE.search(text)
         if advance_match:
             advance_pct = float(advance_match.group(1))
             doc.commercial_terms.advance_payment_percentage = advance_pct
@@ -363,7 +377,7 @@ class FieldInferencer:
             ))
         
         # Check for milestone-based
-        if re.search(r'milestone|progress\s+payment|stage.*payment', text, re.IGNORECASE):
+        if _MILESTONE_PAYMENT_RE.search(text):
             doc.commercial_terms.milestone_based_payment = True
             signals.append(InferenceSignal(
                 rule_name='infer_payment_terms',
@@ -424,27 +438,41 @@ class DocumentInferencer:
     def __init__(self):
         self.inferencer = FieldInferencer()
     
-    def infer(self, doc: KraftdDocument, text: str) -> Tuple[KraftdDocument, List[InferenceSignal]]:
+    def infer(
+        self,
+        doc: KraftdDocument,
+        text: str,
+        context: Optional[DocumentContext] = None
+    ) -> Tuple[KraftdDocument, List[InferenceSignal]]:
         """
         Apply all inference rules to document.
         
         Args:
             doc: KraftdDocument from Mapper stage
             text: Original normalized text for context
+            context: Optional pipeline context used for scan accounting and rule timings
         
         Returns:
             (Enhanced KraftdDocument, List of inference signals)
         """
         
         all_signals = []
+        timer = None
+        
+        if context is not None:
+            context.record_pass("inferencer", context.text_bytes)
+            timer = context.timer
         
-        # Apply each inference rule
+        # Apply each inference rule (timed per rule when running in the pipeline)
         for rule_name, rule_func in self.inferencer.inference_rules.items():
+            start_ns = time.perf_counter_ns()
             try:
                 signals = rule_func(doc, text)
                 all_signals.extend(signals)
             except Exception as e:
                 logger.warning(f"Inference rule '{rule_name}' failed: {e}")
+            if timer is not None:
+                timer.record_rule("inferencer", rule_name, time.perf_counter_ns() - start_ns)
         
         # Update document metadata to show inference was applied
         if doc.processing_metadata:
@@ -456,7 +484,23 @@ class DocumentInferencer:
         return doc, all_signals
 
 
-def infer_document(doc: KraftdDocument, text: str) -> Tuple[KraftdDocument, List[InferenceSignal]]:
+# Shared inferencer (stateless, safe to reuse across threads)
+_document_inferencer: Optional[DocumentInferencer] = None
+
+
+def get_document_inferencer() -> DocumentInferencer:
+    """Get or create the process-wide DocumentInferencer instance (singleton)."""
+    global _document_inferencer
+    if _document_inferencer is None:
+        _document_inferencer = DocumentInferencer()
+    return _document_inferencer
+
+
+def infer_document(
+    doc: KraftdDocument,
+    text: str,
+    context: Optional[DocumentContext] = None
+) -> Tuple[KraftdDocument, List[InferenceSignal]]:
     """
     Quick function to apply inference rules.
     
@@ -465,5 +509,4 @@ def infer_document(doc: KraftdDocument, text: str) -> Tuple[KraftdDocument, List
         for signal in signals:
             print(f"{signal.field_name}: {signal.inferred_value}")
     """
-    inferencer = DocumentInferencer()
-    return inferencer.infer(doc, text)
+    return get_document_inferencer().infer(doc, text, context)
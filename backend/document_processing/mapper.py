@@ -28,7 +28,27 @@ from .schemas import (
     DocumentStatus, ExtractionMethod, RFQData, QuotationData, POData, ContractData,
     RFQScope, SubmissionInstructions, EvaluationCriteria, RFQConditions
 )
-from .classifier import DocumentTypeEnum, classify_document
+from .classifier import DocumentTypeEnum, classify_document, get_classifier
+from .context import DocumentContext
+from .parsed_document import ParsedTable
+
+# Flags used for every field extraction pattern
+FIELD_PATTERN_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Helper patterns, compiled once per process
+_LINE_NUMBER_RE = re.compile(r'^\s*(\d+)\s*[\s\.|)]+')
+_LINE_SPLIT_RE = re.compile(r'\s*\|\s*|,\s+')
+_NUMBER_RE = re.compile(r'[\d,]+\.?\d*')
+_DECIMAL_RE = re.compile(r'[\d.]+')
+_ADVANCE_PAYMENT_RE = re.compile(r"advance\s+payment|upfront", re.IGNORECASE)
+_ADVANCE_PERCENT_RE = re.compile(r"advance.*?(\d+)\s*%", re.IGNORECASE)
+_MILESTONE_RE = re.compile(r"milestone|progress payment", re.IGNORECASE)
+_WARRANTY_RE = re.compile(r"warranty.*?(\d+)\s*(?:month|year|day)", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b", re.IGNORECASE)
+_PHONE_RE = re.compile(r"(?:\+|00)?[\d\s\-\(\)]{10,}")
+
+# Header cells that identify line item table columns
+_LINE_NUMBER_HEADERS = {'item', 'item no', 'item no.', 'no', 'no.', '#', 's/n', 'sn', 'sr', 'sr.', 'sl', 'line'}
 
 
 @dataclass
@@ -44,12 +64,20 @@ class ExtractionSignal:
 class FieldExtractor:
     """Extract specific fields using various methods"""
     
+    # Compiled pattern table shared by all instances (read-only)
+    _compiled_patterns: Optional[Dict[str, List[re.Pattern]]] = None
+    
     def __init__(self):
-        """Initialize field extraction patterns"""
-        self.patterns = self._init_patterns()
+        """Initialize field extraction patterns (compiled once per process)"""
+        if FieldExtractor._compiled_patterns is None:
+            FieldExtractor._compiled_patterns = {
+                field_name: [re.compile(pattern, FIELD_PATTERN_FLAGS) for pattern in patterns]
+                for field_name, patterns in self._init_patterns().items()
+            }
+        self.patterns = FieldExtractor._compiled_patterns
     
     def _init_patterns(self) -> Dict[str, List[str]]:
-        """Initialize regex patterns for field extraction"""
+        """Regex source for field extraction (compiled with FIELD_PATTERN_FLAGS)"""
         return {
             # Parties
             "supplier_name": [
@@ -103,7 +131,7 @@ class FieldExtractor:
             ],
         }
     
-    def extract_party(self, text: str, party_type: str) -> Optional[Party]:
+    def extract_party(self, text: str, party_type: str, context: Optional[DocumentContext] = None) -> Optional[Party]:
         """Extract party (buyer/supplier) from text"""
         name_pattern = f"{party_type}_name"
         
@@ -120,7 +148,7 @@ class FieldExtractor:
         )
         
         # Extract address
-        address = self._extract_address(text)
+        address = self._extract_address(text, context)
         
         return Party(
             name=name.strip(),
@@ -142,37 +170,38 @@ class FieldExtractor:
         
         return dates
     
-    def extract_line_items(self, text: str) -> List[LineItem]:
-        """Extract line items from text"""
+    def extract_line_items(self, text: str, context: Optional[DocumentContext] = None) -> List[LineItem]:
+        """Extract line items from text (reusing the context's line splits if given)"""
         line_items = []
         
+        if context is None:
+            context = DocumentContext(text)
+        
         # Try to find structured tables first
-        items_from_table = self._extract_from_table(text)
+        items_from_table = self._extract_from_table(text, context)
         if items_from_table:
             return items_from_table
         
         # Look for patterns like rows with line numbers
         # Split text by lines and find table-like sections
-        lines = text.split('\n')
-        
-        for line in lines:
+        for line, line_lower in zip(context.lines, context.lower_lines):
             # Skip empty or header lines
-            if not line.strip() or any(x in line.lower() for x in ['item', 'description', 'qty', 'quantity', 'price', '---']):
+            if not line.strip() or any(x in line_lower for x in ['item', 'description', 'qty', 'quantity', 'price', '---']):
                 continue
             
             # Look for lines starting with numbers (line items)
-            match = re.match(r'^\s*(\d+)\s*[\s\.|)]+', line)
+            match = _LINE_NUMBER_RE.match(line)
             if match:
                 try:
                     # Extract components
-                    parts = re.split(r'\s*\|\s*|,\s+', line)
+                    parts = _LINE_SPLIT_RE.split(line)
                     
                     if len(parts) >= 3:
                         # Find numeric values in the parts
                         numbers = []
                         for part in parts:
                             # Extract all numbers from part
-                            nums = re.findall(r'[\d,]+\.?\d*', part)
+                            nums = _NUMBER_RE.findall(part)
                             if nums:
                                 numbers.append(float(nums[0].replace(',', '')))
                         
@@ -214,17 +243,17 @@ class FieldExtractor:
         payment_terms = self._extract_single_field(text, "payment_terms")
         
         # Check for advance payment
-        has_advance = bool(re.search(r"advance\s+payment|upfront", text, re.IGNORECASE))
+        has_advance = bool(_ADVANCE_PAYMENT_RE.search(text))
         advance_pct = None
-        advance_match = re.search(r"advance.*?(\d+)\s*%", text, re.IGNORECASE)
+        advance_match = _ADVANCE_PERCENT_RE.search(text)
         if advance_match:
             advance_pct = float(advance_match.group(1))
         
         # Check for milestone-based
-        has_milestone = bool(re.search(r"milestone|progress payment", text, re.IGNORECASE))
+        has_milestone = bool(_MILESTONE_RE.search(text))
         
         # Warranty
-        warranty_match = re.search(r"warranty.*?(\d+)\s*(?:month|year|day)", text, re.IGNORECASE)
+        warranty_match = _WARRANTY_RE.search(text)
         warranty_period = warranty_match.group(0) if warranty_match else None
         
         return CommercialTerms(
@@ -246,7 +275,7 @@ class FieldExtractor:
         
         patterns = self.patterns[field_name]
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip() if match.lastindex else match.group(0).strip()
         
@@ -254,22 +283,24 @@ class FieldExtractor:
     
     def _extract_email(self, text: str) -> Optional[str]:
         """Extract email address"""
-        match = re.search(r"\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b", text, re.IGNORECASE)
+        match = _EMAIL_RE.search(text)
         return match.group(0) if match else None
     
     def _extract_phone(self, text: str) -> Optional[str]:
         """Extract phone number"""
-        match = re.search(r"(?:\+|00)?[\d\s\-\(\)]{10,}", text)
+        match = _PHONE_RE.search(text)
         return match.group(0).strip() if match else None
     
-    def _extract_address(self, text: str) -> Optional[Address]:
+    def _extract_address(self, text: str, context: Optional[DocumentContext] = None) -> Optional[Address]:
         """Extract address components"""
         # Simplified address extraction
-        lines = text.split('\n')
+        if context is None:
+            context = DocumentContext(text)
+        lines = context.lines
         address_lines = []
         
-        for i, line in enumerate(lines):
-            if any(x in line.lower() for x in ['address', 'city', 'country', 'postal']):
+        for i, line_lower in enumerate(context.lower_lines):
+            if any(x in line_lower for x in ['address', 'city', 'country', 'postal']):
                 # Capture this line and next few lines
                 address_lines.extend(lines[i:min(i+3, len(lines))])
                 break
@@ -285,18 +316,25 @@ class FieldExtractor:
             country=None
         )
     
-    def _extract_from_table(self, text: str) -> List[LineItem]:
+    def _extract_from_table(self, text: str, context: Optional[DocumentContext] = None) -> List[LineItem]:
         """Try to extract line items from table structure"""
+        # Real table cells from the parser beat re-splitting text
+        if context is not None and context.tables:
+            items = self._extract_from_parsed_tables(context.tables)
+            if items:
+                return items
+        
         # Look for table patterns: item | qty | price
         items = []
         
         # Split by common table delimiters
-        lines = text.split('\n')
+        if context is None:
+            context = DocumentContext(text)
         table_lines = []
         in_table = False
         
-        for line in lines:
-            if '|' in line or any(x in line.lower() for x in ['qty', 'quantity', 'price', 'amount', 'item']):
+        for line, line_lower in zip(context.lines, context.lower_lines):
+            if '|' in line or any(x in line_lower for x in ['qty', 'quantity', 'price', 'amount', 'item']):
                 in_table = True
                 table_lines.append(line)
             elif in_table and (line.strip() == '' or not any(c.isdigit() for c in line)):
@@ -311,13 +349,13 @@ class FieldExtractor:
                     desc = parts[0]
                     
                     # Try to find qty in parts[1]
-                    qty_match = re.search(r'[\d.]+', parts[1] or '0')
+                    qty_match = _DECIMAL_RE.search(parts[1] or '0')
                     if not qty_match:
                         continue
                     qty = float(qty_match.group())
                     
                     # Try to find price in last part
-                    price_match = re.search(r'[\d.]+', parts[-1] or '0')
+                    price_match = _DECIMAL_RE.search(parts[-1] or '0')
                     if not price_match:
                         continue
                     price = float(price_match.group().replace(',', ''))
@@ -337,6 +375,87 @@ class FieldExtractor:
         
         return items
     
+    def _extract_from_parsed_tables(self, tables: List[ParsedTable]) -> List[LineItem]:
+        """Extract line items from parsed table cells using the header row to map columns"""
+        items = []
+        
+        for table in tables:
+            columns = self._map_table_columns(table.header)
+            if 'description' not in columns or 'quantity' not in columns:
+                continue
+            if 'unit_price' not in columns and 'total_price' not in columns:
+                continue
+            
+            for row in table.body:
+                values = {role: row[i] if i < len(row) else '' for role, i in columns.items()}
+                
+                qty = self._parse_number(values.get('quantity'))
+                desc = values.get('description')
+                if not qty or not desc:
+                    continue  # Section headings, subtotal rows, blank rows
+                
+                unit_price = self._parse_number(values.get('unit_price'))
+                total_price = self._parse_number(values.get('total_price'))
+                if unit_price is None and total_price is None:
+                    continue
+                if unit_price is None:
+                    unit_price = total_price / qty
+                if total_price is None:
+                    total_price = qty * unit_price
+                
+                line_number = self._parse_number(values.get('line_number'))
+                items.append(LineItem(
+                    line_number=int(line_number) if line_number else len(items) + 1,
+                    description=desc,
+                    quantity=qty,
+                    unit_of_measure=self._normalize_uom(values.get('unit')),
+                    unit_price=unit_price,
+                    total_price=total_price,
+                    currency=Currency.SAR
+                ))
+        
+        return items
+    
+    def _map_table_columns(self, header: List[str]) -> Dict[str, int]:
+        """Map line item roles (description, quantity, unit, prices) to header column indexes"""
+        columns: Dict[str, int] = {}
+        
+        for index, cell in enumerate(header):
+            label = ' '.join(cell.lower().split())
+            if not label:
+                continue
+            if ('price' in label or 'rate' in label) and 'total' not in label:
+                role = 'unit_price'
+            elif 'amount' in label or 'total' in label:
+                role = 'total_price'
+            elif 'qty' in label or 'quantity' in label:
+                role = 'quantity'
+            elif label in ('unit', 'units', 'uom', 'u/m') or 'unit of measure' in label:
+                role = 'unit'
+            elif 'desc' in label or 'material' in label or 'particular' in label:
+                role = 'description'
+            elif label in _LINE_NUMBER_HEADERS:
+                role = 'line_number'
+            else:
+                continue
+            columns.setdefault(role, index)
+        
+        # "Item" without a description column holds the description itself
+        if 'description' not in columns and 'line_number' in columns:
+            columns['description'] = columns.pop('line_number')
+        
+        return columns
+    
+    def _parse_number(self, value: str) -> Optional[float]:
+        """First number in a table cell (thousands separators removed), None if there is none"""
+        match = _NUMBER_RE.search(value or '')
+        if not match:
+            return None
+        try:
+            return float(match.group().replace(',', ''))
+        except ValueError:
+            return None
+    
     def _parse_date(self, date_str: str) -> Optional[date]:
         """Parse date string into date object"""
         if not date_str:
@@ -414,7 +533,8 @@ class DocumentMapper:
         self,
         text: str,
         classification_result: Optional[Dict] = None,
-        document_file_name: Optional[str] = None
+        document_file_name: Optional[str] = None,
+        context: Optional[DocumentContext] = None
     ) -> KraftdDocument:
         """
         Map document text to KraftdDocument schema.
@@ -423,15 +543,24 @@ class DocumentMapper:
             text: Normalized document text
             classification_result: Result from Classifier stage
             document_file_name: Original filename for metadata
+            context: Pipeline context with precomputed text views and the
+                classifier result (avoids classifying the text a second time)
         
         Returns:
             KraftdDocument with extracted fields
         """
+        if context is None:
+            context = DocumentContext(text, source_file=document_file_name)
         
         # Classify if not already done
         if not classification_result:
-            from .classifier import classify_document
-            classification_result = classify_document(text, file_name=document_file_name)
+            classification_result = context.classification
+        if not classification_result:
+            classification_result = get_classifier().classify(
+                text, file_name=document_file_name, context=context
+            )
+        
+        context.record_pass("mapper", context.text_bytes)
         
         # Map document type
         doc_type_map = {
@@ -455,8 +584,8 @@ class DocumentMapper:
         
         # Extract parties
         parties = {}
-        issuer = self.extractor.extract_party(text, "supplier")
-        recipient = self.extractor.extract_party(text, "buyer")
+        issuer = self.extractor.extract_party(text, "supplier", context)
+        recipient = self.extractor.extract_party(text, "buyer", context)
         
         if issuer:
             parties["issuer"] = issuer
@@ -480,7 +609,7 @@ class DocumentMapper:
         ) if dates_dict else None
         
         # Extract line items
-        line_items = self.extractor.extract_line_items(text)
+        line_items = self.extractor.extract_line_items(text, context)
         
         # Extract commercial terms
         commercial_terms = self.extractor.extract_commercial_terms(text)
@@ -543,10 +672,23 @@ class DocumentMapper:
         return doc
 
 
+# Shared mapper (stateless, safe to reuse across threads)
+_document_mapper: Optional[DocumentMapper] = None
+
+
+def get_document_mapper() -> DocumentMapper:
+    """Get or create the process-wide DocumentMapper instance (singleton)."""
+    global _document_mapper
+    if _document_mapper is None:
+        _document_mapper = DocumentMapper()
+    return _document_mapper
+
+
 def map_document(
     text: str,
     classification_result: Optional[Dict] = None,
-    document_file_name: Optional[str] = None
+    document_file_name: Optional[str] = None,
+    context: Optional[DocumentContext] = None
 ) -> KraftdDocument:
     """
     Quick function to map document.
@@ -556,5 +698,4 @@ def map_document(
         print(doc.parties)
         print(doc.line_items)
     """
-    mapper = DocumentMapper()
-    return mapper.map(text, classification_result, document_file_name)
+    return get_document_mapper().map(text, classification_result, document_file_name, context)
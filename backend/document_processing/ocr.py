@@ -0,0 +1,215 @@
+"""
+OCR engine shared by the image/scanned-PDF processor.
+
+- Bounded worker pool: at most OCR_WORKERS tesseract processes run at once
+- Rasterization DPI and grayscale/binarize preprocessing are configurable
+- Per-page cache keyed by a hash of the preprocessed image, so pages that
+  repeat across documents (letterheads, T&C pages) are recognized once
+- Per-page timeout: tesseract is killed when a page runs over, so one bad
+  page cannot stall the whole document
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import pytesseract
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))  # 0 = one per CPU
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))  # Rasterization resolution for scanned PDF pages
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "true").lower() == "true"
+OCR_BINARIZE_THRESHOLD = int(os.getenv("OCR_BINARIZE_THRESHOLD", "0"))  # 1-255 cut-off, 0 = off
+OCR_PAGE_TIMEOUT = float(os.getenv("OCR_PAGE_TIMEOUT", "30"))  # Seconds per page, 0 = no limit
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "1024"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+
+def preprocess_image(image: Image.Image, grayscale: bool = OCR_GRAYSCALE, binarize_threshold: int = OCR_BINARIZE_THRESHOLD) -> Image.Image:
+    """Convert a page image to what tesseract reads best (and fastest): grayscale, optionally black and white"""
+    if grayscale or binarize_threshold:
+        image = image.convert("L")
+    if binarize_threshold:
+        image = image.point(lambda value: 255 if value >= binarize_threshold else 0, mode="1")
+    return image
+
+
+def image_hash(image: Image.Image) -> str:
+    """SHA-256 of an image's pixels (mode and size included)"""
+    digest = hashlib.sha256(f"{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def _run_tesseract(image: Image.Image, lang: str, timeout: float) -> str:
+    """Recognize one image; pytesseract kills the tesseract process after `timeout` seconds"""
+    return pytesseract.image_to_string(image, lang=lang, timeout=timeout)
+
+
+class OCREngine:
+    """
+    Pooled, cached tesseract OCR.
+
+    Every recognition runs in its own tesseract process; the pool threads only
+    wait on it, so the pool size is the cap on concurrent tesseract processes.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        dpi: int = OCR_DPI,
+        grayscale: bool = OCR_GRAYSCALE,
+        binarize_threshold: int = OCR_BINARIZE_THRESHOLD,
+        page_timeout: float = OCR_PAGE_TIMEOUT,
+        cache_max_entries: int = OCR_CACHE_MAX_ENTRIES,
+        lang: str = OCR_LANG
+    ):
+        """
+        Args:
+            max_workers: Concurrent tesseract processes (default OCR_WORKERS, or one per CPU)
+            dpi: Resolution scanned PDF pages are rendered at
+            grayscale: Convert page images to grayscale before OCR
+            binarize_threshold: Pixel value cut-off for black/white conversion (0 = off)
+            page_timeout: Seconds before a page's tesseract process is killed (0 = no limit)
+            cache_max_entries: Recognized pages kept in the image-hash cache
+            lang: Tesseract language(s), e.g. "eng" or "eng+ara"
+        """
+        self.max_workers = max_workers or OCR_WORKERS or os.cpu_count() or 1
+        self.dpi = dpi
+        self.grayscale = grayscale
+        self.binarize_threshold = binarize_threshold
+        self.page_timeout = page_timeout
+        self.cache_max_entries = cache_max_entries
+        self.lang = lang
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "pages": 0,
+            "cache_hits": 0,
+            "recognized": 0,
+            "timeouts": 0,
+            "failures": 0,
+        }
+
+    def render_page(self, page) -> Image.Image:
+        """Rasterize a pdfplumber page at the configured DPI"""
+        return page.to_image(resolution=self.dpi).original
+
+    def submit(self, image: Image.Image) -> "Future[str]":
+        """
+        Queue an image for OCR.
+
+        Returns a future with the recognized text. Cached pages come back already
+        completed, and an image identical to one still being recognized shares
+        that page's future. The future raises if tesseract fails or times out.
+        """
+        image = preprocess_image(image, self.grayscale, self.binarize_threshold)
+        key = image_hash(image)
+
+        with self._lock:
+            self._counters["pages"] += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._counters["cache_hits"] += 1
+                future: Future = Future()
+                future.set_result(self._cache[key])
+                return future
+            if key in self._in_flight:
+                self._counters["cache_hits"] += 1
+                return self._in_flight[key]
+
+            future = self._get_executor().submit(self._recognize, key, image)
+            self._in_flight[key] = future
+        return future
+
+    def recognize(self, image: Image.Image) -> str:
+        """OCR one image and wait for the text"""
+        return self.submit(image).result()
+
+    def clear_cache(self) -> None:
+        """Drop all cached page texts"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Page, cache and failure counters"""
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._cache)
+        return {
+            **counters,
+            "cache_hit_rate": round(counters["cache_hits"] / counters["pages"] * 100, 2) if counters["pages"] else 0,
+            "cache_entries": entries,
+            "max_workers": self.max_workers,
+            "dpi": self.dpi,
+            "page_timeout": self.page_timeout,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker pool (a later submit starts a new one)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Called with self._lock held
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr")
+        return self._executor
+
+    def _recognize(self, key: str, image: Image.Image) -> str:
+        """Worker: run tesseract on a preprocessed image and cache the text (failures are not cached)"""
+        try:
+            text = _run_tesseract(image, self.lang, self.page_timeout)
+        except RuntimeError as e:
+            # pytesseract reports a killed process as RuntimeError("Tesseract process timeout")
+            counter = "timeouts" if "timeout" in str(e).lower() else "failures"
+            with self._lock:
+                self._counters[counter] += 1
+                self._in_flight.pop(key, None)
+            raise
+        except Exception:
+            with self._lock:
+                self._counters["failures"] += 1
+                self._in_flight.pop(key, None)
+            raise
+
+        with self._lock:
+            self._counters["recognized"] += 1
+            self._in_flight.pop(key, None)
+            self._cache[key] = text
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+        return text
+
+
+# ===== Singleton Helper =====
+
+_ocr_engine: Optional[OCREngine] = None
+_ocr_engine_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OCREngine:
+    """Get or create the process-wide OCREngine."""
+    global _ocr_engine
+    if _ocr_engine is None:
+        with _ocr_engine_lock:
+            if _ocr_engine is None:
+                _ocr_engine = OCREngine()
+    return _ocr_engine
+
+
+def shutdown_ocr_pool() -> None:
+    """Stop the OCR worker pool (called on application shutdown)"""
+    if _ocr_engine is not None:
+        _ocr_engine.shutdown()
@@ -10,21 +10,57 @@ Pipeline Flow:
 Returns: KraftdDocument with full metadata, scores, and readiness assessment.
 """
 
-from typing import Optional, Dict, List, Tuple
-from datetime import datetime
+import logging
+import queue
+import threading
+import time
+from typing import Optional, Dict, List, Tuple, Union
 from .schemas import KraftdDocument, DocumentType
-from .classifier import UniversalClassifier
-from .mapper import map_document
-from .inferencer import infer_document
-from .validator import validate_document, ValidationResult
+from .classifier import get_classifier
+from .mapper import get_document_mapper
+from .inferencer import get_document_inferencer
+from .validator import get_document_validator, ValidationResult
+from .context import DocumentContext
+from .parsed_document import ParsedDocument, ParsedPage
+from .timing import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Version of the stage rules. Part of the extraction cache key: bump it when a
+# change to any stage alters extraction output so cached results are not reused
+PIPELINE_VERSION = "2"
+
+# Streaming input: classify once this much text has arrived (title blocks and
+# document headings are on the first pages), while later pages still parse
+CLASSIFY_PREFIX_CHARS = 20_000
+
+# Small document used to exercise every stage during warm-up
+WARM_UP_TEXT = """
+REQUEST FOR QUOTATION
+RFQ Number: RFQ-2024-001
+Date: 15 January 2024
+Buyer: Warm Up Trading Co
+Supplier: Warm Up Supplies Ltd
+Submission Deadline: 30 January 2024
+Currency: SAR
+
+Item | Description | Qty | Unit Price | Amount
+1 | Steel Pipe 4 inch | 10 | 100 | 1000
+
+Payment Terms: 30 days net
+"""
 
 
 class ExtractionPipeline:
     """
     Orchestrates all 4 document processing stages.
     
+    Stages hold no per-document state, so one instance can process
+    documents from many threads at once. Use get_pipeline() to share the
+    process-wide instance instead of building a new one per request.
+    
     Usage:
-        pipeline = ExtractionPipeline()
+        pipeline = get_pipeline()
         result = pipeline.process_document(text)
         
         print(result.document.metadata.document_type)
@@ -33,61 +69,124 @@ class ExtractionPipeline:
     """
     
     def __init__(self):
-        """Initialize pipeline stages"""
-        self.classifier = UniversalClassifier()
+        """Initialize pipeline stages (rule tables are compiled once per process)"""
+        self.classifier = get_classifier()
+        self.mapper = get_document_mapper()
+        self.inferencer = get_document_inferencer()
+        self.validator = get_document_validator()
     
-    def process_document(self, text: str, source_file: str = None) -> "PipelineResult":
+    def process_document(self, text: Union[str, ParsedDocument], source_file: str = None,
+                         timer: Optional[StageTimer] = None,
+                         prefix: Optional[DocumentContext] = None) -> "PipelineResult":
         """
         Process a document through all 4 stages.
         
         Args:
-            text: Document text (extracted from PDF, Word, etc.)
+            text: Document text, or a ParsedDocument from a processor (its
+                table cells are used directly for line item extraction)
             source_file: Optional source filename for tracking
+            timer: Optional StageTimer to record stage timings into (e.g. one
+                that already holds the parse timing, or that profiles)
+            prefix: Optional context of the document's first pages that a
+                PageClassifier already classified; stage 1 is then skipped
             
         Returns:
             PipelineResult with document, metadata, and validation results
         """
         
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
         
-        # Stage 1: Classification
-        classification = self._stage_classify(text)
+        # One context per document: text views and the classifier result are
+        # computed once and shared by every stage
+        if isinstance(text, ParsedDocument):
+            context = DocumentContext.from_parsed(text, source_file=source_file)
+        else:
+            context = DocumentContext(text, source_file=source_file)
+        if timer is not None:
+            context.timer = timer
+        if prefix is not None:
+            context.classification = prefix.classification
+            context.bytes_scanned_estimate.update(prefix.bytes_scanned_estimate)
+        
+        return self._run_stages(context, start_ns)
+    
+    def classify_prefix(self, text: str, source_file: str = None,
+                        timer: Optional[StageTimer] = None) -> Optional[DocumentContext]:
+        """
+        Run stage 1 over the first pages of a document (see PageClassifier).
+        
+        Returns:
+            The classified context to pass to process_document(prefix=...),
+            or None when classification failed (the pipeline then classifies
+            the full text and reports the failure)
+        """
+        context = DocumentContext(text, source_file=source_file, timer=timer or StageTimer())
+        with context.timer.stage("classifier") as timing:
+            classification = self._stage_classify(context)
+            self._record_volume(timing, context, "classifier")
+        if not classification['success']:
+            logger.warning(f"Classifying the first pages of {source_file} failed: {classification['error']}")
+            return None
+        return context
+    
+    def _run_stages(self, context: DocumentContext, start_ns: int) -> "PipelineResult":
+        """Run the 4 stages over a document context, timing each one"""
+        source_file = context.source_file
+        timer = context.timer
+        
+        # Stage 1: Classification (already done when a PageClassifier classified the first pages)
+        if context.classification is None:
+            with timer.stage("classifier") as timing:
+                classification = self._stage_classify(context)
+                self._record_volume(timing, context, "classifier")
+        else:
+            classification = self._stage_classify(context)
         if not classification['success']:
             return PipelineResult.from_error(
                 error=f"Classification failed: {classification['error']}",
                 source_file=source_file,
-                stage_failed="classifier"
+                stage_failed="classifier",
+                timer=timer
             )
         
         # Stage 2: Field Mapping
-        mapping = self._stage_map(text, classification['document_type'])
+        with timer.stage("mapper") as timing:
+            mapping = self._stage_map(context)
+            self._record_volume(timing, context, "mapper")
         if not mapping['success']:
             return PipelineResult.from_error(
                 error=f"Mapping failed: {mapping['error']}",
                 source_file=source_file,
-                stage_failed="mapper"
+                stage_failed="mapper",
+                timer=timer
             )
         
         # Stage 3: Field Inference
-        inference = self._stage_infer(mapping['document'], text)
+        with timer.stage("inferencer") as timing:
+            inference = self._stage_infer(mapping['document'], context)
+            self._record_volume(timing, context, "inferencer")
         if not inference['success']:
             return PipelineResult.from_error(
                 error=f"Inference failed: {inference['error']}",
                 source_file=source_file,
-                stage_failed="inferencer"
+                stage_failed="inferencer",
+                timer=timer
             )
         
-        # Stage 4: Validation
-        validation = self._stage_validate(inference['document'])
+        # Stage 4: Validation (works on the document, not the text)
+        with timer.stage("validator") as timing:
+            validation = self._stage_validate(inference['document'])
+            timing.lines = len(inference['document'].line_items or [])
         if not validation['success']:
             return PipelineResult.from_error(
                 error=f"Validation failed: {validation['error']}",
                 source_file=source_file,
-                stage_failed="validator"
+                stage_failed="validator",
+                timer=timer
             )
         
         # Calculate processing time
-        processing_time = (datetime.now() - start_time).total_seconds()
+        processing_time = (time.perf_counter_ns() - start_ns) / 1e9
         
         # Build result
         return PipelineResult(
@@ -99,13 +198,21 @@ class ExtractionPipeline:
             stages_completed=["classifier", "mapper", "inferencer", "validator"],
             classifier_confidence=classification['confidence'],
             mapping_signals=mapping['signals_count'],
-            inference_signals=len(inference['signals'])
+            inference_signals=len(inference['signals']),
+            bytes_scanned_estimate=dict(context.bytes_scanned_estimate),
+            timer=timer
         )
     
-    def _stage_classify(self, text: str) -> Dict:
-        """Stage 1: Classify document type"""
+    @staticmethod
+    def _record_volume(timing, context: DocumentContext, stage: str) -> None:
+        """Estimated bytes a text stage scanned and the lines of text it had to work through"""
+        timing.bytes = context.bytes_scanned_estimate.get(stage, 0)
+        timing.lines = context.line_count
+    
+    def _stage_classify(self, context: DocumentContext) -> Dict:
+        """Stage 1: Classify document type (result is stored on the context)"""
         try:
-            result = self.classifier.classify(text)
+            result = context.classification or self.classifier.classify(context.text, context=context)
             return {
                 'success': True,
                 'document_type': result.document_type,
@@ -117,10 +224,15 @@ class ExtractionPipeline:
                 'error': str(e)
             }
     
-    def _stage_map(self, text: str, doc_type) -> Dict:
-        """Stage 2: Extract fields into structured schema"""
+    def _stage_map(self, context: DocumentContext) -> Dict:
+        """Stage 2: Extract fields into structured schema using the stage 1 classification"""
         try:
-            document = map_document(text)
+            document = self.mapper.map(
+                context.text,
+                classification_result=context.classification,
+                document_file_name=context.source_file,
+                context=context
+            )
             signals_count = self._count_extraction_signals(document)
             
             return {
@@ -134,10 +246,10 @@ class ExtractionPipeline:
                 'error': str(e)
             }
     
-    def _stage_infer(self, document: KraftdDocument, text: str) -> Dict:
+    def _stage_infer(self, document: KraftdDocument, context: DocumentContext) -> Dict:
         """Stage 3: Apply business logic rules"""
         try:
-            document, signals = infer_document(document, text)
+            document, signals = self.inferencer.infer(document, context.text, context)
             
             return {
                 'success': True,
@@ -153,7 +265,7 @@ class ExtractionPipeline:
     def _stage_validate(self, document: KraftdDocument) -> Dict:
         """Stage 4: Score completeness and quality"""
         try:
-            result = validate_document(document)
+            result = self.validator.validate(document)
             
             return {
                 'success': True,
@@ -221,7 +333,9 @@ class PipelineResult:
         mapping_signals: int = 0,
         inference_signals: int = 0,
         error: str = None,
-        stage_failed: str = None
+        stage_failed: str = None,
+        bytes_scanned_estimate: Dict[str, int] = None,
+        timer: Optional[StageTimer] = None
     ):
         self.success = success
         self.document = document
@@ -234,17 +348,52 @@ class PipelineResult:
         self.inference_signals = inference_signals
         self.error = error
         self.stage_failed = stage_failed
+        self.bytes_scanned_estimate = bytes_scanned_estimate or {}
+        self.timer = timer  # Not part of to_dict(): timings describe one run, not the cached result
     
     @classmethod
-    def from_error(cls, error: str, source_file: str = None, stage_failed: str = None):
+    def from_error(cls, error: str, source_file: str = None, stage_failed: str = None,
+                   timer: Optional[StageTimer] = None):
         """Create a failed result"""
         return cls(
             success=False,
             error=error,
             source_file=source_file,
-            stage_failed=stage_failed
+            stage_failed=stage_failed,
+            timer=timer
         )
     
+    @property
+    def stage_timings(self) -> Dict[str, Dict]:
+        """Per-stage duration, bytes and lines of this run ({} for results from the cache)"""
+        return self.timer.to_dict() if self.timer else {}
+    
+    def to_dict(self) -> Dict:
+        """JSON-safe representation of a successful result (used by the extraction cache)"""
+        return {
+            'success': self.success,
+            'document': self.document.model_dump(mode="json") if self.document else None,
+            'validation_result': self.validation_result.to_dict() if self.validation_result else None,
+            'source_file': self.source_file,
+            'processing_time_seconds': self.processing_time_seconds,
+            'stages_completed': list(self.stages_completed),
+            'classifier_confidence': self.classifier_confidence,
+            'mapping_signals': self.mapping_signals,
+            'inference_signals': self.inference_signals,
+            'error': self.error,
+            'stage_failed': self.stage_failed,
+            'bytes_scanned_estimate': dict(self.bytes_scanned_estimate)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PipelineResult":
+        """Rebuild a PipelineResult from to_dict() output"""
+        return cls(**{
+            **data,
+            'document': KraftdDocument.model_validate(data['document']) if data.get('document') else None,
+            'validation_result': ValidationResult.from_dict(data['validation_result']) if data.get('validation_result') else None
+        })
+    
     @property
     def is_ready_for_processing(self) -> bool:
         """Can this document be auto-processed?"""
@@ -293,6 +442,7 @@ class PipelineResult:
                 'parties_found': len(self.document.parties) if self.document and self.document.parties else 0,
                 'line_items': len(self.document.line_items) if self.document and self.document.line_items else 0
             },
+            'bytes_scanned_estimate': dict(self.bytes_scanned_estimate),
             'validation': {
                 'completeness_score': round(self.validation_result.completeness_score, 1) if self.validation_result else 0,
                 'data_quality_score': round(self.validation_result.data_quality_score, 1) if self.validation_result else 0,
@@ -362,12 +512,114 @@ class PipelineResult:
         print("\n" + "="*80)
 
 
+class PageClassifier:
+    """
+    Classifies a document from its first pages while later pages still parse.
+
+    The parse worker feeds pages in document order as its page iterator
+    yields them; a thread of the classifier's own takes them off a queue and,
+    once CLASSIFY_PREFIX_CHARS of text have arrived, runs stage 1 on that
+    prefix. Shorter documents are left to the pipeline, which classifies
+    their full text as before.
+
+    Usage:
+        page_classifier = PageClassifier(get_pipeline(), source_file, timer)
+        for page in processor.iter_pages():
+            page_classifier.feed(page)
+        prefix = page_classifier.finish()
+        get_pipeline().process_document(parsed, source_file, timer, prefix=prefix)
+    """
+
+    def __init__(self, pipeline: ExtractionPipeline, source_file: str = None,
+                 timer: Optional[StageTimer] = None):
+        self.pipeline = pipeline
+        self.source_file = source_file
+        self.timer = timer or StageTimer()
+        self.prefix_chars = CLASSIFY_PREFIX_CHARS
+        self.prefix: Optional[DocumentContext] = None
+        self._pages: "queue.Queue[Optional[ParsedPage]]" = queue.Queue()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="page-classifier", daemon=True)
+        self._thread.start()
+
+    def feed(self, page: ParsedPage) -> None:
+        """Hand over the next page (dropped once the prefix is classified)"""
+        if not self._done.is_set():
+            self._pages.put(page)
+
+    def finish(self) -> Optional[DocumentContext]:
+        """
+        Signal the last page and wait for the classifier thread.
+
+        Returns:
+            The classified prefix context, or None when the document was
+            shorter than CLASSIFY_PREFIX_CHARS or classification failed
+        """
+        self._pages.put(None)
+        self._thread.join()
+        return self.prefix
+
+    def _run(self) -> None:
+        texts: List[str] = []
+        chars = 0
+        try:
+            while True:
+                page = self._pages.get()
+                if page is None:
+                    return
+                texts.append(page.text)
+                chars += len(page.text)
+                if chars >= self.prefix_chars:
+                    self.prefix = self.pipeline.classify_prefix("\n".join(texts), self.source_file, self.timer)
+                    return
+        finally:
+            self._done.set()
+
+
 def create_pipeline() -> ExtractionPipeline:
     """Factory to create a new pipeline instance"""
     return ExtractionPipeline()
 
 
-def process_document(text: str, source_file: str = None) -> PipelineResult:
+# Process-wide pipeline instance
+_pipeline: Optional[ExtractionPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> ExtractionPipeline:
+    """Get or create the process-wide ExtractionPipeline (thread-safe singleton)."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = ExtractionPipeline()
+    return _pipeline
+
+
+def warm_up_pipeline() -> PipelineResult:
+    """
+    Build the shared pipeline and run a small document through every stage.
+    
+    Call this during application startup so the first real extraction after
+    a deploy does not pay for building rule tables, compiling patterns and
+    initializing the document models.
+    
+    Returns:
+        PipelineResult of the warm-up document
+    """
+    start_ns = time.perf_counter_ns()
+    result = get_pipeline().process_document(WARM_UP_TEXT, source_file="warm-up")
+    elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+    
+    if result.success:
+        logger.info(f"ExtractionPipeline warm-up completed in {elapsed:.3f}s")
+    else:
+        logger.warning(f"ExtractionPipeline warm-up failed at {result.stage_failed}: {result.error}")
+    
+    return result
+
+
+def process_document(text: Union[str, ParsedDocument], source_file: str = None) -> PipelineResult:
     """
     Convenience function to process a document through the full extraction pipeline.
     
@@ -383,5 +635,4 @@ def process_document(text: str, source_file: str = None) -> PipelineResult:
             # Add to manual review queue
             queue_for_review(result)
     """
-    pipeline = ExtractionPipeline()
-    return pipeline.process_document(text, source_file)
+    return get_pipeline().process_document(text, source_file)
@@ -0,0 +1,195 @@
+"""
+Parsed Document - typed output of the file processors
+
+Intermediate representation between parsing (PDF, Word, Excel, Image) and
+the extraction pipeline. Replaces feeding str(parse_result) to the pipeline,
+which made every stage scan a Python repr full of quotes, brackets, page
+dicts and duplicated text, and hid table structure from line item
+extraction.
+
+Holds:
+- text: clean document text (pages/sheets joined by newlines)
+- pages: per-page (or per-sheet) text and tables
+- tables: every table as real rows of cell strings
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+
+@dataclass
+class ParsedTable:
+    """A table as rows of cell strings (first row is the header when present)"""
+    rows: List[List[str]]
+    page_number: Optional[int] = None
+    name: Optional[str] = None  # Sheet name / table label
+
+    @property
+    def header(self) -> List[str]:
+        return self.rows[0] if self.rows else []
+
+    @property
+    def body(self) -> List[List[str]]:
+        return self.rows[1:]
+
+    def to_text(self) -> str:
+        """Render as pipe-delimited lines (the layout the text heuristics expect)"""
+        return "\n".join(" | ".join(row) for row in self.rows)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"page_number": self.page_number, "name": self.name, "rows": self.rows}
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Iterable[Any]],
+        page_number: Optional[int] = None,
+        name: Optional[str] = None
+    ) -> "ParsedTable":
+        """Table from raw cell values (None/NaN become empty strings, empty rows are dropped)"""
+        table = _table_from_rows(rows, page_number)
+        table.name = name
+        return table
+
+
+@dataclass
+class ParsedPage:
+    """Text and tables of one page (PDF/image) or sheet (Excel)"""
+    page_number: int
+    text: str
+    tables: List[ParsedTable] = field(default_factory=list)
+
+    @classmethod
+    def for_sheet(cls, page_number: int, table: ParsedTable) -> "ParsedPage":
+        """Spreadsheet page: the sheet name followed by its pipe-delimited rows"""
+        text = f"Sheet: {table.name}\n{table.to_text()}" if table.rows else f"Sheet: {table.name}"
+        return cls(page_number=page_number, text=text, tables=[table])
+
+
+@dataclass
+class ParsedDocument:
+    """Typed parse result consumed directly by the extraction pipeline"""
+    text: str
+    pages: List[ParsedPage] = field(default_factory=list)
+    tables: List[ParsedTable] = field(default_factory=list)
+    source_format: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @classmethod
+    def from_pages(
+        cls,
+        pages: List[ParsedPage],
+        source_format: Optional[str] = None
+    ) -> "ParsedDocument":
+        """Build a document from pages, joining text and collecting tables in page order"""
+        return cls(
+            text="\n".join(page.text for page in pages),
+            pages=pages,
+            tables=[table for page in pages for table in page.tables],
+            source_format=source_format
+        )
+
+    @classmethod
+    def from_parse_result(
+        cls,
+        parsed: Any,
+        source_format: Optional[str] = None
+    ) -> "ParsedDocument":
+        """
+        Convert a processor's parse() dict into a ParsedDocument.
+
+        Understands the PDF, Word, Excel and Image processor layouts. Plain
+        strings are wrapped as single-page documents.
+        """
+        if isinstance(parsed, ParsedDocument):
+            return parsed
+
+        if isinstance(parsed, str):
+            return cls.from_pages([ParsedPage(page_number=1, text=parsed)], source_format)
+
+        if not isinstance(parsed, dict):
+            return cls(text="", source_format=source_format, error=f"Unsupported parse result: {type(parsed).__name__}")
+
+        if "error" in parsed:
+            return cls(text="", source_format=source_format, error=str(parsed["error"]))
+
+        # Excel: one page per sheet, each sheet is a table
+        if "sheets" in parsed:
+            pages = []
+            for index, sheet in enumerate(parsed["sheets"], 1):
+                table = _table_from_records(sheet.get("data") or [])
+                table.page_number = index
+                table.name = sheet.get("sheet_name")
+                pages.append(ParsedPage.for_sheet(index, table))
+            return cls.from_pages(pages, source_format)
+
+        # PDF / scanned PDF: per-page text, PDF pages also carry their tables
+        if parsed.get("pages") and "page_number" in parsed["pages"][0]:
+            pages = [
+                ParsedPage(
+                    page_number=page["page_number"],
+                    text=page.get("text") or "",
+                    tables=[
+                        _table_from_rows(rows, page_number=page["page_number"])
+                        for rows in page.get("tables") or [] if rows
+                    ]
+                )
+                for page in parsed["pages"]
+            ]
+            return cls.from_pages(pages, source_format)
+
+        # Word: paragraphs text plus numbered tables
+        text = parsed.get("text") or parsed.get("full_text") or ""
+        tables = []
+        for raw_table in parsed.get("tables") or []:
+            if isinstance(raw_table, dict):
+                table = _table_from_rows(raw_table.get("data") or [])
+                table.name = f"Table {raw_table['table_number']}" if raw_table.get("table_number") else None
+            else:
+                table = _table_from_rows(raw_table)
+            if table.rows:
+                tables.append(table)
+
+        # Word keeps table cells out of the paragraph text; append them once
+        table_text = "\n\n".join(table.to_text() for table in tables)
+        full_text = f"{text}\n{table_text}" if table_text else text
+
+        return cls(
+            text=full_text,
+            pages=[ParsedPage(page_number=1, text=full_text, tables=tables)],
+            tables=tables,
+            source_format=source_format
+        )
+
+
+def _cell_to_str(value: Any) -> str:
+    """Render a cell value, mapping None/NaN to an empty string"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    return str(value).strip()
+
+
+def _table_from_rows(rows: Iterable[Iterable[Any]], page_number: Optional[int] = None) -> ParsedTable:
+    """Table from a list of rows (pdfplumber / python-docx layout)"""
+    cells = ([_cell_to_str(cell) for cell in row] for row in rows if row is not None)
+    return ParsedTable(rows=[row for row in cells if row], page_number=page_number)
+
+
+def _table_from_records(records: List[Dict[str, Any]]) -> ParsedTable:
+    """Table from a list of row dicts (pandas to_dict(orient="records") layout)"""
+    columns = list(records[0].keys()) if records else []
+    if not columns:
+        return ParsedTable(rows=[])
+    header = [_cell_to_str(column) for column in columns]
+    body = [[_cell_to_str(record.get(column)) for column in columns] for record in records]
+    return ParsedTable(rows=[header] + body)
@@ -1,41 +1,172 @@
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Iterator, Optional
+
 import pdfplumber
-from typing import List, Dict, Any
 from .base_processor import BaseProcessor
+from .parsed_document import ParsedPage, ParsedTable
+
+logger = logging.getLogger(__name__)
+
+# Page-parallel parsing (0 workers = one per CPU)
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "0"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))  # Smaller PDFs parse in-process
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "10"))
+
+# Worker pools are expensive to start, so one is kept per pool size. Workers
+# are spawned rather than forked: the API process runs threads (asyncio.to_thread)
+# and forking a threaded process can deadlock the child.
+_executors: Dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ProcessPoolExecutor:
+    """Get the shared parse pool for a pool size, starting it on first use"""
+    executor = _executors.get(max_workers)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(max_workers)
+            if executor is None:
+                executor = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                _executors[max_workers] = executor
+    return executor
+
+
+def shutdown_parse_pool() -> None:
+    """Stop all PDF parse worker processes (called on application shutdown)"""
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
+
+
+def _parse_page(page, page_num: int) -> Dict[str, Any]:
+    """Extract text and tables from one pdfplumber page, then release its layout cache"""
+    text = page.extract_text() or ""
+    tables = page.extract_tables() or []
+    page.close()
+    return {
+        "page_number": page_num,
+        "text": text,
+        "tables_count": len(tables),
+        "tables": tables
+    }
+
+
+def _parse_page_range(file_path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """Worker task: open the PDF and parse pages [start, end) (0-based)"""
+    with pdfplumber.open(file_path) as pdf:
+        return [_parse_page(pdf.pages[i], i + 1) for i in range(start, end)]
+
+
+def _to_parsed_page(parsed: Dict[str, Any]) -> ParsedPage:
+    """ParsedPage for a _parse_page() result"""
+    page_num = parsed["page_number"]
+    return ParsedPage(
+        page_number=page_num,
+        text=parsed["text"],
+        tables=[ParsedTable.from_rows(rows, page_number=page_num) for rows in parsed["tables"]]
+    )
+
 
 class PDFProcessor(BaseProcessor):
     """Process PDF documents and extract text, tables, and structured data."""
-    
+
+    def __init__(
+        self,
+        file_path: str,
+        max_workers: Optional[int] = None,
+        parallel_min_pages: Optional[int] = None
+    ):
+        """
+        Args:
+            file_path: Path to the PDF
+            max_workers: Parse pool size (default PDF_PARSE_WORKERS, or one per CPU);
+                1 disables parallel parsing
+            parallel_min_pages: PDFs with fewer pages are parsed in-process
+                (default PDF_PARALLEL_MIN_PAGES)
+        """
+        super().__init__(file_path)
+        self.max_workers = max_workers or PDF_PARSE_WORKERS or os.cpu_count() or 1
+        self.parallel_min_pages = PDF_PARALLEL_MIN_PAGES if parallel_min_pages is None else parallel_min_pages
+
     def parse(self) -> Dict[str, Any]:
         """Parse PDF and return structured data."""
         try:
+            pages = None
             with pdfplumber.open(self.file_path) as pdf:
-                result = {
-                    "total_pages": len(pdf.pages),
-                    "text": "",
-                    "tables": [],
-                    "pages": []
-                }
-                
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Extract text
-                    text = page.extract_text()
-                    result["text"] += text + "\n"
-                    
-                    # Extract tables
-                    tables = page.extract_tables()
-                    if tables:
-                        result["tables"].extend(tables)
-                    
-                    result["pages"].append({
-                        "page_number": page_num,
-                        "text": text,
-                        "tables_count": len(tables) if tables else 0
-                    })
-                
-                return result
+                total_pages = len(pdf.pages)
+                if not self._use_parallel(total_pages):
+                    pages = [_parse_page(page, page_num) for page_num, page in enumerate(pdf.pages, 1)]
+
+            if pages is None:
+                pages = self._parse_parallel(total_pages)
+
+            return {
+                "total_pages": total_pages,
+                "text": "".join(page["text"] + "\n" for page in pages),
+                "tables": [table for page in pages for table in page["tables"]],
+                "pages": pages
+            }
         except Exception as e:
             return {"error": f"Failed to parse PDF: {str(e)}"}
-    
+
+    def _use_parallel(self, total_pages: int) -> bool:
+        return self.max_workers > 1 and total_pages >= max(self.parallel_min_pages, 2)
+
+    def _page_ranges(self, total_pages: int) -> List[tuple]:
+        """Split pages into contiguous ranges, at least two per worker so slow pages even out"""
+        tasks = min(math.ceil(total_pages / PDF_PAGES_PER_TASK), self.max_workers * 2)
+        tasks = max(tasks, min(self.max_workers, total_pages))
+        size = math.ceil(total_pages / tasks)
+        return [(start, min(start + size, total_pages)) for start in range(0, total_pages, size)]
+
+    def _parse_parallel(self, total_pages: int) -> List[Dict[str, Any]]:
+        """Parse page ranges in the worker pool; results come back in page order"""
+        return list(self._iter_parallel(total_pages))
+
+    def _iter_parallel(self, total_pages: int) -> Iterator[Dict[str, Any]]:
+        """Parse page ranges in the worker pool, yielding pages in order as each range comes back"""
+        parsed_pages = 0
+        try:
+            executor = _get_executor(self.max_workers)
+            futures = [executor.submit(_parse_page_range, self.file_path, start, end)
+                       for start, end in self._page_ranges(total_pages)]
+            for future in futures:
+                for page in future.result():
+                    yield page
+                    parsed_pages += 1
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Parallel PDF parse unavailable ({e}), parsing {self.file_path} in-process")
+            with _executors_lock:
+                _executors.pop(self.max_workers, None)
+            yield from _parse_page_range(self.file_path, parsed_pages, total_pages)
+
+    def iter_pages(self) -> Iterator[ParsedPage]:
+        """
+        Yield pages in order from a single open of the PDF, releasing each page's layout cache after use.
+
+        Large PDFs are parsed in the worker pool like parse(); their pages are
+        yielded as soon as the range holding them comes back.
+        """
+        with pdfplumber.open(self.file_path) as pdf:
+            total_pages = len(pdf.pages)
+            if not self._use_parallel(total_pages):
+                for page_num, page in enumerate(pdf.pages, 1):
+                    yield _to_parsed_page(_parse_page(page, page_num))
+                return
+
+        for parsed in self._iter_parallel(total_pages):
+            yield _to_parsed_page(parsed)
+
     def extract_tables(self) -> List[List[Dict]]:
         """Extract all tables from the PDF."""
         tables = []
@@ -52,14 +183,11 @@ class PDFProcessor(BaseProcessor):
         except Exception as e:
             return [{"error": f"Failed to extract tables: {str(e)}"}]
         return tables
-    
+
     def extract_text(self) -> str:
         """Extract all text from the PDF."""
-        text = ""
         try:
             with pdfplumber.open(self.file_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text() + "\n"
+                return "".join((page.extract_text() or "") + "\n" for page in pdf.pages)
         except Exception as e:
-            text = f"Error extracting text: {str(e)}"
-        return text
+            return f"Error extracting text: {str(e)}"
@@ -0,0 +1,294 @@
+"""
+Compiled Signal Scanner for the Universal Classifier
+
+Precompiles the classifier's signal table once per process and evaluates it
+against normalized text with the minimum amount of regex work.
+
+Design:
+- Every distinct pattern is compiled exactly once and shared by all signals
+  that use it (e.g. "scope of work" feeds both contract and SOW signals)
+- Patterns that start with a word boundary and a literal (r"\\brfq\\b") are
+  rewritten so the boundary is checked after the literal. The match spans and
+  groups are identical, but sre can use its fast literal-prefix search instead
+  of probing every position of the text
+- Patterns with a known literal prefix (or a leading group of literal
+  alternatives) are skipped when none of the literals occurs in the text, and
+  otherwise start matching at the first occurrence
+- Only the first 3 matches of each pattern are ever used as evidence, so each
+  pattern stops scanning as soon as it has them
+- Signal -> target type map is precomputed for scoring
+
+Output is identical to running re.findall() for every pattern of every signal.
+A single merged alternation cannot give that guarantee: overlapping patterns
+(e.g. "request for quotation" and r"\\bquotation\\b") would consume each
+other's matches.
+"""
+
+import re
+import threading
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+# Evidence matches kept per pattern (mirrors the original findall()[:3])
+MAX_EVIDENCE_PER_PATTERN = 3
+
+# Characters that are literal outside a character class
+_PLAIN_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789 :/#_-,;'\"")
+_QUANTIFIERS = ("?", "*", "+", "{")
+
+
+def _leading_literal(pattern: str) -> Tuple[str, int]:
+    """
+    Longest literal every match of `pattern` must start with.
+
+    Returns:
+        (literal, end) where pattern[end:] is the regex source after the literal
+    """
+    chars: List[str] = []
+    starts: List[int] = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char in _PLAIN_CHARS:
+            chars.append(char)
+            starts.append(i)
+            i += 1
+        elif char == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            chars.append(pattern[i + 1])
+            starts.append(i)
+            i += 2
+        else:
+            break
+
+    # A quantifier binds to the last literal character, so it is not required
+    if chars and pattern[i:i + 1] in _QUANTIFIERS and pattern[i] != "+":
+        chars.pop()
+        i = starts.pop()
+
+    return "".join(chars), i
+
+
+def _split_leading_group(pattern: str) -> Optional[List[str]]:
+    """
+    Split a pattern that starts with "(a|b|c)" or "(?:a|b|c)" into its alternatives.
+
+    Returns None if the pattern does not start with a plain group, or if the
+    group is optional (followed by ?, * or {).
+    """
+    if pattern.startswith("(?:"):
+        i = 3
+    elif pattern.startswith("(") and not pattern.startswith("(?"):
+        i = 1
+    else:
+        return None
+
+    alternatives = []
+    current_start = i
+    depth = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            return None
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            if depth == 0:
+                alternatives.append(pattern[current_start:i])
+                if pattern[i + 1:i + 2] in ("?", "*", "{"):
+                    return None
+                return alternatives
+            depth -= 1
+        elif char == "|" and depth == 0:
+            alternatives.append(pattern[current_start:i])
+            current_start = i + 1
+        i += 1
+
+    return None
+
+
+def required_prefixes(pattern: str) -> Optional[List[str]]:
+    """
+    Literals one of which starts every match of `pattern`.
+
+    Used as a prefilter: if none of them occurs in the text the pattern cannot
+    match, and otherwise matching can start at the first occurrence.
+
+    Returns None when no such set can be derived (e.g. r"\\d+ ...").
+    """
+    if pattern.startswith(r"\b"):
+        pattern = pattern[2:]
+
+    alternatives = _split_leading_group(pattern)
+    if alternatives is None:
+        literal, _ = _leading_literal(pattern)
+        return [literal] if literal else None
+
+    prefixes = []
+    for alternative in alternatives:
+        literal, _ = _leading_literal(alternative)
+        if not literal:
+            return None
+        prefixes.append(literal)
+    return prefixes
+
+
+def accelerate_pattern(pattern: str) -> str:
+    """
+    Rewrite a leading r"\\b<literal>" so the literal comes first.
+
+    r"\\bquote\\b" becomes r"quote(?<=\\bquote)\\b". Both match exactly the
+    same spans, but the rewritten form starts with a literal which lets the
+    regex engine skip ahead with a fast substring search.
+
+    Patterns that do not start with a boundary + literal are returned as-is.
+    """
+    if not pattern.startswith(r"\b"):
+        return pattern
+
+    body = pattern[2:]
+    literal, end = _leading_literal(body)
+    if not literal:
+        return pattern
+
+    source = body[:end]
+    return f"{source}(?<=\\b{source}){body[end:]}"
+
+
+class SignalScanner:
+    """
+    Precompiled evaluator for a classifier signal table.
+
+    Usage:
+        scanner = SignalScanner.for_signals(classifier.signals)
+        for name, matched, evidence in scanner.scan(normalized_text):
+            ...
+    """
+
+    _cache: Dict[tuple, "SignalScanner"] = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, signals: Dict[str, Dict[str, Any]]):
+        """
+        Compile a signal table.
+
+        Args:
+            signals: {signal_name: {"patterns": [...], "weight": float, "target_type": ...}}
+        """
+        compiled: Dict[str, re.Pattern] = {}
+        self.prefixes: Dict[re.Pattern, Optional[List[str]]] = {}
+        self.signal_patterns: List[Tuple[str, List[re.Pattern]]] = []
+        self.target_types: Dict[str, Any] = {}
+        self.weights: Dict[str, float] = {}
+
+        for signal_name, signal_def in signals.items():
+            patterns = []
+            for pattern in signal_def["patterns"]:
+                if pattern not in compiled:
+                    compiled[pattern] = re.compile(accelerate_pattern(pattern))
+                    self.prefixes[compiled[pattern]] = required_prefixes(pattern)
+                patterns.append(compiled[pattern])
+
+            self.signal_patterns.append((signal_name, patterns))
+            self.target_types[signal_name] = signal_def["target_type"]
+            self.weights[signal_name] = signal_def["weight"]
+
+        self.compiled_patterns: List[re.Pattern] = list(compiled.values())
+
+        # Every distinct prefix literal, shortest first, with the shorter
+        # literals it contains: if one of those is absent, so is the prefix
+        literals = sorted(
+            {prefix for prefixes in self.prefixes.values() if prefixes for prefix in prefixes},
+            key=lambda literal: (len(literal), literal)
+        )
+        self.prefix_order: List[Tuple[str, List[str]]] = [
+            (literal, [shorter for shorter in literals[:index] if shorter in literal])
+            for index, literal in enumerate(literals)
+        ]
+
+    @classmethod
+    def for_signals(cls, signals: Dict[str, Dict[str, Any]]) -> "SignalScanner":
+        """Get the process-wide scanner for a signal table, compiling it on first use."""
+        key = cls._fingerprint(signals)
+        scanner = cls._cache.get(key)
+        if scanner is None:
+            with cls._cache_lock:
+                scanner = cls._cache.get(key)
+                if scanner is None:
+                    scanner = cls(signals)
+                    cls._cache[key] = scanner
+        return scanner
+
+    @staticmethod
+    def _fingerprint(signals: Dict[str, Dict[str, Any]]) -> tuple:
+        return tuple(
+            (name, tuple(sig["patterns"]), sig["weight"], sig["target_type"])
+            for name, sig in signals.items()
+        )
+
+    def scan(self, text: str) -> List[Tuple[str, bool, List[Any]]]:
+        """
+        Evaluate every signal against normalized text.
+
+        Returns:
+            [(signal_name, matched, evidence)] in signal table order. Evidence
+            holds the first 3 findall() items of each matching pattern.
+        """
+        first_offsets = self._find_prefixes(text)
+
+        pattern_hits: Dict[re.Pattern, List[Any]] = {}
+        for pattern in self.compiled_patterns:
+            start = self._first_candidate(pattern, first_offsets)
+            if start < 0:
+                pattern_hits[pattern] = []
+                continue
+            pattern_hits[pattern] = [
+                self._findall_item(m, pattern.groups)
+                for m in islice(pattern.finditer(text, start), MAX_EVIDENCE_PER_PATTERN)
+            ]
+
+        results = []
+        for signal_name, patterns in self.signal_patterns:
+            matched = False
+            evidence: List[Any] = []
+            for pattern in patterns:
+                hits = pattern_hits[pattern]
+                if hits:
+                    matched = True
+                    evidence.extend(hits)
+            results.append((signal_name, matched, evidence))
+
+        return results
+
+    def _find_prefixes(self, text: str) -> Dict[str, int]:
+        """First offset of every prefix literal in the text (-1 if absent)"""
+        first_offsets: Dict[str, int] = {}
+        for literal, contained in self.prefix_order:
+            if any(first_offsets[shorter] < 0 for shorter in contained):
+                first_offsets[literal] = -1
+            else:
+                first_offsets[literal] = text.find(literal)
+        return first_offsets
+
+    def _first_candidate(self, pattern: re.Pattern, first_offsets: Dict[str, int]) -> int:
+        """Earliest offset a match could start at, or -1 if the pattern cannot match"""
+        prefixes = self.prefixes[pattern]
+        if not prefixes:
+            return 0
+        offsets = [first_offsets[prefix] for prefix in prefixes if first_offsets[prefix] >= 0]
+        return min(offsets) if offsets else -1
+
+    def target_type(self, signal_name: str) -> Optional[Any]:
+        """Document type a signal votes for (None for unknown signals)"""
+        return self.target_types.get(signal_name)
+
+    @staticmethod
+    def _findall_item(match: re.Match, groups: int) -> Any:
+        """Shape a match the same way re.findall() does"""
+        if groups == 0:
+            return match.group(0)
+        if groups == 1:
+            return match.groups(default="")[0]
+        return match.groups(default="")
@@ -0,0 +1,167 @@
+"""
+Pipeline Stage Timing
+
+Times each part of an extraction (parse, classifier, mapper, inferencer,
+validator, and every inference rule) with perf_counter_ns, together with
+the bytes and lines it processed, so a slow or timed-out /extract shows
+which stage the time went to.
+
+Profiling is optional and per document: when a timer is created with
+profile=True (an X-Profile request header, or PIPELINE_PROFILE_SAMPLE_RATE
+sampling), each stage also runs under cProfile (or pyinstrument, when
+installed and selected) and keeps its top functions as text.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PyinstrumentProfiler = None
+    PYINSTRUMENT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_PROFILE_SAMPLE_RATE = float(os.getenv("PIPELINE_PROFILE_SAMPLE_RATE", "0"))  # Share of documents profiled
+PIPELINE_PROFILER = os.getenv("PIPELINE_PROFILER", "cprofile")  # cprofile or pyinstrument
+PROFILE_TOP_FUNCTIONS = 15  # Functions kept per stage profile
+
+
+def should_profile(requested: bool = False, sample_rate: Optional[float] = None) -> bool:
+    """Profile this document? Always when requested, otherwise by sampling"""
+    rate = PIPELINE_PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+    return requested or (rate > 0 and random.random() < rate)
+
+
+@dataclass
+class StageTiming:
+    """Time and volume of one stage"""
+    name: str
+    start_time_ns: int  # Wall clock (time.time_ns) at stage start, for trace spans
+    duration_ns: int = 0
+    finished: bool = False
+    bytes: int = 0
+    lines: int = 0
+    rules_ns: Dict[str, int] = field(default_factory=dict)
+    profile: Optional[str] = None
+    _perf_start_ns: int = field(default_factory=time.perf_counter_ns, repr=False)
+
+    @property
+    def duration_ms(self) -> float:
+        """Stage time; time so far while the stage is still running"""
+        if not self.finished:
+            return (time.perf_counter_ns() - self._perf_start_ns) / 1e6
+        return self.duration_ns / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "duration_ms": round(self.duration_ms, 3),
+            "bytes": self.bytes,
+            "lines": self.lines,
+        }
+        if not self.finished:
+            result["in_progress"] = True
+        if self.rules_ns:
+            result["rules_ms"] = {rule: round(ns / 1e6, 3) for rule, ns in self.rules_ns.items()}
+        if self.profile:
+            result["profile"] = self.profile
+        return result
+
+
+class StageTimer:
+    """
+    Stage timings for one document.
+
+    Usage:
+        timer = StageTimer(profile=should_profile(header_set))
+        with timer.stage("parse") as timing:
+            parsed = processor.parse_document()
+            timing.bytes, timing.lines = ...
+        timer.to_dict()  # {"parse": {"duration_ms": ..., "bytes": ..., "lines": ...}, ...}
+    """
+
+    def __init__(self, profile: bool = False, profiler: str = PIPELINE_PROFILER):
+        self.profile = profile
+        self.profiler = profiler
+        self.stages: List[StageTiming] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageTiming]:
+        """Time (and optionally profile) the body as stage `name`"""
+        timing = StageTiming(name=name, start_time_ns=time.time_ns())
+        self.stages.append(timing)
+        profiler = self._start_profiler() if self.profile else None
+        timing._perf_start_ns = time.perf_counter_ns()
+        try:
+            yield timing
+        finally:
+            timing.duration_ns = time.perf_counter_ns() - timing._perf_start_ns
+            timing.finished = True
+            if profiler is not None:
+                timing.profile = self._stop_profiler(profiler)
+
+    def call(self, name: str, func: Callable, *args, **kwargs):
+        """Run func(*args, **kwargs) as stage `name` (e.g. inside asyncio.to_thread)"""
+        with self.stage(name):
+            return func(*args, **kwargs)
+
+    def record_rule(self, stage: str, rule: str, duration_ns: int) -> None:
+        """Add a rule's time to the latest timing of a stage"""
+        for timing in reversed(self.stages):
+            if timing.name == stage:
+                timing.rules_ns[rule] = timing.rules_ns.get(rule, 0) + duration_ns
+                return
+
+    def get(self, name: str) -> Optional[StageTiming]:
+        for timing in reversed(self.stages):
+            if timing.name == name:
+                return timing
+        return None
+
+    @property
+    def total_ns(self) -> int:
+        return sum(timing.duration_ns for timing in self.stages)
+
+    @property
+    def running(self) -> Optional[str]:
+        """Name of the stage still in progress, if any (e.g. after a timeout)"""
+        return next((timing.name for timing in self.stages if not timing.finished), None)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {timing.name: timing.to_dict() for timing in self.stages}
+
+    # ===== Profilers =====
+
+    def _start_profiler(self):
+        try:
+            if self.profiler == "pyinstrument" and PYINSTRUMENT_AVAILABLE:
+                profiler = PyinstrumentProfiler()
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            return profiler
+        except Exception as e:
+            # Another profiler already active on this thread
+            logger.warning(f"Stage profiling unavailable: {e}")
+            return None
+
+    @staticmethod
+    def _stop_profiler(profiler) -> str:
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            return output.getvalue()
+        profiler.stop()
+        return profiler.output_text()
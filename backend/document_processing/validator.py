@@ -13,8 +13,8 @@ Input: Enhanced KraftdDocument from Inferencer
 Output: ValidationResult with scores and gaps
 """
 
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import asdict, dataclass
 from enum import Enum
 from datetime import datetime
 
@@ -65,13 +65,45 @@ class ValidationResult:
     def __post_init__(self):
         if self.validation_timestamp is None:
             self.validation_timestamp = datetime.now()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe representation (enums as values, timestamp as ISO string)"""
+        data = asdict(self)
+        data['document_type'] = self.document_type.value
+        for key in ('critical_gaps', 'important_gaps', 'optional_gaps'):
+            for gap in data[key]:
+                gap['criticality'] = gap['criticality'].value
+        data['validation_timestamp'] = self.validation_timestamp.isoformat()
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ValidationResult":
+        """Rebuild a ValidationResult from to_dict() output"""
+        gaps = {
+            key: [
+                FieldGap(**{**gap, 'criticality': CriticalityLevel(gap['criticality'])})
+                for gap in data[key]
+            ]
+            for key in ('critical_gaps', 'important_gaps', 'optional_gaps')
+        }
+        return cls(**{
+            **data,
+            **gaps,
+            'document_type': DocumentType(data['document_type']),
+            'validation_timestamp': datetime.fromisoformat(data['validation_timestamp'])
+        })
 
 
 class CriticalityChecker:
     """Define critical fields per document type"""
     
+    # Critical field map shared by all instances (read-only)
+    _shared_critical_fields: Optional[Dict[DocumentType, Dict[str, CriticalityLevel]]] = None
+    
     def __init__(self):
-        self.critical_fields = self._init_critical_fields()
+        if CriticalityChecker._shared_critical_fields is None:
+            CriticalityChecker._shared_critical_fields = self._init_critical_fields()
+        self.critical_fields = CriticalityChecker._shared_critical_fields
     
     def _init_critical_fields(self) -> Dict[DocumentType, Dict[str, CriticalityLevel]]:
         """Define which fields are critical for each document type"""
@@ -399,6 +431,18 @@ class DocumentValidator:
         return warnings
 
 
+# Shared validator (stateless, safe to reuse across threads)
+_document_validator: Optional[DocumentValidator] = None
+
+
+def get_document_validator() -> DocumentValidator:
+    """Get or create the process-wide DocumentValidator instance (singleton)."""
+    global _document_validator
+    if _document_validator is None:
+        _document_validator = DocumentValidator()
+    return _document_validator
+
+
 def validate_document(doc: KraftdDocument) -> ValidationResult:
     """
     Quick function to validate document.
@@ -410,5 +454,4 @@ def validate_document(doc: KraftdDocument) -> ValidationResult:
         for gap in result.critical_gaps:
             print(f"  Missing: {gap.field_name}")
     """
-    validator = DocumentValidator()
-    return validator.validate(doc)
+    return get_document_validator().validate(doc)
@@ -1,6 +1,11 @@
 from docx import Document
-from typing import List, Dict, Any
+from docx.table import Table
+from typing import List, Dict, Any, Iterator
 from .base_processor import BaseProcessor
+from .parsed_document import ParsedPage, ParsedTable
+
+# Word files have no fixed pages; iter_pages() yields blocks of this many paragraphs
+PARAGRAPHS_PER_PAGE = 50
 
 class WordProcessor(BaseProcessor):
     """Process Word (.docx) documents and extract text, tables, and structured data."""
@@ -41,6 +46,40 @@ class WordProcessor(BaseProcessor):
         except Exception as e:
             return {"error": f"Failed to parse Word document: {str(e)}"}
     
+    def iter_pages(self) -> Iterator[ParsedPage]:
+        """
+        Yield the document in blocks of PARAGRAPHS_PER_PAGE paragraphs, in body order.
+        
+        Tables stay at their position in the body: their cells are rendered into
+        the block text as pipe-delimited rows and attached to the block.
+        """
+        doc = Document(self.file_path)
+        page_number = 1
+        lines: List[str] = []
+        tables: List[ParsedTable] = []
+        paragraphs = 0
+        
+        for block in doc.iter_inner_content():
+            if isinstance(block, Table):
+                table = ParsedTable.from_rows(
+                    ([cell.text for cell in row.cells] for row in block.rows),
+                    page_number=page_number
+                )
+                if table.rows:
+                    tables.append(table)
+                    lines.append(table.to_text())
+            elif block.text.strip():
+                lines.append(block.text)
+                paragraphs += 1
+            
+            if paragraphs >= PARAGRAPHS_PER_PAGE:
+                yield ParsedPage(page_number=page_number, text="\n".join(lines), tables=tables)
+                page_number += 1
+                lines, tables, paragraphs = [], [], 0
+        
+        if lines or page_number == 1:
+            yield ParsedPage(page_number=page_number, text="\n".join(lines), tables=tables)
+    
     def extract_tables(self) -> List[List[Dict]]:
         """Extract all tables from the Word document."""
         tables = []
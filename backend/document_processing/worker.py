@@ -0,0 +1,113 @@
+"""
+Extraction Worker Steps
+
+The two blocking steps of an extraction, parse and pipeline, as
+module-level functions with picklable arguments and results. The parse
+step also classifies the document from its first pages while later pages
+still parse, and hands the classified prefix on to the pipeline step. The same
+functions run in a worker thread for an inline /extract (?wait=true) and in
+a spawned worker process for extraction jobs (services/extraction_jobs.py),
+so this module imports only the processors and the pipeline.
+
+Each step takes and returns the document's StageTimer: in a worker process
+the caller gets back a copy holding the new timings.
+"""
+
+import logging
+import os
+from typing import Dict, Optional, Tuple, Type
+
+from .base_processor import BaseProcessor
+from .excel_processor import ExcelProcessor
+from .image_processor import ImageProcessor
+from .context import DocumentContext
+from .orchestrator import PageClassifier, PipelineResult, get_pipeline, warm_up_pipeline
+from .parsed_document import ParsedDocument
+from .pdf_processor import PDFProcessor
+from .timing import StageTimer
+from .word_processor import WordProcessor
+
+logger = logging.getLogger(__name__)
+
+PROCESSORS: Dict[str, Type[BaseProcessor]] = {
+    "pdf": PDFProcessor,
+    "docx": WordProcessor,
+    "xlsx": ExcelProcessor,
+    "xls": ExcelProcessor,
+    "jpg": ImageProcessor,
+    "jpeg": ImageProcessor,
+    "png": ImageProcessor,
+    "gif": ImageProcessor,
+}
+
+# Set in extraction job worker processes (see init_job_worker)
+_in_job_worker = False
+
+
+def init_job_worker() -> None:
+    """
+    Initializer of extraction job worker processes.
+
+    Builds and warms up the pipeline once per process. PDFs are parsed
+    in-process: the job pool already keeps every worker busy, a parse pool
+    per job would only oversubscribe the CPUs.
+    """
+    global _in_job_worker
+    _in_job_worker = True
+    try:
+        warm_up_pipeline()
+    except Exception as e:
+        logger.warning(f"Pipeline warm-up failed in extraction worker {os.getpid()}: {e}")
+
+
+def create_processor(file_path: str, file_ext: str) -> BaseProcessor:
+    """Processor for a file type (see PROCESSORS); ValueError for unsupported types"""
+    processor_class = PROCESSORS.get(file_ext)
+    if processor_class is None:
+        raise ValueError(f"Unsupported file type: {file_ext}")
+    if processor_class is PDFProcessor and _in_job_worker:
+        return PDFProcessor(file_path, max_workers=1)
+    return processor_class(file_path)
+
+
+def parse_file(file_path: str, file_ext: str, timer: Optional[StageTimer] = None
+               ) -> Tuple[ParsedDocument, Optional[DocumentContext], StageTimer]:
+    """
+    Parse a file as stage "parse", recording the bytes and lines it processed.
+
+    Pages come from the processor's iter_pages() and are fed to a
+    PageClassifier as they arrive, so stage 1 runs on its own thread from the
+    first pages while later pages are still parsing.
+
+    Returns:
+        The parsed document, the classified prefix for run_pipeline (None
+        for short documents or failed parses) and the timer
+    """
+    timer = timer or StageTimer()
+    processor = create_processor(file_path, file_ext)
+    logger.debug(f"Parser instantiated: {processor.__class__.__name__}")
+    page_classifier = PageClassifier(get_pipeline(), file_path, timer)
+    pages = []
+    try:
+        with timer.stage("parse") as timing:
+            for page in processor.iter_pages():
+                pages.append(page)
+                page_classifier.feed(page)
+            parsed_document = ParsedDocument.from_pages(pages, processor.source_format)
+    except Exception as e:
+        parsed_document = ParsedDocument(
+            text="", source_format=processor.source_format,
+            error=f"Failed to parse {processor.source_format} document: {str(e)}"
+        )
+    prefix = page_classifier.finish()
+    if parsed_document.error:
+        return parsed_document, None, timer
+    timing.bytes = os.path.getsize(file_path)
+    timing.lines = parsed_document.text.count("\n") + 1
+    return parsed_document, prefix, timer
+
+
+def run_pipeline(parsed_document: ParsedDocument, source_file: Optional[str],
+                 timer: StageTimer, prefix: Optional[DocumentContext] = None) -> PipelineResult:
+    """Run the shared ExtractionPipeline over a parsed document (and its classified prefix from parse_file)"""
+    return get_pipeline().process_document(parsed_document, source_file, timer, prefix=prefix)
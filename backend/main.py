@@ -1,11 +1,11 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Annotated, List, Optional
 from contextlib import asynccontextmanager
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 import os
 import time
 import logging
@@ -31,7 +31,11 @@ from document_processing import (
     ProcessingMetadata, ExtractionMethod, DataQuality
 )
 from document_processing.azure_service import get_azure_service, is_azure_configured
-from document_processing.orchestrator import ExtractionPipeline
+from document_processing.orchestrator import warm_up_pipeline
+from document_processing.timing import StageTimer, should_profile
+from document_processing.worker import PROCESSORS, init_job_worker, parse_file, run_pipeline
+from document_processing.pdf_processor import shutdown_parse_pool
+from document_processing.ocr import get_ocr_engine, shutdown_ocr_pool
 
 # Import AI Agent (GPT-4o mini)
 try:
@@ -46,7 +50,13 @@ from config import (
     REQUEST_TIMEOUT, DOCUMENT_PROCESSING_TIMEOUT, FILE_PARSE_TIMEOUT,
     MAX_RETRIES, RETRY_BACKOFF_FACTOR, RETRY_MAX_WAIT,
     RATE_LIMIT_ENABLED, RATE_LIMIT_REQUESTS_PER_MINUTE, RATE_LIMIT_REQUESTS_PER_HOUR,
-    METRICS_ENABLED, UPLOAD_DIR, MAX_UPLOAD_SIZE_MB, validate_config
+    RATE_LIMIT_BACKEND, RATE_LIMIT_REDIS_URL, RATE_LIMIT_SQLITE_PATH,
+    EXTRACTION_QUEUE_ENABLED, EXTRACTION_QUEUE_BACKEND, EXTRACTION_QUEUE_REDIS_URL, EXTRACTION_QUEUE_SQLITE_PATH,
+    EXTRACTION_WORKERS, EXTRACTION_WORKER_MODE, EXTRACTION_JOB_MAX_ATTEMPTS,
+    EXTRACTION_JOB_RETRY_BASE_SECONDS, EXTRACTION_JOB_RETRY_MAX_SECONDS, EXTRACTION_JOB_STEP_TIMEOUT,
+    STREAM_PUBSUB_BACKEND, STREAM_PUBSUB_REDIS_URL, STREAM_PUBSUB_SOCKET_DIR,
+    METRICS_ENABLED, UPLOAD_DIR, MAX_UPLOAD_SIZE_MB, UPLOAD_CHUNK_SIZE, UPLOAD_CONCURRENCY,
+    validate_config
 )
 
 # Import monitoring and telemetry
@@ -57,15 +67,28 @@ from models.errors import (
     KraftdHTTPException, APIErrorResponse, ErrorCode,
     internal_server_error, service_unavailable_error, authentication_error
 )
-from metrics import metrics_collector
-from rate_limit import RateLimitMiddleware
+from metrics import metrics_collector, MetricsMiddleware
+from rate_limit import RateLimitMiddleware, create_rate_limit_store
 
 # Import Cosmos DB services
-from services.cosmos_service import initialize_cosmos, get_cosmos_service
+from repositories.bulk import get_bulk_job_stats
+from services.cosmos_service import initialize_cosmos, get_cosmos_service, COSMOS_IN_MEMORY, get_patch_stats
+from services.quota_service import close_quota_service, get_quota_service
+from middleware.quota import reserved_quota
+from services.blob_service import close_async_blob_client
+from services.event_broadcaster import broadcaster
+from services.event_bus import create_event_bus
+from services.signals_broadcaster_bridge import SignalsBroadcasterBridge
+from services.extraction_cache import EXTRACTION_CACHE_ENABLED, get_extraction_cache, hash_file
+from services.extraction_jobs import (
+    ExtractionJob, ExtractionWorkerPool, JobContext, JobError, JobStatus, create_job_queue
+)
+from services.tenant_service import TenantService
+from services.uploads import UploadTooLarge, remove_upload, stream_upload_to_file
 from services.secrets_manager import get_secrets_manager
 
 # Import repositories
-from repositories import UserRepository, DocumentRepository
+from repositories import BatchCreateError, UserRepository, DocumentRepository
 from repositories.document_repository import DocumentStatus as RepoDocumentStatus
 from repositories.extraction_repository import ExtractionRepository
 from models.extraction import (
@@ -338,6 +361,7 @@ async def lifespan(app: FastAPI):
     logger.info("=" * 60)
     
     cosmos_service = None
+    stream_bus = None
     try:
         # Validate configuration
         if not validate_config():
@@ -362,6 +386,9 @@ async def lifespan(app: FastAPI):
             #     logger.warning("[WARN] Cosmos DB credentials not configured")
             #     logger.warning("      Set COSMOS_ENDPOINT and COSMOS_KEY in environment or Azure Key Vault")
             #     logger.info("      Continuing with fallback mode (in-memory storage)")
+            if COSMOS_IN_MEMORY:
+                cosmos_service = await initialize_cosmos()
+                logger.info("[OK] In-memory Cosmos DB stand-in initialized (COSMOS_IN_MEMORY)")
         except Exception as e:
             logger.warning(f"[WARN] Could not initialize Cosmos DB: {str(e)}")
             logger.info("      Continuing with fallback mode (in-memory storage)")
@@ -422,15 +449,31 @@ async def lifespan(app: FastAPI):
             logger.warning("      Document uploads will fail, but app will continue")
             logger.warning("      This is OK for read-only operations")
         
-        # Validate pipeline
+        # Build the shared pipeline and warm it up so the first extraction is fast
         try:
-            pipeline = ExtractionPipeline()
+            await asyncio.to_thread(warm_up_pipeline)
             logger.info(f"[OK] ExtractionPipeline initialized and ready")
         except Exception as e:
             logger.warning(f"[WARN] ExtractionPipeline initialization failed: {str(e)}")
             logger.warning("      Document processing will not be available")
             logger.info("      App will continue with limited functionality")
         
+        # Start the extraction job workers
+        if EXTRACTION_QUEUE_ENABLED:
+            extraction_workers.start()
+            logger.info(f"[OK] Extraction workers started ({EXTRACTION_WORKERS} {EXTRACTION_WORKER_MODE}, {EXTRACTION_QUEUE_BACKEND} queue)")
+        
+        # Connect this worker's streaming broadcaster to the other workers
+        try:
+            stream_bus = create_event_bus(STREAM_PUBSUB_BACKEND, STREAM_PUBSUB_REDIS_URL, STREAM_PUBSUB_SOCKET_DIR)
+            broadcaster.attach_bus(stream_bus)
+            SignalsBroadcasterBridge.attach_bus(stream_bus)
+            await stream_bus.start()
+            logger.info(f"[OK] Streaming pub/sub started ({STREAM_PUBSUB_BACKEND})")
+        except Exception as e:
+            logger.warning(f"[WARN] Streaming pub/sub unavailable: {str(e)}")
+            logger.info("      WebSocket clients only receive events ingested by this worker")
+        
         # Initialize Export Tracking Service (Three-stage recording)
         if cosmos_service and cosmos_service.is_initialized():
             try:
@@ -467,6 +510,38 @@ async def lifespan(app: FastAPI):
         logger.info("Shutting down Kraftd Docs Backend")
         logger.info("=" * 60)
         
+        # Flush write-behind quota usage and hand back leases while Cosmos is still open
+        try:
+            await close_quota_service()
+        except Exception as e:
+            logger.error(f"[ERROR] Failed to flush quota usage: {str(e)}")
+        
+        # Stop extraction workers; jobs still running on a shared queue are requeued when their lease expires
+        try:
+            await extraction_workers.stop()
+        except Exception as e:
+            logger.error(f"[ERROR] Failed to stop extraction workers: {str(e)}")
+        
+        # Close the shared rate limit store (Redis/SQLite connection)
+        if rate_limit_store:
+            try:
+                await rate_limit_store.close()
+            except Exception as e:
+                logger.error(f"[ERROR] Failed to close rate limit store: {str(e)}")
+        
+        # Flush and disconnect the streaming pub/sub
+        if stream_bus:
+            try:
+                await stream_bus.close()
+            except Exception as e:
+                logger.error(f"[ERROR] Failed to close streaming pub/sub: {str(e)}")
+        
+        # Close the shared async Blob Storage client and its connection pool
+        try:
+            await close_async_blob_client()
+        except Exception as e:
+            logger.error(f"[ERROR] Failed to close blob storage client: {str(e)}")
+        
         # Close Cosmos DB connection
         if cosmos_service and cosmos_service.is_initialized():
             try:
@@ -475,6 +550,10 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.error(f"[ERROR] Failed to close Cosmos DB: {str(e)}")
         
+        # Stop PDF parse worker processes and the OCR pool
+        shutdown_parse_pool()
+        shutdown_ocr_pool()
+        
         # Export metrics on shutdown if enabled
         if METRICS_ENABLED:
             metrics_collector.export_metrics("metrics_export.json")
@@ -498,6 +577,10 @@ app.add_middleware(
 # Add Application Insights monitoring middleware
 app.add_middleware(MonitoringMiddleware)
 
+# Record every request (count, errors, latency percentiles) for /api/v1/metrics
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # ===== Global Exception Handlers =====
 
 @app.exception_handler(KraftdHTTPException)
@@ -560,18 +643,21 @@ async def get_user_repository() -> Optional[UserRepository]:
         return None
 
 # ===== Add Rate Limiting Middleware =====
+rate_limit_store = None
 if RATE_LIMIT_ENABLED:
+    rate_limit_store = create_rate_limit_store(RATE_LIMIT_BACKEND, RATE_LIMIT_REDIS_URL, RATE_LIMIT_SQLITE_PATH)
     app.add_middleware(
         RateLimitMiddleware,
         requests_per_minute=RATE_LIMIT_REQUESTS_PER_MINUTE,
-        requests_per_hour=RATE_LIMIT_REQUESTS_PER_HOUR
+        requests_per_hour=RATE_LIMIT_REQUESTS_PER_HOUR,
+        store=rate_limit_store
     )
     logger.info(f"Rate limiting enabled: {RATE_LIMIT_REQUESTS_PER_MINUTE} req/min")
 
 # ===== JSON Encoder Helper =====
 def json_serialize(obj):
-    """Encode JSON with support for datetime objects."""
-    if isinstance(obj, datetime):
+    """Encode JSON with support for datetime and date objects."""
+    if isinstance(obj, (datetime, date)):
         return obj.isoformat()
     raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
@@ -635,9 +721,9 @@ async def startup_event():
             logger.warning("      Document uploads will fail, but app will continue")
             logger.warning("      This is OK for read-only operations")
         
-        # Validate pipeline
+        # Build the shared pipeline and warm it up so the first extraction is fast
         try:
-            pipeline = ExtractionPipeline()
+            await asyncio.to_thread(warm_up_pipeline)
             logger.info(f"[OK] ExtractionPipeline initialized and ready")
         except Exception as e:
             logger.warning(f"[WARN] ExtractionPipeline initialization failed: {str(e)}")
@@ -1390,7 +1476,23 @@ async def get_metrics():
     if not METRICS_ENABLED:
         raise HTTPException(status_code=403, detail="Metrics are disabled")
     
-    return metrics_collector.get_stats()
+    stats = metrics_collector.get_stats()
+    stats["extraction_cache"] = get_extraction_cache().get_stats()
+    stats["ocr"] = get_ocr_engine().get_stats()
+    stats["cosmos_patch"] = get_patch_stats().get_stats()
+    stats["bulk_jobs"] = get_bulk_job_stats()
+    stats["extraction_jobs"] = await extraction_workers.get_stats()
+    if get_quota_service().accounting:
+        stats["quota_accounting"] = get_quota_service().accounting.get_stats()
+    return stats
+
+@app.get("/api/v1/metrics/prometheus")
+async def get_prometheus_metrics():
+    """Metrics in the Prometheus text exposition format."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=403, detail="Metrics are disabled")
+    
+    return PlainTextResponse(metrics_collector.to_prometheus(), media_type="text/plain; version=0.0.4")
 
 # ===== Root Endpoint =====
 @app.get("/api/v1/")
@@ -1410,199 +1512,229 @@ async def root():
     }
 
 # ===== Document Ingestion Endpoints =====
+async def _receive_upload(file: UploadFile) -> dict:
+    """
+    Validate one uploaded file and stream it to UPLOAD_DIR.
+    
+    Returns:
+        Fields of its document record, plus file_size_bytes
+        
+    Raises:
+        HTTPException: 400 for an unsupported file type, 413 when over MAX_UPLOAD_SIZE_MB
+    """
+    doc_id = str(uuid.uuid4())
+    file_ext = file.filename.split(".")[-1].lower()
+    file_path = os.path.join(UPLOAD_DIR, f"{doc_id}.{file_ext}")
+    
+    # Validate file type
+    if file_ext not in PROCESSORS:
+        logger.warning(f"Unsupported file type: {file_ext}")
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_ext}. Allowed: {', '.join(PROCESSORS)}")
+    
+    # Stream uploaded file to disk in chunks, hashing it and enforcing the size limit on the way
+    max_size_bytes = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    try:
+        file_size, file_hash = await stream_upload_to_file(file, file_path, max_size_bytes, UPLOAD_CHUNK_SIZE)
+    except UploadTooLarge:
+        logger.warning(f"File too large: {file.filename} (> {max_size_bytes} bytes)")
+        raise HTTPException(status_code=413, detail=f"File size exceeds {MAX_UPLOAD_SIZE_MB}MB limit")
+    
+    logger.info(f"Document saved: {doc_id}, size: {file_size} bytes, type: {file_ext}, sha256: {file_hash}")
+    
+    # Create initial document record
+    kraftd_doc = KraftdDocument(
+        document_id=doc_id,
+        metadata={
+            "document_type": DocumentType.BOQ,  # Will be detected during extraction
+            "document_number": f"DOC-{doc_id[:8]}",
+            "issue_date": datetime.now().date()
+        },
+        parties={},
+        status=DocumentStatus.UPLOADED,
+        processing_metadata=ProcessingMetadata(
+            extraction_method=ExtractionMethod.DIRECT_PARSE,
+            processing_duration_ms=0,
+            source_file_size_bytes=file_size
+        )
+    )
+    return {
+        "document_id": doc_id,
+        "filename": file.filename,
+        "file_path": file_path,
+        "file_type": file_ext,
+        "file_hash": file_hash,
+        "file_size_bytes": file_size,
+        "document": kraftd_doc.dict()
+    }
+
+
+async def _register_uploads(uploads: List[dict], owner_email: str) -> None:
+    """
+    Create the document records of uploaded files.
+    
+    Records go to Cosmos DB in transactional batches; the records of a
+    batch that fails are created one by one (UPLOAD_CONCURRENCY at a time),
+    and records Cosmos DB does not take fall back to in-memory storage.
+    """
+    records = [{
+        "document_id": upload["document_id"],
+        "filename": upload["filename"],
+        "document_type": str(DocumentType.BOQ),
+        "file_path": upload["file_path"],
+        "file_type": upload["file_type"],
+        "file_hash": upload["file_hash"],
+        "document": upload["document"]
+    } for upload in uploads]
+    
+    # Try to persist to Cosmos DB (with fallback to in-memory)
+    repo = await get_document_repository()
+    if repo:
+        if len(records) > 1:
+            try:
+                await repo.create_documents(owner_email, records)
+                logger.info(f"{len(records)} documents persisted to Cosmos DB")
+                return
+            except BatchCreateError as e:
+                # The other batches are committed: only these records are left to create
+                failed_ids = {item["id"] for item in e.failed}
+                records = [record for record in records if record["document_id"] in failed_ids]
+                logger.warning(f"Batch create failed for {len(records)} documents, creating them one by one: {e}")
+            except Exception as e:
+                logger.warning(f"Batch create of {len(records)} documents failed, creating them one by one: {e}")
+        
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        
+        async def create(record: dict) -> Optional[dict]:
+            async with semaphore:
+                try:
+                    await repo.create_document(owner_email=owner_email, **record)
+                    logger.info(f"Document persisted to Cosmos DB: {record['document_id']}")
+                    return None
+                except ValueError as e:
+                    # Already stored in Cosmos DB: no in-memory copy
+                    logger.warning(f"Document {record['document_id']} already in Cosmos DB: {e}")
+                    return None
+                except Exception as e:
+                    logger.warning(f"Failed to persist {record['document_id']} to Cosmos DB, using fallback: {e}")
+                    return record
+        
+        records = [record for record in await asyncio.gather(*map(create, records)) if record]
+    
+    # Fallback to in-memory storage
+    for record in records:
+        documents_db[record["document_id"]] = {
+            "owner_email": owner_email,
+            "file_path": record["file_path"],
+            "file_type": record["file_type"],
+            "file_hash": record["file_hash"],
+            "document": record["document"]
+        }
+        logger.info(f"Using fallback in-memory storage for: {record['document_id']}")
+
+
+def _upload_result(upload: dict) -> dict:
+    return {
+        "document_id": upload["document_id"],
+        "filename": upload["filename"],
+        "status": "uploaded",
+        "file_size_bytes": upload["file_size_bytes"],
+        "file_hash": upload["file_hash"],
+        "message": "Document uploaded successfully. Ready for extraction and intelligence."
+    }
+
+
 @app.post("/api/v1/docs/upload")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+    file: UploadFile = File(...),
+    extract: bool = False,
+    priority: Annotated[int, Query(ge=-10, le=10)] = 0
+):
     """Upload and ingest a document (PDF, Excel, Word, image, scanned).
     
     Supported formats: PDF, DOCX, XLSX, XLS, JPG, PNG, JPEG, GIF
     Max file size: 25MB (per MASTER INPUT SPECIFICATION)
+    
+    With ?extract=true the document is also queued for extraction (see
+    /api/v1/docs/extract) and the response carries the job_id. The
+    document counts against the owner's quota (429 when used up).
     """
     try:
         logger.info(f"Uploading document: {file.filename}")
-        doc_id = str(uuid.uuid4())
-        file_ext = file.filename.split(".")[-1].lower()
-        file_path = os.path.join(UPLOAD_DIR, f"{doc_id}.{file_ext}")
-        
-        # Save uploaded file
-        contents = await file.read()
-        
-        # Validate file size
-        max_size_bytes = MAX_UPLOAD_SIZE_MB * 1024 * 1024
-        if len(contents) > max_size_bytes:
-            logger.warning(f"File too large: {file.filename} ({len(contents)} bytes > {max_size_bytes} bytes)")
-            raise HTTPException(status_code=413, detail=f"File size exceeds {MAX_UPLOAD_SIZE_MB}MB limit. File size: {len(contents) / (1024*1024):.2f}MB")
-        
-        # Validate file type
-        allowed_extensions = {'pdf', 'docx', 'xlsx', 'xls', 'jpg', 'jpeg', 'png', 'gif'}
-        if file_ext not in allowed_extensions:
-            logger.warning(f"Unsupported file type: {file_ext}")
-            raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_ext}. Allowed: {', '.join(allowed_extensions)}")
-        
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        
-        logger.info(f"Document saved: {doc_id}, size: {len(contents)} bytes, type: {file_ext}")
-        
-        # Create initial document record
-        kraftd_doc = KraftdDocument(
-            document_id=doc_id,
-            metadata={
-                "document_type": DocumentType.BOQ,  # Will be detected during extraction
-                "document_number": f"DOC-{doc_id[:8]}",
-                "issue_date": datetime.now().date()
-            },
-            parties={},
-            status=DocumentStatus.UPLOADED,
-            processing_metadata=ProcessingMetadata(
-                extraction_method=ExtractionMethod.DIRECT_PARSE,
-                processing_duration_ms=0,
-                source_file_size_bytes=len(contents)
-            )
-        )
-        
-        # Try to persist to Cosmos DB (with fallback to in-memory)
-        repo = await get_document_repository()
-        if repo:
-            try:
-                # Get owner email from context (for now use default)
-                owner_email = "default@kraftdintel.com"
-                await repo.create_document(
-                    document_id=doc_id,
-                    owner_email=owner_email,
-                    filename=file.filename,
-                    document_type=str(DocumentType.BOQ),
-                    file_path=file_path,
-                    file_type=file_ext,
-                    document=kraftd_doc.dict()
-                )
-                logger.info(f"Document persisted to Cosmos DB: {doc_id}")
-            except Exception as e:
-                logger.warning(f"Failed to persist to Cosmos DB, using fallback: {e}")
-                documents_db[doc_id] = {
-                    "file_path": file_path,
-                    "file_type": file_ext,
-                    "document": kraftd_doc.dict()
-                }
-        else:
-            # Fallback to in-memory storage
-            documents_db[doc_id] = {
-                "file_path": file_path,
-                "file_type": file_ext,
-                "document": kraftd_doc.dict()
-            }
-            logger.info(f"Using fallback in-memory storage for: {doc_id}")
-        
-        logger.info(f"Document registered: {doc_id}")
-        return JSONResponse({
-            "document_id": doc_id,
-            "filename": file.filename,
-            "status": "uploaded",
-            "file_size_bytes": len(contents),
-            "message": "Document uploaded successfully. Ready for extraction and intelligence."
-        })
+        # Get owner email from context (for now use default)
+        owner_email = "default@kraftdintel.com"
+        async with reserved_quota(owner_email, "documents_uploaded"):
+            upload = await _receive_upload(file)
+            await _register_uploads([upload], owner_email)
+        logger.info(f"Document registered: {upload['document_id']}")
+        
+        result = _upload_result(upload)
+        if extract:
+            result["job_id"] = (await _submit_extraction(upload["document_id"], owner_email, priority)).job_id
+        return JSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=400, detail=f"Upload failed: {str(e)}")
 
 # Batch upload endpoint for multiple documents
 @app.post("/api/v1/docs/upload/batch")
-async def upload_documents(files: List[UploadFile] = File(...)):
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    extract: bool = False,
+    priority: Annotated[int, Query(ge=-10, le=10)] = 0
+):
+    """Upload several documents at once (e.g. a supplier pack).
+    
+    Files are streamed to disk concurrently (UPLOAD_CONCURRENCY at a time)
+    and their records are created together, so a batch takes about as long
+    as its slowest file. A file that is rejected (type, size) does not fail
+    the others; results are in request order. With ?extract=true every
+    uploaded document is also queued for extraction. The uploaded documents
+    count against the owner's quota together: if they do not all fit, none
+    is kept (429).
+    """
     try:
         if not files or len(files) == 0:
             raise HTTPException(status_code=400, detail="No files provided")
 
-        results = []
-        allowed_extensions = {'pdf', 'docx', 'xlsx', 'xls', 'jpg', 'jpeg', 'png', 'gif'}
-        max_size_bytes = MAX_UPLOAD_SIZE_MB * 1024 * 1024
-
-        repo = await get_document_repository()
+        owner_email = "default@kraftdintel.com"
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
 
-        for file in files:
+        async def receive(file: UploadFile) -> dict:
+            async with semaphore:
+                try:
+                    return await _receive_upload(file)
+                except HTTPException as e:
+                    return {"filename": file.filename, "status": "error", "error_message": e.detail}
+                except Exception as inner_e:
+                    logger.warning(f"Upload of {getattr(file, 'filename', 'unknown')} failed: {inner_e}")
+                    return {"filename": getattr(file, 'filename', 'unknown'), "status": "error", "error_message": str(inner_e)}
+
+        received = await asyncio.gather(*map(receive, files))
+        uploads = [item for item in received if "document_id" in item]
+        if uploads:
             try:
-                file_ext = file.filename.split(".")[-1].lower()
-                if file_ext not in allowed_extensions:
-                    results.append({
-                        "filename": file.filename,
-                        "status": "error",
-                        "error_message": f"Unsupported file type: {file_ext}. Allowed: {', '.join(allowed_extensions)}"
-                    })
-                    continue
-
-                contents = await file.read()
-                if len(contents) > max_size_bytes:
-                    results.append({
-                        "filename": file.filename,
-                        "status": "error",
-                        "error_message": f"File size exceeds {MAX_UPLOAD_SIZE_MB}MB limit. File size: {len(contents) / (1024*1024):.2f}MB"
-                    })
-                    continue
-
-                doc_id = str(uuid.uuid4())
-                file_path = os.path.join(UPLOAD_DIR, f"{doc_id}.{file_ext}")
-                with open(file_path, "wb") as f:
-                    f.write(contents)
-
-                kraftd_doc = KraftdDocument(
-                    document_id=doc_id,
-                    metadata={
-                        "document_type": DocumentType.BOQ,
-                        "document_number": f"DOC-{doc_id[:8]}",
-                        "issue_date": datetime.now().date()
-                    },
-                    parties={},
-                    status=DocumentStatus.UPLOADED,
-                    processing_metadata=ProcessingMetadata(
-                        extraction_method=ExtractionMethod.DIRECT_PARSE,
-                        processing_duration_ms=0,
-                        source_file_size_bytes=len(contents)
-                    )
-                )
-
-                owner_email = "default@kraftdintel.com"
-                
-                if repo:
-                    try:
-                        # Store main document metadata separately from extractions
-                        await repo.create_document(
-                            document_id=doc_id,
-                            owner_email=owner_email,
-                            filename=file.filename,
-                            document_type=str(DocumentType.BOQ),
-                            file_path=file_path,
-                            file_type=file_ext,
-                            document=kraftd_doc.dict()
-                        )
-                        # Note: Extraction results (OCR, DI data) will be stored separately 
-                        # in ExtractionRepository when /extract endpoint is called
-                    except Exception as e:
-                        logger.warning(f"Failed to store document {doc_id} in Cosmos DB: {e}")
-                        documents_db[doc_id] = {
-                            "file_path": file_path,
-                            "file_type": file_ext,
-                            "document": kraftd_doc.dict()
-                        }
-                else:
-                    # Fallback to in-memory
-                    documents_db[doc_id] = {
-                        "file_path": file_path,
-                        "file_type": file_ext,
-                        "document": kraftd_doc.dict()
-                    }
-
-                results.append({
-                    "document_id": doc_id,
-                    "filename": file.filename,
-                    "status": "uploaded",
-                    "file_size_bytes": len(contents),
-                    "message": "Document uploaded successfully. Ready for extraction and intelligence."
-                })
-            except Exception as inner_e:
-                results.append({
-                    "filename": getattr(file, 'filename', 'unknown'),
-                    "status": "error",
-                    "error_message": str(inner_e)
-                })
+                async with reserved_quota(owner_email, "documents_uploaded", len(uploads)):
+                    # Note: Extraction results (OCR, DI data) will be stored separately
+                    # in ExtractionRepository when /extract endpoint is called
+                    await _register_uploads(uploads, owner_email)
+            except HTTPException:
+                # Over quota: none of the files is kept
+                await asyncio.gather(*(asyncio.to_thread(remove_upload, upload["file_path"]) for upload in uploads))
+                raise
 
+        results = []
+        for item in received:
+            if "document_id" not in item:
+                results.append(item)
+                continue
+            result = _upload_result(item)
+            if extract:
+                result["job_id"] = (await _submit_extraction(item["document_id"], owner_email, priority)).job_id
+            results.append(result)
+
+        logger.info(f"Batch upload: {len(uploads)} of {len(files)} files uploaded")
         return JSONResponse(results)
     except HTTPException:
         raise
@@ -1668,28 +1800,24 @@ async def convert_document(document_id: str, target_format: str = "structured_da
         raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
 
 # ===== Document Intelligence Endpoints =====
-@app.post("/api/v1/docs/extract")
-async def extract_intelligence(document_id: str):
-    """Extract intelligence using the new orchestrator pipeline.
-    
-    Pipeline stages:
-    1. Classifier - Identify document type
-    2. Mapper - Extract structured fields
-    3. Inferencer - Apply business logic rules
-    4. Validator - Score completeness and quality
-    
-    Max timeout: 30 seconds per request
+async def _run_step_in_thread(stage: str, func, *args, timeout: float):
+    """Run a blocking extraction step in the default thread pool, within the request timeout"""
+    return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=timeout)
+
+
+async def _extract_document(document_id: str, doc_record: dict, timer: StageTimer,
+                            debug: bool = False, run_step=_run_step_in_thread) -> dict:
     """
-    logger.info(f"Extracting intelligence for document: {document_id}")
+    Parse a document, run the pipeline and store the results.
     
-    # Get document from Cosmos DB or fallback
-    doc_record = await get_document_record(document_id)
-    if not doc_record:
-        logger.warning(f"Document not found: {document_id}")
-        if METRICS_ENABLED:
-            metrics_collector.record_error("/extract", "Document not found", document_id)
-        raise HTTPException(status_code=404, detail="Document not found")
+    Shared by inline extraction and extraction jobs:
+    run_step(stage, func, *args, timeout=...) runs the blocking parse and
+    pipeline steps (in a thread within the request timeouts, or in a job
+    worker process).
     
+    Returns:
+        Extraction summary (the response body of an inline /extract)
+    """
     file_path = doc_record["file_path"]
     file_ext = doc_record["file_type"]
     
@@ -1697,8 +1825,7 @@ async def extract_intelligence(document_id: str):
         start_time = time.time()
         
         # Validate file type
-        supported_types = ["pdf", "docx", "xlsx", "xls", "jpg", "jpeg", "png", "gif"]
-        if file_ext not in supported_types:
+        if file_ext not in PROCESSORS:
             logger.error(f"Unsupported file type: {file_ext}")
             if METRICS_ENABLED:
                 metrics_collector.record_error("/extract", f"Unsupported file type: {file_ext}", document_id)
@@ -1706,54 +1833,68 @@ async def extract_intelligence(document_id: str):
         
         logger.info(f"Processing {file_ext} document")
         
-        # Parse document using appropriate processor (in thread pool to avoid blocking)
-        if file_ext == "pdf":
-            processor = PDFProcessor(file_path)
-        elif file_ext == "docx":
-            processor = WordProcessor(file_path)
-        elif file_ext in ["xlsx", "xls"]:
-            processor = ExcelProcessor(file_path)
-        else:  # jpg, jpeg, png, gif
-            processor = ImageProcessor(file_path)
-        
-        logger.debug(f"Parser instantiated: {processor.__class__.__name__}")
+        # Same bytes from the same owner under the same pipeline version: reuse the stored extraction
+        file_hash = doc_record.get("file_hash") or await asyncio.to_thread(hash_file, file_path)
+        document_owner = doc_record.get("owner_email") or "default@kraftdintel.com"
+        extraction_cache = get_extraction_cache() if EXTRACTION_CACHE_ENABLED else None
+        cached = await extraction_cache.get(file_hash, document_owner) if extraction_cache else None
         
-        # Extract text from document (run in thread pool to avoid blocking, with timeout)
-        try:
-            parsed_data = await asyncio.wait_for(
-                asyncio.to_thread(processor.parse),
-                timeout=FILE_PARSE_TIMEOUT
-            )
-        except asyncio.TimeoutError:
-            logger.error(f"File parsing timeout for document {document_id} after {FILE_PARSE_TIMEOUT}s")
-            if METRICS_ENABLED:
-                metrics_collector.record_error("/extract", f"Parsing timeout after {FILE_PARSE_TIMEOUT}s", document_id)
-            raise HTTPException(status_code=408, detail=f"File parsing timeout (>{FILE_PARSE_TIMEOUT}s)")
-        
-        text = parsed_data if isinstance(parsed_data, str) else str(parsed_data)
-        logger.debug(f"Text extracted, length: {len(text)} characters")
-        
-        # Process through full pipeline (run in thread pool to avoid blocking, with timeout)
-        logger.info("Starting extraction pipeline...")
-        try:
-            pipeline = ExtractionPipeline()
-            pipeline_result = await asyncio.wait_for(
-                asyncio.to_thread(pipeline.process_document, text, doc_record["file_path"]),
-                timeout=DOCUMENT_PROCESSING_TIMEOUT
+        if cached:
+            pipeline_result, tables = cached
+            pipeline_result.source_file = file_path  # This upload, not the one that filled the cache
+            logger.info(f"Extraction cache hit for {document_id} (sha256 {file_hash[:12]})")
+        else:
+            # Extract text from document with the processor for its type (in a worker, with timeout)
+            try:
+                parsed_document, prefix, timer = await run_step(
+                    "parse", parse_file, file_path, file_ext, timer, timeout=FILE_PARSE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.error(f"File parsing timeout for document {document_id} after {FILE_PARSE_TIMEOUT}s")
+                if METRICS_ENABLED:
+                    metrics_collector.record_error("/extract", f"Parsing timeout after {FILE_PARSE_TIMEOUT}s", document_id)
+                raise HTTPException(status_code=408, detail=f"File parsing timeout (>{FILE_PARSE_TIMEOUT}s)")
+            
+            if parsed_document.error:
+                logger.error(f"Parsing failed for document {document_id}: {parsed_document.error}")
+                if METRICS_ENABLED:
+                    metrics_collector.record_error("/extract", f"Parsing failed: {parsed_document.error}", document_id)
+                raise HTTPException(status_code=500, detail=f"Parsing failed: {parsed_document.error}")
+            
+            logger.debug(
+                f"Text extracted, length: {len(parsed_document.text)} characters, "
+                f"{parsed_document.page_count} pages, {len(parsed_document.tables)} tables"
             )
-        except asyncio.TimeoutError:
-            logger.error(f"Document processing timeout for {document_id} after {DOCUMENT_PROCESSING_TIMEOUT}s")
-            if METRICS_ENABLED:
-                metrics_collector.record_error("/extract", f"Processing timeout after {DOCUMENT_PROCESSING_TIMEOUT}s", document_id)
-            raise HTTPException(status_code=408, detail=f"Processing timeout (>{DOCUMENT_PROCESSING_TIMEOUT}s)")
-        
-        if not pipeline_result.success:
-            logger.error(f"Pipeline failed: {pipeline_result.error}")
-            if METRICS_ENABLED:
-                metrics_collector.record_error("/extract", f"Pipeline failed: {pipeline_result.error}", document_id)
-            raise HTTPException(status_code=500, detail=f"Pipeline failed: {pipeline_result.error}")
-        
-        logger.info("Pipeline completed successfully")
+            # Process through full pipeline (in a worker, with timeout); stage 1
+            # already ran on the first pages during parsing for longer documents
+            logger.info("Starting extraction pipeline...")
+            try:
+                pipeline_result = await run_step(
+                    "pipeline", run_pipeline, parsed_document, file_path, timer, prefix,
+                    timeout=DOCUMENT_PROCESSING_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.error(
+                    f"Document processing timeout for {document_id} after {DOCUMENT_PROCESSING_TIMEOUT}s "
+                    f"(still in stage: {timer.running}; timings: {timer.to_dict()})"
+                )
+                if METRICS_ENABLED:
+                    metrics_collector.record_error("/extract", f"Processing timeout after {DOCUMENT_PROCESSING_TIMEOUT}s", document_id)
+                raise HTTPException(status_code=408, detail=f"Processing timeout (>{DOCUMENT_PROCESSING_TIMEOUT}s)")
+            
+            timer = pipeline_result.timer or timer
+            
+            if not pipeline_result.success:
+                logger.error(f"Pipeline failed: {pipeline_result.error}")
+                if METRICS_ENABLED:
+                    metrics_collector.record_error("/extract", f"Pipeline failed: {pipeline_result.error}", document_id)
+                raise HTTPException(status_code=500, detail=f"Pipeline failed: {pipeline_result.error}")
+            
+            logger.info("Pipeline completed successfully")
+            
+            tables = [table.to_dict() for table in parsed_document.tables]
+            if extraction_cache:
+                await extraction_cache.put(file_hash, document_owner, pipeline_result, tables)
         
         # Get the extracted document
         kraftd_document = pipeline_result.document
@@ -1825,12 +1966,12 @@ async def extract_intelligence(document_id: str):
                     file_type=file_ext.upper(),
                     file_size_bytes=os.path.getsize(file_path),
                     uploaded_at=datetime.utcnow(),
-                    file_hash=None
+                    file_hash=file_hash
                 )
                 
                 extraction_data = ExtractionData(
                     text=kraftd_document.content[:5000] if kraftd_document.content else "",  # First 5K chars
-                    tables=[],  # Extracted tables if any
+                    tables=tables,
                     images=[],  # Image references if any
                     key_value_pairs=kraftd_document.metadata.dict() if kraftd_document.metadata else {},
                     metadata={
@@ -1877,15 +2018,25 @@ async def extract_intelligence(document_id: str):
         logger.info(f"  - Completeness: {pipeline_result.validation_result.completeness_score if pipeline_result.validation_result else 0}%")
         logger.info(f"  - Quality: {pipeline_result.validation_result.data_quality_score if pipeline_result.validation_result else 0}%")
         
+        # Stage timings of a fresh extraction (a cache hit ran no stages)
+        if timer.stages:
+            monitoring.record_pipeline_stages(document_id, timer)
+            for timing in timer.stages:
+                if timing.profile:
+                    logger.info(f"Profile of stage '{timing.name}' for {document_id}:\n{timing.profile}")
+        
         # Record metrics if enabled
         if METRICS_ENABLED:
+            if timer.stages:
+                metrics_collector.record_pipeline_stages(timer.to_dict())
             metrics_collector.record_extraction(
                 document_id=document_id,
                 status_code=200,
                 duration_ms=processing_duration,
                 completeness=pipeline_result.validation_result.completeness_score if pipeline_result.validation_result else 0,
                 quality=pipeline_result.validation_result.data_quality_score if pipeline_result.validation_result else 0,
-                doc_type=kraftd_document.metadata.document_type.value if kraftd_document.metadata else "UNKNOWN"
+                doc_type=kraftd_document.metadata.document_type.value if kraftd_document.metadata else "UNKNOWN",
+                bytes_scanned_estimate=pipeline_result.bytes_scanned_estimate
             )
         
         # Prepare response data with proper JSON serialization
@@ -1898,7 +2049,9 @@ async def extract_intelligence(document_id: str):
                 "fields_mapped": pipeline_result.mapping_signals,
                 "inferences_made": pipeline_result.inference_signals,
                 "line_items": len(kraftd_document.line_items) if kraftd_document.line_items else 0,
-                "parties_found": len(kraftd_document.parties) if kraftd_document.parties else 0
+                "parties_found": len(kraftd_document.parties) if kraftd_document.parties else 0,
+                "bytes_scanned_estimate": pipeline_result.bytes_scanned_estimate,
+                "cache_hit": cached is not None
             },
             "validation": {
                 "completeness_score": pipeline_result.validation_result.completeness_score if pipeline_result.validation_result else 0,
@@ -1909,9 +2062,14 @@ async def extract_intelligence(document_id: str):
             },
             "document": json.loads(json.dumps(kraftd_document.dict(), default=json_serialize))
         }
+        if debug:
+            response_data["debug"] = {
+                "stage_timings": timer.to_dict(),
+                "pipeline_ms": round(timer.total_ns / 1e6, 3),
+                "profiled": timer.profile
+            }
         
-        # Return extraction summary using custom JSON serialization
-        return create_json_response(response_data)
+        return response_data
     except HTTPException:
         raise
     except Exception as e:
@@ -1920,6 +2078,161 @@ async def extract_intelligence(document_id: str):
             metrics_collector.record_error("/extract", str(e), document_id)
         raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
 
+@app.post("/api/v1/docs/extract")
+async def extract_intelligence(
+    document_id: str,
+    debug: bool = False,
+    wait: bool = False,
+    priority: Annotated[int, Query(ge=-10, le=10)] = 0,
+    x_profile: Annotated[Optional[str], Header()] = None
+):
+    """Extract intelligence using the new orchestrator pipeline.
+    
+    Pipeline stages:
+    1. Classifier - Identify document type
+    2. Mapper - Extract structured fields
+    3. Inferencer - Apply business logic rules
+    4. Validator - Score completeness and quality
+    
+    The extraction is queued as a job (202 with its job_id) and run by the
+    extraction worker pool: poll GET /api/v1/documents/{id}/status or
+    GET /api/v1/docs/extract/jobs/{job_id} for progress and the result.
+    Jobs with a higher priority (-10..10) run first; tenants take turns
+    within a priority. With ?wait=true (or EXTRACTION_QUEUE_ENABLED=false)
+    the document is extracted within the request instead, max timeout 30
+    seconds.
+    
+    With ?debug=true an inline response includes per-stage timings (parse,
+    each stage and each inference rule, with bytes and lines processed). An
+    X-Profile: true header also profiles every stage (see
+    PIPELINE_PROFILE_SAMPLE_RATE for sampled profiling).
+    """
+    logger.info(f"Extracting intelligence for document: {document_id}")
+    profile = should_profile(
+        requested=x_profile is not None and x_profile.lower() not in ("", "0", "false")
+    )
+    
+    # Get document from Cosmos DB or fallback
+    doc_record = await get_document_record(document_id)
+    if not doc_record:
+        logger.warning(f"Document not found: {document_id}")
+        if METRICS_ENABLED:
+            metrics_collector.record_error("/extract", "Document not found", document_id)
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    if EXTRACTION_QUEUE_ENABLED and not wait:
+        return await _enqueue_extraction(document_id, doc_record, priority, profile)
+    
+    # Return extraction summary using custom JSON serialization
+    response_data = await _extract_document(document_id, doc_record, StageTimer(profile=profile), debug=debug)
+    return create_json_response(response_data)
+
+
+# ===== Extraction Jobs =====
+def _job_response(job: ExtractionJob, status_code: int = 200) -> JSONResponse:
+    body = job.status_dict()
+    body["status_url"] = f"/api/v1/documents/{job.document_id}/status"
+    body["job_url"] = f"/api/v1/docs/extract/jobs/{job.job_id}"
+    return JSONResponse(body, status_code=status_code)
+
+
+async def _enqueue_extraction(document_id: str, doc_record: dict, priority: int, profile: bool) -> JSONResponse:
+    """Queue an extraction job, or return the one already pending for the document"""
+    current = doc_record.get("job")
+    if current and current["status"] in (JobStatus.QUEUED.value, JobStatus.RUNNING.value):
+        job = await extraction_workers.get(current["job_id"])
+        if job and not job.finished:
+            return _job_response(job, status_code=202)
+    
+    owner_email = "default@kraftdintel.com"  # Default fallback until the request carries its user
+    job = await _submit_extraction(document_id, owner_email, priority, profile)
+    return _job_response(job, status_code=202)
+
+
+async def _submit_extraction(document_id: str, owner_email: str, priority: int = 0,
+                             profile: bool = False) -> ExtractionJob:
+    """Queue an extraction job for the current tenant (the owner when there is no tenant context)"""
+    tenant_context = TenantService.get_current_tenant()
+    job = await extraction_workers.submit(
+        document_id,
+        tenant=tenant_context.tenant_id if tenant_context else owner_email,
+        owner_email=owner_email,
+        priority=priority,
+        profile=profile
+    )
+    logger.info(f"Queued extraction job {job.job_id} for document {document_id} (priority {priority})")
+    return job
+
+
+async def run_extraction_job(job: ExtractionJob, context: JobContext) -> dict:
+    """Extraction job handler: an inline extraction with its steps run by the worker pool"""
+    doc_record = await get_document_record(job.document_id, job.owner_email)
+    if not doc_record:
+        raise JobError("Document not found", retryable=False)
+    try:
+        response_data = await _extract_document(
+            job.document_id, doc_record, StageTimer(profile=job.profile), run_step=context.run
+        )
+    except HTTPException as e:
+        # Client errors (e.g. an unsupported file type) fail the same way on every attempt
+        raise JobError(e.detail, retryable=e.status_code >= 500 or e.status_code == 408)
+    response_data.pop("document")  # Stored on the document record
+    return response_data
+
+
+# Document record status for each job status
+_JOB_DOCUMENT_STATUS = {
+    JobStatus.QUEUED.value: RepoDocumentStatus.PENDING.value,
+    JobStatus.RUNNING.value: RepoDocumentStatus.PROCESSING.value,
+    JobStatus.COMPLETED.value: RepoDocumentStatus.COMPLETED.value,
+    JobStatus.FAILED.value: RepoDocumentStatus.FAILED.value,
+    JobStatus.CANCELLED.value: RepoDocumentStatus.PENDING.value,
+}
+
+
+async def record_extraction_job(job: ExtractionJob) -> None:
+    """Write a job's state to its document record (reported by the document status endpoint)"""
+    await update_document_record(job.document_id, {
+        "status": _JOB_DOCUMENT_STATUS[job.status],
+        "job": job.status_dict()
+    }, job.owner_email)
+
+
+extraction_workers = ExtractionWorkerPool(
+    create_job_queue(EXTRACTION_QUEUE_BACKEND, EXTRACTION_QUEUE_REDIS_URL, EXTRACTION_QUEUE_SQLITE_PATH),
+    handler=run_extraction_job,
+    workers=EXTRACTION_WORKERS,
+    mode=EXTRACTION_WORKER_MODE,
+    on_update=record_extraction_job,
+    max_attempts=EXTRACTION_JOB_MAX_ATTEMPTS,
+    retry_base_seconds=EXTRACTION_JOB_RETRY_BASE_SECONDS,
+    retry_max_seconds=EXTRACTION_JOB_RETRY_MAX_SECONDS,
+    step_timeout=EXTRACTION_JOB_STEP_TIMEOUT,
+    initializer=init_job_worker
+)
+
+
+@app.get("/api/v1/docs/extract/jobs/{job_id}")
+async def get_extraction_job(job_id: str):
+    """Status, progress and (once completed) the result summary of an extraction job."""
+    job = await extraction_workers.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Extraction job not found")
+    return _job_response(job)
+
+
+@app.delete("/api/v1/docs/extract/jobs/{job_id}")
+async def cancel_extraction_job(job_id: str):
+    """Cancel a queued or running extraction job (409 once it has finished)."""
+    job = await extraction_workers.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Extraction job not found")
+    if job.status != JobStatus.CANCELLED.value:
+        raise HTTPException(status_code=409, detail=f"Extraction job already {job.status}")
+    logger.info(f"Cancelled extraction job {job_id} for document {job.document_id}")
+    return _job_response(job)
+
+
 # ===== Workflow Orchestration Endpoints =====
 @app.post("/api/v1/workflow/inquiry")
 async def create_inquiry(document_id: str):
@@ -2189,9 +2502,14 @@ async def get_document_status(document_id: str):
     
     logger.debug(f"Document status: {doc.status}, Quality: {doc.data_quality}")
     
+    # Latest extraction job (see /api/v1/docs/extract): status, progress, error
+    job = doc_record.get("job")
+    extracting = job is not None and job["status"] in (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+    
     return JSONResponse({
         "document_id": document_id,
-        "status": doc.status,
+        "status": DocumentStatus.PROCESSING if extracting else doc.status,
+        "job": job,
         "file_type": doc_record["file_type"],
         "extraction_confidence": doc.extraction_confidence.dict() if doc.extraction_confidence else None,
         "data_quality": doc.data_quality.dict() if doc.data_quality else None,
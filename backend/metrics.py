@@ -1,6 +1,16 @@
-"""Metrics collection and monitoring for Kraftd Docs Backend."""
+"""Metrics collection and monitoring for Kraftd Docs Backend.
+
+Recent metrics live in a fixed-size ring buffer. Every aggregate reported
+by get_stats() (totals, averages, per-endpoint counts and p50/p95/p99
+latencies) is kept up to date as metrics enter and leave the ring, so
+recording and reading stats are O(1) in the number of metrics kept.
+Latencies go into log-bucketed (HDR-style) histograms with ~1.6% relative
+error, which support removal as well as insertion.
+"""
 import time
+import math
 import logging
+from itertools import count
 from typing import Dict, List, Optional
 from dataclasses import dataclass, asdict
 from datetime import datetime
@@ -16,6 +26,9 @@ class MetricType(Enum):
     ERROR = "error"
     LATENCY = "latency"
 
+TIMED_TYPES = (MetricType.REQUEST.value, MetricType.EXTRACTION.value)
+QUANTILES = (0.5, 0.95, 0.99)
+
 @dataclass
 class Metric:
     """Single metric data point."""
@@ -32,16 +45,111 @@ class Metric:
         """Convert to dictionary."""
         return asdict(self)
 
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram (HDR-style).
+
+    Each power of two is split into SUB_BUCKETS linear buckets, so a value
+    is reported to within ~1.6% whatever its magnitude. Buckets are a
+    sparse dict: add() and remove() are O(1); quantiles walk the few
+    hundred occupied buckets.
+    """
+
+    SUB_BUCKETS = 32
+    MIN_VALUE = 0.001  # Smaller values (ms) share the lowest bucket
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    @classmethod
+    def bucket(cls, value: float) -> int:
+        mantissa, exponent = math.frexp(max(value, cls.MIN_VALUE))  # value = mantissa * 2**exponent, mantissa in [0.5, 1)
+        return exponent * cls.SUB_BUCKETS + int((mantissa - 0.5) * 2 * cls.SUB_BUCKETS)
+
+    @classmethod
+    def bucket_value(cls, index: int) -> float:
+        """Midpoint of a bucket"""
+        exponent, sub_bucket = divmod(index, cls.SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub_bucket + 0.5) / (2 * cls.SUB_BUCKETS), exponent)
+
+    def add(self, value: float):
+        index = self.bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+
+    def remove(self, value: float):
+        index = self.bucket(value)
+        remaining = self.counts[index] - 1
+        if remaining:
+            self.counts[index] = remaining
+        else:
+            del self.counts[index]
+        self.total -= 1
+
+    def quantiles(self, quantiles=QUANTILES) -> List[float]:
+        """Values at the given quantiles (0 when empty)"""
+        if not self.total:
+            return [0.0] * len(quantiles)
+        ranks = [max(1, math.ceil(q * self.total)) for q in quantiles]
+        values = [0.0] * len(quantiles)
+        seen = 0
+        pending = sorted(range(len(ranks)), key=ranks.__getitem__)
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            while pending and ranks[pending[0]] <= seen:
+                values[pending.pop(0)] = round(self.bucket_value(index), 2)
+            if not pending:
+                break
+        return values
+
+class _EndpointStats:
+    """Rolling aggregates for one endpoint over the metrics in the ring, plus lifetime counters"""
+
+    __slots__ = ("count", "errors", "total_duration", "latency", "lifetime_count", "lifetime_errors",
+                 "lifetime_duration")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_duration = 0.0
+        self.latency = LatencyHistogram()
+        self.lifetime_count = 0
+        self.lifetime_errors = 0
+        self.lifetime_duration = 0.0
+
+class _StageStats:
+    """Lifetime time and volume of one pipeline stage (or inference rule)"""
+
+    __slots__ = ("count", "total_ms", "bytes", "lines", "latency")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.bytes = 0
+        self.lines = 0
+        self.latency = LatencyHistogram()
+
 class MetricsCollector:
     """Collect and track metrics."""
-    
+
     def __init__(self, max_metrics: int = 10000):
         """Initialize metrics collector."""
-        self.metrics: List[Metric] = []
         self.max_metrics = max_metrics
         self.start_time = datetime.now()
+        self._ring: List[Optional[Metric]] = [None] * max_metrics
+        self._sequence = count()  # next() is atomic in CPython: slots are claimed without a lock
+        self._written = 0
+        self._by_type: Dict[str, int] = {}
+        self._timed_duration = 0.0
+        self._latency = LatencyHistogram()
+        self._extraction_completeness = 0.0
+        self._extraction_quality = 0.0
+        self._stage_bytes: Dict[str, int] = {}
+        self._endpoints: Dict[str, _EndpointStats] = {}
+        self._stages: Dict[str, _StageStats] = {}
         logger.info(f"Metrics collector initialized (max {max_metrics} metrics)")
-    
+
     def record_request(self, endpoint: str, status_code: int, duration_ms: float, document_id: Optional[str] = None):
         """Record a request metric."""
         metric = Metric(
@@ -53,10 +161,11 @@ class MetricsCollector:
             document_id=document_id
         )
         self._add_metric(metric)
-    
-    def record_extraction(self, document_id: str, status_code: int, duration_ms: float, 
-                         completeness: float, quality: float, doc_type: str):
-        """Record an extraction metric."""
+
+    def record_extraction(self, document_id: str, status_code: int, duration_ms: float,
+                         completeness: float, quality: float, doc_type: str,
+                         bytes_scanned_estimate: Optional[Dict[str, int]] = None):
+        """Record an extraction metric (bytes_scanned_estimate: text bytes per pipeline stage, one view size per pass)."""
         metric = Metric(
             timestamp=datetime.now().isoformat(),
             metric_type=MetricType.EXTRACTION.value,
@@ -67,11 +176,12 @@ class MetricsCollector:
             details={
                 "completeness": completeness,
                 "quality": quality,
-                "document_type": doc_type
+                "document_type": doc_type,
+                "bytes_scanned_estimate": bytes_scanned_estimate or {}
             }
         )
         self._add_metric(metric)
-    
+
     def record_error(self, endpoint: str, error: str, document_id: Optional[str] = None):
         """Record an error metric."""
         metric = Metric(
@@ -84,17 +194,74 @@ class MetricsCollector:
             error=error
         )
         self._add_metric(metric)
-    
+
+    def record_pipeline_stages(self, stages: Dict[str, Dict]):
+        """Record one extraction's stage timings (StageTimer.to_dict(): duration_ms, bytes, lines, rules_ms)."""
+        for stage, timing in stages.items():
+            self._record_stage(stage, timing["duration_ms"], timing.get("bytes", 0), timing.get("lines", 0))
+            for rule, duration_ms in (timing.get("rules_ms") or {}).items():
+                self._record_stage(f"{stage}.{rule}", duration_ms)
+
+    def _record_stage(self, name: str, duration_ms: float, num_bytes: int = 0, lines: int = 0):
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _StageStats()
+        stage.count += 1
+        stage.total_ms += duration_ms
+        stage.bytes += num_bytes
+        stage.lines += lines
+        stage.latency.add(duration_ms)
+
     def _add_metric(self, metric: Metric):
-        """Add metric to collection."""
-        self.metrics.append(metric)
-        if len(self.metrics) > self.max_metrics:
-            # Keep only recent metrics
-            self.metrics = self.metrics[-self.max_metrics:]
-    
+        """Add metric to the ring, evicting the oldest one when full."""
+        slot = next(self._sequence) % self.max_metrics
+        evicted = self._ring[slot]
+        self._ring[slot] = metric
+        self._written += 1
+        if evicted is not None:
+            self._apply(evicted, -1)
+        self._apply(metric, 1)
+
+    def _apply(self, metric: Metric, sign: int):
+        """Add (sign=1) or remove (sign=-1) a metric's contribution to the rolling aggregates."""
+        metric_type = metric.metric_type
+        self._by_type[metric_type] = self._by_type.get(metric_type, 0) + sign
+        timed = metric_type in TIMED_TYPES
+        if timed:
+            self._timed_duration += sign * metric.duration_ms
+            (self._latency.add if sign > 0 else self._latency.remove)(metric.duration_ms)
+        if metric_type == MetricType.EXTRACTION.value and metric.details:
+            self._extraction_completeness += sign * metric.details["completeness"]
+            self._extraction_quality += sign * metric.details["quality"]
+            for stage, num_bytes in (metric.details.get("bytes_scanned_estimate") or {}).items():
+                self._stage_bytes[stage] = self._stage_bytes.get(stage, 0) + sign * num_bytes
+
+        endpoint = self._endpoints.get(metric.endpoint)
+        if endpoint is None:
+            endpoint = self._endpoints[metric.endpoint] = _EndpointStats()
+        failed = metric.status_code >= 400
+        endpoint.count += sign
+        endpoint.errors += sign * failed
+        endpoint.total_duration += sign * metric.duration_ms
+        if timed:
+            (endpoint.latency.add if sign > 0 else endpoint.latency.remove)(metric.duration_ms)
+        if sign > 0:
+            endpoint.lifetime_count += 1
+            endpoint.lifetime_errors += failed
+            endpoint.lifetime_duration += metric.duration_ms
+
+    @property
+    def metrics(self) -> List[Metric]:
+        """Metrics in the ring, oldest first."""
+        if self._written <= self.max_metrics:
+            return self._ring[:self._written]
+        start = self._written % self.max_metrics
+        return self._ring[start:] + self._ring[:start]
+
     def get_stats(self) -> Dict:
         """Get aggregated statistics."""
-        if not self.metrics:
+        total_requests = min(self._written, self.max_metrics)
+        if not total_requests:
             return {
                 "total_requests": 0,
                 "total_errors": 0,
@@ -102,67 +269,121 @@ class MetricsCollector:
                 "avg_response_time_ms": 0,
                 "error_rate": 0,
             }
-        
-        total_requests = len(self.metrics)
-        error_metrics = [m for m in self.metrics if m.metric_type == MetricType.ERROR.value]
-        request_metrics = [m for m in self.metrics if m.metric_type in [MetricType.REQUEST.value, MetricType.EXTRACTION.value]]
-        
-        avg_response_time = sum(m.duration_ms for m in request_metrics) / len(request_metrics) if request_metrics else 0
-        error_rate = len(error_metrics) / total_requests if total_requests > 0 else 0
-        
+
+        total_errors = self._by_type.get(MetricType.ERROR.value, 0)
+        timed = sum(self._by_type.get(metric_type, 0) for metric_type in TIMED_TYPES)
+        avg_response_time = self._timed_duration / timed if timed else 0
+        error_rate = total_errors / total_requests
+
         # Extraction metrics
-        extraction_metrics = [m for m in self.metrics if m.metric_type == MetricType.EXTRACTION.value]
-        avg_completeness = sum(m.details["completeness"] for m in extraction_metrics if m.details) / len(extraction_metrics) if extraction_metrics else 0
-        avg_quality = sum(m.details["quality"] for m in extraction_metrics if m.details) / len(extraction_metrics) if extraction_metrics else 0
-        
+        extractions = self._by_type.get(MetricType.EXTRACTION.value, 0)
+        avg_completeness = self._extraction_completeness / extractions if extractions else 0
+        avg_quality = self._extraction_quality / extractions if extractions else 0
+
+        # Text bytes scanned per pipeline stage (estimated from the passes over text views)
+        avg_bytes_scanned_estimate = {
+            stage: round(total / extractions, 2) for stage, total in self._stage_bytes.items() if extractions
+        }
+
+        p50, p95, p99 = self._latency.quantiles()
         return {
             "total_requests": total_requests,
-            "total_errors": len(error_metrics),
-            "successful_requests": total_requests - len(error_metrics),
+            "total_errors": total_errors,
+            "successful_requests": total_requests - total_errors,
             "uptime_seconds": (datetime.now() - self.start_time).total_seconds(),
             "avg_response_time_ms": round(avg_response_time, 2),
+            "p50_response_time_ms": p50,
+            "p95_response_time_ms": p95,
+            "p99_response_time_ms": p99,
             "error_rate": round(error_rate * 100, 2),
             "extraction_metrics": {
-                "total_extractions": len(extraction_metrics),
+                "total_extractions": extractions,
                 "avg_completeness": round(avg_completeness, 2),
                 "avg_quality": round(avg_quality, 2),
+                "avg_bytes_scanned_estimate_per_stage": avg_bytes_scanned_estimate,
             },
-            "endpoint_stats": self._get_endpoint_stats()
+            "endpoint_stats": self._get_endpoint_stats(),
+            "pipeline_stages": self._get_stage_stats()
         }
-    
+
     def _get_endpoint_stats(self) -> Dict:
         """Get statistics by endpoint."""
         stats: Dict[str, Dict] = {}
-        
-        for metric in self.metrics:
-            endpoint = metric.endpoint
-            if endpoint not in stats:
-                stats[endpoint] = {
-                    "count": 0,
-                    "avg_duration_ms": 0,
-                    "errors": 0,
-                    "total_duration": 0
-                }
-            
-            stats[endpoint]["count"] += 1
-            stats[endpoint]["total_duration"] += metric.duration_ms
-            if metric.status_code >= 400:
-                stats[endpoint]["errors"] += 1
-        
-        # Calculate averages
-        for endpoint in stats:
-            count = stats[endpoint]["count"]
-            if count > 0:
-                stats[endpoint]["avg_duration_ms"] = round(stats[endpoint]["total_duration"] / count, 2)
-            del stats[endpoint]["total_duration"]
-        
+        for name, endpoint in self._endpoints.items():
+            if not endpoint.count:
+                continue
+            p50, p95, p99 = endpoint.latency.quantiles()
+            stats[name] = {
+                "count": endpoint.count,
+                "avg_duration_ms": round(endpoint.total_duration / endpoint.count, 2),
+                "p50_duration_ms": p50,
+                "p95_duration_ms": p95,
+                "p99_duration_ms": p99,
+                "errors": endpoint.errors,
+            }
+        return stats
+
+    def _get_stage_stats(self) -> Dict:
+        """Get time and volume per pipeline stage and inference rule (since start)."""
+        stats: Dict[str, Dict] = {}
+        for name, stage in self._stages.items():
+            p50, p95, p99 = stage.latency.quantiles()
+            stats[name] = {
+                "count": stage.count,
+                "avg_duration_ms": round(stage.total_ms / stage.count, 3),
+                "p50_duration_ms": p50,
+                "p95_duration_ms": p95,
+                "p99_duration_ms": p99,
+                "avg_bytes": round(stage.bytes / stage.count, 1),
+                "avg_lines": round(stage.lines / stage.count, 1),
+            }
         return stats
-    
+
     def get_metrics(self, limit: Optional[int] = None) -> List[Dict]:
         """Get recent metrics."""
         metrics = self.metrics[-limit:] if limit else self.metrics
         return [m.to_dict() for m in metrics]
-    
+
+    def to_prometheus(self) -> str:
+        """Render metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP kraftd_uptime_seconds Seconds since the metrics collector started",
+            "# TYPE kraftd_uptime_seconds gauge",
+            f"kraftd_uptime_seconds {(datetime.now() - self.start_time).total_seconds():.3f}",
+            "# HELP kraftd_requests_total Requests recorded per endpoint",
+            "# TYPE kraftd_requests_total counter",
+        ]
+        endpoints = sorted(self._endpoints.items())
+        lines += [f'kraftd_requests_total{{endpoint="{_label(name)}"}} {endpoint.lifetime_count}'
+                  for name, endpoint in endpoints]
+        lines += ["# HELP kraftd_request_errors_total Requests per endpoint with status >= 400",
+                  "# TYPE kraftd_request_errors_total counter"]
+        lines += [f'kraftd_request_errors_total{{endpoint="{_label(name)}"}} {endpoint.lifetime_errors}'
+                  for name, endpoint in endpoints]
+        lines += ["# HELP kraftd_request_duration_milliseconds Request latency; quantiles over the recent window",
+                  "# TYPE kraftd_request_duration_milliseconds summary"]
+        for name, endpoint in endpoints:
+            label = _label(name)
+            if endpoint.latency.total:
+                for quantile, value in zip(QUANTILES, endpoint.latency.quantiles()):
+                    lines.append(f'kraftd_request_duration_milliseconds{{endpoint="{label}",quantile="{quantile}"}} {value}')
+            lines.append(f'kraftd_request_duration_milliseconds_sum{{endpoint="{label}"}} {endpoint.lifetime_duration:.3f}')
+            lines.append(f'kraftd_request_duration_milliseconds_count{{endpoint="{label}"}} {endpoint.lifetime_count}')
+        lines += ["# HELP kraftd_pipeline_stage_duration_milliseconds Extraction pipeline stage and inference rule time",
+                  "# TYPE kraftd_pipeline_stage_duration_milliseconds summary"]
+        for name, stage in sorted(self._stages.items()):
+            label = _label(name)
+            for quantile, value in zip(QUANTILES, stage.latency.quantiles()):
+                lines.append(f'kraftd_pipeline_stage_duration_milliseconds{{stage="{label}",quantile="{quantile}"}} {value}')
+            lines.append(f'kraftd_pipeline_stage_duration_milliseconds_sum{{stage="{label}"}} {stage.total_ms:.3f}')
+            lines.append(f'kraftd_pipeline_stage_duration_milliseconds_count{{stage="{label}"}} {stage.count}')
+        lines += ["# HELP kraftd_extraction_bytes_scanned_estimate Average estimated text bytes scanned per pipeline stage (recent window)",
+                  "# TYPE kraftd_extraction_bytes_scanned_estimate gauge"]
+        extractions = self._by_type.get(MetricType.EXTRACTION.value, 0)
+        lines += [f'kraftd_extraction_bytes_scanned_estimate{{stage="{_label(stage)}"}} {total / extractions:.2f}'
+                  for stage, total in sorted(self._stage_bytes.items()) if extractions]
+        return "\n".join(lines) + "\n"
+
     def export_metrics(self, filepath: str):
         """Export metrics to JSON file."""
         try:
@@ -176,5 +397,44 @@ class MetricsCollector:
         except Exception as e:
             logger.error(f"Failed to export metrics: {str(e)}")
 
+def _label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording every HTTP request into metrics_collector.
+
+    Requests are labelled by route template (e.g. /api/v1/documents/{document_id})
+    so path parameters do not create one endpoint per document.
+    """
+
+    def __init__(self, app, collector: Optional[MetricsCollector] = None):
+        self.app = app
+        self.collector = collector
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            (self.collector or metrics_collector).record_request(
+                endpoint, status_code, (time.perf_counter() - start) * 1000
+            )
+
 # Global metrics instance
 metrics_collector = MetricsCollector()
@@ -4,10 +4,15 @@ Quota Management Middleware
 Handles user quota checking and enforcement for API operations.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import Depends, HTTPException, status
 from functools import lru_cache
+from typing import AsyncIterator
 import logging
 
+from models.errors import quota_exceeded_error
+from services.quota_service import get_quota_service
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,22 +36,27 @@ async def check_quota(
         tier: User tier (free, pro, enterprise)
     
     Returns:
-        True if user is within quota, raises HTTPException if not
+        True if user is within quota, False if the document quota is used up
         
     Raises:
-        HTTPException: 429 if quota exceeded
+        HTTPException: 500 if the quota could not be checked
     """
     try:
-        # For now, this is a placeholder that always allows
-        # In production, this would query Cosmos DB for usage stats
+        # Answered from the process-wide quota accounting: a cached quota
+        # document and this worker's lease, no Cosmos round trip per request
+        check = await get_quota_service().check_limits(user_email, "documents_uploaded")
         
-        limit = QUOTA_LIMITS.get(tier, QUOTA_LIMITS["free"])
+        if check["exceeded"]:
+            logger.info(f"Quota exceeded for {user_email} ({tier} tier): {check['usage']}/{check['limit']}")
+            return False
         
-        # Placeholder: always return True
-        # TODO: Implement actual quota tracking via Cosmos DB
         logger.debug(f"Quota check passed for {user_email} ({tier} tier)")
         return True
         
+    except RuntimeError as e:
+        # Cosmos DB not initialized (local development): do not block uploads
+        logger.warning(f"Quota check skipped for {user_email}: {e}")
+        return True
     except Exception as e:
         logger.error(f"Quota check failed for {user_email}: {e}")
         raise HTTPException(
@@ -68,3 +78,51 @@ async def check_quota_dependency(
             ...
     """
     return await check_quota(user_email, tier)
+
+
+@asynccontextmanager
+async def reserved_quota(
+    user_email: str,
+    field: str = "documents_uploaded",
+    amount: int = 1,
+    tier: str = "free",
+) -> AsyncIterator[None]:
+    """
+    Reserve quota for the work in the block (the usage is counted up front).
+    
+    The reservation is answered from the worker's quota lease, so requests
+    on different workers cannot together go over the limit; it is given
+    back if the block raises.
+    
+    Usage:
+        async with reserved_quota(user_email, "documents_uploaded"):
+            ...  # store the upload
+    
+    Raises:
+        HTTPException: 429 if the quota is used up, 500 if it could not be checked
+    """
+    quota_service = get_quota_service()
+    try:
+        reserved = await quota_service.reserve_usage(user_email, field, amount)
+        if not reserved:
+            check = await quota_service.check_limits(user_email, field)
+    except RuntimeError as e:
+        # Cosmos DB not initialized (local development): do not block uploads
+        logger.warning(f"Quota reservation skipped for {user_email}: {e}")
+        reserved = None
+    except Exception as e:
+        logger.error(f"Quota reservation failed for {user_email}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Quota check failed"
+        )
+    
+    if reserved is None:
+        yield
+        return
+    if not reserved:
+        logger.info(f"Quota exceeded for {user_email} ({tier} tier): {field} {check['usage']}/{check['limit']}")
+        raise quota_exceeded_error(check["limit"], check["usage"], "User quota exceeded")
+    
+    async with quota_service.release_on_failure(user_email, field, amount):
+        yield
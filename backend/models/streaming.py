@@ -81,6 +81,11 @@ class SubscriptionRequest(BaseModel):
         "MEDIUM",
         description="Sensitivity level: HIGH, MEDIUM, LOW"
     )
+    batch_window_ms: Optional[int] = Field(
+        None,
+        ge=0,
+        description="Deliver events in batch frames every this many ms (prices, trends, anomalies; 0: one frame per event)"
+    )
     
     class Config:
         schema_extra = {
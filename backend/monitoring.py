@@ -91,6 +91,36 @@ class MonitoringMetrics:
         except Exception as e:
             logging.warning(f"Failed to record auth metric: {e}")
     
+    def record_pipeline_stages(self, document_id: str, timer):
+        """Record an extraction's stage timings as spans, placed at the times the stages ran
+        
+        Args:
+            document_id: Document the pipeline processed
+            timer: document_processing.timing.StageTimer of the run
+        """
+        if not self.enabled or not timer.stages:
+            return
+        
+        try:
+            tracer = trace.get_tracer(__name__)
+            stages = timer.stages
+            parent = tracer.start_span("extraction_pipeline", start_time=stages[0].start_time_ns)
+            parent.set_attribute("document.id", document_id)
+            parent.set_attribute("pipeline.profiled", timer.profile)
+            parent_context = trace.set_span_in_context(parent)
+            for timing in stages:
+                span = tracer.start_span(f"pipeline.{timing.name}", context=parent_context,
+                                         start_time=timing.start_time_ns)
+                span.set_attribute("pipeline.stage", timing.name)
+                span.set_attribute("pipeline.bytes", timing.bytes)
+                span.set_attribute("pipeline.lines", timing.lines)
+                for rule, duration_ns in timing.rules_ns.items():
+                    span.set_attribute(f"pipeline.rule.{rule}_ms", duration_ns / 1e6)
+                span.end(end_time=timing.start_time_ns + timing.duration_ns)
+            parent.end(end_time=max(timing.start_time_ns + timing.duration_ns for timing in stages))
+        except Exception as e:
+            logging.warning(f"Failed to record pipeline spans: {e}")
+    
     def record_error(self, error_type: str, error_message: str, severity: EventSeverity):
         """Record error event"""
         if not self.enabled:
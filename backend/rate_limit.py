@@ -1,114 +1,368 @@
-"""Rate limiting middleware for Kraftd Docs Backend."""
-import time
+"""Rate limiting middleware for Kraftd Docs Backend.
+
+Limits are enforced with GCRA (generic cell rate algorithm), the
+continuous form of a token bucket: per client and limit the store keeps a
+single "theoretical arrival time" (TAT) float, so memory and work per
+request are constant however busy the client is. A limit of N requests per
+period allows bursts of up to N and refills one request every period / N
+seconds, which makes Remaining / Reset / Retry-After exact.
+
+Stores:
+- MemoryRateLimitStore: in-process (default); limits are per worker
+- SQLiteRateLimitStore: a shared SQLite file, so limits hold across the
+  uvicorn workers of one host without any extra service
+- RedisRateLimitStore: Redis (redis-py asyncio, optional), the same
+  algorithm in one Lua script; limits hold across hosts
+"""
 import logging
-from typing import Dict
-from datetime import datetime, timedelta
-from fastapi import Request, HTTPException
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
+from services.sqlite_store import SQLiteStore
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
-class RateLimitStore:
-    """Store for rate limit tracking."""
-    
-    def __init__(self):
-        """Initialize rate limit store."""
-        self.requests: Dict[str, list] = {}  # client_id -> [timestamp, timestamp, ...]
-        self.cleanup_interval = 60  # seconds
-        self.last_cleanup = time.time()
-    
-    def is_allowed(self, client_id: str, requests_per_minute: int, requests_per_hour: int) -> bool:
-        """Check if client is within rate limits."""
-        now = time.time()
-        
-        # Cleanup old entries periodically
-        if now - self.last_cleanup > self.cleanup_interval:
-            self._cleanup(now)
-        
-        # Initialize if needed
-        if client_id not in self.requests:
-            self.requests[client_id] = []
-        
-        # Remove old requests outside the hour window
-        one_hour_ago = now - 3600
-        self.requests[client_id] = [t for t in self.requests[client_id] if t > one_hour_ago]
-        
-        # Check per-hour limit
-        if len(self.requests[client_id]) >= requests_per_hour:
-            return False
-        
-        # Check per-minute limit
-        one_minute_ago = now - 60
-        recent_requests = [t for t in self.requests[client_id] if t > one_minute_ago]
-        if len(recent_requests) >= requests_per_minute:
-            return False
-        
-        # Add current request
-        self.requests[client_id].append(now)
-        return True
-    
-    def get_retry_after(self, client_id: str) -> int:
-        """Get seconds until client can make next request."""
-        if client_id not in self.requests or not self.requests[client_id]:
-            return 0
-        
-        now = time.time()
-        oldest_request = min(self.requests[client_id])
-        
-        # Next slot opens after 60 seconds from oldest recent request
-        retry_time = oldest_request + 60
-        retry_after = max(0, int(retry_time - now) + 1)
-        return retry_after
-    
-    def _cleanup(self, now: float):
-        """Remove old entries."""
-        one_hour_ago = now - 3600
-        for client_id in list(self.requests.keys()):
-            self.requests[client_id] = [t for t in self.requests[client_id] if t > one_hour_ago]
-            if not self.requests[client_id]:
-                del self.requests[client_id]
-        self.last_cleanup = now
+_EPSILON = 1e-9  # Float slack so e.g. 3596.4 / 3.6 counts as 999 requests
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """N requests per period (seconds); `name` is used in header names and store keys"""
+    name: str
+    limit: int
+    period: float
+    interval: float = field(init=False)  # Seconds for one request to refill
+
+    def __post_init__(self):
+        object.__setattr__(self, "interval", self.period / self.limit)
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of one request against every limit"""
+    allowed: bool
+    limits: Sequence[RateLimit]
+    tats: Sequence[float]  # Theoretical arrival time per limit after this request
+    now: float
+    retry_after: float = 0.0  # Seconds until a denied request would be allowed
+
+    @property
+    def remaining(self) -> List[int]:
+        """Requests still allowed right now, per limit"""
+        return [max(0, int((self.now + limit.period - tat) / limit.interval + _EPSILON))
+                for tat, limit in zip(self.tats, self.limits)]
+
+    @property
+    def reset_after(self) -> List[float]:
+        """Seconds until each limit is fully refilled"""
+        return [tat - self.now for tat in self.tats]
+
+    @property
+    def retry_after_seconds(self) -> int:
+        return max(1, math.ceil(self.retry_after - _EPSILON))
+
+    def headers(self) -> Dict[str, str]:
+        """X-RateLimit-* headers; the unsuffixed ones describe the most restrictive limit"""
+        remaining, reset_after = self.remaining, self.reset_after
+        headers = {}
+        for limit, left, reset in zip(self.limits, remaining, reset_after):
+            suffix = limit.name.capitalize()
+            headers[f"X-RateLimit-Limit-{suffix}"] = str(limit.limit)
+            headers[f"X-RateLimit-Remaining-{suffix}"] = str(left)
+            headers[f"X-RateLimit-Reset-{suffix}"] = str(math.ceil(reset - _EPSILON))
+        binding = min(range(len(self.limits)), key=lambda i: (remaining[i], -reset_after[i]))
+        headers["X-RateLimit-Limit"] = str(self.limits[binding].limit)
+        headers["X-RateLimit-Remaining"] = str(remaining[binding])
+        headers["X-RateLimit-Reset"] = str(math.ceil(reset_after[binding] - _EPSILON))
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after_seconds)
+        return headers
+
+
+def gcra(tats: Sequence[Optional[float]], limits: Sequence[RateLimit],
+         now: float) -> Tuple[RateLimitResult, Optional[List[float]]]:
+    """
+    Apply one request to every limit at once.
+
+    Args:
+        tats: Stored theoretical arrival time per limit (None if unknown)
+        limits: The limits, in the same order
+        now: Current time in seconds
+
+    Returns:
+        (result, new_tats); new_tats is None when the request is denied
+        (nothing is consumed, not even from limits that had room)
+    """
+    current = []
+    retry_after = 0.0
+    for tat, limit in zip(tats, limits):
+        if tat is None or tat < now:
+            tat = now
+        current.append(tat)
+        wait = tat + limit.interval - limit.period - now
+        if wait > _EPSILON and wait > retry_after:
+            retry_after = wait
+
+    new_tats = None
+    if not retry_after:
+        new_tats = current = [tat + limit.interval for tat, limit in zip(current, limits)]
+
+    return RateLimitResult(not retry_after, limits, current, now, retry_after), new_tats
+
+
+class RateLimitStore(ABC):
+    """Where the per-client GCRA state lives"""
+
+    @abstractmethod
+    async def hit(self, client_id: str, limits: Sequence[RateLimit]) -> RateLimitResult:
+        """Count one request from client_id against all limits"""
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    In-process store: one list of TATs per client in least-recently-used order.
+
+    Clients whose TATs have all passed are indistinguishable from new ones,
+    so they are dropped from the old end of the order as requests come in
+    (amortized O(1)); memory stays bounded by the clients active within
+    the longest period.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._tats: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def hit(self, client_id: str, limits: Sequence[RateLimit]) -> RateLimitResult:
+        return self.hit_now(client_id, limits, self.clock())
+
+    def hit_now(self, client_id: str, limits: Sequence[RateLimit], now: float) -> RateLimitResult:
+        """Synchronous hit at a given time"""
+        self._expire(now)
+        tats = self._tats.get(client_id)
+        result, new_tats = gcra(tats or [None] * len(limits), limits, now)
+        if new_tats is not None:
+            self._tats[client_id] = new_tats
+        if client_id in self._tats:
+            self._tats.move_to_end(client_id)
+        return result
+
+    def _expire(self, now: float, batch: int = 2) -> None:
+        # A couple of evictions per request keeps up with new clients without long pauses
+        for _ in range(batch):
+            if not self._tats:
+                return
+            client_id, tats = next(iter(self._tats.items()))
+            if max(tats) > now:
+                return
+            del self._tats[client_id]
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Store shared by every process on the host through a SQLite file (see SQLiteStore).
+
+    Each request is one IMMEDIATE transaction (read TATs, write the new
+    ones), so concurrent workers serialize on the file lock.
+    """
+
+    CLEANUP_EVERY = 1000  # Requests between deletions of expired rows
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._hits = 0
+        self._store = SQLiteStore(path, schema=[
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS rate_limits_tat ON rate_limits (tat)",
+        ])
+        self._db = self._store.db
+
+    async def hit(self, client_id: str, limits: Sequence[RateLimit]) -> RateLimitResult:
+        return await self._store.run(self._hit, client_id, limits, self.clock())
+
+    def hit_now(self, client_id: str, limits: Sequence[RateLimit], now: float) -> RateLimitResult:
+        """Synchronous hit at a given time"""
+        return self._store.transaction(self._hit, client_id, limits, now)
+
+    def _hit(self, client_id: str, limits: Sequence[RateLimit], now: float) -> RateLimitResult:
+        keys = [f"{client_id}:{limit.name}" for limit in limits]
+        rows = dict(self._db.execute(
+            f"SELECT key, tat FROM rate_limits WHERE key IN ({','.join('?' * len(keys))})", keys
+        ).fetchall())
+        result, new_tats = gcra([rows.get(key) for key in keys], limits, now)
+        if new_tats is not None:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)", zip(keys, new_tats)
+            )
+        self._hits += 1
+        if self._hits % self.CLEANUP_EVERY == 0:
+            self._db.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+        return result
+
+    async def close(self) -> None:
+        self._store.close()
+
+
+# KEYS: one per limit. ARGV: interval and period per limit (milliseconds).
+# Returns allowed, retry_ms, then tat - now per limit (ms, as strings to keep fractions).
+_GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local count = #KEYS
+local tats = {}
+local retry = 0
+for i = 1, count do
+    local interval, period = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    local tat = math.max(tonumber(redis.call('GET', KEYS[i]) or now), now)
+    tats[i] = tat
+    local allow_at = tat + interval - period
+    if allow_at > now then retry = math.max(retry, allow_at - now) end
+end
+local result = {retry == 0 and 1 or 0, tostring(retry)}
+for i = 1, count do
+    local tat = tats[i]
+    if retry == 0 then
+        tat = tat + tonumber(ARGV[2 * i - 1])
+        redis.call('SET', KEYS[i], tat, 'PX', math.max(1, math.ceil(tat - now)))
+    end
+    table.insert(result, tostring(tat - now))
+end
+return result
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """
+    Store shared through Redis (or a local redis-server / Azure Cache for Redis).
+
+    The whole check-and-update runs in one Lua script on Redis' clock, so
+    it is atomic across workers and hosts. Keys expire when their TAT passes.
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package not installed: pip install redis")
+        self.prefix = prefix
+        self._client = aioredis.from_url(url)
+        self._script = self._client.register_script(_GCRA_SCRIPT)
+
+    async def hit(self, client_id: str, limits: Sequence[RateLimit]) -> RateLimitResult:
+        keys = [f"{self.prefix}{client_id}:{limit.name}" for limit in limits]
+        args = []
+        for limit in limits:
+            args += [limit.interval * 1000, limit.period * 1000]
+        reply = await self._script(keys=keys, args=args)
+        # Times come back relative to Redis' clock: express them against now=0
+        return RateLimitResult(
+            allowed=bool(int(reply[0])),
+            limits=limits,
+            tats=[float(value) / 1000 for value in reply[2:]],
+            now=0.0,
+            retry_after=float(reply[1]) / 1000,
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_rate_limit_store(backend: str = "memory", redis_url: Optional[str] = None,
+                            sqlite_path: Optional[str] = None) -> RateLimitStore:
+    """
+    Build the configured store.
+
+    Args:
+        backend: 'memory', 'sqlite' or 'redis'
+        redis_url: Redis URL for the redis backend
+        sqlite_path: Database file for the sqlite backend
+    """
+    if backend == "redis":
+        return RedisRateLimitStore(redis_url or "redis://localhost:6379/0")
+    if backend == "sqlite":
+        return SQLiteRateLimitStore(sqlite_path or "/tmp/kraftd_rate_limits.db")
+    if backend != "memory":
+        logger.warning(f"Unknown rate limit backend '{backend}', using in-process store")
+    return MemoryRateLimitStore()
+
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """Rate limiting middleware."""
-    
-    def __init__(self, app, requests_per_minute: int = 60, requests_per_hour: int = 1000):
+
+    def __init__(self, app, requests_per_minute: int = 60, requests_per_hour: int = 1000,
+                 store: Optional[RateLimitStore] = None):
         """Initialize middleware."""
         super().__init__(app)
-        self.store = RateLimitStore()
+        self.store = store or MemoryRateLimitStore()
+        self.limits = (
+            RateLimit("minute", requests_per_minute, 60),
+            RateLimit("hour", requests_per_hour, 3600),
+        )
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
-        logger.info(f"Rate limiting enabled: {requests_per_minute} req/min, {requests_per_hour} req/hour")
-    
+        self._fallback: Optional[MemoryRateLimitStore] = None
+        logger.info(
+            f"Rate limiting enabled: {requests_per_minute} req/min, {requests_per_hour} req/hour "
+            f"({type(self.store).__name__})"
+        )
+
     async def dispatch(self, request: Request, call_next):
         """Process request with rate limiting."""
         # Skip rate limiting for health checks
         if request.url.path in ["/", "/health"]:
             return await call_next(request)
-        
+
         # Get client identifier (IP address)
         client_id = request.client.host if request.client else "unknown"
-        
+
         # Check rate limit
-        if not self.store.is_allowed(client_id, self.requests_per_minute, self.requests_per_hour):
-            retry_after = self.store.get_retry_after(client_id)
+        result = await self._hit(client_id)
+        if not result.allowed:
             logger.warning(f"Rate limit exceeded for client {client_id}")
-            
+
             return JSONResponse(
                 status_code=429,
                 content={
                     "detail": "Rate limit exceeded",
-                    "retry_after_seconds": retry_after
+                    "retry_after_seconds": result.retry_after_seconds
                 },
-                headers={"Retry-After": str(retry_after)}
+                headers=result.headers()
             )
-        
+
         # Process request
         response = await call_next(request)
-        
+
         # Add rate limit headers
-        response.headers["X-RateLimit-Limit-Minute"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Limit-Hour"] = str(self.requests_per_hour)
-        
+        response.headers.update(result.headers())
+
         return response
+
+    async def _hit(self, client_id: str) -> RateLimitResult:
+        """Check the shared store; if it is unreachable, keep limiting per worker"""
+        try:
+            return await self.store.hit(client_id, self.limits)
+        except Exception as e:
+            if self._fallback is None:
+                logger.error(f"Rate limit store unavailable, limiting per worker: {e}")
+                self._fallback = MemoryRateLimitStore()
+            return await self._fallback.hit(client_id, self.limits)
@@ -4,12 +4,16 @@ Repository modules for data access abstraction.
 Provides repository implementations for database operations using the repository pattern.
 """
 
-from repositories.base import BaseRepository
+from repositories.base import BaseRepository, BatchCreateError
 from repositories.user_repository import UserRepository
 from repositories.document_repository import DocumentRepository
+from repositories.bulk import BulkExecutor, BulkStats
 
 __all__ = [
     "BaseRepository",
+    "BatchCreateError",
     "UserRepository",
     "DocumentRepository",
+    "BulkExecutor",
+    "BulkStats",
 ]
@@ -3,22 +3,49 @@ Base Repository Class
 
 Abstract base class implementing common repository patterns for Cosmos DB.
 Provides CRUD operations, error handling, and retry logic.
+
+Containers are azure.cosmos.aio ContainerProxy objects (or the in-memory
+stand-in from services.cosmos_memory), so every operation is awaited and
+never blocks the event loop; query results are read page by page.
+
+Updates are partial: changed fields go out as patch operations in a single
+round trip instead of read + full replace, and updates that depend on the
+current item use ETag preconditions with retry on conflict.
 """
 
+import asyncio
 import logging
+import random
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Tuple
 from datetime import datetime
 
 try:
+    from azure.core import MatchConditions
     from azure.cosmos import exceptions
     COSMOS_AVAILABLE = True
 except ImportError:
     COSMOS_AVAILABLE = False
 
+from repositories.bulk import MAX_BATCH_OPERATIONS
+from services.cosmos_service import (
+    COSMOS_QUERY_PAGE_SIZE, COSMOS_PATCH_MAX_RETRIES, MAX_PATCH_OPERATIONS,
+    get_patch_stats, patch_container_item, query_page, set_operations
+)
+
 logger = logging.getLogger(__name__)
 
 
+class BatchCreateError(Exception):
+    """Some batches of a create_many were not created; the other batches were committed"""
+    
+    def __init__(self, created: List[Dict[str, Any]], failed: List[Dict[str, Any]], errors: List[Exception]):
+        self.created = created  # Items created (from the committed batches)
+        self.failed = failed  # Items of the batches that were rolled back
+        self.errors = errors  # One error per failed batch
+        super().__init__(f"{len(failed)} of {len(created) + len(failed)} items not created: {errors[0]}")
+
+
 class BaseRepository(ABC):
     """
     Abstract base class for Cosmos DB repositories.
@@ -68,7 +95,7 @@ class BaseRepository(ABC):
             if not container:
                 raise RuntimeError("Container not initialized")
             
-            result = container.create_item(body=item)
+            result = await container.create_item(body=item)
             logger.debug(f"Created item: {item['id']}")
             return result
             
@@ -79,6 +106,95 @@ class BaseRepository(ABC):
             logger.error(f"Error creating item: {e}")
             raise
     
+    async def create_many(self, items: List[Dict[str, Any]], partition_key: str) -> List[Dict[str, Any]]:
+        """
+        Create items of one partition in transactional batches.
+        
+        Each batch of up to MAX_BATCH_OPERATIONS items is a single round
+        trip and applies all or nothing. Batches are committed one after
+        another; a failed batch does not stop the later ones, and the error
+        names exactly the items that were not created.
+        
+        Args:
+            items: Item data (each must include 'id' field)
+            partition_key: Partition key value shared by every item
+            
+        Returns:
+            Created items, in order
+            
+        Raises:
+            ValueError: If an item ID is missing
+            BatchCreateError: If batches failed (e.g. an item already exists);
+                its `created` and `failed` items split the input
+        """
+        now = datetime.utcnow().isoformat() + "Z"
+        for item in items:
+            if "id" not in item:
+                raise ValueError("Item must include 'id' field")
+            item.setdefault("created_at", now)
+            item.setdefault("updated_at", now)
+        
+        container = await self.container
+        if not container:
+            raise RuntimeError("Container not initialized")
+        
+        batches = [items[start:start + MAX_BATCH_OPERATIONS] for start in range(0, len(items), MAX_BATCH_OPERATIONS)]
+        created: List[Dict[str, Any]] = []
+        failed: List[Dict[str, Any]] = []
+        errors: List[Exception] = []
+        for batch in batches:
+            try:
+                result = await container.execute_item_batch(
+                    batch_operations=[("create", (item,)) for item in batch], partition_key=partition_key
+                )
+            except (exceptions.CosmosBatchOperationError, exceptions.CosmosHttpResponseError) as e:
+                if isinstance(e, exceptions.CosmosBatchOperationError) and e.status_code == 409:
+                    logger.warning(f"Item {batch[e.error_index]['id']} already exists, batch of {len(batch)} rolled back")
+                else:
+                    logger.error(f"Error creating items in batch: {e}")
+                failed.extend(batch)
+                errors.append(e)
+                continue
+            created.extend(response["resourceBody"] for response in result)
+        
+        if failed:
+            raise BatchCreateError(created, failed, errors)
+        logger.debug(f"Created {len(items)} items in {len(batches)} batch(es)")
+        return created
+    
+    async def upsert(self, item: Dict[str, Any], partition_key: str) -> Dict[str, Any]:
+        """
+        Create item or replace it if an item with the same ID exists.
+        
+        Args:
+            item: Item data (must include 'id' field)
+            partition_key: Partition key value
+            
+        Returns:
+            Stored item with system fields
+            
+        Raises:
+            ValueError: If item ID is missing
+        """
+        if "id" not in item:
+            raise ValueError("Item must include 'id' field")
+        
+        item.setdefault("created_at", datetime.utcnow().isoformat() + "Z")
+        item["updated_at"] = datetime.utcnow().isoformat() + "Z"
+        
+        try:
+            container = await self.container
+            if not container:
+                raise RuntimeError("Container not initialized")
+            
+            result = await container.upsert_item(body=item)
+            logger.debug(f"Upserted item: {item['id']}")
+            return result
+            
+        except exceptions.CosmosHttpResponseError as e:
+            logger.error(f"Error upserting item: {e}")
+            raise
+    
     async def read(self, item_id: str, partition_key: str) -> Optional[Dict[str, Any]]:
         """
         Read single item by ID.
@@ -97,7 +213,7 @@ class BaseRepository(ABC):
             if not container:
                 raise RuntimeError("Container not initialized")
             
-            result = container.read_item(item=item_id, partition_key=partition_key)
+            result = await container.read_item(item=item_id, partition_key=partition_key)
             logger.debug(f"Read item: {item_id}")
             return result
             
@@ -108,26 +224,94 @@ class BaseRepository(ABC):
             logger.error(f"Error reading item: {e}")
             raise
     
-    async def read_by_query(self, query: str, parameters: Optional[List[Dict]] = None) -> List[Dict[str, Any]]:
+    async def read_by_query(self, query: str, parameters: Optional[List[Dict]] = None,
+                            partition_key: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Execute SQL query and return results.
         
         Args:
             query: SQL query string with parameter placeholders (@param)
             parameters: Query parameters (optional)
+            partition_key: Scope the query to one partition (optional)
             
         Returns:
             List of items matching query
         """
+        items = []
+        async for page in self.iter_query_pages(query, parameters, partition_key=partition_key):
+            items.extend(page)
+        logger.debug(f"Query returned {len(items)} items")
+        return items
+    
+    async def iter_query_pages(self, query: str, parameters: Optional[List[Dict]] = None,
+                               max_item_count: Optional[int] = None,
+                               partition_key: Optional[str] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Execute SQL query and yield results one page at a time.
+        
+        Each page is one round trip; the event loop is free between pages and
+        callers can stop early without fetching the rest.
+        
+        Args:
+            query: SQL query string with parameter placeholders (@param)
+            parameters: Query parameters (optional)
+            max_item_count: Items per page (default COSMOS_QUERY_PAGE_SIZE)
+            partition_key: Scope the query to one partition (optional)
+            
+        Yields:
+            Lists of items, one per result page
+        """
         try:
             container = await self.container
             if not container:
                 raise RuntimeError("Container not initialized")
             
-            params = parameters or []
-            items = list(container.query_items(query=query, parameters=params))
-            logger.debug(f"Query returned {len(items)} items")
-            return items
+            options = {"partition_key": partition_key} if partition_key is not None else {}
+            pages = container.query_items(
+                query=query,
+                parameters=parameters or None,
+                max_item_count=max_item_count or COSMOS_QUERY_PAGE_SIZE,
+                **options
+            ).by_page()
+            async for page in pages:
+                yield [item async for item in page]
+            
+        except exceptions.CosmosHttpResponseError as e:
+            logger.error(f"Query error: {e}")
+            raise
+    
+    async def query_page(self, query: str, parameters: Optional[List[Dict]] = None,
+                         max_item_count: Optional[int] = None, continuation_token: Optional[str] = None,
+                         partition_key: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Execute SQL query and return one page of results plus the token for the next.
+        
+        Args:
+            query: SQL query string with parameter placeholders (@param)
+            parameters: Query parameters (optional)
+            max_item_count: Items per page (default COSMOS_QUERY_PAGE_SIZE, at most COSMOS_MAX_PAGE_SIZE)
+            continuation_token: Token from the previous page (None for the first page)
+            partition_key: Scope the query to one partition (optional)
+            
+        Returns:
+            (items, continuation_token); the token is None after the last page
+            
+        Raises:
+            ValueError: If the continuation token is not valid for this query
+        """
+        try:
+            container = await self.container
+            if not container:
+                raise RuntimeError("Container not initialized")
+            
+            items, token = await query_page(
+                container, query, parameters,
+                max_item_count=max_item_count,
+                continuation_token=continuation_token,
+                partition_key=partition_key
+            )
+            logger.debug(f"Query page returned {len(items)} items (more: {token is not None})")
+            return items, token
             
         except exceptions.CosmosHttpResponseError as e:
             logger.error(f"Query error: {e}")
@@ -138,6 +322,10 @@ class BaseRepository(ABC):
         """
         Update existing item.
         
+        Changed fields are sent as patch operations in one round trip. Updates
+        touching more fields than one patch request allows fall back to
+        read-merge-replace guarded by the item's ETag.
+        
         Args:
             item_id: Item ID
             partition_key: Partition key value
@@ -149,29 +337,122 @@ class BaseRepository(ABC):
         Raises:
             ValueError: If item not found
         """
-        try:
-            # Read existing item
-            existing = await self.read(item_id, partition_key)
-            if not existing:
-                raise ValueError(f"Item {item_id} not found")
+        data = {**data, "updated_at": datetime.utcnow().isoformat() + "Z"}
+        if len(data) > MAX_PATCH_OPERATIONS:
+            return await self._replace_merged(item_id, partition_key, data)
+        return await self.patch(item_id, partition_key, set_operations(data))
+    
+    async def patch(self, item_id: str, partition_key: str, operations: List[Dict[str, Any]],
+                    etag: Optional[str] = None, filter_predicate: Optional[str] = None,
+                    read_avoided: bool = True) -> Dict[str, Any]:
+        """
+        Apply patch operations (add/set/replace/remove/incr) to an item.
+        
+        Args:
+            item_id: Item ID
+            partition_key: Partition key value
+            operations: Patch operations, see services.cosmos_service.patch_op()
+            etag: Only apply if the item still has this ETag
+            filter_predicate: Only apply if the item matches, e.g. "FROM c WHERE c.status = 'PENDING'"
+            read_avoided: False when the caller read the item first (for the savings stats)
             
-            # Merge updates
-            existing.update(data)
-            existing["updated_at"] = datetime.utcnow().isoformat() + "Z"
+        Returns:
+            Updated item
             
-            # Replace item
+        Raises:
+            ValueError: If item not found
+            CosmosAccessConditionFailedError: If the ETag or filter precondition failed
+        """
+        try:
             container = await self.container
             if not container:
                 raise RuntimeError("Container not initialized")
             
-            result = container.replace_item(item=item_id, body=existing)
-            logger.debug(f"Updated item: {item_id}")
+            result = await patch_container_item(
+                container, item_id, partition_key, operations,
+                etag=etag, filter_predicate=filter_predicate, read_avoided=read_avoided
+            )
+            logger.debug(f"Patched item: {item_id}")
             return result
             
+        except exceptions.CosmosResourceNotFoundError:
+            raise ValueError(f"Item {item_id} not found") from None
+        except exceptions.CosmosAccessConditionFailedError:
+            raise
         except exceptions.CosmosHttpResponseError as e:
-            logger.error(f"Error updating item: {e}")
+            logger.error(f"Error patching item: {e}")
             raise
     
+    async def update_optimistic(self, item_id: str, partition_key: str,
+                                build_operations: Callable[[Dict[str, Any]], Optional[List[Dict[str, Any]]]],
+                                max_retries: int = COSMOS_PATCH_MAX_RETRIES) -> Dict[str, Any]:
+        """
+        Read-decide-patch with optimistic concurrency.
+        
+        build_operations gets the current item and returns the patch
+        operations to apply (or None/[] to leave it unchanged). The patch only
+        applies if nobody changed the item in between; on a conflict the item
+        is re-read and build_operations runs again, up to max_retries times.
+        
+        Returns:
+            Updated (or unchanged) item
+            
+        Raises:
+            ValueError: If item not found
+            CosmosAccessConditionFailedError: If still conflicting after max_retries
+        """
+        for attempt in range(max_retries + 1):
+            current = await self.read(item_id, partition_key)
+            if current is None:
+                raise ValueError(f"Item {item_id} not found")
+            
+            operations = build_operations(current)
+            if not operations:
+                return current
+            
+            try:
+                return await self.patch(item_id, partition_key, operations,
+                                        etag=current.get("_etag"), read_avoided=False)
+            except exceptions.CosmosAccessConditionFailedError:
+                if attempt == max_retries:
+                    raise
+                get_patch_stats().count("precondition_retries")
+                logger.debug(f"ETag conflict on {item_id}, retrying ({attempt + 1}/{max_retries})")
+                await asyncio.sleep(_conflict_backoff(attempt))
+    
+    async def _replace_merged(self, item_id: str, partition_key: str, data: Dict[str, Any],
+                              max_retries: int = COSMOS_PATCH_MAX_RETRIES) -> Dict[str, Any]:
+        """Read, merge and replace an item, only if unchanged since the read (retried on conflict)"""
+        get_patch_stats().count("replace_fallbacks")
+        for attempt in range(max_retries + 1):
+            existing = await self.read(item_id, partition_key)
+            if not existing:
+                raise ValueError(f"Item {item_id} not found")
+            existing.update(data)
+            
+            try:
+                container = await self.container
+                if not container:
+                    raise RuntimeError("Container not initialized")
+                
+                result = await container.replace_item(
+                    item=item_id,
+                    body=existing,
+                    etag=existing.get("_etag"),
+                    match_condition=MatchConditions.IfNotModified
+                )
+                logger.debug(f"Updated item: {item_id}")
+                return result
+                
+            except exceptions.CosmosAccessConditionFailedError:
+                if attempt == max_retries:
+                    raise
+                get_patch_stats().count("precondition_retries")
+                await asyncio.sleep(_conflict_backoff(attempt))
+            except exceptions.CosmosHttpResponseError as e:
+                logger.error(f"Error updating item: {e}")
+                raise
+    
     async def delete(self, item_id: str, partition_key: str) -> bool:
         """
         Delete item by ID.
@@ -188,7 +469,7 @@ class BaseRepository(ABC):
             if not container:
                 raise RuntimeError("Container not initialized")
             
-            container.delete_item(item=item_id, partition_key=partition_key)
+            await container.delete_item(item=item_id, partition_key=partition_key)
             logger.debug(f"Deleted item: {item_id}")
             return True
             
@@ -216,3 +497,8 @@ class BaseRepository(ABC):
         except Exception as e:
             logger.error(f"Error checking item existence: {e}")
             raise
+
+
+def _conflict_backoff(attempt: int) -> float:
+    """Short jittered exponential backoff between ETag conflict retries"""
+    return random.uniform(0, 0.01 * (2 ** attempt))
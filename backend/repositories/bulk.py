@@ -0,0 +1,372 @@
+"""
+Bulk operations for archive, cleanup and migration jobs.
+
+BulkExecutor walks the items matching a query and applies one operation to
+each (patch, delete, replace, upsert), without a read + write round trip per
+item:
+- Only the fields the job needs are read (projection), a page at a time
+- Operations are grouped by partition key into transactional batches of up
+  to 100 operations, one round trip each
+- Batches run with bounded concurrency and at low priority, so a bulk job
+  does not take the RUs live traffic needs
+- Throttled (429) batches wait for the service's retry-after and retry
+- Progress is checkpointed after every page; a job that is interrupted
+  resumes from its last checkpoint instead of starting over. Job names
+  identify one run (e.g. "reset-monthly-usage:2026-03"), and a checkpoint
+  older than BULK_CHECKPOINT_TTL_HOURS is discarded rather than resumed
+
+Pages are read by key (ORDER BY c.id, "c.id > last id") rather than with
+continuation tokens, so a page stays correct when the job itself removes
+items from the result set (deletes, status changes) and a resumed run picks
+up exactly where the old one stopped.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from azure.cosmos import exceptions
+    COSMOS_AVAILABLE = True
+except ImportError:
+    COSMOS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+BULK_PAGE_SIZE = int(os.getenv("BULK_PAGE_SIZE", "500"))  # Items read per page
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))  # Batches in flight at once
+BULK_MAX_THROTTLE_RETRIES = int(os.getenv("BULK_MAX_THROTTLE_RETRIES", "10"))  # Retries of one throttled batch
+BULK_PRIORITY = os.getenv("BULK_PRIORITY", "Low")  # Priority-based execution ("Low", "High", "" to disable)
+BULK_CHECKPOINT_DIR = os.getenv("BULK_CHECKPOINT_DIR", os.path.join(tempfile.gettempdir(), "kraftd-bulk"))
+BULK_CHECKPOINT_TTL_HOURS = float(os.getenv("BULK_CHECKPOINT_TTL_HOURS", "24"))  # Older checkpoints start over
+
+# The service accepts at most this many operations in one transactional batch
+MAX_BATCH_OPERATIONS = 100
+
+# An operation for one item: ("patch", (item_id, patch_operations)), ("delete", (item_id,)), ...
+BulkOperation = Tuple[str, Tuple[Any, ...]]
+
+
+@dataclass
+class BulkStats:
+    """Progress and throttling counters of one bulk job"""
+    job: str
+    scanned: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    pages: int = 0
+    batches: int = 0
+    throttled: int = 0
+    throttle_wait_ms: float = 0.0
+    request_charge: float = 0.0
+    resumed: bool = False
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        stats["throttle_wait_ms"] = round(self.throttle_wait_ms, 1)
+        stats["request_charge"] = round(self.request_charge, 2)
+        stats["elapsed_seconds"] = round(self.elapsed_seconds, 3)
+        stats["items_per_second"] = round(self.succeeded / self.elapsed_seconds, 1) if self.elapsed_seconds else 0.0
+        return stats
+
+
+@dataclass
+class BulkCheckpoint:
+    """Where a job stopped: its parameters, the last id fully processed and the counters so far"""
+    job: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    started_at: float = 0.0  # Epoch seconds the run began
+    after_id: Optional[str] = None
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+class CheckpointStore:
+    """One JSON file per job under BULK_CHECKPOINT_DIR, written atomically"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or BULK_CHECKPOINT_DIR
+
+    def _path(self, job: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]", "_", job) + ".json")
+
+    def load(self, job: str) -> Optional[BulkCheckpoint]:
+        try:
+            with open(self._path(job), encoding="utf-8") as f:
+                return BulkCheckpoint(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint for {job}: {e}")
+            return None
+
+    def save(self, checkpoint: BulkCheckpoint) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(checkpoint.job)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(asdict(checkpoint), f)
+        os.replace(path + ".tmp", path)
+
+    def clear(self, job: str) -> None:
+        try:
+            os.remove(self._path(job))
+        except FileNotFoundError:
+            pass
+
+
+class BulkExecutor:
+    """
+    Apply one operation to every item matching a query, in partition-grouped batches.
+
+    Usage:
+        executor = BulkExecutor(container, "owner_email")
+        stats = await executor.run(
+            "archive-documents:user@example.com:90d",
+            where="c.owner_email = @email AND c.created_at < @cutoff",
+            params={"@email": email, "@cutoff": cutoff},
+            fields=["status"],
+            build_operation=lambda doc: ("patch", (doc["id"], ops)),
+        )
+
+    The container may be an azure.cosmos.aio ContainerProxy, the in-memory
+    stand-in, or a synchronous ContainerProxy (calls then run in a worker
+    thread).
+    """
+
+    def __init__(self, container: Any, partition_key_field: str,
+                 page_size: int = BULK_PAGE_SIZE, concurrency: int = BULK_CONCURRENCY,
+                 batch_size: int = MAX_BATCH_OPERATIONS, priority: Optional[str] = BULK_PRIORITY,
+                 max_throttle_retries: int = BULK_MAX_THROTTLE_RETRIES,
+                 checkpoints: Optional[CheckpointStore] = None,
+                 on_progress: Optional[Callable[[BulkStats], None]] = None):
+        """
+        Args:
+            container: Container to read and write
+            partition_key_field: Top-level field holding the partition key value
+            page_size: Items read per page (one checkpoint per page)
+            concurrency: Batches in flight at once
+            batch_size: Operations per transactional batch (at most 100)
+            priority: Request priority for batches ("Low" leaves RUs to live traffic)
+            max_throttle_retries: Retries of a throttled batch before its items count as failed
+            checkpoints: Checkpoint store (default: files under BULK_CHECKPOINT_DIR)
+            on_progress: Called with the running stats after every page
+        """
+        self.container = container
+        self.partition_key_field = partition_key_field
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        self.batch_size = min(max(1, batch_size), MAX_BATCH_OPERATIONS)
+        self.priority = priority or None
+        self.max_throttle_retries = max_throttle_retries
+        self.checkpoints = checkpoints or CheckpointStore()
+        self.on_progress = on_progress
+
+    async def run(self, job: str, where: str, build_operation: Callable[[Dict[str, Any]], Optional[BulkOperation]],
+                  params: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None) -> BulkStats:
+        """
+        Run (or resume) a bulk job.
+
+        Args:
+            job: Name of this run of the job, including whatever scopes it
+                (billing month, cutoff...); a checkpoint under this name is
+                resumed unless older than BULK_CHECKPOINT_TTL_HOURS
+            where: Query condition over alias c, e.g. "c.date < @cutoff"
+            build_operation: Operation for one projected item, or None to skip it
+            params: Query parameters by name. A resumed job reuses the
+                parameters it was started with (e.g. the same cutoff date).
+            fields: Fields build_operation needs besides id and the partition key
+
+        Returns:
+            Final stats (also kept for get_bulk_job_stats())
+        """
+        stats = BulkStats(job=job)
+        checkpoint = self.checkpoints.load(job)
+        if checkpoint and time.time() - checkpoint.started_at > BULK_CHECKPOINT_TTL_HOURS * 3600:
+            logger.warning(f"Discarding stale checkpoint of bulk job {job} (after id {checkpoint.after_id!r})")
+            self.checkpoints.clear(job)
+            checkpoint = None
+        if checkpoint:
+            stats = BulkStats(**{**checkpoint.stats, "job": job, "resumed": True})
+            params = checkpoint.params
+            logger.info(f"Resuming bulk job {job} after id {checkpoint.after_id!r}")
+        else:
+            checkpoint = BulkCheckpoint(job=job, params=dict(params or {}), started_at=time.time())
+            params = checkpoint.params
+
+        projection = ", ".join(f"c.{name}" for name in dict.fromkeys(["id", self.partition_key_field, *(fields or [])]))
+        query = f"SELECT TOP {self.page_size} {projection} FROM c WHERE ({where}) AND c.id > @bulk_after ORDER BY c.id"
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter() - stats.elapsed_seconds
+
+        while True:
+            parameters = [{"name": name, "value": value} for name, value in params.items()]
+            parameters.append({"name": "@bulk_after", "value": checkpoint.after_id or ""})
+            page = await self._query(query, parameters)
+            if not page:
+                break
+
+            stats.pages += 1
+            stats.scanned += len(page)
+            batches = self._group(page, build_operation, stats)
+            await asyncio.gather(*(self._execute(pk, batch, stats, semaphore) for pk, batch in batches))
+
+            checkpoint.after_id = page[-1]["id"]
+            stats.elapsed_seconds = time.perf_counter() - started
+            checkpoint.stats = asdict(stats)
+            self.checkpoints.save(checkpoint)
+            self._report(stats)
+            if len(page) < self.page_size:
+                break
+
+        stats.elapsed_seconds = time.perf_counter() - started
+        self.checkpoints.clear(job)
+        _record_job(stats)
+        logger.info(f"Bulk job {job} complete: {stats.to_dict()}")
+        return stats
+
+    def _group(self, page: List[Dict[str, Any]], build_operation: Callable, stats: BulkStats) -> List[Tuple[Any, List[BulkOperation]]]:
+        """Operations for a page, grouped by partition key and cut into batches"""
+        by_partition: Dict[Any, List[BulkOperation]] = defaultdict(list)
+        for item in page:
+            operation = build_operation(item)
+            if operation is None:
+                stats.skipped += 1
+                continue
+            by_partition[item.get(self.partition_key_field)].append(operation)
+        return [
+            (pk, operations[start:start + self.batch_size])
+            for pk, operations in by_partition.items()
+            for start in range(0, len(operations), self.batch_size)
+        ]
+
+    async def _execute(self, partition_key: Any, operations: List[BulkOperation],
+                       stats: BulkStats, semaphore: asyncio.Semaphore) -> None:
+        """Run one batch; throttling is retried, a failed batch falls back to its operations one by one"""
+        async with semaphore:
+            for attempt in range(self.max_throttle_retries + 1):
+                try:
+                    stats.batches += 1
+                    await self._batch(partition_key, operations, stats)
+                    stats.succeeded += len(operations)
+                    return
+                except exceptions.CosmosBatchOperationError as e:
+                    # One operation failed (e.g. the item is already gone) and rolled the batch back
+                    logger.debug(f"Batch for partition {partition_key!r} failed at operation {e.error_index}, retrying individually")
+                    break
+                except exceptions.CosmosHttpResponseError as e:
+                    if e.status_code != 429 or attempt == self.max_throttle_retries:
+                        logger.warning(f"Bulk batch for partition {partition_key!r} failed: {e}")
+                        stats.failed += len(operations)
+                        return
+                    await self._throttled(e, stats)
+
+            for operation in operations:
+                for attempt in range(self.max_throttle_retries + 1):
+                    try:
+                        await self._single(partition_key, operation, stats)
+                        stats.succeeded += 1
+                        break
+                    except exceptions.CosmosHttpResponseError as e:
+                        if e.status_code != 429 or attempt == self.max_throttle_retries:
+                            logger.warning(f"Bulk {operation[0]} of {operation[1][0]} failed: {e}")
+                            stats.failed += 1
+                            break
+                        await self._throttled(e, stats)
+
+    async def _throttled(self, error: Any, stats: BulkStats) -> None:
+        """Wait out a 429 for as long as the service asked"""
+        headers = getattr(error, "headers", None) or {}
+        try:
+            wait_ms = float(headers.get("x-ms-retry-after-ms", 100))
+        except (TypeError, ValueError):
+            wait_ms = 100.0
+        stats.throttled += 1
+        stats.throttle_wait_ms += wait_ms
+        await asyncio.sleep(wait_ms / 1000)
+
+    def _options(self) -> Dict[str, Any]:
+        return {"priority": self.priority} if self.priority else {}
+
+    async def _batch(self, partition_key: Any, operations: List[BulkOperation], stats: BulkStats) -> None:
+        await _call(self.container.execute_item_batch, batch_operations=list(operations),
+                    partition_key=partition_key, **self._options())
+        stats.request_charge += _request_charge(self.container)
+
+    async def _single(self, partition_key: Any, operation: BulkOperation, stats: BulkStats) -> None:
+        kind, args = operation
+        options = dict(self._options(), partition_key=partition_key)
+        if kind == "patch":
+            await _call(self.container.patch_item, item=args[0], patch_operations=args[1], **options)
+        elif kind == "delete":
+            try:
+                await _call(self.container.delete_item, item=args[0], **options)
+            except exceptions.CosmosResourceNotFoundError:
+                pass  # Already gone: the job's goal for this item is met
+        elif kind in ("create", "upsert"):
+            options.pop("partition_key")
+            await _call(getattr(self.container, f"{kind}_item"), body=args[0], **options)
+        elif kind == "replace":
+            options.pop("partition_key")
+            await _call(self.container.replace_item, item=args[0], body=args[1], **options)
+        else:
+            raise ValueError(f"Unsupported bulk operation: {kind}")
+        stats.request_charge += _request_charge(self.container)
+
+    async def _query(self, query: str, parameters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if inspect.iscoroutinefunction(self.container.read_item):
+            results = self.container.query_items(query=query, parameters=parameters, max_item_count=self.page_size)
+            return [item async for item in results]
+        results = self.container.query_items(query=query, parameters=parameters, max_item_count=self.page_size,
+                                             enable_cross_partition_query=True)
+        return await asyncio.to_thread(list, results)
+
+    def _report(self, stats: BulkStats) -> None:
+        logger.info(
+            f"Bulk job {stats.job}: {stats.scanned} scanned, {stats.succeeded} done, "
+            f"{stats.failed} failed, {stats.throttled} throttled"
+        )
+        _record_job(stats)
+        if self.on_progress:
+            self.on_progress(stats)
+
+
+async def _call(method: Callable, **kwargs) -> Any:
+    """Await an async container method; run a synchronous one in a worker thread"""
+    if inspect.iscoroutinefunction(method):
+        return await method(**kwargs)
+    return await asyncio.to_thread(method, **kwargs)
+
+
+def _request_charge(container: Any) -> float:
+    headers = getattr(getattr(container, "client_connection", None), "last_response_headers", None) or {}
+    try:
+        return float(headers.get("x-ms-request-charge", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# ===== Job stats (reported on /api/v1/metrics) =====
+
+_job_stats: Dict[str, Dict[str, Any]] = {}
+_job_stats_lock = threading.Lock()
+
+
+def _record_job(stats: BulkStats) -> None:
+    with _job_stats_lock:
+        _job_stats[stats.job] = stats.to_dict()
+
+
+def get_bulk_job_stats() -> Dict[str, Dict[str, Any]]:
+    """Latest progress of each bulk job run in this process"""
+    with _job_stats_lock:
+        return dict(_job_stats)
@@ -6,12 +6,13 @@ Handles all document-related database operations using repository pattern.
 
 import logging
 import os
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 from enum import Enum
 
 from repositories.base import BaseRepository
-from services.cosmos_service import get_cosmos_service
+from repositories.bulk import BulkExecutor
+from services.cosmos_service import get_cosmos_service, patch_op, select_fields
 
 logger = logging.getLogger(__name__)
 
@@ -103,6 +104,40 @@ class DocumentRepository(BaseRepository):
         logger.info(f"Creating document: {document_id} for user: {owner_email}")
         return await self.create(document_data, owner_email)
     
+    async def create_documents(self, owner_email: str,
+                               documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create several documents of one owner (e.g. a batch upload) in
+        transactional batches instead of one round trip per document.
+        
+        Args:
+            owner_email: Owner email (partition key)
+            documents: Fields per document, as for create_document
+                (document_id, filename, document_type, ...)
+            
+        Returns:
+            Created documents, in order
+            
+        Raises:
+            BatchCreateError: If batches failed, e.g. a document already exists
+                (the documents of the other batches are created)
+        """
+        now = datetime.utcnow().isoformat() + "Z"
+        items = []
+        for fields in documents:
+            fields = dict(fields)
+            items.append({
+                "id": fields.pop("document_id"),
+                "owner_email": owner_email,  # Partition key
+                "status": DocumentStatus.PENDING.value,
+                "created_at": now,
+                "updated_at": now,
+                **fields
+            })
+        
+        logger.info(f"Creating {len(items)} documents for user: {owner_email}")
+        return await self.create_many(items, owner_email)
+    
     async def get_document(self, document_id: str, owner_email: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve document by ID.
@@ -117,11 +152,37 @@ class DocumentRepository(BaseRepository):
         logger.debug(f"Getting document: {document_id}")
         return await self.read(document_id, owner_email)
     
+    async def list_documents(self, owner_email: str, status: Optional[str] = None,
+                             document_type: Optional[str] = None, fields: Optional[List[str]] = None,
+                             max_items: Optional[int] = None,
+                             continuation_token: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of a user's documents, newest first (partition query).
+        
+        Args:
+            owner_email: Owner email
+            status: Only documents with this status (optional)
+            document_type: Only documents of this type (optional)
+            fields: Fields to return besides id (default: whole documents)
+            max_items: Page size (default COSMOS_QUERY_PAGE_SIZE, at most COSMOS_MAX_PAGE_SIZE)
+            continuation_token: Token from the previous page
+            
+        Returns:
+            (documents, continuation_token); the token is None after the last page
+            
+        Raises:
+            ValueError: If a field name or the continuation token is invalid
+        """
+        query, parameters = self._documents_query(owner_email, status, document_type, fields)
+        logger.debug(f"Listing documents for user: {owner_email}")
+        return await self.query_page(query, parameters, max_items, continuation_token, partition_key=owner_email)
+    
     async def get_user_documents(self, owner_email: str) -> List[Dict[str, Any]]:
         """
         Get all documents for a specific user (partition query).
         
-        Efficient query within single partition.
+        Efficient query within single partition. List endpoints should page
+        through list_documents() instead.
         
         Args:
             owner_email: Owner email
@@ -129,17 +190,9 @@ class DocumentRepository(BaseRepository):
         Returns:
             List of user's documents
         """
-        query = """
-            SELECT * FROM documents 
-            WHERE owner_email = @email
-            ORDER BY created_at DESC
-        """
-        
         try:
             logger.debug(f"Getting documents for user: {owner_email}")
-            return await self.read_by_query(query, [
-                {"name": "@email", "value": owner_email}
-            ])
+            return await self.read_by_query(*self._documents_query(owner_email), partition_key=owner_email)
         except Exception as e:
             logger.error(f"Error getting user documents: {e}")
             return []
@@ -156,18 +209,9 @@ class DocumentRepository(BaseRepository):
         Returns:
             List of documents with specified status
         """
-        query = """
-            SELECT * FROM documents 
-            WHERE owner_email = @email AND status = @status
-            ORDER BY created_at DESC
-        """
-        
         try:
             logger.debug(f"Getting {status} documents for user: {owner_email}")
-            return await self.read_by_query(query, [
-                {"name": "@email", "value": owner_email},
-                {"name": "@status", "value": status}
-            ])
+            return await self.read_by_query(*self._documents_query(owner_email, status=status), partition_key=owner_email)
         except Exception as e:
             logger.error(f"Error getting documents by status: {e}")
             return []
@@ -184,22 +228,29 @@ class DocumentRepository(BaseRepository):
         Returns:
             List of documents of specified type
         """
-        query = """
-            SELECT * FROM documents 
-            WHERE owner_email = @email AND document_type = @type
-            ORDER BY created_at DESC
-        """
-        
         try:
             logger.debug(f"Getting {document_type} documents for user: {owner_email}")
-            return await self.read_by_query(query, [
-                {"name": "@email", "value": owner_email},
-                {"name": "@type", "value": document_type}
-            ])
+            return await self.read_by_query(
+                *self._documents_query(owner_email, document_type=document_type), partition_key=owner_email
+            )
         except Exception as e:
             logger.error(f"Error getting documents by type: {e}")
             return []
     
+    @staticmethod
+    def _documents_query(owner_email: str, status: Optional[str] = None, document_type: Optional[str] = None,
+                         fields: Optional[List[str]] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """Query for a user's documents, newest first, with optional filters and projection"""
+        query = f"SELECT {select_fields(fields)} FROM c WHERE c.owner_email = @email"
+        parameters = [{"name": "@email", "value": owner_email}]
+        if status:
+            query += " AND c.status = @status"
+            parameters.append({"name": "@status", "value": status})
+        if document_type:
+            query += " AND c.document_type = @type"
+            parameters.append({"name": "@type", "value": document_type})
+        return query + " ORDER BY c.created_at DESC", parameters
+    
     async def update_document_status(self, document_id: str, owner_email: str,
                                     status: str) -> Dict[str, Any]:
         """
@@ -293,6 +344,10 @@ class DocumentRepository(BaseRepository):
         """
         Archive documents older than specified days.
         
+        Runs as a bulk job: only ids are read, status changes go out as
+        patch operations in transactional batches, and an interrupted run
+        resumes where it stopped (see repositories.bulk).
+        
         Args:
             owner_email: Owner email
             days: Number of days to keep (older docs archived)
@@ -306,34 +361,25 @@ class DocumentRepository(BaseRepository):
             # Calculate cutoff date
             from datetime import timedelta
             cutoff_date = (datetime.utcnow() - timedelta(days=days)).isoformat() + "Z"
+            now = datetime.utcnow().isoformat() + "Z"
+            operations = [
+                patch_op("set", "/status", DocumentStatus.ARCHIVED.value),
+                patch_op("set", "/updated_at", now),
+            ]
             
-            # Find old documents
-            old_docs = await self.read_by_query(
-                """
-                SELECT * FROM documents 
-                WHERE owner_email = @email AND created_at < @cutoff
-                """,
-                [
-                    {"name": "@email", "value": owner_email},
-                    {"name": "@cutoff", "value": cutoff_date}
-                ]
-            )
+            container = await self.container
+            if not container:
+                raise RuntimeError("Container not initialized")
             
-            # Archive them
-            archived_count = 0
-            for doc in old_docs:
-                try:
-                    await self.update_document_status(
-                        doc["id"],
-                        owner_email,
-                        DocumentStatus.ARCHIVED.value
-                    )
-                    archived_count += 1
-                except Exception as e:
-                    logger.warning(f"Failed to archive document {doc['id']}: {e}")
+            stats = await BulkExecutor(container, "owner_email").run(
+                f"archive-documents:{owner_email}:{days}d",
+                where="c.owner_email = @email AND c.created_at < @cutoff AND c.status != @archived",
+                params={"@email": owner_email, "@cutoff": cutoff_date, "@archived": DocumentStatus.ARCHIVED.value},
+                build_operation=lambda doc: ("patch", (doc["id"], operations)),
+            )
             
-            logger.info(f"Archived {archived_count} documents")
-            return archived_count
+            logger.info(f"Archived {stats.succeeded} documents")
+            return stats.succeeded
             
         except Exception as e:
             logger.error(f"Error archiving old documents: {e}")
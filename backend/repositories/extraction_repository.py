@@ -12,7 +12,7 @@ Enables per-document isolation with rich data structure:
 
 import logging
 import os
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
 from repositories.base import BaseRepository
@@ -213,15 +213,41 @@ class ExtractionRepository(BaseRepository):
             List of ExtractionRecords for the user
         """
         try:
-            query = f"SELECT * FROM c WHERE c.owner_email = @owner ORDER BY c.created_at DESC OFFSET 0 LIMIT {limit}"
+            query = f"SELECT TOP {int(limit)} * FROM c WHERE c.owner_email = @owner ORDER BY c.created_at DESC"
             params = [{"name": "@owner", "value": owner_email}]
             
-            items = await self.read_by_query(query, params)
+            items = await self.read_by_query(query, params, partition_key=owner_email)
             return [ExtractionRecord(**item) for item in items]
         except Exception as e:
             logger.error(f"Error querying extractions for user: {e}")
             return []
     
+    async def list_extractions_for_user(
+        self,
+        owner_email: str,
+        max_items: Optional[int] = None,
+        continuation_token: Optional[str] = None
+    ) -> Tuple[List[ExtractionRecord], Optional[str]]:
+        """
+        Get one page of a user's extractions, newest first.
+        
+        Args:
+            owner_email: Owner email (partition key)
+            max_items: Page size (default COSMOS_QUERY_PAGE_SIZE, at most COSMOS_MAX_PAGE_SIZE)
+            continuation_token: Token from the previous page
+        
+        Returns:
+            (records, continuation_token); the token is None after the last page
+        
+        Raises:
+            ValueError: If the continuation token is invalid
+        """
+        query = "SELECT * FROM c WHERE c.owner_email = @owner ORDER BY c.created_at DESC"
+        params = [{"name": "@owner", "value": owner_email}]
+        
+        items, token = await self.query_page(query, params, max_items, continuation_token, partition_key=owner_email)
+        return [ExtractionRecord(**item) for item in items], token
+    
     async def update_extraction(
         self,
         document_id: str,
@@ -245,7 +271,7 @@ class ExtractionRepository(BaseRepository):
             item_id = f"{document_id}:{source}"
             updates["updated_at"] = datetime.utcnow().isoformat() + "Z"
             
-            item = await self.update(item_id, updates, owner_email)
+            item = await self.update(item_id, owner_email, updates)
             if item:
                 return ExtractionRecord(**item)
             return None
@@ -363,3 +389,59 @@ class ExtractionRepository(BaseRepository):
         except Exception as e:
             logger.error(f"Error deleting extractions for document: {e}")
             return False
+    
+    async def get_cached_result(self, owner_email: str, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a content-addressed extraction cache entry.
+        
+        Args:
+            owner_email: Owner of the cached result (partition key)
+            cache_key: Owner, file hash and pipeline version
+        
+        Returns:
+            Cache entry (with "payload" and "expires_at") or None
+        """
+        try:
+            return await self.read(f"cache:{cache_key}", owner_email)
+        except Exception as e:
+            logger.error(f"Error reading extraction cache entry: {e}")
+            return None
+    
+    async def store_cached_result(
+        self,
+        owner_email: str,
+        cache_key: str,
+        payload: Dict[str, Any],
+        expires_at: float,
+        ttl_seconds: int
+    ) -> bool:
+        """
+        Store a content-addressed extraction cache entry in its owner's partition.
+        
+        The Cosmos "ttl" field lets the container expire the entry on its own
+        (when TTL is enabled on the container); expires_at is checked on read.
+        
+        Args:
+            owner_email: Owner of the result (partition key)
+            cache_key: Owner, file hash and pipeline version
+            payload: Serialized pipeline result and tables
+            expires_at: Unix timestamp after which the entry is stale
+            ttl_seconds: Cosmos item TTL
+        
+        Returns:
+            True if stored, False otherwise
+        """
+        try:
+            await self.upsert({
+                "id": f"cache:{cache_key}",
+                "owner_email": owner_email,
+                "type": "extraction_cache",
+                "cache_key": cache_key,
+                "payload": payload,
+                "expires_at": expires_at,
+                "ttl": ttl_seconds
+            }, owner_email)
+            return True
+        except Exception as e:
+            logger.error(f"Error storing extraction cache entry: {e}")
+            return False
@@ -7,7 +7,7 @@ Task 8 Integration: Audit logging for all admin operations (Role changes, Status
 """
 
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException, Depends, status, Request
@@ -531,27 +531,33 @@ async def get_role_permissions(
 @router.get("/logs/authorization")
 async def get_authorization_logs(
     limit: int = 100,
+    event_type: Optional[AuditEventType] = None,
+    continuation_token: Optional[str] = None,
     current_user: Tuple[str, UserRole] = Depends(require_admin),
     request: Request = None
 ):
     """
     Get authorization decision logs (ADMIN only)
     
-    Shows recent authorization decisions for audit purposes.
+    Shows recent authorization decisions for audit purposes, newest first,
+    one page per request: pass the continuation_token of a response to get
+    the next page (null on the last page).
     
     Task 8 Integration: Logs access to authorization logs (audit log access tracking)
 
     Args:
-        limit: Maximum number of logs to return
+        limit: Maximum number of logs to return per page
+        event_type: Only events of this type
+        continuation_token: Cursor from the previous page
     """
     admin_email, admin_role = current_user
     
     logger.info(f"Admin {admin_email} requesting authorization logs (limit: {limit})")
+    tenant_id = TenantService.get_current_tenant() or "default"
     
     # Log authorization logs access for audit trail (HIGH severity - sensitive logs)
     try:
         client_ip = request.client.host if request and request.client else None
-        tenant_id = TenantService.get_current_tenant() or "default"
         
         await AuditService.log_access(
             user_email=admin_email,
@@ -569,11 +575,22 @@ async def get_authorization_logs(
     except Exception as audit_error:
         logger.error(f"Error logging authorization logs access audit event: {audit_error}")
     
-    # This would query the authorization log in production
+    try:
+        events, token = await AuditService.get_events_page(
+            tenant_id,
+            event_type=event_type,
+            max_items=limit,
+            continuation_token=continuation_token
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
     return {
         "message": "Authorization logs",
         "limit": limit,
-        "logs": []  # Would be populated from log storage
+        "logs": [event.to_dict() for event in events],
+        "count": len(events),
+        "continuation_token": token
     }
 
 
@@ -130,48 +130,39 @@ async def create_conversion(
         
         logger.info(f"Creating conversion for user: {user_email}")
         
-        # 2. Check quota via QuotaService
+        # 2. Reserve a conversion from the quota (creates the quota on first use)
         quota_service = get_quota_service()
         try:
-            # Initialize or retrieve existing quota
-            await quota_service.get_or_create_quota(user_email)
-            
-            # Check if user has exceeded conversions limit
-            limit_check = await quota_service.check_limits(user_email, "conversions_used")
-            if limit_check["exceeded"]:
+            if not await quota_service.reserve_usage(user_email, "conversions_created"):
+                limit_check = await quota_service.check_limits(user_email, "conversions_created")
                 logger.warning(f"Conversion quota exceeded for user {user_email}")
                 raise quota_exceeded_error(
                     limit=limit_check["limit"],
                     usage=limit_check["usage"],
                     message="User has reached their conversion quota"
                 )
+        except KraftdHTTPException:
+            raise
         except Exception as e:
             logger.error(f"Quota check failed for {user_email}: {e}", exc_info=True)
             raise internal_server_error("Quota check failed")
         
-        user = await auth_service.get_user_by_email(user_email)
-        if not user:
-            raise not_found_error("user", user_email)
-        
-        # 3. Create conversion
-        conversion_id = str(uuid.uuid4())
-        conversion = await conversions_service.create_conversion(
-            conversion_id=conversion_id,
-            user_email=user_email,
-            user_id=user.get('user_id')
-        )
-        
-        # 4. Increment conversion usage
-        try:
-            await quota_service.increment_usage(user_email, "conversions_used")
-            logger.debug(f"Incremented conversions_used for {user_email}")
-        except Exception as e:
-            logger.error(f"Failed to increment usage for {user_email}: {e}", exc_info=True)
-            # Log but don't fail - conversion was created successfully
+        # 3. Create conversion (the reservation is given back if this fails)
+        async with quota_service.release_on_failure(user_email, "conversions_created"):
+            user = await auth_service.get_user_by_email(user_email)
+            if not user:
+                raise not_found_error("user", user_email)
+            
+            conversion_id = str(uuid.uuid4())
+            conversion = await conversions_service.create_conversion(
+                conversion_id=conversion_id,
+                user_email=user_email,
+                user_id=user.get('user_id')
+            )
         
         logger.info(f"Conversion created: {conversion_id} for user: {user_email}")
         
-        # 5. Return response
+        # 4. Return response
         return ConversionResponse(
             conversion_id=conversion['conversion_id'],
             user_id=conversion['user_id'],
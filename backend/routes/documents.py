@@ -3,19 +3,22 @@ Documents API Routes
 
 Implements the Documents endpoints defined in /docs/api-spec.md:
 - POST /api/v1/documents/upload — Upload a document file
+- GET /api/v1/documents — List the user's documents (cursor-paged)
 - GET /api/v1/documents/:document_id — Get document metadata
 - GET /api/v1/documents/:conversion_id/status — Get document processing status
 """
 
-from fastapi import APIRouter, Header, UploadFile, File, Form, Request, HTTPException
+from fastapi import APIRouter, Header, UploadFile, File, Form, Request, HTTPException, Query
 from typing import Optional
 import uuid
 import logging
 
+from repositories.document_repository import DocumentRepository
+from services.cosmos_service import COSMOS_MAX_PAGE_SIZE
 from services.documents_service import DocumentsService
 from services.auth_service import AuthService
 from models.document import DocumentResponse, DocumentMetadataResponse
-from middleware.quota import check_quota
+from middleware.quota import reserved_quota
 
 # Import standardized error handling
 from models.errors import (
@@ -95,9 +98,10 @@ async def upload_document(
     1. Authenticate user via JWT
     2. Validate conversion_id ownership (user owns the conversion)
     3. Validate file (size, type)
-    4. Upload to Azure Blob Storage
-    5. Create metadata record in Cosmos DB Documents table
-    6. Return document metadata
+    4. Reserve a document from the user's quota (documents_uploaded)
+    5. Upload to Azure Blob Storage
+    6. Create metadata record in Cosmos DB Documents table
+    7. Return document metadata
     
     Request:
         - file: Binary file upload (PDF, DOCX, Excel, Image)
@@ -128,17 +132,7 @@ async def upload_document(
         user_email = get_current_user_email(authorization)
         logger.info(f"Document upload initiated by {user_email} for conversion {conversion_id}")
         
-        # Step 2: Check quota
-        quota_ok = await check_quota(user_email, tier="free")
-        if not quota_ok:
-            logger.warning(f"Quota exceeded for {user_email}")
-            raise quota_exceeded_error(
-                limit=0,  # Will be updated when quota service provides details
-                usage=0,
-                message="User quota exceeded"
-            )
-        
-        # Step 3: Validate conversion ownership
+        # Step 2: Validate conversion ownership
         conversion_owner = documents_service.verify_conversion_ownership(
             conversion_id=conversion_id,
             user_email=user_email
@@ -147,7 +141,7 @@ async def upload_document(
             logger.warning(f"User {user_email} attempted to upload to conversion {conversion_id} they don't own")
             raise KraftdHTTPException(ErrorCode.INSUFFICIENT_PERMISSIONS, "User does not own this conversion")
         
-        # Step 4: Validate file
+        # Step 3: Validate file
         if file.size and file.size > 100 * 1024 * 1024:  # 100MB limit
             logger.warning(f"File too large: {file.size} bytes for {user_email}")
             raise validation_error("File size exceeds 100MB limit")
@@ -167,12 +161,14 @@ async def upload_document(
             logger.warning(f"Unsupported file type: {file.content_type} for {user_email}")
             raise validation_error(f"Unsupported file type: {file.content_type}")
         
-        # Step 5: Upload to Blob Storage and create metadata
-        document_response = await documents_service.upload_document(
-            file=file,
-            conversion_id=conversion_id,
-            user_email=user_email
-        )
+        # Step 4: Reserve a document from the quota (429 when used up), then
+        # upload to Blob Storage and create metadata (given back if that fails)
+        async with reserved_quota(user_email, "documents_uploaded", tier="free"):
+            document_response = await documents_service.upload_document(
+                file=file,
+                conversion_id=conversion_id,
+                user_email=user_email
+            )
         
         logger.info(f"Document {document_response.document_id} uploaded successfully by {user_email}")
         return document_response
@@ -184,6 +180,65 @@ async def upload_document(
         raise internal_server_error("Document upload failed")
 
 
+# ===== GET /api/v1/documents =====
+
+@router.get(
+    "",
+    status_code=200,
+    summary="List documents",
+    description="Lists the current user's documents, newest first, one page per request"
+)
+async def list_documents(
+    request: Request,
+    authorization: str = Header(None),
+    status: Optional[str] = Query(None, description="Only documents with this status"),
+    document_type: Optional[str] = Query(None, description="Only documents of this type"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
+    page_size: int = Query(50, ge=1, le=COSMOS_MAX_PAGE_SIZE, description="Maximum documents per page"),
+    continuation_token: Optional[str] = Query(None, description="Cursor from the previous page"),
+):
+    """
+    List documents a page at a time.
+    
+    Pass the continuation_token of a response to get the next page; it is
+    null on the last page. A page may hold fewer than page_size documents
+    even when more follow.
+    
+    Response:
+        - documents: Documents on this page (only the requested fields, if any)
+        - count: Number of documents on this page
+        - continuation_token: Cursor for the next page, or null
+        
+    Raises:
+        400: Invalid field name or continuation token
+        401: Invalid or missing token
+        500: Database error
+    """
+    try:
+        user_email = get_current_user_email(authorization)
+        field_list = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+        
+        documents, token = await DocumentRepository().list_documents(
+            user_email,
+            status=status,
+            document_type=document_type,
+            fields=field_list,
+            max_items=page_size,
+            continuation_token=continuation_token
+        )
+        
+        logger.info(f"Listed {len(documents)} documents for {user_email}")
+        return {"documents": documents, "count": len(documents), "continuation_token": token}
+        
+    except ValueError as e:
+        raise validation_error(str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Document list error: {e}")
+        raise internal_server_error("Failed to list documents")
+
+
 # ===== GET /api/v1/documents/:document_id =====
 
 @router.get(
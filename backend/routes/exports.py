@@ -163,12 +163,11 @@ async def generate_output(
         except exceptions.CosmosResourceNotFoundError:
             raise not_found_error("conversion", request.conversion_id)
         
-        # Check quota before generating output
+        # Reserve an export before generating output
         quota_service = get_quota_service()
         try:
-            await quota_service.get_or_create_quota(user_email)
-            limit_check = await quota_service.check_limits(user_email, "exports_used")
-            if limit_check["exceeded"]:
+            if not await quota_service.reserve_usage(user_email, "exports_generated"):
+                limit_check = await quota_service.check_limits(user_email, "exports_generated")
                 logger.warning(f"Output generation quota exceeded for user {user_email}")
                 raise quota_exceeded_error(limit_check.get("limit", 0), limit_check.get("usage", 0), "Output generation quota exceeded")
         except HTTPException:
@@ -177,49 +176,42 @@ async def generate_output(
             logger.error(f"Quota check failed for {user_email}: {e}", exc_info=True)
             raise internal_server_error("Quota check failed")
         
-        # Store output in Cosmos DB
-        output_service = get_output_service()
-        try:
-            output_item = await output_service.create_output(
-                conversion_id=request.conversion_id,
-                user_email=user_email,
-                output_data=request.output_data,
-                format=request.format,
-                metadata={
-                    "source": "conversion",
-                    "document_id": request.document_id,
-                    "format": request.format
-                }
-            )
+        # Store output in Cosmos DB (the reserved export is given back if this fails)
+        async with quota_service.release_on_failure(user_email, "exports_generated"):
+            output_service = get_output_service()
+            try:
+                output_item = await output_service.create_output(
+                    conversion_id=request.conversion_id,
+                    user_email=user_email,
+                    output_data=request.output_data,
+                    format=request.format,
+                    metadata={
+                        "source": "conversion",
+                        "document_id": request.document_id,
+                        "format": request.format
+                    }
+                )
+                
+                logger.info(f"Output generated for conversion {request.conversion_id}, document {request.document_id}, format {request.format}")
+                
+                return OutputResponse(
+                    success=True,
+                    output_id=output_item.get("id"),
+                    conversion_id=request.conversion_id,
+                    document_id=request.document_id,
+                    format=request.format,
+                    created_at=output_item.get("created_at", datetime.utcnow().isoformat() + "Z"),
+                    message="Output created successfully"
+                )
             
-            logger.info(f"Output generated for conversion {request.conversion_id}, document {request.document_id}, format {request.format}")
+            except exceptions.CosmosResourceExistsError:
+                logger.warning(f"Output already exists for document {request.document_id}")
+                raise validation_error("Output already exists for this document")
             
-            # Increment exports usage
-            try:
-                await quota_service.increment_usage(user_email, "exports_used")
-                logger.debug(f"Incremented exports_used for {user_email}")
-            except Exception as e:
-                logger.error(f"Failed to increment usage for {user_email}: {e}", exc_info=True)
-                # Log but don't fail - output was created successfully
+            except ValueError as e:
+                logger.error(f"Invalid output data: {e}")
+                raise validation_error(f"Invalid output data: {str(e)}")
             
-            return OutputResponse(
-                success=True,
-                output_id=output_item.get("id"),
-                conversion_id=request.conversion_id,
-                document_id=request.document_id,
-                format=request.format,
-                created_at=output_item.get("created_at", datetime.utcnow().isoformat() + "Z"),
-                message="Output created successfully"
-            )
-        
-        except exceptions.CosmosResourceExistsError:
-            logger.warning(f"Output already exists for document {request.document_id}")
-            raise validation_error("Output already exists for this document")
-        
-        except ValueError as e:
-            logger.error(f"Invalid output data: {e}")
-            raise validation_error(f"Invalid output data: {str(e)}")
-        
     except HTTPException:
         raise
     except Exception as e:
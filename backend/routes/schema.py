@@ -142,12 +142,11 @@ async def generate_schema(
         except exceptions.CosmosResourceNotFoundError:
             raise not_found_error("conversion", conversion_id)
         
-        # Check quota before generating schema
+        # Reserve an API call before generating schema
         quota_service = get_quota_service()
         try:
-            await quota_service.get_or_create_quota(user_email)
-            limit_check = await quota_service.check_limits(user_email, "api_calls_used")
-            if limit_check["exceeded"]:
+            if not await quota_service.reserve_usage(user_email, "daily_api_calls"):
+                limit_check = await quota_service.check_limits(user_email, "daily_api_calls")
                 logger.warning(f"Schema generation quota exceeded for user {user_email}")
                 raise quota_exceeded_error(limit_check["limit"], limit_check["usage"], "Schema generation quota exceeded")
         except HTTPException:
@@ -195,60 +194,53 @@ async def generate_schema(
             }
         }
         
-        # Create schema via service
-        try:
-            schema_result = await schema_service.create_schema(
-                conversion_id=conversion_id,
-                user_email=user_email,
-                schema_json=schema_data,
-                document_id=document_id,
-                document_type="QUOTATION"
-            )
-            
-            # Convert Cosmos DB response to SchemaDefinition
-            schema_def = SchemaDefinition(
-                schema_id=schema_result.get("schema_id", schema_result.get("id")),
-                document_id=document_id,
-                document_type=schema_result.get("document_type", "QUOTATION"),
-                fields=[
-                    SchemaField(
-                        name=f["name"],
-                        type=f["type"],
-                        description=f.get("description", ""),
-                        confidence=f.get("confidence", 0.0),
-                        examples=f.get("examples", [])
-                    )
-                    for f in schema_result.get("fields", [])
-                ],
-                version=schema_result.get("version", 1),
-                status=schema_result.get("status", "draft"),
-                created_at=schema_result.get("created_at", datetime.utcnow().isoformat() + "Z"),
-                updated_at=schema_result.get("updated_at", datetime.utcnow().isoformat() + "Z")
-            )
+        # Create schema via service (the reserved API call is given back if this fails)
+        async with quota_service.release_on_failure(user_email, "daily_api_calls"):
+            try:
+                schema_result = await schema_service.create_schema(
+                    conversion_id=conversion_id,
+                    user_email=user_email,
+                    schema_json=schema_data,
+                    document_id=document_id,
+                    document_type="QUOTATION"
+                )
+                
+                # Convert Cosmos DB response to SchemaDefinition
+                schema_def = SchemaDefinition(
+                    schema_id=schema_result.get("schema_id", schema_result.get("id")),
+                    document_id=document_id,
+                    document_type=schema_result.get("document_type", "QUOTATION"),
+                    fields=[
+                        SchemaField(
+                            name=f["name"],
+                            type=f["type"],
+                            description=f.get("description", ""),
+                            confidence=f.get("confidence", 0.0),
+                            examples=f.get("examples", [])
+                        )
+                        for f in schema_result.get("fields", [])
+                    ],
+                    version=schema_result.get("version", 1),
+                    status=schema_result.get("status", "draft"),
+                    created_at=schema_result.get("created_at", datetime.utcnow().isoformat() + "Z"),
+                    updated_at=schema_result.get("updated_at", datetime.utcnow().isoformat() + "Z")
+                )
+                
+                logger.info(f"Schema generated for document {document_id} in conversion {conversion_id}: {len(schema_def.fields)} fields")
+                
+                return SchemaResponse(
+                    success=True,
+                    schema_def=schema_def
+                )
             
-            logger.info(f"Schema generated for document {document_id} in conversion {conversion_id}: {len(schema_def.fields)} fields")
+            except exceptions.CosmosResourceExistsError:
+                logger.warning(f"Schema already exists for document {document_id}")
+                raise validation_error("Schema already exists for this document")
             
-            # Increment API usage
-            try:
-                await quota_service.increment_usage(user_email, "api_calls_used")
-                logger.debug(f"Incremented api_calls_used for {user_email}")
-            except Exception as e:
-                logger.error(f"Failed to increment usage for {user_email}: {e}", exc_info=True)
-                # Log but don't fail - schema was created successfully
+            except ValueError as e:
+                logger.error(f"Invalid schema data: {e}")
+                raise validation_error(f"Invalid schema data: {str(e)}")
             
-            return SchemaResponse(
-                success=True,
-                schema_def=schema_def
-            )
-        
-        except exceptions.CosmosResourceExistsError:
-            logger.warning(f"Schema already exists for document {document_id}")
-            raise validation_error("Schema already exists for this document")
-        
-        except ValueError as e:
-            logger.error(f"Invalid schema data: {e}")
-            raise validation_error(f"Invalid schema data: {str(e)}")
-        
     except HTTPException:
         raise
     except Exception as e:
@@ -573,12 +565,10 @@ async def generate_summary(
                 detail=f"Conversion not found: {request.conversion_id}"
             )
         
-        # Check quota before generating summary
+        # Reserve an API call before generating summary
         quota_service = get_quota_service()
         try:
-            await quota_service.get_or_create_quota(user_email)
-            limit_check = await quota_service.check_limits(user_email, "api_calls_used")
-            if limit_check["exceeded"]:
+            if not await quota_service.reserve_usage(user_email, "daily_api_calls"):
                 logger.warning(f"Summary generation quota exceeded for user {user_email}")
                 raise HTTPException(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -596,68 +586,61 @@ async def generate_summary(
         # Generate summary (placeholder - would call Azure OpenAI in production)
         summary_text = "This is a quotation for website redesign services from Tech Solutions Inc to Acme Corp. The quote includes 180 hours of development work (frontend and backend) totaling USD 29,000 with a 5% VAT. The quote is valid until February 20, 2026, with payment terms of Net 30."
         
-        # Store summary in Cosmos DB
-        summary_service = get_summary_service()
-        try:
-            summary_item = await summary_service.create_summary(
-                conversion_id=request.conversion_id,
-                user_email=user_email,
-                summary_text=summary_text,
-                metadata={
-                    "source": "ai",
-                    "document_id": request.document_id,
-                    "summary_length": request.summary_length,
-                    "focus_areas": request.focus_areas or []
-                }
-            )
-            
-            logger.info(f"Summary generated and stored for document {request.document_id} in conversion {request.conversion_id}")
-            
-            # Increment API usage
+        # Store summary in Cosmos DB (the reserved API call is given back if this fails)
+        async with quota_service.release_on_failure(user_email, "daily_api_calls"):
+            summary_service = get_summary_service()
             try:
-                await quota_service.increment_usage(user_email, "api_calls_used")
-                logger.debug(f"Incremented api_calls_used for {user_email}")
-            except Exception as e:
-                logger.error(f"Failed to increment usage for {user_email}: {e}", exc_info=True)
-                # Log but don't fail - summary was created successfully
+                summary_item = await summary_service.create_summary(
+                    conversion_id=request.conversion_id,
+                    user_email=user_email,
+                    summary_text=summary_text,
+                    metadata={
+                        "source": "ai",
+                        "document_id": request.document_id,
+                        "summary_length": request.summary_length,
+                        "focus_areas": request.focus_areas or []
+                    }
+                )
+                
+                logger.info(f"Summary generated and stored for document {request.document_id} in conversion {request.conversion_id}")
+                
+                now = datetime.utcnow().isoformat() + "Z"
+                
+                return AISummaryResponse(
+                    document_id=request.document_id,
+                    summary=summary_text,
+                    summary_length=request.summary_length,
+                    key_points=[
+                        "Website redesign project",
+                        "180 hours of development work",
+                        "USD 29,000 total cost including VAT",
+                        "Net 30 payment terms",
+                        "Valid until February 20, 2026"
+                    ],
+                    entities_extracted={
+                        "parties": ["Tech Solutions Inc", "Acme Corp"],
+                        "dates": ["2026-01-20", "2026-02-03", "2026-02-20"],
+                        "amounts": ["USD 29,000"],
+                        "services": ["Frontend Development", "Backend API Development"]
+                    },
+                    sentiment="professional",
+                    generated_at=now
+                )
             
-            now = datetime.utcnow().isoformat() + "Z"
+            except exceptions.CosmosResourceExistsError:
+                logger.warning(f"Summary already exists for document {request.document_id}")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Summary already exists for this document"
+                )
+            
+            except ValueError as e:
+                logger.error(f"Invalid summary data: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid summary data: {str(e)}"
+                )
             
-            return AISummaryResponse(
-                document_id=request.document_id,
-                summary=summary_text,
-                summary_length=request.summary_length,
-                key_points=[
-                    "Website redesign project",
-                    "180 hours of development work",
-                    "USD 29,000 total cost including VAT",
-                    "Net 30 payment terms",
-                    "Valid until February 20, 2026"
-                ],
-                entities_extracted={
-                    "parties": ["Tech Solutions Inc", "Acme Corp"],
-                    "dates": ["2026-01-20", "2026-02-03", "2026-02-20"],
-                    "amounts": ["USD 29,000"],
-                    "services": ["Frontend Development", "Backend API Development"]
-                },
-                sentiment="professional",
-                generated_at=now
-            )
-        
-        except exceptions.CosmosResourceExistsError:
-            logger.warning(f"Summary already exists for document {request.document_id}")
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Summary already exists for this document"
-            )
-        
-        except ValueError as e:
-            logger.error(f"Invalid summary data: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid summary data: {str(e)}"
-            )
-        
     except HTTPException:
         raise
     except Exception as e:
@@ -5,6 +5,7 @@ Part of Phase 5: Signals Intelligence layer.
 """
 
 import logging
+from itertools import islice
 from typing import Optional, List, Tuple
 from fastapi import APIRouter, Depends, Query, Path, HTTPException, status, Header
 
@@ -528,7 +529,7 @@ async def get_predictions(
             )
         
         history = SignalsService._price_history[request.item_id]
-        prices = [p.price for p in history[-90:]]  # Last 90 days
+        prices = [p.price for p in islice(reversed(history), 90)][::-1]  # Last 90 points
         
         if len(prices) < 3:
             raise HTTPException(
@@ -646,6 +647,13 @@ async def ingest_real_time_price(
     4. Broadcasts price update to all connected clients on /ws/prices
     5. Broadcasts risk alerts if thresholds exceeded
     
+    Broadcasts only queue the events for each client's writer task, so a
+    burst of prices is never held up by slow subscribers.
+    
+    The trend and the anomaly check of the new price come from the item's
+    rolling statistics (services/price_stats.py), so ingesting costs the
+    same however long the price history is.
+    
     Query Parameters:
     - item_id: Item/Product ID (required)
     - price: Current price in dollars (required, > 0)
@@ -663,7 +671,8 @@ async def ingest_real_time_price(
             timestamp=datetime.utcnow(),
             source="api_ingestion"
         )
-        SignalsService.add_price_point(item_id, price_point)
+        # Recorded here and replicated to the other API workers
+        SignalsBroadcasterBridge.record_price_point(item_id, price_point)
         
         # Analyze trend and get historical context
         trend = SignalsService.get_price_trend(item_id, days_back=90)
@@ -686,8 +695,7 @@ async def ingest_real_time_price(
             previous_price=trend.previous_price,
             trend=trend,
             volatility=trend.volatility,
-            moving_avg_30=trend.moving_avg_30,
-            moving_avg_90=trend.moving_avg_90
+            moving_avg_30=trend.moving_average_30d
         )
         
         broadcasts_sent = 1 if price_broadcasted else 0
@@ -703,18 +711,18 @@ async def ingest_real_time_price(
             if alert_broadcasted:
                 broadcasts_sent += 1
         
-        # Detect anomalies
-        prices = [pp.price for pp in SignalsService._price_history.get(item_id, [])]
-        anomalies = AnomalyDetectionService.detect_price_anomalies(prices)
+        # Check the new price against the same window (rolling statistics, no history scan)
+        anomaly = SignalsService.detect_latest_price_anomaly(item_id, days_back=90)
+        anomalies = [anomaly] if anomaly else []
         
-        for idx, deviation in anomalies:
+        for deviation, z_score, mean in anomalies:
             anomaly_broadcasted = await SignalsBroadcasterBridge.broadcast_anomaly_detected(
                 item_id=item_id,
                 anomaly_type="PRICE_SPIKE",
                 current_value=price,
-                expected_value=trend.moving_avg_90 or trend.previous_price,
+                expected_value=mean,
                 deviation_percent=deviation,
-                z_score=2.5 if deviation > 10 else 1.5,
+                z_score=z_score,
                 severity="HIGH" if deviation > 20 else "MEDIUM"
             )
             if anomaly_broadcasted:
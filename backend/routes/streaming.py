@@ -234,8 +234,13 @@ async def websocket_prices(
     {
         "action": "subscribe",
         "items": ["COPPER", "STEEL"],
-        "interval": "1s"
+        "interval": "1s",
+        "batch_window_ms": 250
     }
+    
+    With batch_window_ms, updates arrive as batch frames every window
+    holding the latest update per item:
+    {"type": "batch", "topic": "prices", "count": 2, "events": [...]}
     """
     
     # Authenticate and verify permissions
@@ -308,13 +313,15 @@ async def websocket_prices(
                 broadcaster.subscribe(
                     client.client_id,
                     "prices",
-                    filters=filters
+                    filters=filters,
+                    batch_window_ms=req.batch_window_ms
                 )
                 await client.send_event({
                     "type": "subscription_confirmed",
                     "topic": "prices",
                     "items": req.items,
-                    "tenant_id": current_tenant
+                    "tenant_id": current_tenant,
+                    "batch_window_ms": client.batch_windows.get("prices", 0)
                 })
             
             elif req.action == "unsubscribe":
@@ -452,8 +459,12 @@ async def websocket_anomalies(
     {
         "action": "subscribe",
         "anomaly_types": ["PRICE_ANOMALY", "TREND_BREAK"],
-        "sensitivity": "HIGH"
+        "sensitivity": "HIGH",
+        "batch_window_ms": 250
     }
+    
+    With batch_window_ms, anomalies arrive as batch frames every window
+    (every anomaly is kept).
     """
     
     # Authenticate and verify permissions
@@ -529,13 +540,15 @@ async def websocket_anomalies(
                 broadcaster.subscribe(
                     client.client_id,
                     "anomalies",
-                    filters=filters
+                    filters=filters,
+                    batch_window_ms=req.batch_window_ms
                 )
                 await client.send_event({
                     "type": "subscription_confirmed",
                     "topic": "anomalies",
                     "anomaly_types": req.anomaly_types,
-                    "tenant_id": current_tenant
+                    "tenant_id": current_tenant,
+                    "batch_window_ms": client.batch_windows.get("anomalies", 0)
                 })
             
             elif req.action == "unsubscribe":
@@ -564,8 +577,12 @@ async def websocket_trends(
     {
         "action": "subscribe",
         "items": ["COPPER", "STEEL"],
-        "notify_on": ["DIRECTION_CHANGE", "STRENGTH_CHANGE"]
+        "notify_on": ["DIRECTION_CHANGE", "STRENGTH_CHANGE"],
+        "batch_window_ms": 250
     }
+    
+    With batch_window_ms, trend changes arrive as batch frames every
+    window holding the latest change per item.
     """
     
     # Authenticate and verify permissions
@@ -638,13 +655,15 @@ async def websocket_trends(
                 broadcaster.subscribe(
                     client.client_id,
                     "trends",
-                    filters=filters
+                    filters=filters,
+                    batch_window_ms=req.batch_window_ms
                 )
                 await client.send_event({
                     "type": "subscription_confirmed",
                     "topic": "trends",
                     "items": req.items,
-                    "tenant_id": current_tenant
+                    "tenant_id": current_tenant,
+                    "batch_window_ms": client.batch_windows.get("trends", 0)
                 })
             
             elif req.action == "unsubscribe":
@@ -433,20 +433,27 @@ async def update_user_preferences(
 
 @router.get("/profiles")
 async def list_all_profiles(
-    skip: int = 0,
+    skip: Optional[int] = None,
     limit: int = 10,
+    continuation_token: Optional[str] = None,
     current_user: Tuple[str, str] = Depends(require_authenticated)
 ):
     """
     List all user profiles within current tenant (admin only)
     
+    Pages by cursor: pass the continuation_token of a response to get the
+    next page (null on the last page). Passing skip switches to offset
+    paging for existing clients; that re-reads every skipped profile, so it
+    gets slower with depth.
+    
     Args:
-        skip: Number of profiles to skip
+        skip: Number of profiles to skip (offset paging, deprecated)
         limit: Maximum number of profiles to return
+        continuation_token: Cursor from the previous page
         current_user: Current user from auth
         
     Returns:
-        list: List of user profiles scoped to current tenant
+        dict: Profiles scoped to current tenant, count and continuation_token
     """
     email, role = current_user
     service = get_profile_service()
@@ -465,11 +472,19 @@ async def list_all_profiles(
     
     try:
         # Get profiles scoped to current tenant
-        profiles = await service.get_all_profiles(
-            skip=skip, 
-            limit=limit,
-            tenant_id=current_tenant
-        )
+        token = None
+        if skip is not None:
+            profiles = await service.get_all_profiles(
+                skip=skip, 
+                limit=limit,
+                tenant_id=current_tenant
+            )
+        else:
+            profiles, token = await service.get_profiles_page(
+                tenant_id=current_tenant,
+                max_items=limit,
+                continuation_token=continuation_token
+            )
         
         rbac_service.log_authorization_decision(
             user_email=email,
@@ -479,8 +494,10 @@ async def list_all_profiles(
             allowed=True
         )
         
-        return {"profiles": profiles, "count": len(profiles)}
+        return {"profiles": profiles, "count": len(profiles), "continuation_token": token}
         
+    except ValueError as e:
+        raise validation_error(str(e))
     except Exception as e:
         logger.error(f"Error retrieving profiles for tenant {current_tenant}: {e}")
         raise internal_server_error("Failed to retrieve profiles")
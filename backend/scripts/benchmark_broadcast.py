@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of EventBroadcasterService.broadcast_event at 1k/10k subscribers
+
+Subscribes --subscribers clients to the prices topic (most filter on a few
+of --items item ids, some take everything) and broadcasts --events price
+updates. Compares the previous fan-out (a filter scan per client and a
+json.dumps per recipient, as WebSocket.send_json does) with the current
+one (filter index lookup, one serialization per event). Sockets are
+in-memory, so the numbers are the CPU cost of the fan-out itself.
+
+Usage:
+    python scripts/benchmark_broadcast.py
+    python scripts/benchmark_broadcast.py --subscribers 1000 10000 --events 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.event_broadcaster import ORJSON_AVAILABLE, EventBroadcasterService, _json_default
+
+
+class NullWebSocket:
+    """Accepts frames and drops them; send_json encodes like Starlette's"""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def send_json(self, data):
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+        self.frames += 1
+
+    async def send_text(self, data):
+        self.frames += 1
+
+
+class ScanBroadcaster(EventBroadcasterService):
+    """The previous broadcast: check every subscriber's filters, send_json to each recipient"""
+
+    async def broadcast_event(self, event, topic, exclude_client=None):
+        recipients = [
+            self.clients[client_id] for client_id in self.topic_subscriptions.get(topic, ())
+            if client_id != exclude_client and self._matches_filters(event, self.clients[client_id].filters.get(topic, {}))
+        ]
+        results = await asyncio.gather(*(client.send_event(event) for client in recipients))
+        return sum(1 for result in results if result is True)
+
+
+def make_events(count: int, items: int, seed: int = 11):
+    rng = random.Random(seed)
+    now = datetime.now(tz=timezone.utc)
+    return [{
+        "event_type": "price_update", "item_id": f"ITEM-{rng.randrange(items)}", "tenant_id": "tenant-1",
+        "current_price": round(rng.uniform(10, 500), 2), "previous_price": round(rng.uniform(10, 500), 2),
+        "price_change_percent": round(rng.uniform(-5, 5), 2), "volatility": round(rng.uniform(0, 3), 2),
+        "trend_direction": "UPTREND", "moving_avg_30": 101.5, "moving_avg_90": 99.25, "timestamp": now,
+    } for _ in range(count)]
+
+
+async def run(broadcaster: EventBroadcasterService, subscribers: int, items: int, events):
+    rng = random.Random(5)
+    for n in range(subscribers):
+        client = broadcaster.register_client(NullWebSocket(), f"user-{n}@example.com")
+        # 80% watch a few items, the rest every item of their tenant
+        if rng.random() < 0.8:
+            filters = {"item_id": [f"ITEM-{rng.randrange(items)}" for _ in range(3)], "tenant_id": "tenant-1"}
+        else:
+            filters = {"tenant_id": "tenant-1"}
+        broadcaster.subscribe(client.client_id, "prices", filters)
+
+    start = time.perf_counter()
+    delivered = 0
+    for event in events:
+        delivered += await broadcaster.broadcast_event(event, "prices")
+    return (time.perf_counter() - start) / len(events), delivered / len(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--items", type=int, default=100, help="Distinct item ids")
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+
+    events = make_events(args.events, args.items)
+    print(f"{args.events} price updates over {args.items} items; serializer: {'orjson' if ORJSON_AVAILABLE else 'json'}\n")
+    print(f"{'subscribers':>11} {'broadcast':<26} {'ms/event':>9} {'recipients/event':>17}")
+    print("-" * 66)
+    for subscribers in args.subscribers:
+        for label, make in (("scan + send_json (old)", ScanBroadcaster), ("index + serialize once", EventBroadcasterService)):
+            per_event, recipients = asyncio.run(run(make(max_concurrent_connections=subscribers), subscribers, args.items, events))
+            print(f"{subscribers:>11,} {label:<26} {per_event * 1e3:>9.2f} {recipients:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
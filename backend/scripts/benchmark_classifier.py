@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: UniversalClassifier signal evaluation
+
+Compares the compiled SignalScanner against the original per-pattern
+re.findall() loop on synthetic procurement documents from 1KB to 5MB, and
+checks that both produce the same ClassificationResult.
+
+Usage:
+    python scripts/benchmark_classifier.py
+    python scripts/benchmark_classifier.py --sizes 1000 100000 --repeat 5
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from document_processing.classifier import UniversalClassifier, ClassificationSignal
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 5_000_000]
+
+HEADER = """BILL OF QUANTITIES
+Project: Gas Compression Station - Phase 2
+Item | Description | Qty | Unit | Rate | Amount
+"""
+
+DESCRIPTIONS = [
+    "Carbon steel pipe ASTM A106 Gr.B {n}mm",
+    "Gate valve class 300 flanged {n}mm",
+    "Cable tray galvanized {n}mm wide",
+    "Concrete grade C{n} for foundations",
+    "Structural steel beams fabrication {n}kg",
+    "Insulation rockwool {n}mm thick",
+]
+
+
+def make_document(size: int, seed: int = 42) -> str:
+    """Build a BOQ-like document of roughly `size` characters"""
+    rng = random.Random(seed)
+    parts = [HEADER]
+    length = len(HEADER)
+    line_no = 0
+    while length < size:
+        line_no += 1
+        line = "{} | {} | {} | nos | {} | {}\n".format(
+            line_no,
+            rng.choice(DESCRIPTIONS).format(n=rng.randint(10, 900)),
+            rng.randint(1, 999),
+            rng.randint(10, 9999),
+            rng.randint(100, 999999),
+        )
+        parts.append(line)
+        length += len(line)
+    return "".join(parts)[:size]
+
+
+def reference_evaluate(classifier: UniversalClassifier, text: str) -> List[ClassificationSignal]:
+    """Original implementation: re.findall() for every pattern of every signal"""
+    results = []
+    for signal_name, signal_def in classifier.signals.items():
+        matched = False
+        evidence = []
+        max_confidence = 0
+        for pattern in signal_def["patterns"]:
+            matches = re.findall(pattern, text)
+            if matches:
+                matched = True
+                evidence.extend(matches[:3])
+                max_confidence = max(max_confidence, 0.8)
+        results.append(ClassificationSignal(
+            signal_name=signal_name,
+            matched=matched,
+            weight=signal_def["weight"],
+            confidence=max_confidence if matched else 0,
+            evidence=evidence
+        ))
+    return results
+
+
+def time_call(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    classifier = UniversalClassifier()
+
+    print(f"{'size':>10} {'reference':>12} {'scanner':>12} {'speedup':>9}  identical")
+    print("-" * 58)
+    for size in args.sizes:
+        text = classifier._normalize_text(make_document(size))
+
+        ref_time = time_call(lambda: reference_evaluate(classifier, text), args.repeat)
+        new_time = time_call(lambda: classifier._evaluate_signals(text), args.repeat)
+
+        ref_signals = reference_evaluate(classifier, text)
+        new_signals = classifier._evaluate_signals(text)
+        identical = (
+            ref_signals == new_signals and
+            classifier._score_document_types(ref_signals) == classifier._score_document_types(new_signals)
+        )
+
+        print(f"{size:>10} {ref_time * 1000:>10.1f}ms {new_time * 1000:>10.1f}ms "
+              f"{ref_time / new_time if new_time else float('inf'):>8.1f}x  {identical}")
+
+        if not identical:
+            print("ERROR: scanner output differs from reference")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
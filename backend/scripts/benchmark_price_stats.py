@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ingest + trend lookup per price point, rolling statistics vs history scan
+
+Ingests --points price points for one item (spread over the last --days
+days, so the whole history is inside the 90-day trend window) the way
+/signals/ingest does: add the point, then read the item's trend. With the
+rolling statistics each step costs the same however long the history is.
+The previous lookup (filter the history by date, then analyze_trend over
+the prices) is timed at a few history sizes along the way; doing it for
+every point would be quadratic.
+
+Usage:
+    python scripts/benchmark_price_stats.py
+    python scripts/benchmark_price_stats.py --points 100000 --samples 5
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.signals import PricePoint
+from services.signals_service import SignalsService, TrendAnalysisService
+
+
+def scan_trend(item_id: str, days_back: int):
+    """The trend lookup before the rolling statistics"""
+    cutoff_date = datetime.utcnow() - timedelta(days=days_back)
+    recent = [p for p in SignalsService._price_history[item_id] if p.timestamp >= cutoff_date]
+    return TrendAnalysisService.analyze_trend([p.price for p in recent], [p.timestamp for p in recent])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1_000_000, help="Price points for the item")
+    parser.add_argument("--days", type=float, default=80, help="Days the points are spread over")
+    parser.add_argument("--days-back", type=int, default=90, help="Trend window")
+    parser.add_argument("--samples", type=int, default=4, help="History sizes at which the scan is timed")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = random.Random(7)
+    start = datetime.utcnow() - timedelta(days=args.days)
+    step = timedelta(days=args.days) / args.points
+    checkpoints = {args.points * (n + 1) // args.samples for n in range(args.samples)}
+    item_id, price = "ITEM-1", 100.0
+
+    print(f"{args.points:,} points over {args.days:g} days, {args.days_back}-day trend window\n")
+    print(f"{'history':>10} {'rolling: ingest+trend':>22} {'scan: trend':>13} {'speedup':>8}")
+    print("-" * 57)
+    rolling, stepped = 0.0, 0
+    for n in range(1, args.points + 1):
+        price = max(1.0, price * (1 + rng.gauss(0, 0.002)))
+        point = PricePoint(timestamp=start + step * n, price=round(price, 4))
+
+        began = time.perf_counter()
+        SignalsService.add_price_point(item_id, point)
+        trend = SignalsService.get_price_trend(item_id, days_back=args.days_back)
+        rolling += time.perf_counter() - began
+        stepped += 1
+
+        if n in checkpoints:
+            began = time.perf_counter()
+            expected = scan_trend(item_id, args.days_back)
+            scan = time.perf_counter() - began
+            assert trend.data_points == expected["data_points"]
+            per_point = rolling / stepped
+            print(f"{n:>10,} {per_point * 1e6:>19.1f} us {scan * 1e3:>10.1f} ms {scan / per_point:>7.0f}x")
+            rolling, stepped = 0.0, 0
+
+
+if __name__ == "__main__":
+    main()
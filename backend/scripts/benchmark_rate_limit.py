@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request cost and memory of the rate limit stores at 10k clients
+
+Replays a synthetic trace against the old timestamp-list store and the
+GCRA stores: --clients distinct IPs each sending --requests requests,
+plus one busy client sitting at the hourly limit. Reports microseconds per
+request, peak memory (tracemalloc) and the cost of the busy client alone.
+
+Usage:
+    python scripts/benchmark_rate_limit.py
+    python scripts/benchmark_rate_limit.py --clients 10000 --requests 20 --sqlite
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rate_limit import MemoryRateLimitStore, RateLimit, SQLiteRateLimitStore
+
+PER_MINUTE, PER_HOUR = 60, 1000
+LIMITS = (RateLimit("minute", PER_MINUTE, 60), RateLimit("hour", PER_HOUR, 3600))
+
+
+class TimestampListStore:
+    """The previous store: every timestamp of the past hour per client, filtered twice per request"""
+
+    def __init__(self):
+        self.requests = {}
+
+    def hit_now(self, client_id, limits, now):
+        timestamps = self.requests.setdefault(client_id, [])
+        timestamps[:] = [t for t in timestamps if t > now - 3600]
+        if len(timestamps) >= PER_HOUR:
+            return False
+        if len([t for t in timestamps if t > now - 60]) >= PER_MINUTE:
+            return False
+        timestamps.append(now)
+        return True
+
+
+def make_trace(clients: int, requests: int, seed: int = 7):
+    """(client, time) pairs over one hour, in time order"""
+    rng = random.Random(seed)
+    trace = [(f"10.{i // 65536}.{i // 256 % 256}.{i % 256}", rng.uniform(0, 3600))
+             for i in range(clients) for _ in range(requests)]
+    # A client at the hourly limit: 1000 requests spread over the hour
+    trace += [("192.168.0.1", n * 3.6) for n in range(PER_HOUR)]
+    trace.sort(key=lambda item: item[1])
+    return trace
+
+
+def run(make_store, trace):
+    """Timed pass, then a separate pass under tracemalloc (which slows allocation down)"""
+    store = make_store()
+    start = time.perf_counter()
+    for client_id, now in trace:
+        store.hit_now(client_id, LIMITS, now)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    traced = make_store()
+    for client_id, now in trace:
+        traced.hit_now(client_id, LIMITS, now)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    busy = [now for client_id, now in trace if client_id == "192.168.0.1"][-200:]
+    start = time.perf_counter()
+    for now in busy:
+        store.hit_now("192.168.0.1", LIMITS, now)
+    busy_elapsed = time.perf_counter() - start
+    return elapsed / len(trace), peak, busy_elapsed / len(busy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client over the hour")
+    parser.add_argument("--sqlite", action="store_true", help="Include the shared SQLite store")
+    args = parser.parse_args()
+
+    trace = make_trace(args.clients, args.requests)
+    print(f"{len(trace):,} requests from {args.clients:,} clients (+1 client at {PER_HOUR}/hour)\n")
+    print(f"{'store':<22} {'us/request':>11} {'peak memory':>12} {'busy client us/request':>23}")
+    print("-" * 72)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        databases = (str(Path(tmp) / f"limits-{n}.db") for n in range(2))
+        stores = [("timestamp lists (old)", TimestampListStore), ("GCRA in-process", MemoryRateLimitStore)]
+        if args.sqlite:
+            stores.append(("GCRA sqlite (disk)", lambda: SQLiteRateLimitStore(next(databases))))
+        for label, make_store in stores:
+            per_request, peak, busy = run(make_store, trace)
+            print(f"{label:<22} {per_request * 1e6:>11.2f} {peak / 1e6:>10.1f}MB {busy * 1e6:>23.2f}")
+
+
+if __name__ == "__main__":
+    main()
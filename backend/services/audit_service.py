@@ -21,10 +21,11 @@ Phase 5 Integration:
 - Fallback to in-memory for development
 """
 
+import asyncio
 import logging
 import json
 import os
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timedelta, timezone
 from enum import Enum
 from dataclasses import dataclass, asdict
@@ -37,6 +38,8 @@ try:
 except ImportError:
     COSMOS_AVAILABLE = False
 
+from services.cosmos_service import page_size, query_page
+
 logger = logging.getLogger("audit")
 
 
@@ -549,69 +552,155 @@ class AuditService:
         if AuditService._use_cosmos and AuditService._cosmos_container and tenant_id:
             # Query from Cosmos DB
             try:
-                # Build query
-                query = "SELECT * FROM c WHERE c.tenant_id = @tenant_id"
-                parameters = [{"name": "@tenant_id", "value": tenant_id}]
-                
-                if user_email:
-                    query += " AND c.user_email = @user_email"
-                    parameters.append({"name": "@user_email", "value": user_email})
-                
-                if event_type:
-                    query += " AND c.event_type = @event_type"
-                    parameters.append({"name": "@event_type", "value": event_type.value})
-                
-                if resource_type:
-                    query += " AND c.resource_type = @resource_type"
-                    parameters.append({"name": "@resource_type", "value": resource_type})
-                
-                if resource_id:
-                    query += " AND c.resource_id = @resource_id"
-                    parameters.append({"name": "@resource_id", "value": resource_id})
-                
-                # Sort by timestamp descending
-                query += " ORDER BY c.timestamp DESC"
+                query, parameters = AuditService._events_query(
+                    tenant_id, user_email, event_type, resource_type, resource_id
+                )
                 
-                # Execute query with pagination
-                items = list(AuditService._cosmos_container.query_items(
+                # Skip and limit server-side, within the tenant's partition
+                query += " OFFSET @offset LIMIT @limit"
+                parameters += [
+                    {"name": "@offset", "value": offset},
+                    {"name": "@limit", "value": limit}
+                ]
+                items = await asyncio.to_thread(lambda: list(AuditService._cosmos_container.query_items(
                     query=query,
                     parameters=parameters,
+                    partition_key=tenant_id,
                     max_item_count=limit
-                ))
+                )))
                 
                 # Convert back to AuditEvent objects
-                events = []
-                for item in items[offset:offset + limit]:
-                    event = AuditEvent(
-                        id=item.get('id'),
-                        tenant_id=item.get('tenant_id'),
-                        timestamp=item.get('timestamp'),
-                        user_email=item.get('user_email'),
-                        user_role=item.get('user_role'),
-                        event_type=AuditEventType(item.get('event_type')),
-                        action=item.get('action'),
-                        result=AuditResult(item.get('result')),
-                        resource_type=item.get('resource_type'),
-                        resource_id=item.get('resource_id'),
-                        allowed=item.get('allowed', False),
-                        reason=item.get('reason'),
-                        ip_address=item.get('ip_address'),
-                        user_agent=item.get('user_agent'),
-                        details=item.get('details'),
-                        changes=item.get('changes'),
-                        error_message=item.get('error_message'),
-                        processing_time_ms=item.get('processing_time_ms'),
-                        tags=item.get('tags')
-                    )
-                    events.append(event)
-                
-                return events
+                return [AuditService._event_from_item(item) for item in items]
                 
             except Exception as e:
                 logger.error(f"Failed to query Cosmos DB: {e}")
                 # Fallback to in-memory
         
-        # Query from in-memory (development or fallback)
+        results = AuditService._filter_event_log(user_email, event_type, resource_type, resource_id, tenant_id)
+        
+        # Pagination
+        return results[offset:offset + limit]
+    
+    @staticmethod
+    async def get_events_page(
+        tenant_id: str,
+        user_email: Optional[str] = None,
+        event_type: Optional[AuditEventType] = None,
+        resource_type: Optional[str] = None,
+        resource_id: Optional[str] = None,
+        max_items: Optional[int] = None,
+        continuation_token: Optional[str] = None
+    ) -> Tuple[List[AuditEvent], Optional[str]]:
+        """Query one page of a tenant's audit events, newest first
+        
+        Pages follow Cosmos continuation tokens within the tenant's
+        partition, so each page costs one round trip regardless of depth.
+        
+        Args:
+            tenant_id: Tenant (partition key)
+            user_email: Filter by user
+            event_type: Filter by event type
+            resource_type: Filter by resource type
+            resource_id: Filter by resource ID
+            max_items: Page size (default COSMOS_QUERY_PAGE_SIZE, at most COSMOS_MAX_PAGE_SIZE)
+            continuation_token: Token from the previous page
+            
+        Returns:
+            (events, continuation_token); the token is None after the last page
+            
+        Raises:
+            ValueError: If the continuation token is invalid
+        """
+        # Initialize Cosmos DB on first use
+        if not AuditService._use_cosmos:
+            await AuditService._init_cosmos()
+        
+        if AuditService._use_cosmos and AuditService._cosmos_container:
+            query, parameters = AuditService._events_query(
+                tenant_id, user_email, event_type, resource_type, resource_id
+            )
+            items, token = await query_page(
+                AuditService._cosmos_container, query, parameters,
+                max_item_count=max_items,
+                continuation_token=continuation_token,
+                partition_key=tenant_id
+            )
+            return [AuditService._event_from_item(item) for item in items], token
+        
+        # In-memory log: the token is the offset of the next page
+        results = AuditService._filter_event_log(user_email, event_type, resource_type, resource_id, tenant_id)
+        try:
+            start = int(continuation_token) if continuation_token else 0
+        except ValueError:
+            raise ValueError(f"Invalid continuation token: {continuation_token}") from None
+        end = start + page_size(max_items)
+        return results[start:end], (str(end) if end < len(results) else None)
+    
+    @staticmethod
+    def _events_query(
+        tenant_id: str,
+        user_email: Optional[str] = None,
+        event_type: Optional[AuditEventType] = None,
+        resource_type: Optional[str] = None,
+        resource_id: Optional[str] = None
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """Audit event query with the given filters, newest first"""
+        query = "SELECT * FROM c WHERE c.tenant_id = @tenant_id"
+        parameters = [{"name": "@tenant_id", "value": tenant_id}]
+        
+        if user_email:
+            query += " AND c.user_email = @user_email"
+            parameters.append({"name": "@user_email", "value": user_email})
+        
+        if event_type:
+            query += " AND c.event_type = @event_type"
+            parameters.append({"name": "@event_type", "value": event_type.value})
+        
+        if resource_type:
+            query += " AND c.resource_type = @resource_type"
+            parameters.append({"name": "@resource_type", "value": resource_type})
+        
+        if resource_id:
+            query += " AND c.resource_id = @resource_id"
+            parameters.append({"name": "@resource_id", "value": resource_id})
+        
+        # Sort by timestamp descending
+        return query + " ORDER BY c.timestamp DESC", parameters
+    
+    @staticmethod
+    def _event_from_item(item: Dict[str, Any]) -> AuditEvent:
+        """AuditEvent from a stored Cosmos DB item"""
+        return AuditEvent(
+            id=item.get('id'),
+            tenant_id=item.get('tenant_id'),
+            timestamp=item.get('timestamp'),
+            user_email=item.get('user_email'),
+            user_role=item.get('user_role'),
+            event_type=AuditEventType(item.get('event_type')),
+            action=item.get('action'),
+            result=AuditResult(item.get('result')),
+            resource_type=item.get('resource_type'),
+            resource_id=item.get('resource_id'),
+            allowed=item.get('allowed', False),
+            reason=item.get('reason'),
+            ip_address=item.get('ip_address'),
+            user_agent=item.get('user_agent'),
+            details=item.get('details'),
+            changes=item.get('changes'),
+            error_message=item.get('error_message'),
+            processing_time_ms=item.get('processing_time_ms'),
+            tags=item.get('tags')
+        )
+    
+    @staticmethod
+    def _filter_event_log(
+        user_email: Optional[str] = None,
+        event_type: Optional[AuditEventType] = None,
+        resource_type: Optional[str] = None,
+        resource_id: Optional[str] = None,
+        tenant_id: Optional[str] = None
+    ) -> List[AuditEvent]:
+        """In-memory events matching the filters, newest first (development or fallback)"""
         results = AuditService._event_log
         
         # Apply filters
@@ -628,9 +717,7 @@ class AuditService:
         
         # Sort by timestamp descending
         results = sorted(results, key=lambda e: e.timestamp, reverse=True)
-        
-        # Pagination
-        return results[offset:offset + limit]
+        return results
     
     @staticmethod
     async def count_events(
@@ -2,11 +2,30 @@
 Azure Blob Storage Service
 
 Handles file uploads and downloads to/from Azure Blob Storage.
+
+The synchronous helpers suit scripts and worker threads. Async routes use
+the transfer layer at the bottom of this module instead: a shared
+`azure.storage.blob.aio` client (one pooled aiohttp session per event
+loop), block uploads staged in parallel straight from an UploadFile
+(memory is bounded by block size x concurrency, never the whole body),
+parallel ranged downloads, and `open_blob` for processors that want to
+read a blob lazily as a seekable file. Set AZURITE_BLOB_ENDPOINT (or use
+the `UseDevelopmentStorage=true` connection string) to run against the
+Azurite emulator.
 """
 
+import asyncio
+import base64
+import io
 import logging
-from typing import Optional
-from azure.storage.blob import BlobServiceClient, BlobClient
+import threading
+import uuid
+from typing import BinaryIO, Optional, Tuple
+from azure.core import MatchConditions
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob import BlobBlock, BlobServiceClient, BlobClient, ContentSettings
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+import aiohttp
 import os
 
 logger = logging.getLogger(__name__)
@@ -19,21 +38,55 @@ BLOB_CONNECTION_STRING = os.getenv(
 
 BLOB_ACCOUNT_NAME = os.getenv("AZURE_STORAGE_ACCOUNT_NAME", "kraftdblob")
 
+# Azurite emulator (e.g. http://127.0.0.1:10000); takes precedence over the connection string
+AZURITE_BLOB_ENDPOINT = os.getenv("AZURITE_BLOB_ENDPOINT")
+AZURITE_ACCOUNT_NAME = "devstoreaccount1"
+AZURITE_ACCOUNT_KEY = "Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=="  # Well-known emulator key
+
+# Transfer tuning
+BLOB_BLOCK_SIZE = int(os.getenv("BLOB_BLOCK_SIZE", str(4 * 1024 * 1024)))  # Bytes per staged block / ranged GET
+BLOB_MAX_CONCURRENCY = int(os.getenv("BLOB_MAX_CONCURRENCY", "4"))  # Blocks in flight per transfer
+BLOB_CONNECTION_POOL_SIZE = int(os.getenv("BLOB_CONNECTION_POOL_SIZE", "32"))  # Connections shared by all transfers
+
+_blob_client: Optional[BlobServiceClient] = None
+_async_blob_client: Optional[AsyncBlobServiceClient] = None
+_async_blob_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _connection_string() -> str:
+    if AZURITE_BLOB_ENDPOINT:
+        return (
+            f"DefaultEndpointsProtocol=http;AccountName={AZURITE_ACCOUNT_NAME};AccountKey={AZURITE_ACCOUNT_KEY};"
+            f"BlobEndpoint={AZURITE_BLOB_ENDPOINT.rstrip('/')}/{AZURITE_ACCOUNT_NAME};"
+        )
+    return BLOB_CONNECTION_STRING
+
+
+def _client_options() -> dict:
+    return {
+        "max_block_size": BLOB_BLOCK_SIZE,
+        "max_single_put_size": BLOB_BLOCK_SIZE,
+        "max_single_get_size": BLOB_BLOCK_SIZE,
+        "max_chunk_get_size": BLOB_BLOCK_SIZE,
+    }
+
 
 def get_blob_client() -> BlobServiceClient:
     """
-    Get Azure Blob Service client for file operations.
+    Get the shared Azure Blob Service client for file operations.
     
     Returns:
         BlobServiceClient instance
     """
-    try:
-        client = BlobServiceClient.from_connection_string(BLOB_CONNECTION_STRING)
-        logger.debug("Blob service client initialized")
-        return client
-    except Exception as e:
-        logger.error(f"Failed to initialize Blob service client: {e}")
-        raise
+    global _blob_client
+    if _blob_client is None:
+        try:
+            _blob_client = BlobServiceClient.from_connection_string(_connection_string(), **_client_options())
+            logger.debug("Blob service client initialized")
+        except Exception as e:
+            logger.error(f"Failed to initialize Blob service client: {e}")
+            raise
+    return _blob_client
 
 
 def upload_file_to_blob(
@@ -198,3 +251,277 @@ def list_blobs(
     except Exception as e:
         logger.error(f"Blob listing failed: {e}")
         raise
+
+
+# ===== Async transfers =====
+
+def get_async_blob_client() -> AsyncBlobServiceClient:
+    """
+    Get the shared async Blob Service client (call from a running event loop).
+    
+    Every transfer on the loop shares its aiohttp connection pool; a client
+    is bound to the loop that created it, so another loop gets its own.
+    
+    Returns:
+        azure.storage.blob.aio.BlobServiceClient instance
+    """
+    global _async_blob_client, _async_blob_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_blob_client is None or _async_blob_client_loop is not loop:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=BLOB_CONNECTION_POOL_SIZE))
+        _async_blob_client = AsyncBlobServiceClient.from_connection_string(
+            _connection_string(), transport=AioHttpTransport(session=session, session_owner=True),
+            **_client_options()
+        )
+        _async_blob_client_loop = loop
+        logger.debug("Async blob service client initialized")
+    return _async_blob_client
+
+
+async def close_async_blob_client() -> None:
+    """Close the shared async client and its connection pool (on shutdown)"""
+    global _async_blob_client, _async_blob_client_loop
+    if _async_blob_client is not None and _async_blob_client_loop is asyncio.get_running_loop():
+        await _async_blob_client.close()
+    _async_blob_client = None
+    _async_blob_client_loop = None
+
+
+async def upload_stream_to_blob(
+    container_name: str,
+    blob_name: str,
+    stream,
+    content_type: str = "application/octet-stream",
+    overwrite: bool = True,
+    block_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    client: Optional[AsyncBlobServiceClient] = None
+) -> Tuple[str, int]:
+    """
+    Upload from an async stream (e.g. an UploadFile) without buffering it.
+    
+    A stream that fits in one block is sent in a single request. Larger
+    ones are read a block at a time and staged in parallel, at most
+    `max_concurrency` blocks in flight, then committed as one block list;
+    nothing is visible until the commit succeeds (uncommitted blocks are
+    discarded by the service).
+    
+    Args:
+        container_name: Blob container name
+        blob_name: Full path/name of the blob
+        stream: Object with an async read(size) method
+        content_type: MIME type
+        overwrite: Whether to overwrite if exists
+        block_size: Bytes per block (default BLOB_BLOCK_SIZE)
+        max_concurrency: Blocks staged at once (default BLOB_MAX_CONCURRENCY)
+        client: Async service client (default: the shared one)
+    
+    Returns:
+        (blob URI, size in bytes)
+    
+    Raises:
+        Exception: If upload fails
+    """
+    block_size = block_size or BLOB_BLOCK_SIZE
+    max_concurrency = max_concurrency or BLOB_MAX_CONCURRENCY
+    blob_client = (client or get_async_blob_client()).get_blob_client(container=container_name, blob=blob_name)
+    content_settings = ContentSettings(content_type=content_type)
+
+    first = await stream.read(block_size)
+    second = await stream.read(block_size) if len(first) == block_size else b""
+    if not second:
+        await blob_client.upload_blob(first, overwrite=overwrite, content_settings=content_settings)
+        logger.info(f"File uploaded to blob: {blob_client.url} ({len(first)} bytes)")
+        return blob_client.url, len(first)
+
+    # Block ids must all have the same length; the upload id keeps retries from mixing blocks
+    upload_id = uuid.uuid4().hex
+    semaphore = asyncio.Semaphore(max_concurrency)
+    running = set()
+    block_ids = []
+    size = 0
+
+    async def stage(block_id: str, data: bytes) -> None:
+        try:
+            await blob_client.stage_block(block_id, data, length=len(data))
+        finally:
+            semaphore.release()
+
+    buffered = [first, second]
+    try:
+        while True:
+            chunk = buffered.pop(0) if buffered else await stream.read(block_size)
+            if not chunk:
+                break
+            # Wait for a free slot before holding another block in memory; surface failures early
+            await semaphore.acquire()
+            for task in [task for task in running if task.done()]:
+                running.discard(task)
+                task.result()
+            block_id = base64.b64encode(f"{upload_id}-{len(block_ids):08d}".encode()).decode()
+            block_ids.append(block_id)
+            running.add(asyncio.create_task(stage(block_id, chunk)))
+            size += len(chunk)
+        await asyncio.gather(*running)
+    except BaseException:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        raise
+
+    conditions = {} if overwrite else {"etag": "*", "match_condition": MatchConditions.IfMissing}
+    await blob_client.commit_block_list(
+        [BlobBlock(block_id=block_id) for block_id in block_ids], content_settings=content_settings, **conditions
+    )
+    logger.info(f"File uploaded to blob: {blob_client.url} ({size} bytes in {len(block_ids)} blocks)")
+    return blob_client.url, size
+
+
+async def download_blob_range(
+    container_name: str,
+    blob_name: str,
+    offset: int,
+    length: int,
+    client: Optional[AsyncBlobServiceClient] = None
+) -> bytes:
+    """
+    Download `length` bytes of a blob starting at `offset` (fewer at the end of the blob).
+    
+    Returns:
+        The bytes of the range
+    """
+    blob_client = (client or get_async_blob_client()).get_blob_client(container=container_name, blob=blob_name)
+    downloader = await blob_client.download_blob(offset=offset, length=length)
+    return await downloader.readall()
+
+
+def _write_at(handle: BinaryIO, lock: threading.Lock, offset: int, data: bytes) -> None:
+    with lock:
+        handle.seek(offset)
+        handle.write(data)
+
+
+async def download_blob_to_file(
+    container_name: str,
+    blob_name: str,
+    path: str,
+    block_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    client: Optional[AsyncBlobServiceClient] = None
+) -> int:
+    """
+    Download a blob to a local file with parallel ranged GETs.
+    
+    Every range is pinned to the blob's ETag, so a blob replaced mid-download
+    fails the download instead of producing a mix of both versions. Writes go
+    through the thread pool; a partial file is removed on error.
+    
+    Args:
+        container_name: Blob container name
+        blob_name: Full path/name of the blob
+        path: Destination file
+        block_size: Bytes per ranged GET (default BLOB_BLOCK_SIZE)
+        max_concurrency: Ranges fetched at once (default BLOB_MAX_CONCURRENCY)
+        client: Async service client (default: the shared one)
+    
+    Returns:
+        Size in bytes
+    """
+    block_size = block_size or BLOB_BLOCK_SIZE
+    semaphore = asyncio.Semaphore(max_concurrency or BLOB_MAX_CONCURRENCY)
+    blob_client = (client or get_async_blob_client()).get_blob_client(container=container_name, blob=blob_name)
+    properties = await blob_client.get_blob_properties()
+    size = properties.size
+    handle = await asyncio.to_thread(open, path, "wb")
+    lock = threading.Lock()
+
+    async def fetch(offset: int) -> None:
+        async with semaphore:
+            downloader = await blob_client.download_blob(
+                offset=offset, length=min(block_size, size - offset),
+                etag=properties.etag, match_condition=MatchConditions.IfNotModified
+            )
+            data = await downloader.readall()
+        await asyncio.to_thread(_write_at, handle, lock, offset, data)
+
+    try:
+        await asyncio.gather(*(fetch(offset) for offset in range(0, size, block_size)))
+    except BaseException:
+        await asyncio.to_thread(handle.close)
+        await asyncio.to_thread(_remove, path)
+        raise
+    await asyncio.to_thread(handle.close)
+    logger.info(f"File downloaded from blob: {blob_name} ({size} bytes)")
+    return size
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError as e:
+        logger.warning(f"Could not remove partial download {path}: {e}")
+
+
+class BlobRangeReader(io.RawIOBase):
+    """
+    Seekable read-only file over a blob; each read is a ranged GET.
+    
+    For processors (which run in worker threads) that only need part of a
+    file. Wrap it in io.BufferedReader, as open_blob does, so small reads
+    are served from one block-sized range. Reads are pinned to the ETag
+    seen on open.
+    """
+
+    def __init__(self, container_name: str, blob_name: str, client: Optional[BlobServiceClient] = None):
+        super().__init__()
+        self.name = blob_name
+        self._blob = (client or get_blob_client()).get_blob_client(container=container_name, blob=blob_name)
+        properties = self._blob.get_blob_properties()
+        self.size = properties.size
+        self._etag = properties.etag
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self._position)
+        if length <= 0:
+            return 0
+        data = self._blob.download_blob(
+            offset=self._position, length=length, etag=self._etag, match_condition=MatchConditions.IfNotModified
+        ).readall()
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+def open_blob(
+    container_name: str,
+    blob_name: str,
+    buffer_size: Optional[int] = None,
+    client: Optional[BlobServiceClient] = None
+) -> io.BufferedReader:
+    """
+    Open a blob for lazy, buffered reading (see BlobRangeReader).
+    
+    Returns:
+        Seekable binary file object
+    """
+    return io.BufferedReader(BlobRangeReader(container_name, blob_name, client), buffer_size or BLOB_BLOCK_SIZE)
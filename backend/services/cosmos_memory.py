@@ -0,0 +1,739 @@
+"""
+In-Memory Cosmos DB Stand-in
+
+Drop-in replacement for the azure.cosmos.aio client used by CosmosService,
+for tests and local development without the emulator (COSMOS_IN_MEMORY=true).
+
+Implements the async surface the repositories use:
+- create/upsert/read/replace/delete item, with _etag/_ts system properties
+  and ETag preconditions (If-Match) on replace/upsert/delete/patch
+- patch_item with add/set/replace/remove/incr operations and filter predicates
+- execute_item_batch: transactional batches on one partition key
+- query_items over a Cosmos SQL subset: SELECT [TOP n] * | VALUE expr | field
+  list, FROM alias, WHERE with AND/OR/NOT, comparisons, IN, IS_DEFINED,
+  ARRAY_CONTAINS, STARTSWITH/ENDSWITH/CONTAINS, LOWER/UPPER, ORDER BY,
+  OFFSET/LIMIT and the COUNT/SUM/MIN/MAX/AVG aggregates
+- async iteration and by_page() paging with continuation tokens
+
+Items are stored as JSON round-trips, so anything the real service would
+reject for serialization is rejected here too.
+"""
+
+import json
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from azure.core import MatchConditions
+from azure.cosmos import exceptions
+
+
+# ===== Client / database =====
+
+class InMemoryCosmosClient:
+    """Stand-in for azure.cosmos.aio.CosmosClient"""
+
+    def __init__(self):
+        self._databases: Dict[str, "InMemoryDatabase"] = {}
+
+    async def __aenter__(self) -> "InMemoryCosmosClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Nothing to release; data is kept so a service can be re-initialized"""
+
+    def get_database_client(self, database: str) -> "InMemoryDatabase":
+        if database not in self._databases:
+            self._databases[database] = InMemoryDatabase(database)
+        return self._databases[database]
+
+    async def create_database_if_not_exists(self, id: str, **kwargs) -> "InMemoryDatabase":
+        return self.get_database_client(id)
+
+
+class InMemoryDatabase:
+    """Stand-in for azure.cosmos.aio.DatabaseProxy"""
+
+    def __init__(self, database_id: str):
+        self.id = database_id
+        self._containers: Dict[str, "InMemoryContainer"] = {}
+
+    def get_container_client(self, container: str) -> "InMemoryContainer":
+        if container not in self._containers:
+            self._containers[container] = InMemoryContainer(container)
+        return self._containers[container]
+
+    async def create_container_if_not_exists(self, id: str, partition_key: Any = None, **kwargs) -> "InMemoryContainer":
+        container = self.get_container_client(id)
+        path = _partition_key_path(partition_key)
+        if path and container.partition_key_path is None:
+            container.partition_key_path = path
+        container.default_ttl = kwargs.get("default_ttl", container.default_ttl)
+        return container
+
+    async def create_container(self, id: str, partition_key: Any = None, **kwargs) -> "InMemoryContainer":
+        if id in self._containers:
+            raise exceptions.CosmosResourceExistsError(status_code=409, message=f"Container {id} already exists")
+        return await self.create_container_if_not_exists(id, partition_key, **kwargs)
+
+
+# ===== Container =====
+
+class InMemoryContainer:
+    """
+    Stand-in for azure.cosmos.aio.ContainerProxy.
+
+    With a partition key path, items are keyed by (partition key value, id)
+    like the real service; without one (container opened by name only) ids
+    are treated as unique across the container and partition_key arguments
+    are accepted but not checked.
+    """
+
+    def __init__(self, container_id: str, partition_key_path: Optional[str] = None):
+        self.id = container_id
+        self.partition_key_path = partition_key_path
+        self.default_ttl: Optional[int] = None
+        self._items: Dict[Tuple[Any, str], Dict[str, Any]] = {}
+
+    async def read(self, **kwargs) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "partitionKey": {"paths": [self.partition_key_path]} if self.partition_key_path else None,
+            "defaultTtl": self.default_ttl,
+        }
+
+    async def create_item(self, body: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        key = self._key_for(body)
+        if key in self._items:
+            raise exceptions.CosmosResourceExistsError(status_code=409, message=f"Item {body['id']} already exists")
+        return self._store(key, body)
+
+    async def upsert_item(self, body: Dict[str, Any], etag: Optional[str] = None,
+                          match_condition: Optional[MatchConditions] = None, **kwargs) -> Dict[str, Any]:
+        key = self._key_for(body)
+        if key in self._items:
+            self._check_etag(self._items[key], etag, match_condition)
+        return self._store(key, body)
+
+    async def read_item(self, item: Any, partition_key: Any = None, **kwargs) -> Dict[str, Any]:
+        return _copy(self._get(item, partition_key))
+
+    async def replace_item(self, item: Any, body: Dict[str, Any], etag: Optional[str] = None,
+                           match_condition: Optional[MatchConditions] = None, **kwargs) -> Dict[str, Any]:
+        existing = self._get(item, self._partition_value(body))
+        self._check_etag(existing, etag, match_condition)
+        body = dict(body, id=_item_id(item))
+        return self._store(self._key_for(body), body)
+
+    async def delete_item(self, item: Any, partition_key: Any = None, etag: Optional[str] = None,
+                          match_condition: Optional[MatchConditions] = None, **kwargs) -> None:
+        existing = self._get(item, partition_key)
+        self._check_etag(existing, etag, match_condition)
+        del self._items[self._key_for(existing)]
+
+    async def patch_item(self, item: Any, partition_key: Any, patch_operations: List[Dict[str, Any]],
+                         filter_predicate: Optional[str] = None, etag: Optional[str] = None,
+                         match_condition: Optional[MatchConditions] = None, **kwargs) -> Dict[str, Any]:
+        """Apply patch operations (add/set/replace/remove/incr) atomically, like the service"""
+        existing = self._get(item, partition_key)
+        self._check_etag(existing, etag, match_condition)
+        if len(patch_operations) > MAX_PATCH_OPERATIONS:
+            raise exceptions.CosmosHttpResponseError(status_code=400, message=f"At most {MAX_PATCH_OPERATIONS} patch operations")
+        if filter_predicate and not execute_query(f"SELECT VALUE 1 {filter_predicate}", [], [existing]):
+            raise exceptions.CosmosAccessConditionFailedError(status_code=412, message="Filter predicate not satisfied")
+
+        patched = _copy(existing)
+        for operation in patch_operations:
+            _apply_patch(patched, operation)
+        if patched.get("id") != existing["id"] or self._partition_value(patched) != self._partition_value(existing):
+            raise exceptions.CosmosHttpResponseError(status_code=400, message="Cannot patch id or partition key")
+        return self._store(self._key_for(patched), patched)
+
+    async def execute_item_batch(self, batch_operations: List[Tuple], partition_key: Any, **kwargs) -> List[Dict[str, Any]]:
+        """Run operations on one partition as a transaction: all apply, or none do"""
+        if len(batch_operations) > MAX_BATCH_OPERATIONS:
+            raise exceptions.CosmosHttpResponseError(status_code=400, message=f"At most {MAX_BATCH_OPERATIONS} batch operations")
+        snapshot = dict(self._items)
+        results = []
+        for index, (kind, args, *rest) in enumerate(batch_operations):
+            options = rest[0] if rest else {}
+            try:
+                if kind in ("create", "upsert", "replace") and self._partition_value(args[-1]) != partition_key and self.partition_key_path:
+                    raise exceptions.CosmosHttpResponseError(status_code=400, message="Partition key mismatch in batch")
+                if kind == "create":
+                    body = await self.create_item(args[0], **options)
+                elif kind == "upsert":
+                    body = await self.upsert_item(args[0], **options)
+                elif kind == "replace":
+                    body = await self.replace_item(args[0], args[1], **options)
+                elif kind == "read":
+                    body = await self.read_item(args[0], partition_key)
+                elif kind == "delete":
+                    body = await self.delete_item(args[0], partition_key, **options)
+                elif kind == "patch":
+                    body = await self.patch_item(args[0], partition_key, args[1], **options)
+                else:
+                    raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Unknown batch operation {kind}")
+            except exceptions.CosmosHttpResponseError as e:
+                self._items = snapshot
+                raise exceptions.CosmosBatchOperationError(
+                    error_index=index, headers={}, status_code=e.status_code, message=str(e), operation_responses=results
+                ) from None
+            results.append({"statusCode": 204 if kind == "delete" else 200, "resourceBody": body})
+        return results
+
+    def read_all_items(self, max_item_count: Optional[int] = None, **kwargs) -> "InMemoryItemPaged":
+        return self.query_items("SELECT * FROM c", max_item_count=max_item_count, **kwargs)
+
+    def query_items(self, query: str, parameters: Optional[List[Dict[str, Any]]] = None,
+                    partition_key: Any = None, max_item_count: Optional[int] = None, **kwargs) -> "InMemoryItemPaged":
+        """Run a query lazily; results are computed when iteration starts"""
+        def run() -> List[Any]:
+            items = [
+                item for item in self._items.values()
+                if partition_key is None or self.partition_key_path is None
+                or self._partition_value(item) == partition_key
+            ]
+            return execute_query(query, parameters or [], items)
+        return InMemoryItemPaged(run, max_item_count)
+
+    # --- internals ---
+
+    def _partition_value(self, body: Dict[str, Any]) -> Any:
+        if not self.partition_key_path:
+            return None
+        value = _resolve(body, self.partition_key_path.strip("/").split("/"))
+        return None if value is _UNDEFINED else value
+
+    def _key_for(self, body: Dict[str, Any]) -> Tuple[Any, str]:
+        if "id" not in body:
+            raise exceptions.CosmosHttpResponseError(status_code=400, message="Item must include 'id'")
+        return (self._partition_value(body), body["id"])
+
+    def _get(self, item: Any, partition_key: Any) -> Dict[str, Any]:
+        item_id = _item_id(item)
+        stored = self._items.get((partition_key if self.partition_key_path else None, item_id))
+        if stored is None:
+            raise exceptions.CosmosResourceNotFoundError(status_code=404, message=f"Item {item_id} not found")
+        return stored
+
+    @staticmethod
+    def _check_etag(existing: Dict[str, Any], etag: Optional[str], match_condition: Optional[MatchConditions]) -> None:
+        if match_condition == MatchConditions.IfNotModified and etag != existing.get("_etag"):
+            raise exceptions.CosmosAccessConditionFailedError(status_code=412, message="ETag precondition failed")
+
+    def _store(self, key: Tuple[Any, str], body: Dict[str, Any]) -> Dict[str, Any]:
+        stored = _copy(body)
+        stored["_etag"] = f'"{uuid.uuid4()}"'
+        stored["_ts"] = int(time.time())
+        self._items[key] = stored
+        return _copy(stored)
+
+
+class InMemoryItemPaged:
+    """Async iterable of query results with by_page(), like azure.core's AsyncItemPaged"""
+
+    def __init__(self, run, max_item_count: Optional[int] = None):
+        self._run = run
+        self._max_item_count = max_item_count
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self._iter_items()
+
+    async def _iter_items(self) -> AsyncIterator[Any]:
+        for item in self._run():
+            yield item
+
+    def by_page(self, continuation_token: Optional[str] = None) -> "InMemoryPageIterator":
+        return InMemoryPageIterator(self._run, self._max_item_count, continuation_token)
+
+
+class InMemoryPageIterator:
+    """Pages of a query; continuation_token is the offset of the next page (None after the last)"""
+
+    def __init__(self, run, page_size: Optional[int], continuation_token: Optional[str]):
+        self._run = run
+        self._page_size = page_size or 100
+        self._results: Optional[List[Any]] = None
+        self._offset = int(continuation_token) if continuation_token else 0
+        self.continuation_token: Optional[str] = continuation_token
+
+    def __aiter__(self) -> "InMemoryPageIterator":
+        return self
+
+    async def __anext__(self) -> AsyncIterator[Any]:
+        if self._results is None:
+            self._results = self._run()
+        elif self.continuation_token is None:
+            raise StopAsyncIteration
+        if self._offset >= len(self._results) and self._offset > 0:
+            raise StopAsyncIteration
+        page = self._results[self._offset:self._offset + self._page_size]
+        self._offset += len(page)
+        self.continuation_token = str(self._offset) if self._offset < len(self._results) else None
+        return _AsyncList(page)
+
+
+class _AsyncList:
+    def __init__(self, items: List[Any]):
+        self._items = iter(items)
+
+    def __aiter__(self) -> "_AsyncList":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return next(self._items)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+MAX_PATCH_OPERATIONS = 10
+MAX_BATCH_OPERATIONS = 100
+
+
+def _apply_patch(document: Dict[str, Any], operation: Dict[str, Any]) -> None:
+    """Apply one JSON patch operation with Cosmos semantics"""
+    op, value = operation["op"], operation.get("value")
+    parts = [part.replace("~1", "/").replace("~0", "~") for part in operation["path"].lstrip("/").split("/")]
+    parent = _resolve(document, [int(part) if part.isdigit() else part for part in parts[:-1]]) if len(parts) > 1 else document
+    last = parts[-1]
+
+    def fail(reason: str) -> None:
+        raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Patch {op} {operation['path']}: {reason}")
+
+    if isinstance(parent, list):
+        index = len(parent) if last == "-" else int(last) if last.lstrip("-").isdigit() else None
+        if index is None or not 0 <= index <= len(parent):
+            fail("invalid array index")
+        exists = index < len(parent)
+        if op == "add":
+            parent.insert(index, value)
+        elif op in ("set", "replace", "incr") and exists:
+            parent[index] = parent[index] + value if op == "incr" else value
+        elif op == "remove" and exists:
+            parent.pop(index)
+        else:
+            fail("no element at index")
+        return
+
+    if not isinstance(parent, dict):
+        fail("parent path does not exist")
+    if op in ("add", "set"):
+        parent[last] = value
+    elif op == "replace":
+        if last not in parent:
+            fail("path does not exist")
+        parent[last] = value
+    elif op == "remove":
+        if last not in parent:
+            fail("path does not exist")
+        del parent[last]
+    elif op == "incr":
+        current = parent.get(last, 0)
+        if not (_is_number(current) and _is_number(value)):
+            fail("not a number")
+        parent[last] = current + value
+    else:
+        fail("unsupported operation")
+
+
+def _partition_key_path(partition_key: Any) -> Optional[str]:
+    """Path from a PartitionKey (a dict with "paths"), a {"paths": [...]} dict or a plain "/path" string"""
+    if isinstance(partition_key, dict):
+        return (partition_key.get("paths") or [None])[0]
+    return partition_key
+
+
+def _copy(value: Any) -> Any:
+    return json.loads(json.dumps(value))
+
+
+def _item_id(item: Any) -> str:
+    return item["id"] if isinstance(item, dict) else item
+
+
+# ===== Query engine =====
+
+class _Undefined:
+    """Cosmos 'undefined' (missing property); never equal to anything, dropped from projections"""
+
+    def __repr__(self) -> str:
+        return "undefined"
+
+
+_UNDEFINED = _Undefined()
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<param>@\w+)
+      | (?P<op><=|>=|!=|<>|=|<|>|\(|\)|,|\.|\[|\]|\*)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    )""", re.VERBOSE)
+
+_AGGREGATES = {"COUNT", "SUM", "MIN", "MAX", "AVG"}
+_KEYWORDS = {"SELECT", "VALUE", "TOP", "DISTINCT", "FROM", "WHERE", "ORDER", "BY", "ASC", "DESC",
+             "OFFSET", "LIMIT", "AND", "OR", "NOT", "IN", "AS", "TRUE", "FALSE", "NULL"}
+
+
+def execute_query(query: str, parameters: List[Dict[str, Any]], items: List[Dict[str, Any]]) -> List[Any]:
+    """Evaluate a Cosmos SQL query against a list of items"""
+    params = {param["name"]: param["value"] for param in parameters}
+    parsed = _Parser(query).parse()
+
+    rows = [item for item in items if parsed["where"] is None or _truthy(_eval(parsed["where"], item, params))]
+
+    for path, descending in reversed(parsed["order_by"]):
+        rows.sort(key=lambda row: _sort_key(_eval(path, row, params)), reverse=descending)
+
+    projection = parsed["projection"]
+    if projection["kind"] == "value" and _is_aggregate(projection["expr"]):
+        return [_aggregate(projection["expr"], rows, params)]
+    if projection["kind"] == "fields" and all(_is_aggregate(expr) for expr, _ in projection["fields"]):
+        return [{alias: _aggregate(expr, rows, params) for expr, alias in projection["fields"]}]
+
+    offset, limit = _int_arg(parsed["offset"], params), _int_arg(parsed["limit"], params)
+    if parsed["top"] is not None:
+        limit = parsed["top"] if limit is None else min(limit, parsed["top"])
+    rows = rows[offset:offset + limit if limit is not None else None]
+
+    results = []
+    for row in rows:
+        if projection["kind"] == "all":
+            results.append(_copy(row))
+        elif projection["kind"] == "value":
+            value = _eval(projection["expr"], row, params)
+            if value is not _UNDEFINED:
+                results.append(_copy(value))
+        else:
+            results.append({
+                alias: _copy(value)
+                for expr, alias in projection["fields"]
+                for value in [_eval(expr, row, params)] if value is not _UNDEFINED
+            })
+
+    if parsed["distinct"]:
+        unique, seen = [], set()
+        for result in results:
+            key = json.dumps(result, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                unique.append(result)
+        results = unique
+    return results
+
+
+class _Parser:
+    """Recursive-descent parser producing a small expression tree of tuples"""
+
+    def __init__(self, query: str):
+        self.tokens = self._tokenize(query)
+        self.pos = 0
+        self.alias: Optional[str] = None
+
+    @staticmethod
+    def _tokenize(query: str) -> List[Tuple[str, str]]:
+        tokens, pos, query = [], 0, query.strip()
+        while pos < len(query):
+            match = _TOKEN_RE.match(query, pos)
+            if not match or match.end() == pos:
+                raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Syntax error near: {query[pos:pos + 20]!r}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "name" and value.upper() in _KEYWORDS | _AGGREGATES:
+                kind, value = "keyword", value.upper()
+            tokens.append((kind, value))
+            pos = match.end()
+            while pos < len(query) and query[pos].isspace():
+                pos += 1
+        return tokens
+
+    def peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def accept(self, value: str) -> bool:
+        if self.peek()[1] == value and self.peek()[0] in ("keyword", "op"):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, value: str) -> None:
+        if not self.accept(value):
+            raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Expected {value}, got {self.peek()[1]!r}")
+
+    def take(self) -> Tuple[Optional[str], Optional[str]]:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self) -> Dict[str, Any]:
+        self.expect("SELECT")
+        distinct = self.accept("DISTINCT")
+        top = int(self.take()[1]) if self.accept("TOP") else None
+
+        # The FROM alias is needed to read paths in the projection, so find it first
+        start = self.pos
+        depth = 0
+        while self.peek()[0] is not None and not (self.peek() == ("keyword", "FROM") and depth == 0):
+            depth += {"(": 1, ")": -1}.get(self.peek()[1], 0) if self.peek()[0] == "op" else 0
+            self.pos += 1
+        self.expect("FROM")
+        self.alias = self.take()[1]
+        end_of_from = self.pos
+
+        self.pos = start
+        projection = self._projection()
+        self.pos = end_of_from
+
+        where = self._expr() if self.accept("WHERE") else None
+
+        order_by = []
+        if self.accept("ORDER"):
+            self.expect("BY")
+            while True:
+                path = self._primary()
+                descending = self.accept("DESC")
+                if not descending:
+                    self.accept("ASC")
+                order_by.append((path, descending))
+                if not self.accept(","):
+                    break
+
+        offset, limit = 0, None
+        if self.accept("OFFSET"):
+            offset = self.take()[1]
+            self.expect("LIMIT")
+            limit = self.take()[1]
+
+        if self.peek()[0] is not None:
+            raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Unexpected {self.peek()[1]!r}")
+        return {"distinct": distinct, "top": top, "projection": projection, "where": where,
+                "order_by": order_by, "offset": offset, "limit": limit}
+
+    def _projection(self) -> Dict[str, Any]:
+        if self.accept("*"):
+            self.expect("FROM")
+            return {"kind": "all"}
+        if self.accept("VALUE"):
+            expr = self._expr()
+            self.expect("FROM")
+            return {"kind": "value", "expr": expr}
+        fields, index = [], 1
+        while True:
+            expr = self._expr()
+            if self.accept("AS"):
+                alias = self.take()[1]
+            elif expr[0] == "path" and expr[1]:
+                alias = expr[1][-1]
+            else:
+                alias, index = f"${index}", index + 1
+            fields.append((expr, alias))
+            if not self.accept(","):
+                break
+        self.expect("FROM")
+        return {"kind": "fields", "fields": fields}
+
+    def _expr(self) -> Tuple:
+        left = self._and()
+        while self.accept("OR"):
+            left = ("or", left, self._and())
+        return left
+
+    def _and(self) -> Tuple:
+        left = self._not()
+        while self.accept("AND"):
+            left = ("and", left, self._not())
+        return left
+
+    def _not(self) -> Tuple:
+        if self.accept("NOT"):
+            return ("not", self._not())
+        return self._comparison()
+
+    def _comparison(self) -> Tuple:
+        left = self._primary()
+        kind, value = self.peek()
+        if kind == "op" and value in ("=", "!=", "<>", "<", ">", "<=", ">="):
+            self.pos += 1
+            return ("cmp", "!=" if value == "<>" else value, left, self._primary())
+        negate = False
+        if self.peek() == ("keyword", "NOT") and self.peek(1) == ("keyword", "IN"):
+            self.pos += 1
+            negate = True
+        if self.accept("IN"):
+            self.expect("(")
+            options = [self._primary()]
+            while self.accept(","):
+                options.append(self._primary())
+            self.expect(")")
+            node = ("in", left, options)
+            return ("not", node) if negate else node
+        return left
+
+    def _primary(self) -> Tuple:
+        kind, value = self.take()
+        if kind == "op" and value == "(":
+            expr = self._expr()
+            self.expect(")")
+            return expr
+        if kind == "number":
+            return ("lit", float(value) if "." in value else int(value))
+        if kind == "string":
+            return ("lit", re.sub(r"\\(.)", r"\1", value[1:-1]))
+        if kind == "param":
+            return ("param", value)
+        if kind == "keyword" and value in ("TRUE", "FALSE", "NULL"):
+            return ("lit", {"TRUE": True, "FALSE": False, "NULL": None}[value])
+        if (kind == "name" or value in _AGGREGATES) and self.peek() == ("op", "("):
+            self.pos += 1
+            args = []
+            if not self.accept(")"):
+                args.append(self._expr())
+                while self.accept(","):
+                    args.append(self._expr())
+                self.expect(")")
+            return ("func", value.upper(), args)
+        if kind == "name":
+            path = [] if value == self.alias else [value]
+            while True:
+                if self.accept("."):
+                    path.append(self.take()[1])
+                elif self.accept("["):
+                    key_kind, key = self.take()
+                    path.append(key[1:-1] if key_kind == "string" else int(key))
+                    self.expect("]")
+                else:
+                    break
+            return ("path", path)
+        raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Unexpected {value!r}")
+
+
+def _resolve(item: Any, path: List[Any]) -> Any:
+    value = item
+    for part in path:
+        if isinstance(value, dict) and isinstance(part, str) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and isinstance(part, int) and -len(value) <= part < len(value):
+            value = value[part]
+        else:
+            return _UNDEFINED
+    return value
+
+
+def _eval(node: Tuple, item: Dict[str, Any], params: Dict[str, Any]) -> Any:
+    kind = node[0]
+    if kind == "lit":
+        return node[1]
+    if kind == "param":
+        return params.get(node[1], _UNDEFINED)
+    if kind == "path":
+        return _resolve(item, node[1])
+    if kind == "and":
+        return _truthy(_eval(node[1], item, params)) and _truthy(_eval(node[2], item, params))
+    if kind == "or":
+        return _truthy(_eval(node[1], item, params)) or _truthy(_eval(node[2], item, params))
+    if kind == "not":
+        value = _eval(node[1], item, params)
+        return _UNDEFINED if not isinstance(value, bool) else not value
+    if kind == "cmp":
+        return _compare(node[1], _eval(node[2], item, params), _eval(node[3], item, params))
+    if kind == "in":
+        value = _eval(node[1], item, params)
+        return any(_compare("=", value, _eval(option, item, params)) is True for option in node[2])
+    if kind == "func":
+        return _call(node[1], [_eval(arg, item, params) for arg in node[2]])
+    raise ValueError(f"Unknown node {kind}")
+
+
+def _compare(op: str, left: Any, right: Any) -> Any:
+    if left is _UNDEFINED or right is _UNDEFINED:
+        return _UNDEFINED
+    if op in ("=", "!="):
+        equal = type(left) is type(right) and left == right or (
+            _is_number(left) and _is_number(right) and left == right)
+        return equal if op == "=" else not equal
+    if not (_is_number(left) and _is_number(right)) and type(left) is not type(right):
+        return _UNDEFINED
+    try:
+        return {"<": left < right, ">": left > right, "<=": left <= right, ">=": left >= right}[op]
+    except TypeError:
+        return _UNDEFINED
+
+
+def _call(name: str, args: List[Any]) -> Any:
+    if name == "IS_DEFINED":
+        return args[0] is not _UNDEFINED
+    if name == "IS_NULL":
+        return args[0] is None
+    if any(arg is _UNDEFINED for arg in args):
+        return _UNDEFINED
+    if name == "ARRAY_CONTAINS":
+        return isinstance(args[0], list) and args[1] in args[0]
+    if name == "ARRAY_LENGTH":
+        return len(args[0]) if isinstance(args[0], list) else _UNDEFINED
+    if name in ("STARTSWITH", "ENDSWITH", "CONTAINS"):
+        if not (isinstance(args[0], str) and isinstance(args[1], str)):
+            return _UNDEFINED
+        text, needle = (args[0].lower(), args[1].lower()) if len(args) > 2 and args[2] is True else args[:2]
+        return {"STARTSWITH": text.startswith, "ENDSWITH": text.endswith, "CONTAINS": text.__contains__}[name](needle)
+    if name in ("LOWER", "UPPER"):
+        return args[0].lower() if name == "LOWER" else args[0].upper()
+    raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Unsupported function {name}")
+
+
+def _is_aggregate(node: Tuple) -> bool:
+    return node[0] == "func" and node[1] in _AGGREGATES
+
+
+def _aggregate(node: Tuple, rows: List[Dict[str, Any]], params: Dict[str, Any]) -> Any:
+    name, args = node[1], node[2]
+    values = [_eval(args[0], row, params) for row in rows] if args else [1] * len(rows)
+    values = [value for value in values if value is not _UNDEFINED]
+    if name == "COUNT":
+        return len(values)
+    numbers = [value for value in values if _is_number(value)]
+    if name == "SUM":
+        return sum(numbers)
+    if name == "AVG":
+        return sum(numbers) / len(numbers) if numbers else None
+    comparable = numbers or [value for value in values if isinstance(value, str)]
+    if not comparable:
+        return None
+    return min(comparable) if name == "MIN" else max(comparable)
+
+
+def _int_arg(value: Any, params: Dict[str, Any]) -> Optional[int]:
+    """OFFSET/LIMIT value: a number token or a @parameter"""
+    if value is None:
+        return None
+    return int(params[value]) if isinstance(value, str) and value.startswith("@") else int(value)
+
+
+def _truthy(value: Any) -> bool:
+    return value is True
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    """Cosmos type order: undefined, null, booleans, numbers, strings"""
+    if value is _UNDEFINED:
+        return (0, 0)
+    if value is None:
+        return (1, 0)
+    if isinstance(value, bool):
+        return (2, value)
+    if _is_number(value):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5, json.dumps(value, sort_keys=True))
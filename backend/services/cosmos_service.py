@@ -3,15 +3,34 @@ Azure Cosmos DB Service
 
 Manages singleton CosmosClient instance for database operations.
 Follows Microsoft best practices: https://learn.microsoft.com/en-us/azure/cosmos-db/best-practice-python
+
+Uses the async client (azure.cosmos.aio), so a Cosmos round trip never
+blocks the event loop. One client (and its aiohttp connection pool) is
+shared by every repository and service in the process.
+
+Local development:
+- COSMOS_EMULATOR=true (or a localhost endpoint) talks to the Cosmos
+  emulator, accepting its self-signed certificate
+- COSMOS_IN_MEMORY=true swaps in the in-memory stand-in from
+  services.cosmos_memory, no emulator or network needed
 """
 
+import asyncio
+import inspect
+import json
 import logging
+import math
+import os
+import re
+import threading
 import time
-from typing import Optional, Any
-from functools import lru_cache
+from typing import Optional, Any, AsyncIterator, Dict, List, Tuple
+from urllib.parse import urlparse
 
 try:
-    from azure.cosmos import CosmosClient, exceptions, PartitionKey
+    from azure.core import MatchConditions
+    from azure.cosmos import exceptions, PartitionKey
+    from azure.cosmos.aio import CosmosClient
     COSMOS_SDK_AVAILABLE = True
 except ImportError:
     COSMOS_SDK_AVAILABLE = False
@@ -20,13 +39,243 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+COSMOS_IN_MEMORY = os.getenv("COSMOS_IN_MEMORY", "false").lower() == "true"
+COSMOS_EMULATOR = os.getenv("COSMOS_EMULATOR", "false").lower() == "true"
+COSMOS_CONNECTION_LIMIT = int(os.getenv("COSMOS_CONNECTION_LIMIT", "100"))  # Pooled connections per process
+COSMOS_QUERY_PAGE_SIZE = int(os.getenv("COSMOS_QUERY_PAGE_SIZE", "100"))  # Items per query page
+COSMOS_MAX_PAGE_SIZE = int(os.getenv("COSMOS_MAX_PAGE_SIZE", "1000"))  # Largest page a list endpoint may ask for
+COSMOS_PATCH_MAX_RETRIES = int(os.getenv("COSMOS_PATCH_MAX_RETRIES", "5"))  # Retries after an ETag conflict
+
+# The service accepts at most this many operations in one patch request
+MAX_PATCH_OPERATIONS = 10
+
+
+# ===== Partial updates (patch) =====
+
+def patch_path(*keys: Any) -> str:
+    """JSON pointer for a (nested) property, e.g. patch_path("usage", "documents_uploaded")"""
+    return "/" + "/".join(str(key).replace("~", "~0").replace("/", "~1") for key in keys)
+
+
+def patch_op(op: str, path: str, value: Any = None) -> Dict[str, Any]:
+    """One patch operation: op is add, set, replace, remove or incr"""
+    operation = {"op": op, "path": path}
+    if op != "remove":
+        operation["value"] = value
+    return operation
+
+
+def set_operations(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """'set' operations for each top-level field of a partial update"""
+    return [patch_op("set", patch_path(key), value) for key, value in data.items()]
+
+
+class PatchStats:
+    """
+    Process-wide accounting of patch calls versus the read-then-replace they replace.
+    
+    bytes_saved counts the full document body a replace would have sent, less
+    the operations actually sent, plus the read response that is no longer
+    needed. ru_saved_estimate is the point read avoided (about 1 RU per KB);
+    a patch is billed like the replace it stands in for.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "patches": 0,
+            "operations": 0,
+            "round_trips_saved": 0,
+            "bytes_sent": 0,
+            "bytes_saved": 0,
+            "request_charge": 0.0,
+            "ru_saved_estimate": 0.0,
+            "precondition_retries": 0,
+            "replace_fallbacks": 0,
+        }
+    
+    def record_patch(self, operations: List[Dict[str, Any]], document: Dict[str, Any],
+                     request_charge: float, read_avoided: bool = True) -> Dict[str, Any]:
+        """Account one patch call and return its per-call report"""
+        sent = len(json.dumps(operations, default=str))
+        full = len(json.dumps(document, default=str)) if document else 0
+        saved = max(full - sent, 0) + (full if read_avoided else 0)
+        ru_saved = max(1.0, math.ceil(full / 1024)) if read_avoided else 0.0
+        with self._lock:
+            self._counters["patches"] += 1
+            self._counters["operations"] += len(operations)
+            self._counters["round_trips_saved"] += 1 if read_avoided else 0
+            self._counters["bytes_sent"] += sent
+            self._counters["bytes_saved"] += saved
+            self._counters["request_charge"] += request_charge
+            self._counters["ru_saved_estimate"] += ru_saved
+        return {
+            "operations": len(operations),
+            "bytes_sent": sent,
+            "bytes_saved": saved,
+            "request_charge": request_charge,
+            "ru_saved_estimate": ru_saved,
+        }
+    
+    def count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["request_charge"] = round(stats["request_charge"], 2)
+        stats["ru_saved_estimate"] = round(stats["ru_saved_estimate"], 2)
+        return stats
+
+
+_patch_stats = PatchStats()
+
+
+def get_patch_stats() -> PatchStats:
+    """Process-wide patch accounting (reported on /api/v1/metrics)"""
+    return _patch_stats
+
+
+def request_charge(response: Any) -> float:
+    """RU charge of the last response from a container call (0 when not reported)"""
+    get_headers = getattr(response, "get_response_headers", None)
+    try:
+        return float((get_headers() if get_headers else {}).get("x-ms-request-charge", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+async def patch_container_item(container: Any, item_id: str, partition_key: Any,
+                               operations: List[Dict[str, Any]], etag: Optional[str] = None,
+                               filter_predicate: Optional[str] = None,
+                               read_avoided: bool = True) -> Dict[str, Any]:
+    """
+    Patch one item in an async container and record the call in PatchStats.
+    
+    Args:
+        container: Async container (or in-memory stand-in)
+        item_id: Item ID
+        partition_key: Partition key value
+        operations: Patch operations (at most MAX_PATCH_OPERATIONS)
+        etag: Only apply if the item still has this ETag (If-Match)
+        filter_predicate: Only apply if the item matches, e.g. "FROM c WHERE c.status = 'PENDING'"
+        read_avoided: Whether the caller skipped a read to make this call (for accounting)
+        
+    Raises:
+        exceptions.CosmosAccessConditionFailedError: ETag or filter precondition failed (412)
+        exceptions.CosmosResourceNotFoundError: Item not found
+    """
+    options = {}
+    if etag:
+        options.update(etag=etag, match_condition=MatchConditions.IfNotModified)
+    if filter_predicate:
+        options["filter_predicate"] = filter_predicate
+    
+    response = await container.patch_item(
+        item=item_id,
+        partition_key=partition_key,
+        patch_operations=operations,
+        **options
+    )
+    report = _patch_stats.record_patch(operations, response, request_charge(response), read_avoided)
+    logger.debug(
+        f"Patched {item_id}: {report['operations']} ops, {report['bytes_sent']} bytes sent "
+        f"({report['bytes_saved']} saved), {report['request_charge']} RU "
+        f"(~{report['ru_saved_estimate']} RU saved)"
+    )
+    return response
+
+
+# ===== Paged queries =====
+
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def select_fields(fields: Optional[List[str]] = None, alias: str = "c",
+                  required: Tuple[str, ...] = ("id",)) -> str:
+    """
+    Projection for a SELECT: "*" without fields, else the required fields plus the requested ones.
+    
+    Raises:
+        ValueError: If a field name is not a plain property name
+    """
+    if not fields:
+        return "*"
+    names = list(dict.fromkeys([*required, *fields]))
+    invalid = [name for name in names if not _FIELD_NAME.match(name)]
+    if invalid:
+        raise ValueError(f"Invalid field name(s): {', '.join(invalid)}")
+    return ", ".join(f"{alias}.{name}" for name in names)
+
+
+def page_size(max_item_count: Optional[int] = None) -> int:
+    """Requested page size, clamped to 1..COSMOS_MAX_PAGE_SIZE (default COSMOS_QUERY_PAGE_SIZE)"""
+    return max(1, min(max_item_count or COSMOS_QUERY_PAGE_SIZE, COSMOS_MAX_PAGE_SIZE))
+
+
+async def query_page(container: Any, query: str, parameters: Optional[List[Dict[str, Any]]] = None,
+                     max_item_count: Optional[int] = None, continuation_token: Optional[str] = None,
+                     partition_key: Any = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of query results and the continuation token for the next page.
+    
+    Uses the service's native continuation tokens: a page costs one round
+    trip and the RUs of that page only, however deep into the results it is
+    (no OFFSET scans). The token is None after the last page. A page can hold
+    fewer than max_item_count items even when more follow.
+    
+    Works with async containers (azure.cosmos.aio, the in-memory stand-in)
+    and synchronous ones (run in a worker thread).
+    
+    Args:
+        container: Container to query
+        query: SQL query with @parameters
+        parameters: Query parameters
+        max_item_count: Items per page (clamped to COSMOS_MAX_PAGE_SIZE)
+        continuation_token: Token returned with the previous page
+        partition_key: Scope the query to one partition
+        
+    Raises:
+        ValueError: If the continuation token is not valid for this query
+    """
+    options = {"max_item_count": page_size(max_item_count)}
+    if partition_key is not None:
+        options["partition_key"] = partition_key
+    
+    try:
+        if inspect.iscoroutinefunction(container.read_item):
+            pages = container.query_items(query=query, parameters=parameters or None, **options).by_page(continuation_token)
+            try:
+                items = [item async for item in await pages.__anext__()]
+            except StopAsyncIteration:
+                items = []
+            return items, pages.continuation_token or None
+        
+        if partition_key is None:
+            options["enable_cross_partition_query"] = True
+        
+        def fetch() -> Tuple[List[Dict[str, Any]], Optional[str]]:
+            pages = container.query_items(query=query, parameters=parameters or None, **options).by_page(continuation_token)
+            items = list(next(pages, []))
+            return items, pages.continuation_token or None
+        
+        return await asyncio.to_thread(fetch)
+    
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid continuation token: {e}") from None
+    except exceptions.CosmosHttpResponseError as e:
+        if e.status_code == 400 and continuation_token:
+            raise ValueError(f"Invalid continuation token: {e.message}") from None
+        raise
+
 
 class CosmosService:
     """
     Manages Azure Cosmos DB connection and client.
     
     Features:
-    - Singleton pattern: single client per application lifetime
+    - Singleton pattern: single async client per application lifetime
     - Lazy initialization: client created on first use
     - Automatic retry configuration for transient failures
     - Proper cleanup on shutdown
@@ -44,25 +293,26 @@ class CosmosService:
     
     _instance: Optional['CosmosService'] = None
     
-    def __init__(self, endpoint: Optional[str] = None, key: Optional[str] = None):
+    def __init__(self, endpoint: Optional[str] = None, key: Optional[str] = None,
+                 client: Optional[Any] = None):
         """
         Initialize Cosmos service.
         
         Args:
             endpoint: Cosmos DB endpoint URL
             key: Cosmos DB primary key
+            client: Ready-made async client to use instead of creating one
+                (e.g. services.cosmos_memory.InMemoryCosmosClient in tests)
         """
-        if not COSMOS_SDK_AVAILABLE:
-            logger.warning("Azure Cosmos SDK not available")
-            self._client = None
-            self._is_initialized = False
-            return
-        
         self.endpoint = endpoint
         self.key = key
-        self._client = None
+        self._client = client
+        self._owns_client = client is None
         self._is_initialized = False
         self._database = None
+        
+        if not COSMOS_SDK_AVAILABLE:
+            logger.warning("Azure Cosmos SDK not available")
     
     async def initialize(self) -> None:
         """Initialize Cosmos DB client and verify connection."""
@@ -77,11 +327,11 @@ class CosmosService:
         try:
             logger.info("Initializing Cosmos DB connection...")
             
-            # Create client with retry configuration
-            self._client = CosmosClient(self.endpoint, self.key)
+            if self._client is None:
+                self._client = self._create_client()
             
-            # Verify connection by pinging service
-            await self._client.client_connection._get_connection_policy()
+            # Open the client's connection pool (reads the account's regions and settings)
+            await self._client.__aenter__()
             
             self._is_initialized = True
             logger.info("Cosmos DB connection initialized successfully")
@@ -90,12 +340,37 @@ class CosmosService:
             logger.error(f"Failed to initialize Cosmos DB: {e}")
             raise
     
+    def _create_client(self) -> Any:
+        """Create the process-wide async client (or the in-memory stand-in)."""
+        if COSMOS_IN_MEMORY:
+            from services.cosmos_memory import InMemoryCosmosClient
+            logger.info("Using in-memory Cosmos DB stand-in (COSMOS_IN_MEMORY)")
+            return InMemoryCosmosClient()
+        
+        import aiohttp
+        from azure.core.pipeline.transport import AioHttpTransport
+        
+        # One pooled aiohttp session shared by every request this client makes
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=COSMOS_CONNECTION_LIMIT),
+            cookie_jar=aiohttp.DummyCookieJar(),
+            auto_decompress=False
+        )
+        options = {"transport": AioHttpTransport(session=session, session_owner=True)}
+        
+        if COSMOS_EMULATOR or urlparse(self.endpoint or "").hostname in ("localhost", "127.0.0.1"):
+            # The emulator serves a self-signed certificate and has no other regions
+            logger.info("Connecting to the Cosmos DB emulator")
+            options.update(connection_verify=False, enable_endpoint_discovery=False)
+        
+        return CosmosClient(self.endpoint, self.key, **options)
+    
     def get_client(self) -> Optional[Any]:
         """
         Get Cosmos DB client instance.
         
         Returns:
-            CosmosClient instance or None if not initialized
+            Async CosmosClient instance or None if not initialized
         """
         if not self._is_initialized:
             logger.warning("Cosmos service not initialized. Call initialize() first.")
@@ -164,38 +439,29 @@ class CosmosService:
         
         try:
             database = self._client.get_database_client(database_id)
-            container = database.get_container_client(container_id)
-            # Test if container exists by trying to read properties
-            container.read()
-            logger.debug(f"Container already exists: {database_id}/{container_id}")
+            container_props = {
+                "id": container_id,
+                "partition_key": PartitionKey(path=partition_key)
+            }
+            if ttl:
+                container_props["default_ttl"] = ttl
+            
+            container = await database.create_container_if_not_exists(**container_props)
+            logger.debug(f"Container ready: {database_id}/{container_id}")
             return container
-        except exceptions.CosmosResourceNotFoundError:
-            # Container doesn't exist, create it
-            logger.info(f"Creating container: {database_id}/{container_id}")
-            try:
-                pk = PartitionKey(path=partition_key)
-                container_props = {
-                    "id": container_id,
-                    "partitionKey": pk
-                }
-                if ttl:
-                    container_props["defaultTtl"] = ttl
-                
-                database.create_container(**container_props)
-                container = database.get_container_client(container_id)
-                logger.info(f"Created container: {database_id}/{container_id}")
-                return container
-            except Exception as e:
-                logger.error(f"Failed to create container {database_id}/{container_id}: {e}")
-                raise
+        except Exception as e:
+            logger.error(f"Failed to create container {database_id}/{container_id}: {e}")
+            raise
     
-    async def create_item(self, container_name: str, item: dict) -> dict:
+    async def create_item(self, container_name: str, item: dict, partition_key: Optional[Any] = None) -> dict:
         """
         Create a new item in a container.
         
         Args:
             container_name: Container ID (e.g., 'conversions', 'documents', 'schemas')
             item: Dictionary containing the item to create (must include 'id' field)
+            partition_key: Accepted for symmetry with the other helpers; the
+                service reads the partition key from the item itself
             
         Returns:
             Raw Cosmos DB response (created item)
@@ -211,7 +477,7 @@ class CosmosService:
         try:
             start_time = time.time()
             container = self._client.get_database_client("KraftdDB").get_container_client(container_name)
-            response = container.create_item(body=item)
+            response = await container.create_item(body=item)
             duration_ms = (time.time() - start_time) * 1000
             
             logger.debug(f"Created item in {container_name}: {item.get('id', 'unknown')}")
@@ -262,7 +528,7 @@ class CosmosService:
         try:
             start_time = time.time()
             container = self._client.get_database_client("KraftdDB").get_container_client(container_name)
-            response = container.read_item(item=item_id, partition_key=partition_key)
+            response = await container.read_item(item=item_id, partition_key=partition_key)
             duration_ms = (time.time() - start_time) * 1000
             
             logger.debug(f"Read item from {container_name}: {item_id}")
@@ -290,7 +556,8 @@ class CosmosService:
             
             raise
     
-    async def replace_item(self, container_name: str, item_id: str, item: dict) -> dict:
+    async def replace_item(self, container_name: str, item_id: str, item: dict,
+                           partition_key: Optional[Any] = None) -> dict:
         """
         Replace an existing item in a container.
         
@@ -298,6 +565,7 @@ class CosmosService:
             container_name: Container ID
             item_id: Item's unique ID (should match item['id'])
             item: Complete item document (must include '_etag' for concurrency control)
+            partition_key: Accepted for symmetry; taken from the item by the service
             
         Returns:
             Raw Cosmos DB response (updated item)
@@ -313,7 +581,7 @@ class CosmosService:
         
         try:
             container = self._client.get_database_client("KraftdDB").get_container_client(container_name)
-            response = container.replace_item(item=item_id, body=item)
+            response = await container.replace_item(item=item_id, body=item)
             logger.debug(f"Replaced item in {container_name}: {item_id}")
             return response
         except exceptions.CosmosResourceNotFoundError:
@@ -323,7 +591,48 @@ class CosmosService:
             logger.error(f"Error replacing item in {container_name}: {e}")
             raise
     
-    async def query_items(self, container_name: str, query: str, parameters: Optional[list] = None) -> list:
+    async def patch_item(self, container_name: str, item_id: str, partition_key: Any,
+                         operations: List[Dict[str, Any]], etag: Optional[str] = None,
+                         filter_predicate: Optional[str] = None) -> dict:
+        """
+        Partially update an item with patch operations, in one round trip.
+        
+        Args:
+            container_name: Container ID
+            item_id: Item's unique ID
+            partition_key: Partition key value
+            operations: Patch operations, see patch_op() / set_operations()
+            etag: Only apply if the item still has this ETag
+            filter_predicate: Only apply if the item matches this predicate
+            
+        Returns:
+            Raw Cosmos DB response (patched item)
+            
+        Raises:
+            RuntimeError: If service not initialized
+            exceptions.CosmosResourceNotFoundError: If item not found
+            exceptions.CosmosAccessConditionFailedError: If a precondition failed
+        """
+        if not self._is_initialized or not self._client:
+            raise RuntimeError("Cosmos service not initialized")
+        
+        try:
+            container = self._client.get_database_client("KraftdDB").get_container_client(container_name)
+            response = await patch_container_item(
+                container, item_id, partition_key, operations,
+                etag=etag, filter_predicate=filter_predicate
+            )
+            logger.debug(f"Patched item in {container_name}: {item_id}")
+            return response
+        except exceptions.CosmosResourceNotFoundError:
+            logger.warning(f"Item not found for patch in {container_name}: {item_id}")
+            raise
+        except Exception as e:
+            logger.error(f"Error patching item in {container_name}: {e}")
+            raise
+    
+    async def query_items(self, container_name: str, query: str, parameters: Optional[list] = None,
+                          partition_key: Optional[Any] = None) -> list:
         """
         Query items from a container.
         
@@ -331,6 +640,7 @@ class CosmosService:
             container_name: Container ID
             query: SQL query string (e.g., "SELECT * FROM c WHERE c.user_email = @email")
             parameters: Optional list of parameter dicts (e.g., [{"name": "@email", "value": "user@example.com"}])
+            partition_key: Scope the query to one partition (None = cross-partition)
             
         Returns:
             List of items matching the query
@@ -345,24 +655,53 @@ class CosmosService:
         try:
             container = self._client.get_database_client("KraftdDB").get_container_client(container_name)
             
-            # Execute query with optional parameters
-            if parameters:
-                items = list(container.query_items(query=query, parameters=parameters))
-            else:
-                items = list(container.query_items(query=query))
+            # Execute query with optional parameters, reading result pages asynchronously
+            options = {"partition_key": partition_key} if partition_key is not None else {}
+            items = [
+                item async for item in container.query_items(query=query, parameters=parameters or None, **options)
+            ]
             
             logger.debug(f"Query on {container_name} returned {len(items)} items")
             return items
         except Exception as e:
             logger.error(f"Error querying items from {container_name}: {e}")
             raise
+    
+    async def iter_query_pages(self, container_name: str, query: str, parameters: Optional[list] = None,
+                               max_item_count: Optional[int] = None) -> AsyncIterator[List[dict]]:
+        """
+        Query items page by page without holding the whole result set.
+        
+        Args:
+            container_name: Container ID
+            query: SQL query string
+            parameters: Optional list of parameter dicts
+            max_item_count: Items per page (default COSMOS_QUERY_PAGE_SIZE)
+            
+        Yields:
+            Lists of items, one per result page
+        """
+        if not self._is_initialized or not self._client:
+            raise RuntimeError("Cosmos service not initialized")
+        
+        container = self._client.get_database_client("KraftdDB").get_container_client(container_name)
+        pages = container.query_items(
+            query=query,
+            parameters=parameters or None,
+            max_item_count=max_item_count or COSMOS_QUERY_PAGE_SIZE
+        ).by_page()
+        async for page in pages:
+            yield [item async for item in page]
 
     async def close(self) -> None:
         """Close Cosmos DB client connection."""
         if self._client:
             try:
-                self._client.close()
+                await self._client.close()
                 self._is_initialized = False
+                if self._owns_client:
+                    # A closed client's connection pool cannot be reopened
+                    self._client = None
                 logger.info("Cosmos DB connection closed")
             except Exception as e:
                 logger.error(f"Error closing Cosmos connection: {e}")
@@ -9,10 +9,10 @@ from fastapi import UploadFile
 from uuid import uuid4
 from datetime import datetime
 import logging
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 
 from services.cosmos_service import CosmosService
-from services.blob_service import get_blob_client, upload_file_to_blob, get_blob_uri
+from services.blob_service import upload_stream_to_blob
 
 logger = logging.getLogger(__name__)
 
@@ -51,15 +51,11 @@ class DocumentsService:
             document_id = str(uuid4())
             logger.info(f"Uploading document {document_id} for conversion {conversion_id}")
             
-            # Read file content
-            file_content = await file.read()
-            file_size = len(file_content)
-            
-            # Upload to Blob Storage
+            # Stream to Blob Storage (block by block, never the whole body in memory)
             blob_name = f"{conversion_id}/{document_id}/{file.filename}"
-            blob_uri = await self._upload_to_blob_storage(
+            blob_uri, file_size = await self._upload_to_blob_storage(
                 blob_name=blob_name,
-                content=file_content,
+                file=file,
                 content_type=file.content_type
             )
             logger.info(f"Document uploaded to blob: {blob_uri}")
@@ -120,32 +116,32 @@ class DocumentsService:
     async def _upload_to_blob_storage(
         self,
         blob_name: str,
-        content: bytes,
-        content_type: str
-    ) -> str:
+        file: UploadFile,
+        content_type: Optional[str]
+    ) -> Tuple[str, int]:
         """
-        Upload file content to Azure Blob Storage.
+        Stream an uploaded file to Azure Blob Storage.
         
         Args:
             blob_name: Blob path (e.g., "conversion-id/document-id/filename.pdf")
-            content: File content bytes
+            file: Uploaded file, read block by block
             content_type: MIME type
         
         Returns:
-            Full blob URI
+            (full blob URI, size in bytes)
         """
         try:
-            # Upload using blob_service helper
-            blob_uri = upload_file_to_blob(
+            # Parallel block upload on the shared async client
+            blob_uri, size = await upload_stream_to_blob(
                 container_name="documents",
                 blob_name=blob_name,
-                file_content=content,
-                content_type=content_type,
+                stream=file,
+                content_type=content_type or "application/octet-stream",
                 overwrite=True
             )
             
             logger.debug(f"Blob uploaded: {blob_uri}")
-            return blob_uri
+            return blob_uri, size
             
         except Exception as e:
             logger.error(f"Blob storage upload failed: {e}")
@@ -2,23 +2,226 @@
 Phase 7: Event Broadcasting Service
 
 Manages WebSocket connections and broadcasts events to subscribed clients.
+
+A broadcast serializes its event once (orjson when installed) and sends the
+same text frame to every matching subscriber. Subscribers are indexed per
+topic by the values their filters allow, so finding the recipients of an
+event is a few set operations instead of a filter check per client.
+
+Broadcasting never waits on a socket: each client owns a bounded outbound
+queue drained by its own writer task, so a slow or half-dead connection
+only delays itself. When a queue is full, the policy of the event's topic
+decides what gives: drop the oldest queued event, coalesce to the latest
+event per key (e.g. the latest price per item_id; with this policy a
+pending event for the same key is always replaced in place), or
+disconnect the client so it reconnects and resynchronizes.
+
+Clients of high-frequency topics (prices, trends, anomalies) can ask for a
+batch window when subscribing. Their events are then collected for that
+window, keeping only the latest per key where the topic coalesces, and
+sent as one frame holding an array of events.
+
+With several workers, attach an EventBus (services/event_bus.py): each
+broadcast is also published there, already serialized, and broadcasts
+from other workers are fanned out to this worker's clients.
 """
 
-from typing import Dict, List, Set, Optional, Any
+from typing import Callable, Dict, List, Set, Optional, Any, Tuple
 from fastapi import WebSocket
 import asyncio
-from datetime import datetime, timedelta, timezone
-from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from collections import defaultdict, deque
+from enum import Enum
+import json
 import logging
+import os
 import uuid
 
+from services.event_bus import EventBus
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+STREAM_SEND_QUEUE_SIZE = int(os.getenv("STREAM_SEND_QUEUE_SIZE", "256"))  # Events buffered per client
+STREAM_BATCH_WINDOW_MS = int(os.getenv("STREAM_BATCH_WINDOW_MS", "0"))  # Window when a client asks for none (0: unbatched)
+MIN_BATCH_WINDOW_MS = 50
+MAX_BATCH_WINDOW_MS = 5000
+MAX_BATCH_EVENTS = 500  # A batch is sent early once this full
+
+# Topics whose subscribers may negotiate a batch window
+BATCHABLE_TOPICS = frozenset({"prices", "trends", "anomalies"})
+
+
+class OverflowPolicy(str, Enum):
+    """What happens when an event arrives for a client whose send queue is full"""
+    DROP_OLDEST = "drop_oldest"
+    COALESCE_LATEST = "coalesce_latest"
+    DISCONNECT = "disconnect"
+
+
+@dataclass(frozen=True)
+class TopicPolicy:
+    """Overflow policy of a topic; `key` is the event field coalesced on"""
+    policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST
+    key: Optional[str] = None
+
+
+DEFAULT_TOPIC_POLICY = TopicPolicy()
+DEFAULT_TOPIC_POLICIES: Dict[str, TopicPolicy] = {
+    # Only the latest price / trend of an item matters to a client that is behind
+    "prices": TopicPolicy(OverflowPolicy.COALESCE_LATEST, "item_id"),
+    "trends": TopicPolicy(OverflowPolicy.COALESCE_LATEST, "item_id"),
+    # Alerts must not be lost silently: a client that cannot keep up reconnects
+    "alerts": TopicPolicy(OverflowPolicy.DISCONNECT),
+}
+
+
+class Delivery(str, Enum):
+    """Outcome of queueing an event for one client"""
+    QUEUED = "queued"
+    BATCHED = "batched"  # Added to the client's pending batch for the topic
+    COALESCED = "coalesced"  # Replaced a pending event with the same key
+    DROPPED_OLDEST = "dropped_oldest"  # Queued, after dropping the oldest pending event
+    OVERFLOW = "overflow"  # Queue full under the disconnect policy; the client is being closed
+
+
+class _Outbound:
+    __slots__ = ("topic", "key", "payload")
+
+    def __init__(self, topic: Optional[str], key: Any, payload: str):
+        self.topic = topic
+        self.key = key
+        self.payload = payload
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def serialize_event(event: dict) -> str:
+    """Serialize an event to JSON text once, for sending to any number of clients"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(event, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(event, default=_json_default, separators=(",", ":"), ensure_ascii=False)
+
+
+def serialize_batch(topic: str, payloads: List[str]) -> str:
+    """Build a batch frame from serialized events, without serializing them again"""
+    return f'{{"type":"batch","topic":{json.dumps(topic)},"count":{len(payloads)},"events":[{",".join(payloads)}]}}'
+
+
+def deserialize_event(payload: str) -> dict:
+    """Parse an event serialized by serialize_event"""
+    return orjson.loads(payload) if ORJSON_AVAILABLE else json.loads(payload)
+
+
+def _index_value(value: Any) -> Any:
+    # Enum members compare equal to their value (str enums) but hash by name
+    return value.value if isinstance(value, Enum) else value
+
+
+class TopicFilterIndex:
+    """
+    Subscribers of one topic, indexed by the values their filters allow.
+    
+    Matches exactly like EventBroadcasterService._matches_filters: for every
+    filter key present in the event, the event value must be one of the
+    allowed values; keys missing from the event are ignored.
+    """
+    
+    def __init__(self):
+        self.subscribers: Set[str] = set()
+        self.filters: Dict[str, Dict[str, list]] = {}  # client_id -> {key: allowed values}
+        self.filtering: Dict[str, Set[str]] = defaultdict(set)  # key -> clients filtering on it
+        self.allowed: Dict[str, Dict[Any, Set[str]]] = defaultdict(lambda: defaultdict(set))  # key -> value -> clients
+        self.unhashable: Dict[str, Dict[str, list]] = defaultdict(dict)  # key -> client_id -> allowed values
+    
+    def add(self, client_id: str, filters: Optional[Dict[str, Any]]) -> None:
+        """Add (or re-add with new filters) a subscriber"""
+        self.remove(client_id)
+        normalized = {
+            key: list(values) if isinstance(values, (list, set)) else [values]
+            for key, values in (filters or {}).items()
+        }
+        for key, values in normalized.items():
+            self.filtering[key].add(client_id)
+            try:
+                indexed = {_index_value(value) for value in values}
+            except TypeError:
+                self.unhashable[key][client_id] = values
+                continue
+            for value in indexed:
+                self.allowed[key][value].add(client_id)
+        self.filters[client_id] = normalized
+        self.subscribers.add(client_id)
+    
+    def remove(self, client_id: str) -> None:
+        """Remove a subscriber (no-op if absent)"""
+        self.subscribers.discard(client_id)
+        for key, values in self.filters.pop(client_id, {}).items():
+            self.filtering[key].discard(client_id)
+            if not self.filtering[key]:
+                del self.filtering[key]
+                self.allowed.pop(key, None)
+                self.unhashable.pop(key, None)
+                continue
+            if self.unhashable[key].pop(client_id, None) is not None:
+                continue
+            by_value = self.allowed[key]
+            for value in {_index_value(value) for value in values}:
+                by_value[value].discard(client_id)
+                if not by_value[value]:
+                    del by_value[value]
+    
+    def _accepting(self, key: str, value: Any) -> Set[str]:
+        """Clients filtering on `key` that allow `value`"""
+        try:
+            accepting = self.allowed[key].get(_index_value(value), set())
+        except TypeError:
+            accepting = set()
+        if self.unhashable.get(key):
+            accepting = accepting | {
+                client_id for client_id, values in self.unhashable[key].items() if value in values
+            }
+        return accepting
+    
+    def match(self, event: dict) -> Set[str]:
+        """Subscribers whose filters accept the event (a new set)"""
+        matched = self.subscribers
+        for key, filtering in self.filtering.items():
+            if key not in event:
+                continue
+            accepting = self._accepting(key, event[key])
+            # Clients without a filter on this key pass it as well
+            passing = accepting if len(filtering) == len(self.subscribers) else (self.subscribers - filtering) | accepting
+            matched = passing if matched is self.subscribers else matched & passing
+            if not matched:
+                break
+        return set(matched) if matched is self.subscribers else matched
+
 
 class ClientConnection:
     """Represents a connected WebSocket client with subscriptions and metadata"""
     
-    def __init__(self, client_id: str, websocket: WebSocket, user_id: str):
+    def __init__(
+        self,
+        client_id: str,
+        websocket: WebSocket,
+        user_id: str,
+        queue_size: int = STREAM_SEND_QUEUE_SIZE,
+        on_send_error: Optional[Callable[["ClientConnection"], None]] = None
+    ):
         self.client_id = client_id
         self.websocket = websocket
         self.user_id = user_id
@@ -29,6 +232,161 @@ class ClientConnection:
         self.messages_received = 0
         self.messages_sent = 0
         self.errors = 0
+        
+        # Outbound queue, drained by the writer task
+        self.queue_size = queue_size
+        self.messages_dropped = 0
+        self.messages_coalesced = 0
+        self.max_queue_depth = 0
+        self.overflowed = False
+        self._queue: deque = deque()
+        self._pending: Dict[Tuple[Optional[str], Any], _Outbound] = {}  # (topic, key) -> queued event
+        self._ready = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._writer: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+        self._on_send_error = on_send_error
+        
+        # Batching: topic -> window (ms), pending events (key -> payload) and flush timer
+        self.batch_windows: Dict[str, int] = {}
+        self.batches_sent = 0
+        self._batches: Dict[str, Dict[Any, str]] = {}
+        self._batch_timers: Dict[str, asyncio.TimerHandle] = {}
+    
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+    
+    def enqueue(self, payload: str, topic: Optional[str] = None,
+                policy: TopicPolicy = DEFAULT_TOPIC_POLICY, key: Any = None) -> Delivery:
+        """
+        Queue a serialized event for the writer task (never waits)
+        
+        On a topic with a batch window the event joins the pending batch
+        instead, replacing the pending event with the same key if the
+        topic coalesces.
+        
+        Args:
+            payload: Serialized event (see serialize_event)
+            topic: Topic the event was broadcast on
+            policy: Overflow policy of the topic
+            key: Coalescing key value (e.g. the item_id), for COALESCE_LATEST
+        
+        Returns:
+            What happened to the event (and to the queue)
+        """
+        if self.overflowed:
+            return Delivery.OVERFLOW
+        window = self.batch_windows.get(topic)
+        if window:
+            return self._add_to_batch(payload, topic, policy, key, window)
+        return self._push(payload, topic, policy, key)
+    
+    def _push(self, payload: str, topic: Optional[str], policy: TopicPolicy, key: Any) -> Delivery:
+        coalescing = policy.policy is OverflowPolicy.COALESCE_LATEST and key is not None
+        if coalescing:
+            pending = self._pending.get((topic, key))
+            if pending is not None:
+                pending.payload = payload
+                self.messages_coalesced += 1
+                return Delivery.COALESCED
+        
+        delivery = Delivery.QUEUED
+        if len(self._queue) >= self.queue_size:
+            if policy.policy is OverflowPolicy.DISCONNECT:
+                logger.warning(f"Send queue of {self.client_id} overflowed on '{topic}'; disconnecting")
+                self.overflowed = True
+                self._queue.clear()
+                self._pending.clear()
+                # The writer may be stuck on a dead socket: interrupt it and close from a separate task
+                self.stop()
+                self._closer = asyncio.create_task(self.close(code=1013, reason="Send queue overflow"))
+                return Delivery.OVERFLOW
+            self._forget(self._queue.popleft())
+            self.messages_dropped += 1
+            delivery = Delivery.DROPPED_OLDEST
+        
+        entry = _Outbound(topic, key if coalescing else None, payload)
+        self._queue.append(entry)
+        if coalescing:
+            self._pending[(topic, key)] = entry
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write())
+        self._ready.set()
+        return delivery
+    
+    def _add_to_batch(self, payload: str, topic: str, policy: TopicPolicy, key: Any, window: int) -> Delivery:
+        batch = self._batches.setdefault(topic, {})
+        if policy.policy is OverflowPolicy.COALESCE_LATEST and key is not None:
+            if key in batch:
+                batch[key] = payload
+                self.messages_coalesced += 1
+                return Delivery.COALESCED
+        else:
+            key = object()  # Kept as a separate event
+        batch[key] = payload
+        if len(batch) >= MAX_BATCH_EVENTS:
+            self.flush_batch(topic)
+        elif topic not in self._batch_timers:
+            self._batch_timers[topic] = asyncio.get_running_loop().call_later(
+                window / 1000, self.flush_batch, topic
+            )
+        return Delivery.BATCHED
+    
+    def flush_batch(self, topic: str) -> None:
+        """Queue the pending batch of a topic as one frame"""
+        timer = self._batch_timers.pop(topic, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(topic, None)
+        if not batch or self.overflowed:
+            return
+        self.batches_sent += 1
+        self._push(serialize_batch(topic, list(batch.values())), topic, DEFAULT_TOPIC_POLICY, None)
+    
+    def set_batch_window(self, topic: str, window_ms: int) -> None:
+        """Batch events of a topic every `window_ms` (0: send each event on its own)"""
+        if window_ms:
+            self.batch_windows[topic] = window_ms
+        else:
+            self.batch_windows.pop(topic, None)
+            self.flush_batch(topic)
+    
+    def discard_batch(self, topic: str) -> None:
+        """Drop the pending batch of a topic (e.g. on unsubscribe)"""
+        timer = self._batch_timers.pop(topic, None)
+        if timer is not None:
+            timer.cancel()
+        self._batches.pop(topic, None)
+        self.batch_windows.pop(topic, None)
+    
+    def _forget(self, entry: _Outbound) -> None:
+        if entry.key is not None and self._pending.get((entry.topic, entry.key)) is entry:
+            del self._pending[(entry.topic, entry.key)]
+    
+    async def _write(self) -> None:
+        """Writer task: send queued events in order until a send fails"""
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            entry = self._queue.popleft()
+            self._forget(entry)
+            if not await self.send_serialized(entry.payload):
+                self._queue.clear()
+                self._pending.clear()
+                if self._on_send_error:
+                    self._on_send_error(self)
+                return
+    
+    def stop(self) -> None:
+        """Stop the writer task; events still queued or batched are discarded"""
+        for topic in list(self._batch_timers):
+            self.discard_batch(topic)
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
     
     async def send_event(self, event: dict) -> bool:
         """
@@ -38,7 +396,26 @@ class ClientConnection:
             True if sent successfully, False if disconnected
         """
         try:
-            await self.websocket.send_json(event)
+            async with self._send_lock:
+                await self.websocket.send_json(event)
+            self.messages_sent += 1
+            self.last_activity = datetime.now(tz=timezone.utc)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to send to {self.client_id}: {e}")
+            self.errors += 1
+            return False
+    
+    async def send_serialized(self, payload: str) -> bool:
+        """
+        Send an already serialized event (see serialize_event) as a text frame
+        
+        Returns:
+            True if sent successfully, False if disconnected
+        """
+        try:
+            async with self._send_lock:
+                await self.websocket.send_text(payload)
             self.messages_sent += 1
             self.last_activity = datetime.now(tz=timezone.utc)
             return True
@@ -63,10 +440,10 @@ class ClientConnection:
             logger.debug(f"Client {self.client_id} disconnected or sent invalid data: {e}")
             return None
     
-    async def close(self):
+    async def close(self, code: int = 1000, reason: Optional[str] = None):
         """Close WebSocket connection"""
         try:
-            await self.websocket.close()
+            await self.websocket.close(code=code, reason=reason)
         except Exception as e:
             logger.debug(f"Error closing connection {self.client_id}: {e}")
     
@@ -85,7 +462,16 @@ class ClientConnection:
             "messages_received": self.messages_received,
             "messages_sent": self.messages_sent,
             "errors": self.errors,
-            "subscribed_topics": list(self.subscribed_topics)
+            "subscribed_topics": list(self.subscribed_topics),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_size": self.queue_size,
+            "messages_dropped": self.messages_dropped,
+            "messages_coalesced": self.messages_coalesced,
+            "overflowed": self.overflowed,
+            "batch_windows_ms": dict(self.batch_windows),
+            "batches_sent": self.batches_sent,
+            "batched_pending": sum(len(batch) for batch in self._batches.values())
         }
 
 
@@ -101,13 +487,33 @@ class EventBroadcasterService:
     - Supports selective delivery based on filters
     """
     
-    def __init__(self, max_concurrent_connections: int = 1000):
+    def __init__(
+        self,
+        max_concurrent_connections: int = 1000,
+        send_queue_size: int = STREAM_SEND_QUEUE_SIZE,
+        topic_policies: Optional[Dict[str, TopicPolicy]] = None,
+        default_batch_window_ms: int = STREAM_BATCH_WINDOW_MS
+    ):
         self.clients: Dict[str, ClientConnection] = {}
         self.topic_subscriptions: Dict[str, Set[str]] = defaultdict(set)
         # topic -> Set[client_ids]
+        self.topic_indexes: Dict[str, TopicFilterIndex] = defaultdict(TopicFilterIndex)
+        # topic -> subscribers indexed by filter values
         self.max_concurrent_connections = max_concurrent_connections
+        self.send_queue_size = send_queue_size
+        self.topic_policies: Dict[str, TopicPolicy] = dict(
+            DEFAULT_TOPIC_POLICIES if topic_policies is None else topic_policies
+        )
+        self.default_batch_window_ms = default_batch_window_ms
+        self.bus: Optional[EventBus] = None  # Cross-worker pub/sub (see attach_bus)
         
         # Statistics
+        self.total_messages_queued = 0
+        self.total_messages_dropped = 0
+        self.total_messages_coalesced = 0
+        self.total_messages_batched = 0
+        self.total_batches_sent = 0
+        self.total_overflow_disconnects = 0
         self.total_messages_sent = 0
         self.total_messages_received = 0
         self.total_errors = 0
@@ -132,7 +538,9 @@ class EventBroadcasterService:
             return None
         
         client_id = f"client-{uuid.uuid4()}"
-        client = ClientConnection(client_id, websocket, user_id)
+        client = ClientConnection(
+            client_id, websocket, user_id, queue_size=self.send_queue_size, on_send_error=self._on_send_error
+        )
         self.clients[client_id] = client
         logger.info(
             f"Client {client_id} (user: {user_id}) registered. "
@@ -155,7 +563,11 @@ class EventBroadcasterService:
         # Remove from all topic subscriptions
         for topic in list(client.subscribed_topics):
             self.topic_subscriptions[topic].discard(client_id)
+            self.topic_indexes[topic].remove(client_id)
         
+        client.stop()
+        self.total_messages_sent += client.messages_sent
+        self.total_batches_sent += client.batches_sent
         del self.clients[client_id]
         logger.info(f"Client {client_id} unregistered. Total: {len(self.clients)}")
         return True
@@ -164,7 +576,8 @@ class EventBroadcasterService:
         self,
         client_id: str,
         topic: str,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        batch_window_ms: Optional[int] = None
     ) -> bool:
         """
         Subscribe client to a topic with optional filters
@@ -173,6 +586,8 @@ class EventBroadcasterService:
             client_id: Client ID
             topic: Topic name (e.g., "alerts", "prices", "signals")
             filters: Optional dict of filters (e.g., {"risk_level": ["CRITICAL"]})
+            batch_window_ms: Requested batch window (see negotiate_batch_window);
+                the window granted is in client.batch_windows
         
         Returns:
             True if successful, False if client not found
@@ -185,6 +600,8 @@ class EventBroadcasterService:
         client.subscribed_topics.add(topic)
         client.filters[topic] = filters or {}
         self.topic_subscriptions[topic].add(client_id)
+        self.topic_indexes[topic].add(client_id, filters)
+        client.set_batch_window(topic, self.negotiate_batch_window(topic, batch_window_ms))
         
         logger.info(
             f"Client {client_id} subscribed to topic '{topic}' "
@@ -192,6 +609,55 @@ class EventBroadcasterService:
         )
         return True
     
+    def negotiate_batch_window(self, topic: str, requested_ms: Optional[int] = None) -> int:
+        """
+        Batch window granted for a subscription
+        
+        Args:
+            topic: Topic subscribed to; only BATCHABLE_TOPICS are batched
+            requested_ms: Window asked for (None: the server default, 0: unbatched)
+        
+        Returns:
+            Window in ms, clamped to [MIN_BATCH_WINDOW_MS, MAX_BATCH_WINDOW_MS], or 0 for unbatched
+        """
+        if topic not in BATCHABLE_TOPICS:
+            return 0
+        window = self.default_batch_window_ms if requested_ms is None else requested_ms
+        if window <= 0:
+            return 0
+        return min(max(window, MIN_BATCH_WINDOW_MS), MAX_BATCH_WINDOW_MS)
+    
+    def attach_bus(self, bus: EventBus) -> None:
+        """
+        Share broadcasts with the other workers through an event bus
+        
+        Every broadcast is published on the bus, and events published by
+        other workers are delivered to this worker's subscribers. Start the
+        bus (bus.start()) once everything using it is attached.
+        """
+        self.bus = bus
+        bus.subscribe("topic", self._on_bus_event)
+    
+    def set_topic_policy(self, topic: str, policy: OverflowPolicy, key: Optional[str] = None) -> None:
+        """
+        Set what happens when a client's send queue is full for events of a topic
+        
+        Args:
+            topic: Topic name
+            policy: Overflow policy
+            key: Event field to coalesce on (required for COALESCE_LATEST)
+        """
+        policy = OverflowPolicy(policy)
+        if policy is OverflowPolicy.COALESCE_LATEST and not key:
+            raise ValueError("COALESCE_LATEST needs the event field to coalesce on")
+        self.topic_policies[topic] = TopicPolicy(policy, key)
+    
+    def _on_send_error(self, client: ClientConnection) -> None:
+        """A writer task failed to send: the socket is gone"""
+        self.total_errors += 1
+        self.last_minute_errors += 1
+        self.unregister_client(client.client_id)
+    
     def unsubscribe(self, client_id: str, topic: Optional[str] = None) -> bool:
         """
         Unsubscribe client from a topic (or all topics if not specified)
@@ -206,12 +672,16 @@ class EventBroadcasterService:
         
         if topic:
             client.subscribed_topics.discard(topic)
+            client.discard_batch(topic)
             self.topic_subscriptions[topic].discard(client_id)
+            self.topic_indexes[topic].remove(client_id)
             logger.info(f"Client {client_id} unsubscribed from topic '{topic}'")
         else:
             # Unsubscribe from all topics
             for t in list(client.subscribed_topics):
+                client.discard_batch(t)
                 self.topic_subscriptions[t].discard(client_id)
+                self.topic_indexes[t].remove(client_id)
             client.subscribed_topics.clear()
             logger.info(f"Client {client_id} unsubscribed from all topics")
         
@@ -254,75 +724,101 @@ class EventBroadcasterService:
         """
         Broadcast event to all subscribed clients matching filters
         
+        The event is serialized once and queued for every recipient; their
+        writer tasks do the sending, so this never waits on a socket. A
+        recipient whose queue overflows under the disconnect policy is
+        unregistered (its writer closes the connection).
+        
+        With an event bus attached, the same serialized event is also
+        published for the other workers to deliver to their clients.
+        
         Args:
             event: Event data (dict or can convert Pydantic model)
             topic: Topic to broadcast to (e.g., "alerts", "prices")
             exclude_client: Optional client ID to exclude from broadcast
         
         Returns:
-            Number of clients successfully sent to
+            Number of clients of this worker the event was queued for
         """
         
         # Convert Pydantic models to dict
         if hasattr(event, 'dict'):
             event = event.dict()
         
-        # Get subscribed clients
-        client_ids = list(self.topic_subscriptions.get(topic, set()))
-        
-        if not client_ids:
+        payload = None
+        if self.bus is not None:
+            payload = serialize_event(event)
+            self.bus.publish(f"topic:{topic}", payload)
+        return await self._fan_out(event, topic, payload, exclude_client)
+    
+    async def _on_bus_event(self, topic: str, payload: str) -> None:
+        """An event broadcast by another worker: deliver it to this worker's clients"""
+        await self._fan_out(deserialize_event(payload), topic, payload)
+    
+    async def _fan_out(
+        self,
+        event: dict,
+        topic: str,
+        payload: Optional[str] = None,
+        exclude_client: Optional[str] = None
+    ) -> int:
+        """Queue an event for this worker's matching subscribers (serializing it if not done yet)"""
+        index = self.topic_indexes.get(topic)
+        if index is None or not index.subscribers:
             logger.debug(f"No subscribers for topic '{topic}'")
             return 0
         
-        # Filter out excluded client and invalid clients
-        client_ids = [
-            cid for cid in client_ids
-            if cid in self.clients and cid != exclude_client
-        ]
-        
-        # Send to all matching clients in parallel
-        tasks = []
-        valid_clients = []
+        # Subscribers whose filters accept the event
+        client_ids = index.match(event)
+        client_ids.discard(exclude_client)
+        valid_clients = [self.clients[cid] for cid in client_ids if cid in self.clients]
         
-        for client_id in client_ids:
-            client = self.clients[client_id]
-            
-            # Apply filters
-            if not self._matches_filters(event, client.filters.get(topic, {})):
-                continue
-            
-            valid_clients.append(client_id)
-            tasks.append(client.send_event(event))
-        
-        if not tasks:
+        if not valid_clients:
             logger.debug(
                 f"No clients matched filters for topic '{topic}' "
-                f"(subscribed: {len(client_ids)})"
+                f"(subscribed: {len(index.subscribers)})"
             )
             return 0
         
-        # Execute sends in parallel
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Count successes
-        successful = sum(1 for r in results if r is True)
-        self.total_messages_sent += successful
-        
-        # Track errors
-        failed = len([r for r in results if r is False])
-        if failed > 0:
-            self.total_errors += failed
-            self.last_minute_errors += failed
+        payload = payload or serialize_event(event)
+        policy = self.topic_policies.get(topic, DEFAULT_TOPIC_POLICY)
+        key = event.get(policy.key) if policy.key else None
+        if key is not None and not isinstance(key, (str, int, float, bool)):
+            key = str(key)
+        
+        queued = 0
+        overflowed = []
+        for client in valid_clients:
+            delivery = client.enqueue(payload, topic, policy, key)
+            if delivery is Delivery.OVERFLOW:
+                overflowed.append(client)
+                continue
+            queued += 1
+            if delivery is Delivery.BATCHED:
+                self.total_messages_batched += 1
+            elif delivery is Delivery.COALESCED:
+                self.total_messages_coalesced += 1
+            elif delivery is Delivery.DROPPED_OLDEST:
+                self.total_messages_dropped += 1
+        self.total_messages_queued += queued
+        
+        for client in overflowed:
+            self.total_overflow_disconnects += 1
+            self.unregister_client(client.client_id)
+        if overflowed:
             logger.warning(
-                f"Failed to send to {failed}/{len(valid_clients)} clients "
-                f"for topic '{topic}'"
+                f"Disconnected {len(overflowed)}/{len(valid_clients)} clients "
+                f"with full send queues on topic '{topic}'"
             )
         
+        # Let writers that are idle pick the event up right away
+        await asyncio.sleep(0)
+        
         logger.debug(
-            f"Sent event to {successful}/{len(valid_clients)} subscribers "
+            f"Queued event for {queued}/{len(valid_clients)} subscribers "
             f"on topic '{topic}'"
         )
-        return successful
+        return queued
     
     async def cleanup_inactive_clients(self, timeout_seconds: int = 120) -> int:
         """
@@ -360,10 +856,36 @@ class EventBroadcasterService:
     
     def get_stats(self) -> dict:
         """Get server statistics"""
+        depths = [client.queue_depth for client in self.clients.values()]
         return {
             "active_connections": len(self.clients),
             "total_topics": len(self.topic_subscriptions),
-            "messages_sent_total": self.total_messages_sent,
+            "messages_sent_total": self.total_messages_sent + sum(
+                client.messages_sent for client in self.clients.values()
+            ),
+            "messages_queued_total": self.total_messages_queued,
+            "messages_dropped_total": self.total_messages_dropped,
+            "messages_coalesced_total": self.total_messages_coalesced,
+            "overflow_disconnects_total": self.total_overflow_disconnects,
+            "send_queues": {
+                "queue_size": self.send_queue_size,
+                "queued": sum(depths),
+                "max_depth": max(depths, default=0),
+                "clients_backlogged": sum(1 for depth in depths if depth)
+            },
+            "batching": {
+                "default_window_ms": self.default_batch_window_ms,
+                "clients_batching": sum(1 for client in self.clients.values() if client.batch_windows),
+                "messages_batched_total": self.total_messages_batched,
+                "batches_sent_total": self.total_batches_sent + sum(
+                    client.batches_sent for client in self.clients.values()
+                )
+            },
+            "pubsub": self.bus.stats() if self.bus is not None else None,
+            "overflow_policies": {
+                topic: policy.policy.value + (f":{policy.key}" if policy.key else "")
+                for topic, policy in self.topic_policies.items()
+            },
             "messages_received_total": self.total_messages_received,
             "errors_total": self.total_errors,
             "errors_last_minute": self.last_minute_errors,
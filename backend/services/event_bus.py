@@ -0,0 +1,380 @@
+"""
+Streaming Pub/Sub
+
+With several API worker processes (SERVER_WORKERS), a WebSocket client is
+connected to one of them while prices may be ingested on any. The event
+bus connects the workers: EventBroadcasterService publishes every
+broadcast on it, and each worker subscribes once and fans what it
+receives out to its own clients (see EventBroadcasterService.attach_bus).
+SignalsBroadcasterBridge replicates ingested price points the same way,
+so every worker's price history stays complete. No sticky sessions are
+needed.
+
+Messages are serialized once by the publisher and sent as-is: a batch
+is one bus message holding an origin line and then one
+"<channel>\\t<payload>" line per message (JSON payloads never contain raw
+newlines; tabs, newlines and "%" in channels are %-escaped, since names
+such as item ids come from clients). Publishing only appends to the
+batch; it is flushed when full or after `batch_interval` seconds. A
+message that would not fit in a batch of the transport is rejected
+(counted in `oversized`) rather than sent cut off. A worker ignores its own batches,
+since it has already delivered those messages locally.
+
+Buses:
+- MemoryEventBus: in-process; connects the buses sharing a hub (default:
+  nothing else, as a single worker needs nothing more)
+- RedisEventBus: Redis PUBLISH/SUBSCRIBE on one channel (redis-py
+  asyncio, optional); shared across hosts
+- SocketEventBus: Unix datagram sockets in a shared directory; the
+  workers of one host, no server needed
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import unquote
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, str], Awaitable[None]]  # (channel suffix, payload)
+
+DEFAULT_BATCH_SIZE = 256  # Messages per batch
+DEFAULT_BATCH_INTERVAL = 0.005  # Seconds a message may wait for its batch to fill
+
+_CHANNEL_ESCAPES = str.maketrans({"%": "%25", "\t": "%09", "\n": "%0A", "\r": "%0D"})
+
+
+def escape_channel(channel: str) -> str:
+    """Channel with the characters of the line framing %-escaped (undone by urllib.parse.unquote)"""
+    return channel.translate(_CHANNEL_ESCAPES)
+
+
+class EventBus(ABC):
+    """
+    Batched publish/subscribe between worker processes.
+
+    Channels are "<kind>:<name>" (e.g. "topic:prices"); `subscribe(kind, handler)`
+    receives every message of that kind published by another worker.
+    """
+
+    # Largest batch a transport accepts in one message (None: no limit)
+    max_batch_bytes: Optional[int] = None
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, batch_interval: float = DEFAULT_BATCH_INTERVAL):
+        self.origin = uuid.uuid4().hex
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._buffer: List[bytes] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.messages_published = 0
+        self.batches_sent = 0
+        self.messages_received = 0
+        self.batches_received = 0
+        self.oversized = 0
+        self.errors = 0
+
+    def subscribe(self, kind: str, handler: Handler) -> None:
+        """Call `handler(name, payload)` for each message on a "<kind>:<name>" channel from another worker"""
+        self._handlers[kind].append(handler)
+
+    async def start(self) -> None:
+        """Connect and start receiving"""
+
+    def publish(self, channel: str, payload: str) -> None:
+        """
+        Queue a serialized message for the next batch (never waits).
+
+        Args:
+            channel: "<kind>:<name>" (escaped for the framing, so any name)
+            payload: Serialized message without raw newlines (e.g. from serialize_event)
+
+        Raises:
+            ValueError: payload contains a raw newline
+        """
+        if "\n" in payload or "\r" in payload:
+            raise ValueError(f"Event bus payload for '{channel}' contains a raw newline")
+        line = f"{escape_channel(channel)}\t{payload}".encode()
+        if self.max_batch_bytes and len(self.origin) + 1 + len(line) > self.max_batch_bytes:
+            # The transport would cut it off: the other workers miss it, visibly
+            self.oversized += 1
+            logger.warning(
+                f"Event bus message on '{channel}' not published: {len(line)} bytes, "
+                f"over the {self.max_batch_bytes}-byte batch limit of {type(self).__name__}"
+            )
+            return
+        self._buffer.append(line)
+        self.messages_published += 1
+        if len(self._buffer) >= self.batch_size:
+            self._spawn(self.flush())
+        elif self._flush_timer is None or self._flush_timer.done():
+            self._flush_timer = self._spawn(self._flush_later())
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_interval)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Send everything published so far (batches go out in publish order)"""
+        async with self._flush_lock:
+            lines, self._buffer = self._buffer, []
+            for batch in self._batches(lines):
+                try:
+                    await self._send(batch)
+                    self.batches_sent += 1
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Event bus publish failed ({type(self).__name__}): {e}")
+
+    def _batches(self, lines: List[bytes]):
+        header = self.origin.encode()
+        batch, size = [header], len(header)
+        for encoded in lines:
+            if self.max_batch_bytes and len(batch) > 1 and size + 1 + len(encoded) > self.max_batch_bytes:
+                yield b"\n".join(batch)
+                batch, size = [header], len(header)
+            batch.append(encoded)
+            size += 1 + len(encoded)
+        if len(batch) > 1:
+            yield b"\n".join(batch)
+
+    @abstractmethod
+    async def _send(self, batch: bytes) -> None:
+        """Deliver one batch to the other workers"""
+        pass
+
+    async def _dispatch(self, batch: bytes) -> None:
+        """Hand a received batch to the subscribers (unless this bus sent it)"""
+        origin, _, body = batch.decode().partition("\n")
+        if origin == self.origin or not body:
+            return
+        self.batches_received += 1
+        for line in body.split("\n"):
+            channel, _, payload = line.partition("\t")
+            channel = unquote(channel)
+            kind, _, name = channel.partition(":")
+            self.messages_received += 1
+            for handler in self._handlers.get(kind, ()):
+                try:
+                    await handler(name, payload)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Event bus handler for '{channel}' failed: {e}")
+
+    async def close(self) -> None:
+        """Flush what is pending and disconnect"""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "messages_published": self.messages_published,
+            "batches_sent": self.batches_sent,
+            "messages_received": self.messages_received,
+            "batches_received": self.batches_received,
+            "pending": len(self._buffer),
+            "oversized": self.oversized,
+            "errors": self.errors,
+        }
+
+
+class MemoryEventBus(EventBus):
+    """In-process bus: delivers to the other buses on the same hub (a list)"""
+
+    def __init__(self, hub: Optional[list] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.hub = hub if hub is not None else []
+        self.hub.append(self)
+
+    async def _send(self, batch: bytes) -> None:
+        for bus in list(self.hub):
+            if bus is not self:
+                await bus._dispatch(batch)
+
+    async def close(self) -> None:
+        await super().close()
+        if self in self.hub:
+            self.hub.remove(self)
+
+
+class RedisEventBus(EventBus):
+    """Bus over one Redis pub/sub channel; every worker on every host subscribes once"""
+
+    def __init__(self, url: str, channel: str = "kraftd:stream", **kwargs):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package not installed: pip install redis")
+        super().__init__(**kwargs)
+        self.channel = channel
+        self._client = aioredis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._client.pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Event bus subscription lost, resubscribing: {e}")
+                await asyncio.sleep(1)
+
+    async def _send(self, batch: bytes) -> None:
+        await self._client.publish(self.channel, batch)
+
+    async def close(self) -> None:
+        await super().close()
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        await self._client.aclose()
+
+
+class SocketEventBus(EventBus):
+    """
+    Bus over Unix datagram sockets, one per worker, in a shared directory.
+
+    Each batch is sent to every other socket in the directory; sockets of
+    workers that have exited are removed. A peer whose receive buffer is
+    full misses that batch (counted in `dropped`) rather than slowing the
+    sender down. A datagram that arrives cut off (larger than
+    `max_batch_bytes`, from a peer with another limit) is discarded and
+    counted in `truncated` rather than dispatched partially.
+    """
+
+    max_batch_bytes = 64 * 1024
+    PEER_REFRESH_SECONDS = 1.0
+
+    def __init__(self, directory: str, **kwargs):
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("SocketEventBus needs Unix domain sockets")
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.path = os.path.join(directory, f"{self.origin}.sock")
+        self.dropped = 0
+        self.truncated = 0
+        self._socket: Optional[socket.socket] = None
+        self._received: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._peers: List[str] = []
+        self._peers_at = float("-inf")
+
+    async def start(self) -> None:
+        if self._socket is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self._socket.bind(self.path)
+        self._socket.setblocking(False)
+        self._received = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self._socket.fileno(), self._on_readable)
+        self._consumer = asyncio.create_task(self._consume())
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                batch, _, flags, _ = self._socket.recvmsg(self.max_batch_bytes)
+            except (BlockingIOError, InterruptedError):
+                return
+            if flags & socket.MSG_TRUNC:
+                self.truncated += 1
+                logger.warning(f"Event bus batch over {self.max_batch_bytes} bytes discarded (cut off on receipt)")
+                continue
+            self._received.put_nowait(batch)
+
+    async def _consume(self) -> None:
+        while True:
+            await self._dispatch(await self._received.get())
+
+    def _peer_paths(self) -> List[str]:
+        now = asyncio.get_running_loop().time()
+        if now - self._peers_at > self.PEER_REFRESH_SECONDS:
+            self._peers = [
+                os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith(".sock") and os.path.join(self.directory, name) != self.path
+            ]
+            self._peers_at = now
+        return self._peers
+
+    async def _send(self, batch: bytes) -> None:
+        if self._socket is None:
+            return
+        for peer in list(self._peer_paths()):
+            try:
+                self._socket.sendto(batch, peer)
+            except (BlockingIOError, InterruptedError):
+                self.dropped += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker behind it has exited
+                self._peers.remove(peer)
+                try:
+                    os.remove(peer)
+                except OSError:
+                    pass
+
+    async def close(self) -> None:
+        await super().close()
+        if self._socket is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._socket.fileno())
+        self._consumer.cancel()
+        await asyncio.gather(self._consumer, return_exceptions=True)
+        self._socket.close()
+        self._socket = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        return {**super().stats(), "dropped": self.dropped, "truncated": self.truncated, "peers": len(self._peers)}
+
+
+def create_event_bus(backend: str = "memory", redis_url: Optional[str] = None,
+                     socket_dir: Optional[str] = None) -> EventBus:
+    """
+    Build the configured bus.
+
+    Args:
+        backend: 'memory', 'redis' or 'socket'
+        redis_url: Redis URL for the redis backend
+        socket_dir: Directory shared by the workers for the socket backend
+    """
+    if backend == "redis":
+        return RedisEventBus(redis_url or "redis://localhost:6379/0")
+    if backend == "socket":
+        return SocketEventBus(socket_dir or "/tmp/kraftd_stream")
+    if backend != "memory":
+        logger.warning(f"Unknown streaming pub/sub backend '{backend}', using in-process bus")
+    return MemoryEventBus()
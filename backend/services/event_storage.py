@@ -17,6 +17,7 @@ from typing import List, Dict, Any, Optional
 from enum import Enum
 
 from azure.cosmos import CosmosClient, PartitionKey, exceptions
+from repositories.bulk import BulkExecutor
 import asyncio
 from functools import lru_cache
 
@@ -384,24 +385,15 @@ class EventStorageService:
         try:
             cutoff_date = (datetime.utcnow() - timedelta(days=days_to_keep)).strftime("%Y-%m-%d")
 
-            query = f"""
-                SELECT c.id, c.event_type
-                FROM c
-                WHERE c.date < '{cutoff_date}'
-            """
-
-            items = list(self.events_container.query_items(query=query))
-            deleted_count = 0
-
-            for item in items:
-                try:
-                    self.events_container.delete_item(
-                        item=item["id"],
-                        partition_key=item["event_type"]
-                    )
-                    deleted_count += 1
-                except Exception as e:
-                    logger.warning(f"Failed to delete item {item['id']}: {e}")
+            # Deletes go out in per-event-type batches; an interrupted
+            # cleanup resumes from its checkpoint
+            stats = await BulkExecutor(self.events_container, "event_type").run(
+                f"delete-old-events:{cutoff_date}",
+                where="c.date < @cutoff",
+                params={"@cutoff": cutoff_date},
+                build_operation=lambda item: ("delete", (item["id"],)),
+            )
+            deleted_count = stats.succeeded
 
             logger.info(f"Deleted {deleted_count} old events (before {cutoff_date})")
             return deleted_count
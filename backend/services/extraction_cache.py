@@ -0,0 +1,231 @@
+"""
+Extraction Cache Service
+
+Content-addressed cache of extraction pipeline results.
+- Keyed by the owner, the SHA-256 of the uploaded bytes and the pipeline
+  version, so the same file uploaded again under another name is extracted
+  once; results carry per-upload fields (source_file, upload metadata) and
+  are never shared between owners
+- In-process LRU tier bounded by entry count and total payload bytes
+- Persistent tier in the Cosmos extractions container, shared by all
+  workers; each entry sits in its owner's partition
+- TTL on both tiers
+- Hit/miss counters for /api/v1/metrics
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from document_processing.orchestrator import PIPELINE_VERSION, PipelineResult
+from repositories.extraction_repository import ExtractionRepository
+from services.cosmos_service import get_cosmos_service
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "256"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EXTRACTION_CACHE_TTL_SECONDS = int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Read size used when hashing files already on disk
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Two-tier extraction result cache.
+
+    Entries hold a serialized PipelineResult plus the parsed tables; every
+    hit rebuilds fresh objects, so callers may mutate what they get back.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES,
+        max_bytes: int = EXTRACTION_CACHE_MAX_BYTES,
+        ttl_seconds: int = EXTRACTION_CACHE_TTL_SECONDS,
+        persistent: bool = True
+    ):
+        """Initialize an empty cache.
+
+        Args:
+            max_entries: Most entries kept in memory
+            max_bytes: Most serialized payload bytes kept in memory
+            ttl_seconds: Entry lifetime in both tiers
+            persistent: Also read/write the Cosmos extractions container
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+
+        # cache_key -> (expires_at, payload, size_bytes)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @staticmethod
+    def cache_key(file_hash: str, owner: str) -> str:
+        """Cache key for an owner's file hash under the current pipeline version"""
+        owner_digest = hashlib.sha256(owner.encode("utf-8")).hexdigest()[:16]
+        return f"{owner_digest}:{file_hash}:{PIPELINE_VERSION}"
+
+    async def get(self, file_hash: str, owner: str) -> Optional[Tuple[PipelineResult, List[Dict[str, Any]]]]:
+        """
+        Look up the extraction result for a file hash.
+
+        Args:
+            file_hash: SHA-256 of the uploaded bytes
+            owner: Owner of the document (results are scoped to their owner)
+
+        Returns:
+            (PipelineResult, tables) or None on a miss
+        """
+        key = self.cache_key(file_hash, owner)
+
+        payload = self._get_memory(key)
+        if payload is not None:
+            self._count("memory_hits")
+            return self._load(payload)
+
+        if self.persistent:
+            repo = self._repository()
+            entry = await repo.get_cached_result(owner, key) if repo else None
+            if entry and entry.get("expires_at", 0) > time.time():
+                self._put_memory(key, entry["payload"], entry["expires_at"])
+                self._count("persistent_hits")
+                return self._load(entry["payload"])
+
+        self._count("misses")
+        return None
+
+    async def put(self, file_hash: str, owner: str, result: PipelineResult,
+                  tables: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Store a successful pipeline result for its owner (failed results are never cached)"""
+        if not result.success:
+            return
+
+        key = self.cache_key(file_hash, owner)
+        payload = {"result": result.to_dict(), "tables": tables or []}
+        expires_at = time.time() + self.ttl_seconds
+
+        self._put_memory(key, payload, expires_at)
+        self._count("stores")
+
+        if self.persistent:
+            repo = self._repository()
+            if repo:
+                await repo.store_cached_result(owner, key, payload, expires_at, self.ttl_seconds)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (the persistent tier expires on its own)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and in-memory tier size"""
+        with self._lock:
+            counters = dict(self._counters)
+            entries, size = len(self._entries), self._bytes
+        lookups = counters["memory_hits"] + counters["persistent_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["persistent_hits"]
+        return {
+            **counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups * 100, 2) if lookups else 0,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "pipeline_version": PIPELINE_VERSION,
+        }
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload, size = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._bytes -= size
+                self._counters["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def _put_memory(self, key: str, payload: Dict[str, Any], expires_at: float) -> None:
+        size = len(json.dumps(payload, separators=(",", ":")))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (expires_at, payload, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters["evictions"] += 1
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    @staticmethod
+    def _load(payload: Dict[str, Any]) -> Tuple[PipelineResult, List[Dict[str, Any]]]:
+        return PipelineResult.from_dict(payload["result"]), list(payload.get("tables") or [])
+
+    @staticmethod
+    def _repository() -> Optional[ExtractionRepository]:
+        """Extractions repository when Cosmos is available, otherwise None (memory tier only)"""
+        try:
+            cosmos_service = get_cosmos_service()
+            if not cosmos_service or not cosmos_service.is_initialized():
+                return None
+            return ExtractionRepository()
+        except Exception as e:
+            logger.warning(f"Extraction cache persistent tier unavailable: {e}")
+            return None
+
+
+# ===== Singleton Helper =====
+
+_extraction_cache: Optional[ExtractionCache] = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Get or create the process-wide ExtractionCache."""
+    global _extraction_cache
+    if _extraction_cache is None:
+        with _extraction_cache_lock:
+            if _extraction_cache is None:
+                _extraction_cache = ExtractionCache()
+    return _extraction_cache
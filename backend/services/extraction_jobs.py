@@ -0,0 +1,868 @@
+"""
+Extraction Job Queue
+
+POST /api/v1/docs/extract enqueues a job instead of parsing and running the
+pipeline inside the HTTP request. A pool of workers (spawned processes by
+default) takes jobs off the queue; progress, the result or the error is
+written back to the document record, where
+GET /api/v1/documents/{id}/status reports it.
+
+Scheduling:
+- Higher priority first
+- Within a priority, tenants take turns: the tenant served least recently
+  goes next, so one tenant's batch cannot starve everyone else
+- A failed attempt is retried after exponential backoff (base * 2^n,
+  capped) until the job runs out of attempts; permanent errors (JobError
+  with retryable=False, e.g. a missing document) fail the job at once
+- Queued jobs can be cancelled; a running job stops at its next step and
+  its result is discarded
+- A running job holds a lease, renewed at every step; when the worker
+  holding it dies, the job is requeued (or failed) once the lease expires
+
+Queues:
+- MemoryJobQueue: in-process (default); jobs do not survive a restart
+- SQLiteJobQueue: a SQLite file shared by every worker process on the host
+- RedisJobQueue: Redis (redis-py asyncio, optional) or a local
+  redis-server stand-in, each claim one Lua script; shared across hosts
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from services.sqlite_store import SQLiteStore
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+JOB_RETENTION_SECONDS = 24 * 3600  # Finished jobs are kept this long for polling
+
+# Progress reported when a job starts each step
+STEP_PROGRESS = {"parse": 10, "pipeline": 50}
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (JobStatus.COMPLETED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value)
+
+
+class JobError(Exception):
+    """A failed attempt; retryable=False fails the job without further attempts"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class JobCancelled(asyncio.CancelledError):
+    """The running job was cancelled (raised at its next step)"""
+
+
+@dataclass
+class ExtractionJob:
+    """One document extraction request and its progress"""
+    document_id: str
+    tenant: str
+    owner_email: str
+    priority: int = 0  # Higher runs sooner
+    profile: bool = False
+    job_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = JobStatus.QUEUED.value
+    attempts: int = 0
+    max_attempts: int = 3
+    progress: int = 0  # Percent
+    stage: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    enqueued_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    not_before: float = 0.0  # A retry waits until then
+    lease_until: Optional[float] = None  # While running
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExtractionJob":
+        return cls(**data)
+
+    def status_dict(self) -> Dict[str, Any]:
+        """What clients see when polling"""
+        return {
+            "job_id": self.job_id,
+            "document_id": self.document_id,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "priority": self.priority,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "error": self.error,
+            "result": self.result,
+            "enqueued_at": _isoformat(self.enqueued_at),
+            "updated_at": _isoformat(self.updated_at),
+            "retry_at": _isoformat(self.not_before)
+            if self.status == JobStatus.QUEUED.value and self.not_before > self.updated_at else None,
+        }
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _expire_lease(job: ExtractionJob, now: float) -> None:
+    """The worker running the job stopped renewing its lease: requeue or fail it"""
+    job.lease_until = None
+    job.updated_at = now
+    job.error = "Worker lost (lease expired)"
+    if job.attempts < job.max_attempts:
+        job.status = JobStatus.QUEUED.value
+        job.not_before = now
+    else:
+        job.status = JobStatus.FAILED.value
+
+
+class JobQueue(ABC):
+    """Storage and scheduling of extraction jobs"""
+
+    @abstractmethod
+    async def put(self, job: ExtractionJob) -> None:
+        pass
+
+    @abstractmethod
+    async def claim(self, lease_seconds: float) -> Optional[ExtractionJob]:
+        """Take the next due job (now running, one more attempt), or None"""
+        pass
+
+    @abstractmethod
+    async def update(self, job: ExtractionJob) -> bool:
+        """
+        Store the progress or outcome of a claimed job (status queued
+        requeues it for a retry at job.not_before). False when the claim is
+        no longer valid: the job was cancelled or its lease expired.
+        """
+        pass
+
+    @abstractmethod
+    async def cancel(self, job_id: str) -> Optional[ExtractionJob]:
+        """Cancel a queued or running job; returns the job as stored (unchanged if already finished)"""
+        pass
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[ExtractionJob]:
+        pass
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryJobQueue(JobQueue):
+    """
+    In-process queue: a heap of ready jobs per tenant plus a heap of
+    delayed retries. A claim compares the head of each tenant's heap, so it
+    costs O(tenants with queued work + log n).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time,
+                 retention_seconds: float = JOB_RETENTION_SECONDS):
+        self.clock = clock
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, ExtractionJob] = {}
+        self._ready: Dict[str, List[Tuple[int, int, str]]] = {}  # tenant -> heap of (-priority, seq, job_id)
+        self._delayed: List[Tuple[float, int, str]] = []  # (not_before, seq, job_id)
+        self._running: Set[str] = set()
+        self._last_served: Dict[str, int] = {}
+        self._finished: Deque[Tuple[float, str]] = deque()
+        self._seq = itertools.count()
+
+    def _schedule(self, job: ExtractionJob) -> None:
+        if job.not_before > self.clock():
+            heapq.heappush(self._delayed, (job.not_before, next(self._seq), job.job_id))
+        else:
+            heapq.heappush(self._ready.setdefault(job.tenant, []), (-job.priority, next(self._seq), job.job_id))
+
+    def _retire(self, job: ExtractionJob) -> None:
+        """Remember a finished job for polling and drop those past retention"""
+        self._running.discard(job.job_id)
+        self._finished.append((job.updated_at, job.job_id))
+        cutoff = self.clock() - self.retention_seconds
+        while self._finished and self._finished[0][0] < cutoff:
+            _, job_id = self._finished.popleft()
+            stored = self._jobs.get(job_id)
+            if stored is not None and stored.finished:
+                del self._jobs[job_id]
+
+    def _is_queued(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        return job is not None and job.status == JobStatus.QUEUED.value
+
+    async def put(self, job: ExtractionJob) -> None:
+        self._jobs[job.job_id] = replace(job)
+        self._schedule(job)
+
+    async def claim(self, lease_seconds: float) -> Optional[ExtractionJob]:
+        now = self.clock()
+        for job_id in [job_id for job_id in self._running if self._jobs[job_id].lease_until < now]:
+            job = self._jobs[job_id]
+            self._running.discard(job_id)
+            _expire_lease(job, now)
+            if job.status == JobStatus.QUEUED.value:
+                self._schedule(job)
+            else:
+                self._retire(job)
+
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, job_id = heapq.heappop(self._delayed)
+            if self._is_queued(job_id):
+                self._schedule(self._jobs[job_id])
+
+        best = None
+        for tenant in list(self._ready):
+            heap = self._ready[tenant]
+            while heap and not self._is_queued(heap[0][2]):
+                heapq.heappop(heap)  # Cancelled
+            if not heap:
+                del self._ready[tenant]
+                continue
+            rank = (heap[0][0], self._last_served.get(tenant, -1))
+            if best is None or rank < best[0]:
+                best = (rank, tenant)
+        if best is None:
+            return None
+
+        tenant = best[1]
+        _, _, job_id = heapq.heappop(self._ready[tenant])
+        self._last_served[tenant] = next(self._seq)
+        job = self._jobs[job_id]
+        job.status = JobStatus.RUNNING.value
+        job.attempts += 1
+        job.updated_at = now
+        job.lease_until = now + lease_seconds
+        self._running.add(job_id)
+        return replace(job)
+
+    async def update(self, job: ExtractionJob) -> bool:
+        stored = self._jobs.get(job.job_id)
+        if stored is None or stored.status != JobStatus.RUNNING.value or stored.attempts != job.attempts:
+            return False
+        job.updated_at = self.clock()
+        stored = self._jobs[job.job_id] = replace(job)
+        if stored.status == JobStatus.QUEUED.value:
+            self._running.discard(job.job_id)
+            self._schedule(stored)
+        elif stored.finished:
+            self._retire(stored)
+        return True
+
+    async def cancel(self, job_id: str) -> Optional[ExtractionJob]:
+        stored = self._jobs.get(job_id)
+        if stored is None:
+            return None
+        if not stored.finished:
+            stored.status = JobStatus.CANCELLED.value
+            stored.updated_at = self.clock()
+            stored.lease_until = None
+            self._retire(stored)
+        return replace(stored)
+
+    async def get(self, job_id: str) -> Optional[ExtractionJob]:
+        stored = self._jobs.get(job_id)
+        return replace(stored) if stored else None
+
+    async def stats(self) -> Dict[str, int]:
+        return dict(Counter(job.status for job in self._jobs.values()))
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Queue shared by every process on the host through a SQLite file (see SQLiteStore).
+
+    A claim is one IMMEDIATE transaction that picks the job with a single
+    indexed query (priority, then the tenant's last turn, then age), so
+    concurrent workers never take the same job.
+    """
+
+    CLEANUP_EVERY = 100  # Claims between deletions of expired finished jobs
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time,
+                 retention_seconds: float = JOB_RETENTION_SECONDS):
+        self.path = path
+        self.clock = clock
+        self.retention_seconds = retention_seconds
+        self._claims = 0
+        self._store = SQLiteStore(path, schema=[
+            "CREATE TABLE IF NOT EXISTS extraction_jobs (job_id TEXT PRIMARY KEY, tenant TEXT NOT NULL, "
+            "priority INTEGER NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, "
+            "not_before REAL NOT NULL, lease_until REAL, updated_at REAL NOT NULL, seq INTEGER NOT NULL, "
+            "data TEXT NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS extraction_jobs_queued ON extraction_jobs (status, priority, seq)",
+            "CREATE TABLE IF NOT EXISTS extraction_tenants (tenant TEXT PRIMARY KEY, last_served INTEGER NOT NULL)",
+        ])
+        self._db = self._store.db
+
+    def _write(self, job: ExtractionJob, new_seq: bool = False) -> None:
+        seq = None
+        if not new_seq:
+            row = self._db.execute("SELECT seq FROM extraction_jobs WHERE job_id = ?", (job.job_id,)).fetchone()
+            seq = row[0] if row else None
+        if seq is None:
+            seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM extraction_jobs").fetchone()[0]
+        self._db.execute(
+            "INSERT OR REPLACE INTO extraction_jobs "
+            "(job_id, tenant, priority, status, attempts, not_before, lease_until, updated_at, seq, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job.job_id, job.tenant, job.priority, job.status, job.attempts, job.not_before,
+             job.lease_until, job.updated_at, seq, json.dumps(job.to_dict()))
+        )
+
+    def _read(self, job_id: str) -> Optional[ExtractionJob]:
+        row = self._db.execute("SELECT data FROM extraction_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return ExtractionJob.from_dict(json.loads(row[0])) if row else None
+
+    async def put(self, job: ExtractionJob) -> None:
+        await self._store.run(self._write, job, True)
+
+    async def claim(self, lease_seconds: float) -> Optional[ExtractionJob]:
+        return await self._store.run(self._claim, self.clock(), lease_seconds)
+
+    def _claim(self, now: float, lease_seconds: float) -> Optional[ExtractionJob]:
+        for (data,) in self._db.execute(
+            "SELECT data FROM extraction_jobs WHERE status = 'running' AND lease_until < ?", (now,)
+        ).fetchall():
+            job = ExtractionJob.from_dict(json.loads(data))
+            _expire_lease(job, now)
+            self._write(job, new_seq=job.status == JobStatus.QUEUED.value)
+
+        self._claims += 1
+        if self._claims % self.CLEANUP_EVERY == 0:
+            self._db.execute(
+                f"DELETE FROM extraction_jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))}) "
+                "AND updated_at < ?", (*FINISHED_STATUSES, now - self.retention_seconds)
+            )
+
+        row = self._db.execute(
+            "SELECT j.data FROM extraction_jobs j LEFT JOIN extraction_tenants t ON t.tenant = j.tenant "
+            "WHERE j.status = 'queued' AND j.not_before <= ? "
+            "ORDER BY j.priority DESC, COALESCE(t.last_served, -1), j.seq LIMIT 1", (now,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = ExtractionJob.from_dict(json.loads(row[0]))
+        job.status = JobStatus.RUNNING.value
+        job.attempts += 1
+        job.updated_at = now
+        job.lease_until = now + lease_seconds
+        self._write(job)
+        self._db.execute(
+            "INSERT OR REPLACE INTO extraction_tenants (tenant, last_served) "
+            "VALUES (?, (SELECT COALESCE(MAX(last_served), 0) + 1 FROM extraction_tenants))", (job.tenant,)
+        )
+        return job
+
+    async def update(self, job: ExtractionJob) -> bool:
+        return await self._store.run(self._update, job)
+
+    def _update(self, job: ExtractionJob) -> bool:
+        row = self._db.execute(
+            "SELECT 1 FROM extraction_jobs WHERE job_id = ? AND status = 'running' AND attempts = ?",
+            (job.job_id, job.attempts)
+        ).fetchone()
+        if row is None:
+            return False
+        job.updated_at = self.clock()
+        self._write(job, new_seq=job.status == JobStatus.QUEUED.value)
+        return True
+
+    async def cancel(self, job_id: str) -> Optional[ExtractionJob]:
+        return await self._store.run(self._cancel, job_id)
+
+    def _cancel(self, job_id: str) -> Optional[ExtractionJob]:
+        job = self._read(job_id)
+        if job is not None and not job.finished:
+            job.status = JobStatus.CANCELLED.value
+            job.updated_at = self.clock()
+            job.lease_until = None
+            self._write(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[ExtractionJob]:
+        return await self._store.run_read(self._read, job_id)
+
+    async def stats(self) -> Dict[str, int]:
+        def count():
+            return dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM extraction_jobs GROUP BY status"
+            ).fetchall())
+        return await self._store.run_read(count)
+
+    async def close(self) -> None:
+        self._store.close()
+
+
+# KEYS[1]: key prefix. ARGV: now, lease seconds.
+# Ready jobs: one sorted set per tenant, score -priority * 1e12 + enqueue seq.
+# Returns the claimed job as JSON, or nil.
+_CLAIM_SCRIPT = """
+local p = KEYS[1]
+local now, lease = tonumber(ARGV[1]), tonumber(ARGV[2])
+local function enqueue(job)
+    local seq = redis.call('INCR', p .. 'seq')
+    redis.call('ZADD', p .. 'ready:' .. job.tenant, -job.priority * 1e12 + seq, job.job_id)
+    redis.call('SADD', p .. 'active', job.tenant)
+end
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', p .. 'running', '-inf', '(' .. now)) do
+    redis.call('ZREM', p .. 'running', id)
+    local raw = redis.call('GET', p .. 'job:' .. id)
+    if raw then
+        local job = cjson.decode(raw)
+        job.lease_until = cjson.null
+        job.updated_at = now
+        job.error = 'Worker lost (lease expired)'
+        if job.attempts < job.max_attempts then
+            job.status = 'queued'
+            job.not_before = now
+            enqueue(job)
+        else
+            job.status = 'failed'
+        end
+        redis.call('SET', p .. 'job:' .. id, cjson.encode(job), 'KEEPTTL')
+    end
+end
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', p .. 'delayed', '-inf', now)) do
+    redis.call('ZREM', p .. 'delayed', id)
+    local raw = redis.call('GET', p .. 'job:' .. id)
+    if raw then
+        local job = cjson.decode(raw)
+        if job.status == 'queued' then enqueue(job) end
+    end
+end
+local best_tenant, best_rank, best_turn
+for _, tenant in ipairs(redis.call('SMEMBERS', p .. 'active')) do
+    local head = redis.call('ZRANGE', p .. 'ready:' .. tenant, 0, 0, 'WITHSCORES')
+    if #head == 0 then
+        redis.call('SREM', p .. 'active', tenant)
+    else
+        local rank = math.floor(tonumber(head[2]) / 1e12)
+        local turn = tonumber(redis.call('ZSCORE', p .. 'turns', tenant) or -1)
+        if best_tenant == nil or rank < best_rank or (rank == best_rank and turn < best_turn) then
+            best_tenant, best_rank, best_turn = tenant, rank, turn
+        end
+    end
+end
+if best_tenant == nil then return nil end
+local id = redis.call('ZRANGE', p .. 'ready:' .. best_tenant, 0, 0)[1]
+redis.call('ZREM', p .. 'ready:' .. best_tenant, id)
+redis.call('ZADD', p .. 'turns', redis.call('INCR', p .. 'served'), best_tenant)
+local job = cjson.decode(redis.call('GET', p .. 'job:' .. id))
+job.status = 'running'
+job.attempts = job.attempts + 1
+job.updated_at = now
+job.lease_until = now + lease
+redis.call('ZADD', p .. 'running', job.lease_until, id)
+local raw = cjson.encode(job)
+redis.call('SET', p .. 'job:' .. id, raw)
+return raw
+"""
+
+# KEYS[1]: key prefix. ARGV: job id, claimed attempt, new job JSON, status, not_before,
+# lease_until (or ''), retention seconds. Returns 1 when stored, 0 when the claim is gone.
+_UPDATE_SCRIPT = """
+local p = KEYS[1]
+local id = ARGV[1]
+local raw = redis.call('GET', p .. 'job:' .. id)
+if not raw then return 0 end
+local stored = cjson.decode(raw)
+if stored.status ~= 'running' or stored.attempts ~= tonumber(ARGV[2]) then return 0 end
+redis.call('SET', p .. 'job:' .. id, ARGV[3])
+redis.call('ZREM', p .. 'running', id)
+local status = ARGV[4]
+if status == 'running' then
+    redis.call('ZADD', p .. 'running', tonumber(ARGV[6]), id)
+elseif status == 'queued' then
+    redis.call('ZADD', p .. 'delayed', tonumber(ARGV[5]), id)
+else
+    redis.call('EXPIRE', p .. 'job:' .. id, tonumber(ARGV[7]))
+end
+return 1
+"""
+
+# KEYS[1]: key prefix. ARGV: job id, now, retention seconds. Returns the job JSON after cancelling.
+_CANCEL_SCRIPT = """
+local p = KEYS[1]
+local id = ARGV[1]
+local raw = redis.call('GET', p .. 'job:' .. id)
+if not raw then return nil end
+local job = cjson.decode(raw)
+if job.status == 'queued' or job.status == 'running' then
+    job.status = 'cancelled'
+    job.updated_at = tonumber(ARGV[2])
+    job.lease_until = cjson.null
+    redis.call('ZREM', p .. 'ready:' .. job.tenant, id)
+    redis.call('ZREM', p .. 'delayed', id)
+    redis.call('ZREM', p .. 'running', id)
+    raw = cjson.encode(job)
+    redis.call('SET', p .. 'job:' .. id, raw, 'EX', tonumber(ARGV[3]))
+end
+return raw
+"""
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Queue shared through Redis (or a local redis-server stand-in).
+
+    Claims, updates and cancellations each run as one Lua script, so they
+    are atomic across workers and hosts. Finished jobs expire after the
+    retention period.
+    """
+
+    def __init__(self, url: str, prefix: str = "extraction:", clock: Callable[[], float] = time.time,
+                 retention_seconds: float = JOB_RETENTION_SECONDS):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package not installed: pip install redis")
+        self.prefix = prefix
+        self.clock = clock
+        self.retention_seconds = retention_seconds
+        self._client = aioredis.from_url(url)
+        self._claim = self._client.register_script(_CLAIM_SCRIPT)
+        self._update = self._client.register_script(_UPDATE_SCRIPT)
+        self._cancel = self._client.register_script(_CANCEL_SCRIPT)
+
+    async def put(self, job: ExtractionJob) -> None:
+        seq = await self._client.incr(f"{self.prefix}seq")
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.set(f"{self.prefix}job:{job.job_id}", json.dumps(job.to_dict()))
+            if job.not_before > self.clock():
+                pipe.zadd(f"{self.prefix}delayed", {job.job_id: job.not_before})
+            else:
+                pipe.zadd(f"{self.prefix}ready:{job.tenant}", {job.job_id: -job.priority * 1e12 + seq})
+                pipe.sadd(f"{self.prefix}active", job.tenant)
+            await pipe.execute()
+
+    async def claim(self, lease_seconds: float) -> Optional[ExtractionJob]:
+        raw = await self._claim(keys=[self.prefix], args=[self.clock(), lease_seconds])
+        return ExtractionJob.from_dict(json.loads(raw)) if raw else None
+
+    async def update(self, job: ExtractionJob) -> bool:
+        job.updated_at = self.clock()
+        stored = await self._update(keys=[self.prefix], args=[
+            job.job_id, job.attempts, json.dumps(job.to_dict()), job.status, job.not_before,
+            "" if job.lease_until is None else job.lease_until, int(self.retention_seconds),
+        ])
+        return bool(int(stored))
+
+    async def cancel(self, job_id: str) -> Optional[ExtractionJob]:
+        raw = await self._cancel(keys=[self.prefix], args=[job_id, self.clock(), int(self.retention_seconds)])
+        return ExtractionJob.from_dict(json.loads(raw)) if raw else None
+
+    async def get(self, job_id: str) -> Optional[ExtractionJob]:
+        raw = await self._client.get(f"{self.prefix}job:{job_id}")
+        return ExtractionJob.from_dict(json.loads(raw)) if raw else None
+
+    async def stats(self) -> Dict[str, int]:
+        """Queued and running counts (finished jobs are only kept as expiring keys)"""
+        queued = await self._client.zcard(f"{self.prefix}delayed")
+        for tenant in await self._client.smembers(f"{self.prefix}active"):
+            tenant = tenant.decode() if isinstance(tenant, bytes) else tenant
+            queued += await self._client.zcard(f"{self.prefix}ready:{tenant}")
+        return {
+            JobStatus.QUEUED.value: queued,
+            JobStatus.RUNNING.value: await self._client.zcard(f"{self.prefix}running"),
+        }
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_job_queue(backend: str = "memory", redis_url: Optional[str] = None,
+                     sqlite_path: Optional[str] = None) -> JobQueue:
+    """
+    Build the configured queue.
+
+    Args:
+        backend: 'memory', 'sqlite' or 'redis'
+        redis_url: Redis URL for the redis backend
+        sqlite_path: Database file for the sqlite backend
+    """
+    if backend == "redis":
+        return RedisJobQueue(redis_url or "redis://localhost:6379/0")
+    if backend == "sqlite":
+        return SQLiteJobQueue(sqlite_path or "/tmp/kraftd_extraction_jobs.db")
+    if backend != "memory":
+        logger.warning(f"Unknown extraction queue backend '{backend}', using in-process queue")
+    return MemoryJobQueue()
+
+
+class JobContext:
+    """Handed to a job handler to run its blocking steps and report progress"""
+
+    def __init__(self, pool: "ExtractionWorkerPool", job: ExtractionJob):
+        self.pool = pool
+        self.job = job
+
+    async def progress(self, progress: int, stage: Optional[str] = None) -> None:
+        """Record progress (renewing the lease); raises JobCancelled if the job was cancelled"""
+        self.job.progress = progress
+        self.job.stage = stage
+        await self.pool._save(self.job)
+
+    async def run(self, stage: str, func: Callable, *args, timeout: Optional[float] = None):
+        """
+        Run a blocking step in a worker; same signature as the inline
+        runner of /extract. The request timeout is ignored: job steps are
+        bounded by the pool's step_timeout instead.
+        """
+        await self.progress(STEP_PROGRESS.get(stage, self.job.progress), stage)
+        return await self.pool.run(func, *args)
+
+
+JobHandler = Callable[[ExtractionJob, JobContext], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class ExtractionWorkerPool:
+    """
+    Runs queued extraction jobs.
+
+    `workers` jobs run at once, each step in a spawned worker process
+    (mode 'process'; processes are spawned rather than forked for the same
+    reason as the PDF parse pool) or in a thread (mode 'thread'). The
+    handler does the work of one job; on_update is called with every change
+    of a job's state so it can be written back to the document.
+
+    Usage:
+        pool = ExtractionWorkerPool(create_job_queue(), handler, workers=2)
+        pool.start()
+        job = await pool.submit(document_id, tenant, owner_email, priority=5)
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: JobHandler,
+        workers: int = 2,
+        mode: str = "process",
+        on_update: Optional[Callable[[ExtractionJob], Awaitable[None]]] = None,
+        max_attempts: int = 3,
+        retry_base_seconds: float = 2.0,
+        retry_max_seconds: float = 60.0,
+        step_timeout: float = 600.0,
+        poll_interval: float = 1.0,
+        initializer: Optional[Callable[[], None]] = None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.on_update = on_update
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.step_timeout = step_timeout
+        self.lease_seconds = step_timeout + 60  # Renewed at every step
+        self.poll_interval = poll_interval
+        self.initializer = initializer
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: Set[str] = set()
+
+    # ===== Lifecycle =====
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop (no-op when already running there)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and any(not task.done() for task in self._tasks):
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._tasks = [loop.create_task(self._work(), name=f"extraction-worker-{n}") for n in range(self.workers)]
+        logger.info(f"Started {self.workers} extraction workers ({self.mode})")
+
+    async def stop(self) -> None:
+        """Stop the workers and worker processes; running jobs are requeued when their lease expires"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+        await self.queue.close()
+
+    # ===== Jobs =====
+
+    async def submit(self, document_id: str, tenant: str, owner_email: str,
+                     priority: int = 0, profile: bool = False) -> ExtractionJob:
+        """Queue an extraction and wake a worker"""
+        job = ExtractionJob(document_id=document_id, tenant=tenant, owner_email=owner_email,
+                            priority=priority, profile=profile, max_attempts=self.max_attempts)
+        await self.queue.put(job)
+        await self._notify(job)
+        self.start()
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[ExtractionJob]:
+        return await self.queue.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[ExtractionJob]:
+        """Cancel a job; a job running in this process is interrupted at once"""
+        job = await self.queue.cancel(job_id)
+        if job is None or job.status != JobStatus.CANCELLED.value:
+            return job
+        task = self._running.get(job_id)
+        if task is not None:
+            self._cancelled.add(job_id)
+            task.cancel()
+        await self._notify(job)
+        return job
+
+    def retry_delay(self, attempt: int) -> float:
+        """Backoff before the attempt after `attempt` (1-based)"""
+        return min(self.retry_base_seconds * 2 ** (attempt - 1), self.retry_max_seconds)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        try:
+            jobs = await self.queue.stats()
+        except Exception as e:
+            logger.warning(f"Extraction queue stats unavailable: {e}")
+            jobs = {}
+        return {
+            "backend": type(self.queue).__name__,
+            "workers": self.workers,
+            "mode": self.mode,
+            "running_here": len(self._running),
+            "jobs": jobs,
+        }
+
+    # ===== Workers =====
+
+    async def run(self, func: Callable, *args):
+        """Run a blocking step in a worker process (or thread), bounded by step_timeout"""
+        if self.mode == "process":
+            call = asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        else:
+            call = asyncio.to_thread(func, *args)
+        try:
+            return await asyncio.wait_for(call, timeout=self.step_timeout)
+        except BrokenProcessPool as e:
+            with self._executor_lock:
+                self._executor = None
+            raise JobError(f"Extraction worker process died: {e}")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer
+                )
+            return self._executor
+
+    async def _work(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self.queue.claim(self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Extraction queue claim failed: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job)
+
+    async def _process(self, job: ExtractionJob) -> None:
+        logger.info(f"Extraction job {job.job_id} for {job.document_id} started (attempt {job.attempts})")
+        await self._notify(job)
+        task = asyncio.create_task(self.handler(job, JobContext(self, job)))
+        self._running[job.job_id] = task
+        try:
+            job.result = await task
+            job.status = JobStatus.COMPLETED.value
+            job.progress = 100
+            job.stage = None
+            job.error = None
+        except asyncio.CancelledError:
+            # The job was cancelled (here, or elsewhere and noticed at its next step),
+            # unless it is this worker that is being stopped
+            if job.job_id not in self._cancelled and not task.done():
+                raise
+            self._cancelled.discard(job.job_id)
+            logger.info(f"Extraction job {job.job_id} cancelled while running")
+            return
+        except Exception as e:
+            retryable = not isinstance(e, JobError) or e.retryable
+            job.error = str(e)
+            if retryable and job.attempts < job.max_attempts:
+                delay = self.retry_delay(job.attempts)
+                job.status = JobStatus.QUEUED.value
+                job.not_before = time.time() + delay
+                logger.warning(f"Extraction job {job.job_id} attempt {job.attempts} failed, retrying in {delay:.0f}s: {e}")
+            else:
+                job.status = JobStatus.FAILED.value
+                logger.error(f"Extraction job {job.job_id} failed after {job.attempts} attempt(s): {e}")
+        finally:
+            self._running.pop(job.job_id, None)
+        job.lease_until = None
+        if await self.queue.update(job):
+            await self._notify(job)
+        else:
+            logger.info(f"Extraction job {job.job_id} was cancelled; result discarded")
+
+    async def _save(self, job: ExtractionJob) -> None:
+        job.lease_until = time.time() + self.lease_seconds
+        if not await self.queue.update(job):
+            raise JobCancelled(f"Extraction job {job.job_id} was cancelled or reclaimed")
+        await self._notify(job)
+
+    async def _notify(self, job: ExtractionJob) -> None:
+        if self.on_update is None:
+            return
+        try:
+            await self.on_update(replace(job))
+        except Exception as e:
+            logger.warning(f"Failed to record status of extraction job {job.job_id}: {e}")
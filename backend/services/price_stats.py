@@ -0,0 +1,306 @@
+"""
+Incremental Price Statistics
+
+SignalsService keeps a PriceSeries per item next to its price history, so
+that ingesting a price and reading a trend never rescan the history.
+
+PriceSeries stores the item's points in an array-backed ring buffer
+(timestamps, prices and the exponentially smoothed level after each
+point, as C doubles; the capacity doubles when full and points older than
+the retention are dropped, along with any window still holding them, which
+is rebuilt when next read). It also keeps running sums of the latest
+points for the moving averages. A RollingWindow follows the points of the
+last N days over that buffer and updates, as points enter and leave:
+- count, mean and variance (Welford's update, reversed for removals)
+- the sums of the first and second half of the window (trend direction)
+- monotonic deques holding the candidates for the minimum and maximum
+
+Points enter a window when it is next read and leave once older than its
+cutoff, so each point costs O(1) amortized per window, and reading a
+window is O(1). The smoothed level of a window is derived from the
+series' levels in O(1) (see RollingWindow.smoothed_level).
+
+Windows are ordered by position, so a series whose timestamps arrive out
+of order is flagged (`ordered`) and callers fall back to filtering the
+history.
+"""
+
+import math
+import os
+from array import array
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+SMOOTHING_ALPHA = 0.3  # Exponential smoothing factor (as TrendAnalysisService.simple_forecast)
+MOVING_AVERAGE_WINDOWS = (7, 30)  # Points
+SIGNALS_STATS_RETENTION_DAYS = int(os.getenv("SIGNALS_STATS_RETENTION_DAYS", "365"))
+MAX_WINDOWS_PER_ITEM = 8  # Distinct days_back windows kept per item (least recently read evicted)
+
+_DAY = 86400.0
+
+
+def to_epoch(timestamp: datetime) -> float:
+    """Seconds since the epoch; naive datetimes are UTC (as datetime.utcnow())"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+class RollingWindow:
+    """Statistics of the points of a series within the last `days` days"""
+
+    def __init__(self, series: "PriceSeries", days: float, start: int):
+        self.series = series
+        self.days = days
+        self.start = self.mid = self.end = start  # Sequence numbers: [start, mid) first half, [mid, end) second
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._first_sum = 0.0
+        self._second_sum = 0.0
+        self._min: deque = deque()  # Sequence numbers of increasing prices
+        self._max: deque = deque()  # Sequence numbers of decreasing prices
+
+    def _push(self, seq: int) -> None:
+        price = self.series.price(seq)
+        self.count += 1
+        delta = price - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (price - self.mean)
+        self._second_sum += price
+        self.end = seq + 1
+        self._rebalance()
+        while self._min and self.series.price(self._min[-1]) >= price:
+            self._min.pop()
+        self._min.append(seq)
+        while self._max and self.series.price(self._max[-1]) <= price:
+            self._max.pop()
+        self._max.append(seq)
+
+    def _pop(self) -> None:
+        seq = self.start
+        price = self.series.price(seq)
+        self.count -= 1
+        if self.count == 0:
+            self.mean = self._m2 = self._first_sum = self._second_sum = 0.0
+        else:
+            delta = price - self.mean
+            self.mean -= delta / self.count
+            self._m2 = max(self._m2 - delta * (price - self.mean), 0.0)
+            if seq < self.mid:
+                self._first_sum -= price
+            else:
+                self._second_sum -= price
+        self.start = seq + 1
+        self.mid = max(self.mid, self.start)
+        if self._min[0] == seq:
+            self._min.popleft()
+        if self._max[0] == seq:
+            self._max.popleft()
+        self._rebalance()
+
+    def _rebalance(self) -> None:
+        # The first half is the first count // 2 points
+        target = self.start + self.count // 2
+        while self.mid < target:
+            price = self.series.price(self.mid)
+            self._first_sum += price
+            self._second_sum -= price
+            self.mid += 1
+        while self.mid > target:
+            self.mid -= 1
+            price = self.series.price(self.mid)
+            self._first_sum -= price
+            self._second_sum += price
+
+    def advance(self, cutoff: float) -> None:
+        """Take in the points added since the last read and drop those older than `cutoff`"""
+        series = self.series
+        for seq in range(self.end, series.count):
+            self._push(seq)
+        while self.count and series.timestamp(self.start) < cutoff:
+            self._pop()
+
+    @property
+    def first_price(self) -> float:
+        return self.series.price(self.start)
+
+    @property
+    def last_price(self) -> float:
+        return self.series.price(self.end - 1)
+
+    @property
+    def min_price(self) -> float:
+        return self.series.price(self._min[0])
+
+    @property
+    def max_price(self) -> float:
+        return self.series.price(self._max[0])
+
+    @property
+    def stdev(self) -> float:
+        """Sample standard deviation (0 for fewer than 2 points)"""
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def first_half_mean(self) -> float:
+        return self._first_sum / (self.mid - self.start)
+
+    @property
+    def second_half_mean(self) -> float:
+        return self._second_sum / (self.end - self.mid)
+
+    def moving_average(self, points: int) -> Optional[float]:
+        """Mean of the last `points` prices (None if the window has fewer)"""
+        if self.count < points:
+            return None
+        return self.series.moving_average(points)
+
+    def smoothed_level(self) -> float:
+        """
+        Exponential smoothing over the window's points, starting from its first price
+
+        The series level L after point b smooths every point so far; smoothing
+        from point a instead only changes the weight of what came before a:
+        level = L[b] - (1 - alpha) ** (b - a + 1) * (L[a - 1] - price[a])
+        """
+        series = self.series
+        level = series.level(self.end - 1)
+        if self.start == 0:
+            return level
+        decay = (1 - series.alpha) ** (self.end - self.start)
+        return level - decay * (series.level(self.start - 1) - series.price(self.start))
+
+
+class PriceSeries:
+    """Price points of one item in an array-backed ring buffer, with windows over them"""
+
+    def __init__(
+        self,
+        alpha: float = SMOOTHING_ALPHA,
+        retention_days: float = SIGNALS_STATS_RETENTION_DAYS,
+        capacity: int = 1024
+    ):
+        capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.alpha = alpha
+        self.retention = retention_days * _DAY
+        self.head = 0  # Sequence number of the oldest point kept
+        self.count = 0  # Points added (sequence number of the next one)
+        self.ordered = True  # False once a point arrived older than the previous one
+        self.trimmed_until = float("-inf")  # Newest timestamp dropped by retention
+        self._level_before_head = 0.0
+        self._mask = capacity - 1
+        self._times = array("d", bytes(8 * capacity))
+        self._prices = array("d", bytes(8 * capacity))
+        self._levels = array("d", bytes(8 * capacity))
+        self._recent: deque = deque(maxlen=max(MOVING_AVERAGE_WINDOWS))
+        self._recent_sums: Dict[int, float] = {points: 0.0 for points in MOVING_AVERAGE_WINDOWS}
+        self._windows: "OrderedDict[float, RollingWindow]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return self.count - self.head
+
+    def timestamp(self, seq: int) -> float:
+        return self._times[seq & self._mask]
+
+    def price(self, seq: int) -> float:
+        return self._prices[seq & self._mask]
+
+    def level(self, seq: int) -> float:
+        """Smoothed level after point `seq` (kept down to the point before the head)"""
+        if seq < self.head:
+            return self._level_before_head
+        return self._levels[seq & self._mask]
+
+    def append(self, timestamp: float, price: float) -> None:
+        """Add a point (timestamp in epoch seconds)"""
+        if len(self) > self._mask:
+            self._grow()
+        if self.count > self.head and timestamp < self.timestamp(self.count - 1):
+            self.ordered = False
+        seq = self.count
+        slot = seq & self._mask
+        self._times[slot] = timestamp
+        self._prices[slot] = price
+        self._levels[slot] = price if seq == 0 else (
+            self.alpha * price + (1 - self.alpha) * self.level(seq - 1)
+        )
+        self.count += 1
+
+        recent = self._recent
+        for points in MOVING_AVERAGE_WINDOWS:
+            if len(recent) >= points:
+                self._recent_sums[points] -= recent[-points]
+            self._recent_sums[points] += price
+        recent.append(price)
+
+        if self.retention and self.timestamp(self.head) < timestamp - self.retention:
+            self._trim(timestamp - self.retention)
+
+    def _grow(self) -> None:
+        capacity = 2 * (self._mask + 1)
+        mask = capacity - 1
+        times, prices, levels = (array("d", bytes(8 * capacity)) for _ in range(3))
+        for seq in range(self.head, self.count):
+            old, new = seq & self._mask, seq & mask
+            times[new] = self._times[old]
+            prices[new] = self._prices[old]
+            levels[new] = self._levels[old]
+        self._times, self._prices, self._levels, self._mask = times, prices, levels, mask
+
+    def _trim(self, before: float) -> None:
+        # Keep the latest point; a window not read since it held the dropped
+        # points is rebuilt on its next read
+        while self.head < self.count - 1 and self.timestamp(self.head) < before:
+            self.trimmed_until = max(self.trimmed_until, self.timestamp(self.head))
+            self._level_before_head = self.level(self.head)
+            self.head += 1
+        for days in [days for days, window in self._windows.items() if window.start < self.head]:
+            del self._windows[days]
+
+    def moving_average(self, points: int) -> Optional[float]:
+        """Mean of the last `points` prices (None if fewer were added)"""
+        if len(self._recent) < points:
+            return None
+        return self._recent_sums[points] / points
+
+    def _first_at_or_after(self, cutoff: float) -> int:
+        low, high = self.head, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < cutoff:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def window(self, days: float, now: Optional[float] = None) -> Optional[RollingWindow]:
+        """
+        The window of points from the last `days` days, brought up to date
+
+        Args:
+            days: Window length in days
+            now: Current time in epoch seconds (default: now)
+
+        Returns:
+            The window (possibly empty), or None when it cannot be served from
+            the series: timestamps out of order, or points of the window
+            already dropped by retention
+        """
+        if not self.ordered:
+            return None
+        now = datetime.now(tz=timezone.utc).timestamp() if now is None else now
+        cutoff = now - days * _DAY
+        if self.trimmed_until >= cutoff:
+            return None
+        window = self._windows.get(days)
+        if window is None:
+            window = RollingWindow(self, days, self._first_at_or_after(cutoff))
+            self._windows[days] = window
+            if len(self._windows) > MAX_WINDOWS_PER_ITEM:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(days)
+        window.advance(cutoff)
+        return window
@@ -5,7 +5,7 @@ Handles CRUD operations for user profiles and preferences using Cosmos DB
 
 import logging
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 
 from models.user_preferences import (
@@ -14,6 +14,7 @@ from models.user_preferences import (
     UserProfile,
     UserPreferencesResponse
 )
+from services.cosmos_service import query_page
 
 logger = logging.getLogger(__name__)
 
@@ -74,7 +75,7 @@ class ProfileService:
             return None
         
         try:
-            response = self.profiles_container.read_item(
+            response = await self.profiles_container.read_item(
                 item=email,
                 partition_key=email
             )
@@ -152,7 +153,7 @@ class ProfileService:
                 logger.debug(f"Profile already exists for user: {email}")
                 return existing
             
-            self.profiles_container.create_item(body=profile_data)
+            await self.profiles_container.create_item(body=profile_data)
             logger.info(f"Profile created for user: {email}")
             
             return UserProfile(**profile_data)
@@ -195,7 +196,7 @@ class ProfileService:
             update_dict["id"] = email  # Ensure ID is set
             
             # Replace item in Cosmos DB
-            self.profiles_container.replace_item(
+            await self.profiles_container.replace_item(
                 item=email,
                 body=update_dict
             )
@@ -229,14 +230,14 @@ class ProfileService:
                 return False
             
             # Delete profile
-            self.profiles_container.delete_item(
+            await self.profiles_container.delete_item(
                 item=email,
                 partition_key=email
             )
             
             # Also delete preferences
             try:
-                self.preferences_container.delete_item(
+                await self.preferences_container.delete_item(
                     item=email,
                     partition_key=email
                 )
@@ -271,7 +272,7 @@ class ProfileService:
             )
         
         try:
-            prefs = self.preferences_container.read_item(
+            prefs = await self.preferences_container.read_item(
                 item=email,
                 partition_key=email
             )
@@ -327,7 +328,7 @@ class ProfileService:
                 logger.debug(f"Preferences already exist for user: {email}")
                 return existing
             
-            self.preferences_container.create_item(body=prefs_data)
+            await self.preferences_container.create_item(body=prefs_data)
             logger.info(f"Preferences created for user: {email}")
             
             # Fix datetime
@@ -368,13 +369,13 @@ class ProfileService:
             
             # Try to replace existing, if not found create new
             try:
-                self.preferences_container.replace_item(
+                await self.preferences_container.replace_item(
                     item=email,
                     body=update_dict
                 )
             except Exception:
                 # Create if doesn't exist
-                self.preferences_container.create_item(body=update_dict)
+                await self.preferences_container.create_item(body=update_dict)
             
             logger.info(f"Preferences updated for user: {email}")
             
@@ -408,34 +409,26 @@ class ProfileService:
             # If tenant_id provided, filter by tenant_id field
             if tenant_id:
                 query = "SELECT * FROM c WHERE c.tenant_id = @tenant_id ORDER BY c.created_at DESC OFFSET @skip LIMIT @limit"
-                items = list(self.profiles_container.query_items(
+                items = [item async for item in self.profiles_container.query_items(
                     query=query,
                     parameters=[
                         {"name": "@tenant_id", "value": tenant_id},
                         {"name": "@skip", "value": skip},
                         {"name": "@limit", "value": limit}
                     ]
-                ))
+                )]
             else:
                 # Without tenant filtering (use with caution - admin only)
                 query = "SELECT * FROM c ORDER BY c.created_at DESC OFFSET @skip LIMIT @limit"
-                items = list(self.profiles_container.query_items(
+                items = [item async for item in self.profiles_container.query_items(
                     query=query,
                     parameters=[
                         {"name": "@skip", "value": skip},
                         {"name": "@limit", "value": limit}
                     ]
-                ))
+                )]
             
-            # Remove Cosmos DB system fields
-            profiles = []
-            for item in items:
-                item.pop("_rid", None)
-                item.pop("_self", None)
-                item.pop("_etag", None)
-                item.pop("_attachments", None)
-                item.pop("_ts", None)
-                profiles.append(UserProfile(**item))
+            profiles = [self._to_profile(item) for item in items]
             
             tenant_context = f"tenant:{tenant_id}" if tenant_id else "all"
             logger.info(f"Retrieved {len(profiles)} profiles from {tenant_context} (skip={skip}, limit={limit})")
@@ -445,6 +438,48 @@ class ProfileService:
             logger.error(f"Error retrieving profiles: {e}")
             raise
     
+    async def get_profiles_page(self, tenant_id: Optional[str] = None, max_items: Optional[int] = None,
+                                continuation_token: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """
+        Get one page of user profiles, newest first (admin operation)
+        
+        Pages follow Cosmos continuation tokens, so deep pages cost the same
+        as the first one (unlike OFFSET, which re-reads everything skipped).
+        
+        Args:
+            tenant_id: Optional tenant ID to filter profiles
+            max_items: Page size (default COSMOS_QUERY_PAGE_SIZE, at most COSMOS_MAX_PAGE_SIZE)
+            continuation_token: Token from the previous page
+            
+        Returns:
+            (profiles, continuation_token); the token is None after the last page
+            
+        Raises:
+            ValueError: If the continuation token is invalid
+        """
+        if not self.profiles_container:
+            logger.warning("Profiles container not initialized")
+            return [], None
+        
+        query = "SELECT * FROM c"
+        parameters = []
+        if tenant_id:
+            query += " WHERE c.tenant_id = @tenant_id"
+            parameters.append({"name": "@tenant_id", "value": tenant_id})
+        query += " ORDER BY c.created_at DESC"
+        
+        items, token = await query_page(self.profiles_container, query, parameters, max_items, continuation_token)
+        profiles = [self._to_profile(item) for item in items]
+        logger.info(f"Retrieved page of {len(profiles)} profiles (more: {token is not None})")
+        return profiles, token
+    
+    @staticmethod
+    def _to_profile(item: Dict[str, Any]) -> UserProfile:
+        """UserProfile from a stored item, without the Cosmos DB system fields"""
+        for system_field in ("_rid", "_self", "_etag", "_attachments", "_ts"):
+            item.pop(system_field, None)
+        return UserProfile(**item)
+    
     async def export_profile_data(self, email: str) -> Dict[str, Any]:
         """
         Export all user data (GDPR compliance)
@@ -0,0 +1,473 @@
+"""
+Quota Accounting
+
+In-process, write-behind usage accounting on top of QuotaService:
+- Usage is counted in memory and flushed to Cosmos in the background, one
+  patch (incr) per user per flush interval instead of a round trip per call
+- Limit checks are answered from a short-TTL local copy of the quota
+  document plus this worker's unflushed usage
+- Limits stay safe across workers through leases: before using quota a
+  worker reserves a block of units on the quota document (ETag-guarded
+  incr of reserved.<field>), then spends it locally without round trips.
+  Flushes turn spent reservations into usage. Lease blocks shrink as the
+  limit nears, down to one unit, so workers cannot together overshoot.
+
+Each worker records its reservations under leases.<worker id> on the
+document (units per field and when it last touched them). Unused leases
+are handed back after QUOTA_LEASE_IDLE_SECONDS idle and on shutdown. The
+lease of a worker that died is reclaimed once it has not been touched for
+QUOTA_STALE_RESERVATION_SECONDS: only its units are taken off reserved,
+so the leases of live workers stay covered.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from azure.cosmos import exceptions
+
+from services.cosmos_service import MAX_PATCH_OPERATIONS, patch_op, patch_path
+
+logger = logging.getLogger(__name__)
+
+QUOTA_WRITE_BEHIND = os.getenv("QUOTA_WRITE_BEHIND", "true").lower() == "true"
+QUOTA_LEASE_SIZE = int(os.getenv("QUOTA_LEASE_SIZE", "10"))  # Most units reserved per lease
+QUOTA_FLUSH_INTERVAL = float(os.getenv("QUOTA_FLUSH_INTERVAL", "1.0"))  # Seconds between flushes
+QUOTA_CHECK_TTL = float(os.getenv("QUOTA_CHECK_TTL", "5.0"))  # Seconds a cached quota document is trusted
+QUOTA_LEASE_IDLE_SECONDS = float(os.getenv("QUOTA_LEASE_IDLE_SECONDS", "60"))  # Unused leases returned after this
+QUOTA_STALE_RESERVATION_SECONDS = float(os.getenv("QUOTA_STALE_RESERVATION_SECONDS", "300"))
+QUOTA_FLUSH_CONCURRENCY = int(os.getenv("QUOTA_FLUSH_CONCURRENCY", "8"))  # Users flushed at once
+QUOTA_LEASE_RETRIES = 5  # ETag conflicts tolerated while reserving
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _parse_time(value: Optional[str]) -> float:
+    """Epoch seconds of an ISO timestamp written by _now() (0 if missing)"""
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class _UserQuota:
+    """This worker's view of one user's quota"""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.quota: Optional[Dict[str, Any]] = None
+        self.fetched_at = 0.0
+        self.last_used = time.monotonic()
+        self.leases: Dict[str, int] = {}  # Reserved units not spent yet
+        self.pending: Dict[str, int] = {}  # Usage not flushed yet
+        self.pending_leased: Dict[str, int] = {}  # Part of pending that was spent from leases
+        self.released: Dict[str, int] = {}  # Unspent lease units to hand back at the next flush
+        self.drop_lease = False  # Remove this worker's lease entry from the document at the next flush
+
+    def idle(self) -> bool:
+        return not (any(self.leases.values()) or any(self.pending.values()) or any(self.released.values())
+                    or self.drop_lease)
+
+
+class QuotaAccounting:
+    """
+    Write-behind usage counters and lease-based limit enforcement for one process.
+
+    Usage:
+        accounting = QuotaAccounting(quota_service)
+        if not await accounting.consume(email, "documents_uploaded"):
+            raise quota_exceeded_error(...)
+        ...
+        await accounting.release(email, "documents_uploaded")  # the upload failed
+        await accounting.close()  # flush and hand back leases
+    """
+
+    def __init__(self, quota_service: Any, lease_size: int = QUOTA_LEASE_SIZE,
+                 flush_interval: float = QUOTA_FLUSH_INTERVAL, check_ttl: float = QUOTA_CHECK_TTL):
+        """
+        Args:
+            quota_service: QuotaService used for reads and patches
+            lease_size: Most units reserved per lease
+            flush_interval: Seconds between background flushes
+            check_ttl: Seconds a cached quota document answers checks
+        """
+        self.quota_service = quota_service
+        self.lease_size = max(1, lease_size)
+        self.flush_interval = flush_interval
+        self.check_ttl = check_ttl
+        self.worker_id = uuid.uuid4().hex  # Key of this worker's entry under leases
+        self._users: Dict[str, _UserQuota] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stats = {
+            "checks": 0,
+            "check_cache_hits": 0,
+            "quota_reads": 0,
+            "units_counted": 0,
+            "units_released": 0,
+            "units_flushed": 0,
+            "flushes": 0,
+            "flush_patches": 0,
+            "flush_errors": 0,
+            "leases_granted": 0,
+            "lease_units_granted": 0,
+            "lease_units_returned": 0,
+            "lease_conflicts": 0,
+            "lease_denied": 0,
+            "reservations_reclaimed": 0,
+        }
+
+    # ===== Public API =====
+
+    async def check(self, user_email: str, field: str) -> Dict[str, Any]:
+        """
+        Limit status for a usage field, from the local cache when fresh.
+
+        Returns:
+            Same shape as QuotaService.check_limits: exceeded, remaining,
+            usage, limit, unlimited
+        """
+        from services.quota_service import limit_status
+
+        self._stats["checks"] += 1
+        user = self._user(user_email)
+        quota = await self._quota(user_email, user)
+        status = limit_status(quota, field, pending=user.pending.get(field, 0))
+        if not status["unlimited"] and user.leases.get(field, 0) > 0:
+            # Units already reserved for this worker are usable whatever the document says
+            status["exceeded"] = False
+            status["remaining"] = max(status["remaining"], user.leases[field])
+        return status
+
+    async def consume(self, user_email: str, field: str, amount: int = 1, enforce: bool = True) -> bool:
+        """
+        Count usage, spending from this worker's lease (reserving a new one when needed).
+
+        Args:
+            user_email: Email of the user (partition key)
+            field: Usage field, e.g. 'documents_uploaded'
+            amount: Units used
+            enforce: Refuse (return False) when the limit would be exceeded;
+                with enforce=False the usage is counted regardless
+
+        Returns:
+            True if the usage was counted
+        """
+        from services.quota_service import limit_for, limit_status
+
+        self._ensure_flushing()
+        user = self._user(user_email)
+        async with user.lock:
+            user.last_used = time.monotonic()
+            quota = await self._quota(user_email, user)
+            limit = limit_for(quota, field)
+
+            if limit is not None:
+                have = user.leases.get(field, 0)
+                # Usage that is counted regardless only reserves while the limit still has room
+                if have < amount and (enforce or not limit_status(quota, field, user.pending.get(field, 0))["exceeded"]):
+                    have += await self._reserve(user_email, user, field, limit, amount - have)
+                leased = min(have, amount)
+                if leased < amount and enforce:
+                    user.leases[field] = have
+                    self._stats["lease_denied"] += 1
+                    return False
+                user.leases[field] = have - leased
+                user.pending_leased[field] = user.pending_leased.get(field, 0) + leased
+
+            user.pending[field] = user.pending.get(field, 0) + amount
+            self._stats["units_counted"] += amount
+            return True
+
+    async def release(self, user_email: str, field: str, amount: int = 1) -> None:
+        """
+        Give back usage counted by consume() for work that then failed.
+
+        Units spent from this worker's lease and not flushed yet go back to
+        the lease; the rest is taken off the recorded usage at the next flush.
+        """
+        user = self._user(user_email)
+        async with user.lock:
+            user.last_used = time.monotonic()
+            returned = min(user.pending_leased.get(field, 0), amount)
+            if returned:
+                user.pending_leased[field] -= returned
+                user.leases[field] = user.leases.get(field, 0) + returned
+            user.pending[field] = user.pending.get(field, 0) - amount
+            self._stats["units_released"] += amount
+
+    def projected_quota(self, user_email: str) -> Optional[Dict[str, Any]]:
+        """Last known quota document with this worker's unflushed usage added"""
+        user = self._users.get(user_email)
+        if not user or not user.quota:
+            return None
+        quota = dict(user.quota, usage=dict(user.quota.get("usage", {})))
+        for field, amount in user.pending.items():
+            quota["usage"][field] = quota["usage"].get(field, 0) + amount
+        return quota
+
+    async def flush(self) -> int:
+        """Write all unflushed usage and returned leases; returns the units flushed"""
+        semaphore = asyncio.Semaphore(QUOTA_FLUSH_CONCURRENCY)
+        self._release_idle_leases()
+
+        async def flush_user(user_email: str, user: _UserQuota) -> int:
+            async with semaphore:
+                return await self._flush_user(user_email, user)
+
+        flushed = await asyncio.gather(*(
+            flush_user(user_email, user) for user_email, user in list(self._users.items()) if not user.idle()
+        ))
+        self._stats["flushes"] += 1
+
+        # Forget users with nothing outstanding that have gone quiet
+        cutoff = time.monotonic() - QUOTA_LEASE_IDLE_SECONDS
+        for user_email, user in list(self._users.items()):
+            if user.idle() and user.last_used < cutoff:
+                del self._users[user_email]
+        return sum(flushed)
+
+    async def close(self) -> None:
+        """Stop background flushing, hand back every unused lease and flush"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        for user in self._users.values():
+            self._hand_back_leases(user)
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["users"] = len(self._users)
+        stats["pending_units"] = sum(sum(user.pending.values()) for user in self._users.values())
+        stats["leased_units"] = sum(sum(user.leases.values()) for user in self._users.values())
+        return stats
+
+    # ===== Internals =====
+
+    def _user(self, user_email: str) -> _UserQuota:
+        user = self._users.get(user_email)
+        if user is None:
+            user = self._users[user_email] = _UserQuota()
+        return user
+
+    async def _quota(self, user_email: str, user: _UserQuota, fresh: bool = False) -> Dict[str, Any]:
+        """The user's quota document, read again when older than check_ttl (or when fresh=True)"""
+        if not fresh and user.quota is not None and time.monotonic() - user.fetched_at < self.check_ttl:
+            self._stats["check_cache_hits"] += 1
+            return user.quota
+        self._stats["quota_reads"] += 1
+        user.quota = await self.quota_service.get_or_create_quota(user_email)
+        user.fetched_at = time.monotonic()
+        return user.quota
+
+    def _lease_path(self, *keys: Any) -> str:
+        """JSON pointer into this worker's entry under leases"""
+        return patch_path("leases", self.worker_id, *keys)
+
+    async def _reserve(self, user_email: str, user: _UserQuota, field: str, limit: int, needed: int) -> int:
+        """
+        Reserve units of a limited field on the quota document; returns the units granted (0 if none left).
+
+        Reads the document fresh and increments reserved.<field> and this
+        worker's lease under its ETag, so reservations from all workers
+        together never exceed what the limit leaves after recorded usage.
+        """
+        for _ in range(QUOTA_LEASE_RETRIES):
+            quota = await self._quota(user_email, user, fresh=True)
+            usage = quota.get("usage", {}).get(field, 0)
+            reserved = max(quota.get("reserved", {}).get(field, 0), 0)
+            available = limit - usage - reserved
+
+            if available < needed:
+                stale = self._stale_lease(quota, field)
+                if stale is None:
+                    return 0
+                # A worker died holding a lease: take back its units, and only those
+                worker_id, units = stale
+                operations = [
+                    patch_op("incr", patch_path("reserved", name), -count) for name, count in units.items() if count
+                ] + [patch_op("remove", patch_path("leases", worker_id))]
+                if await self._patch_quota(user_email, user, operations, etag=quota.get("_etag")):
+                    self._stats["reservations_reclaimed"] += 1
+                continue
+
+            # Larger blocks while there is plenty left; single units near the limit
+            grant = max(needed, min(self.lease_size, available // 4))
+            now = _now()
+            operations = [
+                patch_op("incr", patch_path("reserved", field), grant) if "reserved" in quota
+                else patch_op("set", "/reserved", {field: grant}),
+            ]
+            leases = quota.get("leases")
+            if leases and self.worker_id in leases:
+                operations += [
+                    patch_op("incr", self._lease_path("units", field), grant),
+                    patch_op("set", self._lease_path("at"), now),
+                ]
+            elif isinstance(leases, dict):
+                operations.append(patch_op("set", self._lease_path(), {"at": now, "units": {field: grant}}))
+            else:
+                operations.append(patch_op("set", "/leases", {self.worker_id: {"at": now, "units": {field: grant}}}))
+            if await self._patch_quota(user_email, user, operations, etag=quota.get("_etag")):
+                self._stats["leases_granted"] += 1
+                self._stats["lease_units_granted"] += grant
+                return grant
+            self._stats["lease_conflicts"] += 1
+        return 0
+
+    def _stale_lease(self, quota: Dict[str, Any], field: str) -> Optional[Tuple[str, Dict[str, int]]]:
+        """Another worker's lease holding units of `field` untouched for QUOTA_STALE_RESERVATION_SECONDS"""
+        cutoff = time.time() - QUOTA_STALE_RESERVATION_SECONDS
+        for worker_id, lease in (quota.get("leases") or {}).items():
+            units = lease.get("units", {})
+            if worker_id != self.worker_id and units.get(field, 0) > 0 and _parse_time(lease.get("at")) < cutoff:
+                return worker_id, units
+        return None
+
+    def _hand_back_leases(self, user: _UserQuota) -> None:
+        """Queue the user's unused lease units to be returned, and the lease entry to be removed"""
+        for field, units in user.leases.items():
+            if units:
+                user.released[field] = user.released.get(field, 0) + units
+        user.leases.clear()
+        if self.worker_id in ((user.quota or {}).get("leases") or {}):
+            user.drop_lease = True
+
+    def _release_idle_leases(self) -> None:
+        """Queue unused leases of users idle for QUOTA_LEASE_IDLE_SECONDS to be handed back"""
+        cutoff = time.monotonic() - QUOTA_LEASE_IDLE_SECONDS
+        for user in self._users.values():
+            if user.last_used < cutoff and not user.lock.locked():
+                self._hand_back_leases(user)
+
+    async def _flush_user(self, user_email: str, user: _UserQuota) -> int:
+        """One patch per user: usage += spent, reserved and this worker's lease -= spent from leases and returned"""
+        async with user.lock:
+            pending, leased, released = user.pending, user.pending_leased, user.released
+            user.pending, user.pending_leased, user.released = {}, {}, {}
+
+        # Each entry: the operations with the deltas to put back if they are not written
+        entries: List[Tuple[List[Dict[str, Any]], List[Tuple[str, str, int]]]] = [
+            ([patch_op("incr", patch_path("usage", field), amount)], [("pending", field, amount)])
+            for field, amount in pending.items() if amount
+        ]
+        for field in set(leased) | set(released):
+            spent, returned = leased.get(field, 0), released.get(field, 0)
+            if spent + returned:
+                entries.append((
+                    [
+                        patch_op("incr", patch_path("reserved", field), -(spent + returned)),
+                        patch_op("incr", self._lease_path("units", field), -(spent + returned)),
+                    ],
+                    [("pending_leased", field, spent), ("released", field, returned)]
+                ))
+
+        # Room is left in each patch for the /updated_at and lease timestamps
+        batches: List[list] = []
+        size = MAX_PATCH_OPERATIONS
+        for entry in entries:
+            if size + len(entry[0]) > MAX_PATCH_OPERATIONS - 2:
+                batches.append([])
+                size = 0
+            batches[-1].append(entry)
+            size += len(entry[0])
+
+        flushed = 0
+        for index, batch in enumerate(batches):
+            operations = [operation for entry_operations, _ in batch for operation in entry_operations]
+            touches_lease = any(bucket != "pending" for _, deltas in batch for bucket, _, _ in deltas)
+            operations.append(patch_op("set", "/updated_at", _now()))
+            if touches_lease:
+                operations.append(patch_op("set", self._lease_path("at"), _now()))
+            if not await self._patch_quota(user_email, user, operations):
+                async with user.lock:
+                    # A lease reclaimed as stale is already off reserved: only usage is left to write
+                    reclaimed = touches_lease and not await self._holds_lease(user_email, user)
+                    if reclaimed:
+                        user.leases.clear()
+                        user.drop_lease = False
+                    # Put this and the later deltas back for the next flush
+                    for later in batches[index:]:
+                        for _, deltas in later:
+                            for bucket, field, amount in deltas:
+                                if reclaimed and bucket != "pending":
+                                    continue
+                                counters = getattr(user, bucket)
+                                counters[field] = counters.get(field, 0) + amount
+                self._stats["flush_errors"] += 1
+                break
+            for _, deltas in batch:
+                for bucket, _, amount in deltas:
+                    if bucket == "pending":
+                        flushed += amount
+                    elif bucket == "released":
+                        self._stats["lease_units_returned"] += amount
+        else:
+            if user.drop_lease:
+                await self._drop_lease(user_email, user)
+
+        self._stats["units_flushed"] += flushed
+        return flushed
+
+    async def _holds_lease(self, user_email: str, user: _UserQuota) -> bool:
+        """Whether this worker's lease entry is still on the document (True when it cannot be read)"""
+        try:
+            quota = await self._quota(user_email, user, fresh=True)
+        except Exception:
+            return True
+        return self.worker_id in (quota.get("leases") or {})
+
+    async def _drop_lease(self, user_email: str, user: _UserQuota) -> None:
+        """Remove this worker's lease entry once every unit in it has been handed back"""
+        async with user.lock:
+            user.drop_lease = False
+            if any(user.leases.values()) or any(user.pending_leased.values()) or any(user.released.values()):
+                return  # Leased again since it was handed back
+            lease = ((user.quota or {}).get("leases") or {}).get(self.worker_id)
+            if lease is None or any(lease.get("units", {}).values()):
+                return
+            await self._patch_quota(user_email, user, [patch_op("remove", self._lease_path())],
+                                    etag=user.quota.get("_etag"))
+
+    async def _patch_quota(self, user_email: str, user: _UserQuota, operations: list,
+                           etag: Optional[str] = None) -> bool:
+        """Patch the quota document; False on an ETag conflict or error (the cached copy is refreshed)"""
+        try:
+            quota = await self.quota_service.cosmos_service.patch_item(
+                self.quota_service.container_name, f"quota-{user_email}", user_email, operations, etag=etag
+            )
+            self._stats["flush_patches"] += 1
+            user.quota, user.fetched_at = quota, time.monotonic()
+            return True
+        except exceptions.CosmosAccessConditionFailedError:
+            return False
+        except Exception as e:
+            logger.error(f"Quota patch failed for {user_email}: {e}")
+            return False
+
+    def _ensure_flushing(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+            except RuntimeError:
+                pass  # No running loop: callers flush explicitly
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Quota flush failed: {e}")
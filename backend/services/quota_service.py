@@ -6,14 +6,20 @@ Manages user quota and usage limits with Cosmos DB storage.
 - Increment usage counters
 - Check quota limits
 - Track usage by tier (free, pro, enterprise)
+
+The process-wide instance (get_quota_service) counts usage write-behind
+through services.quota_accounting when QUOTA_WRITE_BEHIND is on.
 """
 
 import uuid
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any
 
-from services.cosmos_service import CosmosService
+from repositories.bulk import BulkExecutor
+from services.cosmos_service import CosmosService, get_cosmos_service, patch_op, patch_path
+from services.quota_accounting import QUOTA_WRITE_BEHIND, QuotaAccounting
 from azure.cosmos import exceptions
 
 logger = logging.getLogger(__name__)
@@ -23,33 +29,85 @@ logger = logging.getLogger(__name__)
 QUOTA_LIMITS = {
     "free": {
         "documents_per_month": 10,
+        "conversions_per_month": 10,
         "exports_per_month": 20,
         "api_calls_per_day": 100,
     },
     "pro": {
         "documents_per_month": 100,
+        "conversions_per_month": 100,
         "exports_per_month": 500,
         "api_calls_per_day": 10000,
     },
     "enterprise": {
         "documents_per_month": None,  # Unlimited
+        "conversions_per_month": None,
         "exports_per_month": None,
         "api_calls_per_day": None,
     },
 }
 
 
+# Usage field -> limit field (e.g., 'documents_uploaded' -> 'documents_per_month');
+# the gated routes reserve these usage fields
+USAGE_LIMIT_FIELDS = {
+    "documents_uploaded": "documents_per_month",
+    "conversions_created": "conversions_per_month",
+    "exports_generated": "exports_per_month",
+    "daily_api_calls": "api_calls_per_day",
+}
+
+
+def limit_for(quota: Dict[str, Any], field: str) -> Optional[int]:
+    """Limit on a usage field in a quota document (None = unlimited)
+    
+    A limit the document predates comes from its tier's defaults.
+    """
+    limit_field = USAGE_LIMIT_FIELDS.get(field, field)
+    limits = quota.get("limits", {})
+    if limit_field in limits:
+        return limits[limit_field]
+    return QUOTA_LIMITS.get(quota.get("tier"), QUOTA_LIMITS["free"]).get(limit_field)
+
+
+def limit_status(quota: Dict[str, Any], field: str, pending: int = 0) -> Dict[str, Any]:
+    """Limit check result for a usage field, counting pending (not yet stored) usage"""
+    limit = limit_for(quota, field)
+    usage_count = quota.get("usage", {}).get(field, 0) + pending
+    
+    # Unlimited if limit is None
+    if limit is None:
+        return {
+            "exceeded": False,
+            "remaining": None,
+            "usage": usage_count,
+            "limit": None,
+            "unlimited": True
+        }
+    
+    return {
+        "exceeded": usage_count >= limit,
+        "remaining": max(0, limit - usage_count),
+        "usage": usage_count,
+        "limit": limit,
+        "unlimited": False
+    }
+
+
 class QuotaService:
     """Service for managing user quotas and usage limits in Cosmos DB."""
 
-    def __init__(self, cosmos_service: CosmosService):
+    def __init__(self, cosmos_service: CosmosService, write_behind: bool = False):
         """Initialize with Cosmos DB service.
         
         Args:
             cosmos_service: Instance of CosmosService for database operations
+            write_behind: Count usage in memory and flush it in batches
+                (QuotaAccounting) instead of one patch per increment
         """
         self.cosmos_service = cosmos_service
         self.container_name = "quota"
+        self.accounting: Optional[QuotaAccounting] = QuotaAccounting(self) if write_behind else None
 
     async def get_or_create_quota(self, user_email: str, tier: str = "free") -> Dict[str, Any]:
         """Get existing quota or create default for user.
@@ -92,6 +150,7 @@ class QuotaService:
                     "usage": {
                         "documents_uploaded": 0,
                         "documents_processed": 0,
+                        "conversions_created": 0,
                         "exports_generated": 0,
                         "total_api_calls": 0,
                         "daily_api_calls": 0,
@@ -140,29 +199,22 @@ class QuotaService:
         try:
             logger.debug(f"Incrementing {field} by {amount} for user {user_email}")
             
-            quota_id = f"quota-{user_email}"
+            if self.accounting:
+                # Counted locally (from this worker's lease) and flushed in the background
+                await self.accounting.consume(user_email, field, amount, enforce=False)
+                return self.accounting.projected_quota(user_email)
             
-            # Read current quota
-            quota = await self.cosmos_service.read_item(
-                self.container_name,
-                quota_id,
-                partition_key=user_email
-            )
-            
-            # Increment the field
-            if "usage" not in quota:
-                quota["usage"] = {}
-            
-            current_value = quota["usage"].get(field, 0)
-            quota["usage"][field] = current_value + amount
-            quota["updated_at"] = datetime.utcnow().isoformat() + "Z"
+            quota_id = f"quota-{user_email}"
             
-            # Replace the document
-            result = await self.cosmos_service.replace_item(
+            # Increment in place: one patch round trip, no read and no lost updates
+            result = await self.cosmos_service.patch_item(
                 self.container_name,
                 quota_id,
-                quota,
-                partition_key=user_email
+                user_email,
+                [
+                    patch_op("incr", patch_path("usage", field), amount),
+                    patch_op("set", "/updated_at", datetime.utcnow().isoformat() + "Z"),
+                ]
             )
             
             logger.info(f"Usage {field} incremented to {result['usage'].get(field)} for {user_email}")
@@ -195,44 +247,16 @@ class QuotaService:
         try:
             logger.debug(f"Checking limits for {field}, user {user_email}")
             
-            quota = await self.get_or_create_quota(user_email)
-            
-            limits = quota.get("limits", {})
-            usage = quota.get("usage", {})
-            
-            # Map usage field to limit field (e.g., 'documents_uploaded' -> 'documents_per_month')
-            field_mapping = {
-                "documents_uploaded": "documents_per_month",
-                "exports_generated": "exports_per_month",
-                "total_api_calls": "api_calls_per_day",
-            }
-            
-            limit_field = field_mapping.get(field, field)
-            limit = limits.get(limit_field)
-            usage_count = usage.get(field, 0)
+            if self.accounting:
+                return await self.accounting.check(user_email, field)
             
-            # Unlimited if limit is None
-            if limit is None:
-                return {
-                    "exceeded": False,
-                    "remaining": None,
-                    "usage": usage_count,
-                    "limit": None,
-                    "unlimited": True
-                }
-            
-            exceeded = usage_count >= limit
-            remaining = max(0, limit - usage_count)
-            
-            logger.debug(f"Limit check for {field}: usage={usage_count}, limit={limit}, exceeded={exceeded}")
+            quota = await self.get_or_create_quota(user_email)
+            result = limit_status(quota, field)
             
-            return {
-                "exceeded": exceeded,
-                "remaining": remaining,
-                "usage": usage_count,
-                "limit": limit,
-                "unlimited": False
-            }
+            logger.debug(
+                f"Limit check for {field}: usage={result['usage']}, limit={result['limit']}, exceeded={result['exceeded']}"
+            )
+            return result
         
         except Exception as e:
             logger.error(
@@ -241,6 +265,62 @@ class QuotaService:
             )
             raise
 
+    async def reserve_usage(self, user_email: str, field: str, amount: int = 1) -> bool:
+        """Check the limit and count the usage in one step.
+        
+        With write-behind accounting this is answered from the worker's
+        quota lease, so concurrent requests (on any worker) cannot together
+        go over the limit; otherwise it is check_limits + increment_usage.
+        
+        Args:
+            user_email: Email of the user (partition key)
+            field: Usage field name (e.g., 'documents_uploaded')
+            amount: Units to use
+        
+        Returns:
+            True if the usage was within the limit and has been counted
+        """
+        if self.accounting:
+            return await self.accounting.consume(user_email, field, amount)
+        
+        status = await self.check_limits(user_email, field)
+        if not status["unlimited"] and status["remaining"] < amount:
+            return False
+        await self.increment_usage(user_email, field, amount)
+        return True
+
+    async def release_usage(self, user_email: str, field: str, amount: int = 1) -> None:
+        """Give back usage counted by reserve_usage when the work it gated failed.
+        
+        Args:
+            user_email: Email of the user (partition key)
+            field: Usage field name (e.g., 'documents_uploaded')
+            amount: Units reserved
+        """
+        if self.accounting:
+            await self.accounting.release(user_email, field, amount)
+            return
+        await self.increment_usage(user_email, field, -amount)
+
+    @asynccontextmanager
+    async def release_on_failure(self, user_email: str, field: str, amount: int = 1) -> AsyncIterator[None]:
+        """Run the work a reserve_usage call gated; the usage is released if it raises.
+        
+        Usage:
+            if not await quota_service.reserve_usage(email, "exports_generated"):
+                raise quota_exceeded_error(...)
+            async with quota_service.release_on_failure(email, "exports_generated"):
+                ...  # create the export
+        """
+        try:
+            yield
+        except BaseException:
+            try:
+                await self.release_usage(user_email, field, amount)
+            except Exception as e:
+                logger.error(f"Failed to release {field} for {user_email}: {e}", exc_info=True)
+            raise
+
     async def get_usage(self, user_email: str) -> Dict[str, Any]:
         """Get current usage and quota status for user.
         
@@ -291,42 +371,28 @@ class QuotaService:
         try:
             logger.info("Starting monthly quota reset")
             
-            # Query all quota documents
-            query = "SELECT * FROM c WHERE c.type = 'quota'"
-            results = await self.cosmos_service.query_items(
-                self.container_name,
-                query,
-                partition_key=None  # Query across all partitions
-            )
-            
-            updated_count = 0
+            # Patch the monthly counters in place, in per-user batches;
+            # a reset interrupted part way resumes from its checkpoint
             now = datetime.utcnow().isoformat() + "Z"
+            operations = [
+                patch_op("set", patch_path("usage", field), 0)
+                for field in (
+                    "documents_uploaded", "documents_processed", "conversions_created",
+                    "exports_generated", "daily_api_calls",
+                )
+            ] + [
+                patch_op("set", "/last_reset", now),
+                patch_op("set", "/next_reset", self._calculate_next_reset()),
+                patch_op("set", "/updated_at", now),
+            ]
             
-            for quota in results:
-                try:
-                    # Reset monthly counters
-                    quota["usage"]["documents_uploaded"] = 0
-                    quota["usage"]["documents_processed"] = 0
-                    quota["usage"]["exports_generated"] = 0
-                    quota["usage"]["daily_api_calls"] = 0
-                    quota["last_reset"] = now
-                    quota["next_reset"] = self._calculate_next_reset()
-                    quota["updated_at"] = now
-                    
-                    # Replace the document
-                    await self.cosmos_service.replace_item(
-                        self.container_name,
-                        quota.get("id"),
-                        quota,
-                        partition_key=quota.get("user_email")
-                    )
-                    
-                    updated_count += 1
-                    logger.debug(f"Reset quota for {quota.get('user_email')}")
-                
-                except Exception as e:
-                    logger.error(f"Failed to reset quota {quota.get('id')}: {e}")
-                    continue
+            container = await self.cosmos_service.get_container("KraftdDB", self.container_name)
+            stats = await BulkExecutor(container, "user_email").run(
+                f"reset-monthly-usage:{datetime.utcnow():%Y-%m}",
+                where="c.type = 'quota'",
+                build_operation=lambda quota: ("patch", (quota["id"], operations)),
+            )
+            updated_count = stats.succeeded
             
             logger.info(f"Monthly quota reset complete: {updated_count} quotas updated")
             return updated_count
@@ -338,6 +404,39 @@ class QuotaService:
             )
             raise
 
+    async def reset_daily_usage(self) -> int:
+        """Reset the daily API call counters (limited by api_calls_per_day) for all users.
+        
+        This should be called daily (e.g., via scheduled task).
+        
+        Returns:
+            Number of quotas updated
+        """
+        try:
+            logger.info("Starting daily quota reset")
+            
+            operations = [
+                patch_op("set", patch_path("usage", "daily_api_calls"), 0),
+                patch_op("set", "/updated_at", datetime.utcnow().isoformat() + "Z"),
+            ]
+            
+            container = await self.cosmos_service.get_container("KraftdDB", self.container_name)
+            stats = await BulkExecutor(container, "user_email").run(
+                f"reset-daily-usage:{datetime.utcnow():%Y-%m-%d}",
+                where="c.type = 'quota'",
+                build_operation=lambda quota: ("patch", (quota["id"], operations)),
+            )
+            
+            logger.info(f"Daily quota reset complete: {stats.succeeded} quotas updated")
+            return stats.succeeded
+        
+        except Exception as e:
+            logger.error(
+                f"Failed to reset daily usage: {e}",
+                exc_info=True
+            )
+            raise
+
     @staticmethod
     def _calculate_next_reset() -> str:
         """Calculate next monthly reset date (1st of next month).
@@ -369,6 +468,11 @@ def get_quota_service() -> QuotaService:
     """
     global _quota_service_instance
     if _quota_service_instance is None:
-        cosmos_service = CosmosService()
-        _quota_service_instance = QuotaService(cosmos_service)
+        _quota_service_instance = QuotaService(get_cosmos_service(), write_behind=QUOTA_WRITE_BEHIND)
     return _quota_service_instance
+
+
+async def close_quota_service() -> None:
+    """Flush write-behind usage and hand back quota leases (on shutdown, before Cosmos closes)"""
+    if _quota_service_instance is not None and _quota_service_instance.accounting:
+        await _quota_service_instance.accounting.close()
@@ -9,6 +9,7 @@ Provides:
 - Anomaly detection events
 - Trend change notifications
 - Supplier signal events
+- Price point replication across API workers (through the streaming event bus)
 """
 
 import logging
@@ -16,18 +17,21 @@ from typing import List, Optional, Dict
 from datetime import datetime
 from models.signals import (
     RiskSignal, RiskLevel, AlertType, PriceTrend, TrendDirection,
-    SupplierMetric, AnomalyDetection
+    SupplierMetric, AnomalyDetection, PricePoint
 )
 from models.streaming import (
     RiskAlert, PriceUpdate, AnomalyDetected, TrendChange, SupplierSignal,
     AlertLevel, AnomalyType, TrendDirection as StreamTrendDirection, SignalType
 )
 
+from services.event_bus import EventBus
+from services.signals_service import SignalsService
+
 logger = logging.getLogger(__name__)
 
 # Import broadcaster - will be initialized at module load
 try:
-    from services.event_broadcaster import broadcaster
+    from services.event_broadcaster import broadcaster, deserialize_event, serialize_event
     BROADCASTER_AVAILABLE = True
 except Exception as e:
     logger.warning(f"EventBroadcaster not available: {e}")
@@ -41,6 +45,32 @@ class SignalsBroadcasterBridge:
     to connected WebSocket clients in real-time.
     """
     
+    _bus: Optional[EventBus] = None
+    
+    @staticmethod
+    def attach_bus(bus: EventBus) -> None:
+        """Replicate price points through the event bus, and apply those of other workers"""
+        SignalsBroadcasterBridge._bus = bus
+        bus.subscribe("price_point", SignalsBroadcasterBridge._on_bus_price_point)
+    
+    @staticmethod
+    def record_price_point(item_id: str, price_point: PricePoint) -> None:
+        """Add a price point to this worker's history and publish it for the other workers
+        
+        Args:
+            item_id: Item/product ID
+            price_point: The price point
+        """
+        SignalsService.add_price_point(item_id, price_point)
+        bus = SignalsBroadcasterBridge._bus
+        if bus is not None and BROADCASTER_AVAILABLE:
+            bus.publish(f"price_point:{item_id}", serialize_event(price_point.dict()))
+    
+    @staticmethod
+    async def _on_bus_price_point(item_id: str, payload: str) -> None:
+        """A price point ingested by another worker"""
+        SignalsService.add_price_point(item_id, PricePoint(**deserialize_event(payload)))
+    
     @staticmethod
     async def broadcast_price_update(
         item_id: str,
@@ -6,9 +6,9 @@ Implements Phase 5: Signals Intelligence layer for KraftdIntel.
 
 import logging
 import statistics
-from typing import List, Dict, Optional, Tuple
+from typing import Deque, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, deque
 
 from models.signals import (
     PricePoint, PriceTrend, TrendDirection, AnalysisPeriod,
@@ -16,6 +16,7 @@ from models.signals import (
     SupplierPerformance, SupplierHealthStatus, PricePrediction,
     AnomalyDetection
 )
+from services.price_stats import SMOOTHING_ALPHA, PriceSeries, RollingWindow, to_epoch
 
 logger = logging.getLogger(__name__)
 
@@ -50,17 +51,27 @@ class TrendAnalysisService:
         if len(prices) < 2:
             return TrendDirection.STABLE
         
-        # Calculate volatility
-        volatility = TrendAnalysisService.calculate_volatility(prices)
-        volatility_threshold = statistics.mean(prices) * 0.05  # 5% threshold
+        return TrendAnalysisService.classify_trend(
+            volatility=TrendAnalysisService.calculate_volatility(prices),
+            mean=statistics.mean(prices),
+            first_half_avg=statistics.mean(prices[:len(prices)//2]),
+            second_half_avg=statistics.mean(prices[len(prices)//2:])
+        )
+    
+    @staticmethod
+    def classify_trend(
+        volatility: float,
+        mean: float,
+        first_half_avg: float,
+        second_half_avg: float
+    ) -> TrendDirection:
+        """Trend direction from the statistics of at least 2 prices"""
+        volatility_threshold = mean * 0.05  # 5% threshold
         
         if volatility > volatility_threshold:
             return TrendDirection.VOLATILE
         
         # Calculate simple trend
-        first_half_avg = statistics.mean(prices[:len(prices)//2])
-        second_half_avg = statistics.mean(prices[len(prices)//2:])
-        
         change_percent = TrendAnalysisService.calculate_price_change_percent(
             second_half_avg, first_half_avg
         )
@@ -86,15 +97,13 @@ class TrendAnalysisService:
         if len(prices) < 3:
             return None
         
-        # Simple exponential smoothing with alpha = 0.3
-        alpha = 0.3
-        forecast = prices[-1]
-        
-        for _ in range(periods):
-            # Calculate next forecast
-            forecast = alpha * prices[-1] + (1 - alpha) * forecast
+        # Simple exponential smoothing: the forecast for every period ahead is the smoothed level
+        alpha = SMOOTHING_ALPHA
+        level = prices[0]
+        for price in prices[1:]:
+            level = alpha * price + (1 - alpha) * level
         
-        return round(forecast, 2)
+        return round(level, 2)
     
     @staticmethod
     def analyze_trend(
@@ -135,6 +144,46 @@ class TrendAnalysisService:
         }
         
         return trend_data
+    
+    @staticmethod
+    def analyze_window(window: RollingWindow) -> Dict:
+        """Trend analysis of a rolling window: analyze_trend over its prices, in O(1)
+        
+        Args:
+            window: Non-empty window of an item's PriceSeries
+            
+        Returns:
+            Dictionary with trend metrics (as analyze_trend)
+        """
+        count = window.count
+        current_price = window.last_price
+        previous_price = window.first_price if count > 1 else current_price
+        
+        if count < 2:
+            direction = TrendDirection.STABLE
+        else:
+            direction = TrendAnalysisService.classify_trend(
+                volatility=window.stdev,
+                mean=window.mean,
+                first_half_avg=window.first_half_mean,
+                second_half_avg=window.second_half_mean
+            )
+        
+        return {
+            "direction": direction,
+            "current_price": current_price,
+            "previous_price": previous_price,
+            "price_change_percent": TrendAnalysisService.calculate_price_change_percent(
+                current_price, previous_price
+            ),
+            "moving_average_7d": window.moving_average(7),
+            "moving_average_30d": window.moving_average(30),
+            "volatility": window.stdev,
+            "min_price": window.min_price,
+            "max_price": window.max_price,
+            "forecasted_price": round(window.smoothed_level(), 2) if count >= 3 else None,
+            "data_points": count
+        }
 
 
 class RiskScoringService:
@@ -429,20 +478,37 @@ class AnomalyDetectionService:
 class SignalsService:
     """Main service orchestrating all signals intelligence operations"""
     
-    # In-memory storage
-    _price_history: Dict[str, List[PricePoint]] = {}
+    # In-memory storage; an item's history holds the points its PriceSeries
+    # keeps (SIGNALS_STATS_RETENTION_DAYS), oldest first
+    _price_history: Dict[str, Deque[PricePoint]] = {}
+    _price_series: Dict[str, PriceSeries] = {}  # Rolling statistics over _price_history
     _risk_alerts: Dict[str, RiskAlert] = {}
     _supplier_metrics: Dict[str, Dict] = {}
     
     @staticmethod
     def add_price_point(item_id: str, price_point: PricePoint) -> None:
-        """Add a price point to history"""
-        if item_id not in SignalsService._price_history:
-            SignalsService._price_history[item_id] = []
-        
-        SignalsService._price_history[item_id].append(price_point)
+        """Add a price point to history (points past the statistics retention are dropped)"""
+        history = SignalsService._price_history.get(item_id)
+        if history is None:
+            history = SignalsService._price_history[item_id] = deque()
+            SignalsService._price_series[item_id] = PriceSeries()
+        series = SignalsService._price_series[item_id]
+        
+        history.append(price_point)
+        series.append(to_epoch(price_point.timestamp), price_point.price)
+        # The series drops its oldest points past the retention: so does the history
+        while len(history) > len(series):
+            history.popleft()
         logger.info(f"Price point added for {item_id}: ${price_point.price}")
     
+    @staticmethod
+    def _price_window(item_id: str, days_back: int) -> Optional[RollingWindow]:
+        """The item's rolling window of the last days_back days (None: not served by the series)"""
+        window = SignalsService._price_series[item_id].window(days_back)
+        if window is None:
+            logger.debug(f"Price series of {item_id} cannot serve a {days_back}-day window; scanning history")
+        return window
+    
     @staticmethod
     def get_price_trend(
         item_id: str,
@@ -454,23 +520,21 @@ class SignalsService:
         if item_id not in SignalsService._price_history:
             return None
         
-        history = SignalsService._price_history[item_id]
-        cutoff_date = datetime.utcnow() - timedelta(days=days_back)
-        
-        # Filter by date range
-        recent_prices = [
-            p for p in history
-            if p.timestamp >= cutoff_date
-        ]
-        
-        if not recent_prices:
-            return None
-        
-        prices = [p.price for p in recent_prices]
-        timestamps = [p.timestamp for p in recent_prices]
-        
-        # Analyze trend
-        trend_data = TrendAnalysisService.analyze_trend(prices, timestamps, period)
+        window = SignalsService._price_window(item_id, days_back)
+        if window is not None:
+            if not window.count:
+                return None
+            trend_data = TrendAnalysisService.analyze_window(window)
+        else:
+            recent_prices = SignalsService._recent_price_points(item_id, days_back)
+            if not recent_prices:
+                return None
+            
+            prices = [p.price for p in recent_prices]
+            timestamps = [p.timestamp for p in recent_prices]
+            
+            # Analyze trend
+            trend_data = TrendAnalysisService.analyze_trend(prices, timestamps, period)
         
         return PriceTrend(
             item_id=item_id,
@@ -480,6 +544,45 @@ class SignalsService:
             forecast_confidence=0.85  # Simple estimate
         )
     
+    @staticmethod
+    def _recent_price_points(item_id: str, days_back: int) -> List[PricePoint]:
+        """Price points of the last days_back days, by scanning the history"""
+        cutoff_date = datetime.utcnow() - timedelta(days=days_back)
+        return [
+            p for p in SignalsService._price_history[item_id]
+            if p.timestamp >= cutoff_date
+        ]
+    
+    @staticmethod
+    def detect_latest_price_anomaly(
+        item_id: str,
+        days_back: int = 90,
+        threshold_std_dev: float = 2.5
+    ) -> Optional[Tuple[float, float, float]]:
+        """Check the item's latest price against its last days_back days
+        
+        Returns:
+            (deviation_percent, z_score, mean) if the latest price is an anomaly, else None
+        """
+        if item_id not in SignalsService._price_history:
+            return None
+        
+        window = SignalsService._price_window(item_id, days_back)
+        if window is not None:
+            if window.count < 3:
+                return None
+            price, mean, std_dev = window.last_price, window.mean, window.stdev
+        else:
+            prices = [p.price for p in SignalsService._recent_price_points(item_id, days_back)]
+            if len(prices) < 3:
+                return None
+            price, mean, std_dev = prices[-1], statistics.mean(prices), statistics.stdev(prices)
+        
+        z_score = (price - mean) / std_dev if std_dev > 0 else 0
+        if abs(z_score) <= threshold_std_dev:
+            return None
+        return abs((price - mean) / mean * 100), z_score, mean
+    
     @staticmethod
     def create_risk_alert(
         item_id: str,
@@ -559,6 +662,7 @@ class SignalsService:
     def clear_all() -> None:
         """Clear all stored data (for testing)"""
         SignalsService._price_history.clear()
+        SignalsService._price_series.clear()
         SignalsService._risk_alerts.clear()
         SignalsService._supplier_metrics.clear()
         logger.info("Signals service cleared")
@@ -0,0 +1,73 @@
+"""
+SQLite Store
+
+Connection handling shared by the stores that keep state for every worker
+process of one host in a SQLite file (rate_limit.SQLiteRateLimitStore,
+services.extraction_jobs.SQLiteJobQueue):
+- WAL journal with synchronous=NORMAL: readers never block the writer and
+  commits do not wait for an fsync
+- One connection per store, used by one thread at a time
+- IMMEDIATE transactions: the write lock is taken up front, so concurrent
+  processes queue on it instead of failing to upgrade a read lock
+- Async callers run their statements in a thread to keep the event loop free
+"""
+
+import asyncio
+import sqlite3
+import threading
+from typing import Any, Callable, Sequence
+
+
+class SQLiteStore:
+    """
+    A SQLite file opened for cross-process state.
+
+    Usage:
+        store = SQLiteStore(path, schema=["CREATE TABLE IF NOT EXISTS ..."])
+        row = await store.run(lambda: store.db.execute("SELECT ...").fetchone())
+        store.close()
+    """
+
+    def __init__(self, path: str, schema: Sequence[str] = (), timeout: float = 10):
+        """
+        Args:
+            path: Database file (created if missing)
+            schema: Statements run once on open (CREATE ... IF NOT EXISTS)
+            timeout: Seconds to wait for another process's write lock
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in schema:
+            self.db.execute(statement)
+
+    def transaction(self, func: Callable[..., Any], *args) -> Any:
+        """Call func(*args) in an IMMEDIATE transaction, rolled back if it raises"""
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(*args)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return result
+
+    def read(self, func: Callable[..., Any], *args) -> Any:
+        """Call func(*args) with the connection to itself (for reads, no transaction)"""
+        with self._lock:
+            return func(*args)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """transaction() in a thread"""
+        return await asyncio.to_thread(self.transaction, func, *args)
+
+    async def run_read(self, func: Callable[..., Any], *args) -> Any:
+        """read() in a thread"""
+        return await asyncio.to_thread(self.read, func, *args)
+
+    def close(self) -> None:
+        with self._lock:
+            self.db.close()
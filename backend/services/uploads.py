@@ -0,0 +1,78 @@
+"""
+Upload Streaming
+
+Writes uploaded files to disk a chunk at a time, hashing them and enforcing
+the size limit on the way, without blocking the event loop: each chunk is
+hashed and written in one hop to the default thread pool (hashlib and file
+writes release the GIL), so several uploads proceed in parallel while the
+loop keeps serving requests. A file whose declared size is already over
+the limit is rejected before anything is written.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from typing import BinaryIO, Tuple
+
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeds the size limit (nothing is left on disk)"""
+
+    def __init__(self, size: int, max_bytes: int):
+        super().__init__(f"Upload of at least {size} bytes exceeds the {max_bytes} byte limit")
+        self.size = size
+        self.max_bytes = max_bytes
+
+
+def _write_chunk(handle: BinaryIO, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+async def stream_upload_to_file(file: UploadFile, path: str, max_bytes: int,
+                                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[int, str]:
+    """
+    Stream an upload to `path`.
+
+    Args:
+        file: The uploaded file
+        path: Destination file
+        max_bytes: Size limit; larger uploads raise UploadTooLarge
+        chunk_size: Bytes read and written at a time
+
+    Returns:
+        (size in bytes, SHA-256 hex digest)
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(file.size, max_bytes)
+
+    digest = hashlib.sha256()
+    size = 0
+    handle = await asyncio.to_thread(open, path, "wb")
+    try:
+        while chunk := await file.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(size, max_bytes)
+            await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+    except BaseException:
+        await asyncio.to_thread(handle.close)
+        await asyncio.to_thread(remove_upload, path)
+        raise
+    await asyncio.to_thread(handle.close)
+    return size, digest.hexdigest()
+
+
+def remove_upload(path: str) -> None:
+    """Delete an uploaded (or partially written) file, logging if it cannot be removed"""
+    try:
+        os.remove(path)
+    except OSError as e:
+        logger.warning(f"Could not remove upload {path}: {e}")
@@ -80,11 +80,11 @@ class UserService:
                 query = "SELECT * FROM c WHERE c.email = @email"
                 parameters = [{"name": "@email", "value": email}]
                 
-                results = list(self.users_container.query_items(
+                results = [item async for item in self.users_container.query_items(
                     query=query,
                     parameters=parameters,
                     partition_key=email
-                ))
+                )]
                 
                 if results:
                     user_data = results[0]
@@ -42,6 +42,60 @@ def init_profile_service():
     # Service is stateless, no cleanup needed
 
 
+# Containers of the in-memory Cosmos DB (name -> partition key path); override
+# per test with @pytest.mark.parametrize("cosmos", [{...}], indirect=True)
+COSMOS_TEST_CONTAINERS = {
+    "documents": "/owner_email",
+    "extractions": "/owner_email",
+    "quota": "/user_email",
+}
+
+
+@pytest.fixture
+async def cosmos(request, monkeypatch, tmp_path):
+    """Process-wide CosmosService backed by the in-memory client; bulk checkpoints under tmp_path"""
+    from azure.cosmos import PartitionKey
+    import repositories.bulk as bulk_module
+    import services.cosmos_service as cosmos_module
+    import services.quota_service as quota_module
+    from repositories.document_repository import DATABASE_ID
+    from services.cosmos_memory import InMemoryCosmosClient
+    from services.cosmos_service import CosmosService
+
+    client = InMemoryCosmosClient()
+    database = client.get_database_client(DATABASE_ID)
+    for container, partition_key in getattr(request, "param", COSMOS_TEST_CONTAINERS).items():
+        await database.create_container_if_not_exists(id=container, partition_key=PartitionKey(path=partition_key))
+    service = CosmosService(client=client)
+    await service.initialize()
+    monkeypatch.setattr(cosmos_module, "_cosmos_service", service)
+    # Services cached by other tests hold their own CosmosService
+    monkeypatch.setattr(quota_module, "_quota_service_instance", None)
+    monkeypatch.setattr(bulk_module, "BULK_CHECKPOINT_DIR", str(tmp_path))
+    yield service
+    await service.close()
+
+
+@pytest.fixture
+def count_calls(monkeypatch):
+    """count_calls(*names): record in-memory container calls by method name"""
+    from services.cosmos_memory import InMemoryContainer
+
+    def count(*names):
+        calls = []
+        for name in names:
+            original = getattr(InMemoryContainer, name)
+
+            async def record(self, *args, _name=name, _original=original, **kwargs):
+                calls.append(_name)
+                return await _original(self, *args, **kwargs)
+
+            monkeypatch.setattr(InMemoryContainer, name, record)
+        return calls
+
+    return count
+
+
 def create_client_connection(websocket, user_id: str) -> ClientConnection:
     """Helper to create ClientConnection with auto-generated client_id"""
     client_id = f"test-client-{uuid.uuid4()}"
@@ -1,10 +1,12 @@
 import os
 import json
 import pytest
+from contextlib import nullcontext
 from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 from io import BytesIO
 from models.document import DocumentResponse
+from models.errors import quota_exceeded_error
 
 pytestmark = pytest.mark.asyncio
 
@@ -17,12 +19,12 @@ async def test_document_upload_endpoint():
 
     # Mock the documents service
     with patch('routes.documents.documents_service') as mock_service, \
-         patch('routes.documents.check_quota') as mock_quota, \
+         patch('routes.documents.reserved_quota') as mock_quota, \
          patch('routes.documents.get_current_user_email') as mock_auth:
 
         # Setup mocks
         mock_auth.return_value = "test@example.com"
-        mock_quota.return_value = True
+        mock_quota.return_value = nullcontext()
         mock_service.verify_conversion_ownership.return_value = True
         mock_service.upload_document = AsyncMock(return_value=DocumentResponse(
             document_id="test-doc-id",
@@ -61,11 +63,13 @@ async def test_document_upload_validation():
     client = TestClient(app)
 
     # Test quota exceeded
-    with patch('routes.documents.check_quota') as mock_quota, \
+    with patch('routes.documents.documents_service') as mock_service, \
+         patch('routes.documents.reserved_quota') as mock_quota, \
          patch('routes.documents.get_current_user_email') as mock_auth:
 
         mock_auth.return_value = "test@example.com"
-        mock_quota.return_value = False
+        mock_service.verify_conversion_ownership.return_value = True
+        mock_quota.side_effect = quota_exceeded_error(10, 10, "User quota exceeded")
 
         test_file = BytesIO(b"test content")
         test_file.name = "test.pdf"
@@ -78,6 +82,7 @@ async def test_document_upload_validation():
         )
 
         assert response.status_code == 429  # Quota exceeded
+        mock_service.upload_document.assert_not_called()
 
 
 async def test_servicebus_worker_placeholder():
@@ -0,0 +1,101 @@
+"""
+Test the async blob transfer layer: parallel block uploads, ranged downloads and lazy reads.
+"""
+
+import asyncio
+import io
+import os
+from types import SimpleNamespace
+
+from fastapi import UploadFile
+
+from services.blob_service import download_blob_to_file, open_blob, upload_stream_to_blob
+
+
+class FakeStorage:
+    """Just enough of a Blob Service client (async or sync) for the transfer helpers"""
+
+    def __init__(self, asynchronous=True):
+        self.asynchronous = asynchronous
+        self.blobs, self.staged, self.requests = {}, {}, []
+        self.in_flight = self.peak = 0
+
+    def get_blob_client(self, container, blob):
+        return (FakeAsyncBlob if self.asynchronous else FakeBlob)(self, f"{container}/{blob}")
+
+
+class FakeBlob:
+    def __init__(self, storage, name):
+        self.storage, self.name = storage, name
+        self.url = f"http://127.0.0.1:10000/devstoreaccount1/{name}"
+
+    def get_blob_properties(self):
+        return SimpleNamespace(size=len(self.storage.blobs[self.name]), etag="0x1")
+
+    def download_blob(self, offset, length, **conditions):
+        self.storage.requests.append(("get", offset, length))
+        data = self.storage.blobs[self.name][offset:offset + length]
+        return SimpleNamespace(readall=lambda: data)
+
+
+class FakeAsyncBlob(FakeBlob):
+    async def upload_blob(self, data, overwrite, content_settings):
+        self.storage.requests.append(("put", len(data)))
+        self.storage.blobs[self.name] = data
+
+    async def stage_block(self, block_id, data, length):
+        self.storage.in_flight += 1
+        self.storage.peak = max(self.storage.peak, self.storage.in_flight)
+        await asyncio.sleep(0.01)
+        self.storage.staged[block_id] = data
+        self.storage.in_flight -= 1
+
+    async def commit_block_list(self, blocks, content_settings, **conditions):
+        self.storage.requests.append(("commit", len(blocks)))
+        self.storage.blobs[self.name] = b"".join(self.storage.staged.pop(block.id) for block in blocks)
+
+    async def get_blob_properties(self):
+        return FakeBlob.get_blob_properties(self)
+
+    async def download_blob(self, offset, length, **conditions):
+        await asyncio.sleep(0.01)
+        downloader = FakeBlob.download_blob(self, offset, length)
+
+        async def readall():
+            return downloader.readall()
+        return SimpleNamespace(readall=readall)
+
+
+async def test_upload_stages_blocks_in_parallel_and_download_by_ranges(tmp_path):
+    storage = FakeStorage()
+    content = os.urandom(10_500)
+
+    uri, size = await upload_stream_to_blob(
+        "documents", "c/d/big.pdf", UploadFile(io.BytesIO(content)), block_size=1000, max_concurrency=3, client=storage
+    )
+    assert uri.endswith("/documents/c/d/big.pdf") and size == 10_500
+    assert storage.blobs["documents/c/d/big.pdf"] == content
+    assert storage.requests == [("commit", 11)] and 1 < storage.peak <= 3 and not storage.staged
+
+    # A body that fits in one block is a single request
+    await upload_stream_to_blob("documents", "small.pdf", UploadFile(io.BytesIO(b"%PDF-1")), client=storage)
+    assert storage.requests[-1] == ("put", 6)
+
+    storage.requests.clear()
+    path = tmp_path / "big.pdf"
+    assert await download_blob_to_file("documents", "c/d/big.pdf", str(path), block_size=4000, client=storage) == 10_500
+    assert path.read_bytes() == content
+    assert sorted(storage.requests) == [("get", 0, 4000), ("get", 4000, 4000), ("get", 8000, 2500)]
+
+
+def test_open_blob_reads_lazily():
+    storage = FakeStorage(asynchronous=False)
+    storage.blobs["documents/big.pdf"] = content = os.urandom(10_000)
+
+    with open_blob("documents", "big.pdf", buffer_size=1024, client=storage) as handle:
+        handle.seek(-100, io.SEEK_END)
+        assert handle.read() == content[-100:]
+        handle.seek(2000)
+        assert handle.read(10) == content[2000:2010] and handle.read(10) == content[2010:2020]
+    # Only the ranges read were fetched, one buffer each
+    assert storage.requests == [("get", 9900, 100), ("get", 2000, 1024)]
@@ -0,0 +1,160 @@
+"""
+Test bulk archive/cleanup/reset jobs against the in-memory Cosmos stand-in.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from azure.cosmos import exceptions
+
+import repositories.bulk as bulk_module
+from repositories.bulk import BulkCheckpoint, BulkExecutor, CheckpointStore
+from repositories.document_repository import DocumentRepository, DATABASE_ID
+from services.cosmos_memory import InMemoryContainer
+from services.cosmos_service import patch_op
+from services.event_storage import EventStorageService
+from services.quota_service import QuotaService
+
+
+async def seed_documents(count, owner="buyer@example.com", days_old=120):
+    repo = DocumentRepository()
+    created_at = (datetime.utcnow() - timedelta(days=days_old)).isoformat() + "Z"
+    for index in range(count):
+        document = await repo.create_document(f"doc-{index:04d}", owner, f"{index}.pdf", "RFQ")
+        await repo.update(document["id"], owner, {"created_at": created_at})
+    return repo
+
+
+async def test_archive_runs_in_batches(cosmos, monkeypatch, count_calls):
+    """Old documents are archived by projected pages and batched patches, not read+replace per document"""
+    repo = await seed_documents(250)
+    await repo.create_document("doc-new", "buyer@example.com", "new.pdf", "RFQ")
+    monkeypatch.setattr(bulk_module, "BULK_PAGE_SIZE", 100)
+    calls = count_calls("read_item", "replace_item", "execute_item_batch")
+
+    assert await repo.archive_old_documents("buyer@example.com", days=90) == 250
+
+    assert calls == ["execute_item_batch"] * 3
+    archived = await repo.get_documents_by_status("buyer@example.com", "ARCHIVED")
+    assert len(archived) == 250
+    assert (await repo.get_document("doc-new", "buyer@example.com"))["status"] == "PENDING"
+    stats = bulk_module.get_bulk_job_stats()["archive-documents:buyer@example.com:90d"]
+    assert stats["scanned"] == 250 and stats["succeeded"] == 250 and stats["failed"] == 0
+
+    # Already archived documents are not touched again
+    assert await repo.archive_old_documents("buyer@example.com", days=90) == 0
+
+
+async def test_interrupted_job_resumes_from_checkpoint(cosmos, tmp_path):
+    """A job stopped after its first page resumes after the last checkpointed id"""
+    await seed_documents(30)
+    container = await DocumentRepository().container
+    patched = []
+    operations = [patch_op("incr", "/version", 1)]
+
+    def build(doc):
+        patched.append(doc["id"])
+        return ("patch", (doc["id"], operations))
+
+    def interrupt(stats):
+        raise KeyboardInterrupt
+
+    job = dict(where="c.owner_email = @email", params={"@email": "buyer@example.com"}, build_operation=build)
+    with pytest.raises(KeyboardInterrupt):
+        await BulkExecutor(container, "owner_email", page_size=10, on_progress=interrupt).run("touch", **job)
+    assert CheckpointStore(str(tmp_path)).load("touch").after_id == "doc-0009"
+
+    stats = await BulkExecutor(container, "owner_email", page_size=10).run("touch", **job)
+
+    assert stats.resumed and stats.succeeded == 30 and stats.pages == 3
+    assert sorted(patched) == [f"doc-{index:04d}" for index in range(30)]
+    assert CheckpointStore(str(tmp_path)).load("touch") is None
+
+
+async def test_throttled_batches_wait_and_retry(cosmos, monkeypatch):
+    """A 429 is retried after the service's retry-after; the wait shows up in the stats"""
+    await seed_documents(5)
+    original = InMemoryContainer.execute_item_batch
+    throttles = [2]
+
+    async def throttled_batch(self, *args, **kwargs):
+        if throttles[0]:
+            throttles[0] -= 1
+            error = exceptions.CosmosHttpResponseError(status_code=429, message="Request rate is large")
+            error.headers = {"x-ms-retry-after-ms": "5"}
+            raise error
+        return await original(self, *args, **kwargs)
+
+    monkeypatch.setattr(InMemoryContainer, "execute_item_batch", throttled_batch)
+    container = await DocumentRepository().container
+
+    stats = await BulkExecutor(container, "owner_email").run(
+        "throttled", where="c.owner_email = @email", params={"@email": "buyer@example.com"},
+        build_operation=lambda doc: ("patch", (doc["id"], [patch_op("set", "/flag", True)])),
+    )
+
+    assert stats.succeeded == 5 and stats.throttled == 2 and stats.throttle_wait_ms == 10
+
+
+async def test_failed_batch_falls_back_to_single_operations(cosmos):
+    """One bad operation rolls its batch back; the rest still apply one by one"""
+    await seed_documents(4)
+    container = await DocumentRepository().container
+
+    def build(doc):
+        if doc["id"] == "doc-0002":
+            return ("patch", (doc["id"], [patch_op("incr", "/filename", 1)]))  # Not a number
+        return ("patch", (doc["id"], [patch_op("set", "/flag", True)]))
+
+    stats = await BulkExecutor(container, "owner_email").run(
+        "partial", where="c.owner_email = @email", params={"@email": "buyer@example.com"}, build_operation=build
+    )
+
+    assert stats.succeeded == 3 and stats.failed == 1
+    flagged = [item async for item in container.query_items("SELECT VALUE c.id FROM c WHERE c.flag = true")]
+    assert sorted(flagged) == ["doc-0000", "doc-0001", "doc-0003"]
+
+
+async def test_quota_reset_and_event_cleanup(cosmos):
+    """Monthly reset patches every quota; old events are deleted in batches per event type"""
+    quotas = QuotaService(cosmos)
+    for index in range(3):
+        await quotas.get_or_create_quota(f"user{index}@example.com")
+        await quotas.increment_usage(f"user{index}@example.com", "documents_uploaded", 7)
+
+    assert await quotas.reset_monthly_usage() == 3
+    usage = await quotas.get_usage("user1@example.com")
+    assert usage["usage"]["documents_uploaded"] == 0 and usage["usage"]["total_api_calls"] == 0
+
+    events = EventStorageService.__new__(EventStorageService)
+    events.events_container = InMemoryContainer("events", "/event_type")
+    old = (datetime.utcnow() - timedelta(days=200)).strftime("%Y-%m-%d")
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    for index in range(6):
+        await events.events_container.create_item({
+            "id": f"event-{index}", "event_type": ["price", "alert"][index % 2], "date": old if index < 4 else today
+        })
+
+    assert await events.delete_old_events(days_to_keep=90) == 4
+    remaining = [item async for item in events.events_container.query_items("SELECT VALUE c.id FROM c")]
+    assert sorted(remaining) == ["event-4", "event-5"]
+
+
+async def test_stale_checkpoint_is_not_resumed(cosmos, tmp_path):
+    """A checkpoint left by an earlier, interrupted run neither skips items nor inflates the count"""
+    quotas = QuotaService(cosmos)
+    for index in range(5):
+        await quotas.get_or_create_quota(f"u{index}@example.com")
+        await quotas.increment_usage(f"u{index}@example.com", "documents_uploaded", 5)
+    container = await cosmos.get_container(DATABASE_ID, "quota")
+    ids = sorted([item async for item in container.query_items("SELECT VALUE c.id FROM c")])
+    store = CheckpointStore(str(tmp_path))
+    job = f"reset-monthly-usage:{datetime.utcnow():%Y-%m}"
+    # Stopped after the third quota, over a day ago
+    store.save(BulkCheckpoint(job=job, after_id=ids[2], stats={"job": job, "succeeded": 3},
+                              started_at=(datetime.utcnow() - timedelta(days=2)).timestamp()))
+
+    assert await quotas.reset_monthly_usage() == 5
+    for index in range(5):
+        assert (await quotas.get_usage(f"u{index}@example.com"))["usage"]["documents_uploaded"] == 0
+    assert store.load(job) is None
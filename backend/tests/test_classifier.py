@@ -2,11 +2,18 @@
 Test the Universal Classifier with realistic procurement documents.
 """
 
+import re
+
 from document_processing.classifier import (
     UniversalClassifier,
     DocumentTypeEnum,
     classify_document
 )
+from document_processing.signal_scanner import (
+    SignalScanner,
+    accelerate_pattern,
+    required_prefixes
+)
 
 
 def test_rfq_detection():
@@ -303,6 +310,48 @@ def test_confidence_scoring():
     print(f"  Requires Review: {result2.requires_review}")
 
 
+def test_signal_scanner_matches_findall():
+    """Test that the compiled scanner gives the same signals as per-pattern re.findall"""
+    classifier = UniversalClassifier()
+    texts = [
+        "REQUEST FOR QUOTATION RFQ-2024-001 Submission Deadline: 15 Feb. Quote validity period 30 days",
+        "PO Number: 4500012 Buyer: ACME Vendor: Steel Co. Bill To: ACME Invoice # : 88 Amount Due",
+        "1. Scope of work. Whereas the parties hereby agree, section 2 liability ASTM A106 spec sheet",
+        "Tax invoice from: supplier ___ the company ___ signature: date 12 pieces 4 units unit price",
+        "",
+    ]
+    for text in texts:
+        normalized = classifier._normalize_text(text)
+        expected = []
+        for signal_name, signal_def in classifier.signals.items():
+            evidence = []
+            for pattern in signal_def["patterns"]:
+                evidence.extend(re.findall(pattern, normalized)[:3])
+            matched = any(re.search(p, normalized) for p in signal_def["patterns"])
+            expected.append((signal_name, matched, evidence))
+        assert classifier._scanner.scan(normalized) == expected
+
+
+def test_signal_scanner_compiled_once():
+    """Test that classifiers share one compiled scanner per signal table"""
+    assert UniversalClassifier()._scanner is UniversalClassifier()._scanner
+    assert SignalScanner.for_signals(UniversalClassifier().signals) is UniversalClassifier()._scanner
+
+
+def test_signal_scanner_pattern_rewrites():
+    """Test boundary rewriting and prefix extraction for scanner patterns"""
+    assert accelerate_pattern(r"\bquote\b") == r"quote(?<=\bquote)\b"
+    assert accelerate_pattern(r"\bunits?") == r"unit(?<=\bunit)s?"
+    assert accelerate_pattern(r"\d+\s+") == r"\d+\s+"
+    assert required_prefixes(r"(qty|units?)") == ["qty", "unit"]
+    assert required_prefixes(r"(1\.|section)\s+[a-z]") == ["1.", "section"]
+    assert required_prefixes(r"(qty)?x") is None
+    assert required_prefixes(r"\d+\s+[a-z]") is None
+
+    for text in ["a quote.", "unquote", "quote", "quotes quote"]:
+        assert re.findall(accelerate_pattern(r"\bquote\b"), text) == re.findall(r"\bquote\b", text)
+
+
 if __name__ == "__main__":
     print("\n" + "="*60)
     print("UNIVERSAL CLASSIFIER TESTS")
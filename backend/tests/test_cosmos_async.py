@@ -0,0 +1,209 @@
+"""
+Test the async Cosmos data access layer against the in-memory stand-in.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from repositories.document_repository import DocumentRepository
+from services.cosmos_memory import InMemoryContainer
+from services.cosmos_service import get_patch_stats, patch_op
+from services.quota_service import QuotaService
+
+
+async def test_repository_crud_and_queries(cosmos):
+    """Repository operations round-trip through the async container"""
+    repo = DocumentRepository()
+    for index in range(5):
+        await repo.create_document(f"doc-{index}", "buyer@example.com", f"rfq-{index}.pdf", "RFQ")
+    await repo.create_document("doc-other", "other@example.com", "po.pdf", "PO")
+
+    with pytest.raises(ValueError):
+        await repo.create_document("doc-0", "buyer@example.com", "dup.pdf", "RFQ")
+
+    assert (await repo.get_document("doc-1", "buyer@example.com"))["filename"] == "rfq-1.pdf"
+    assert await repo.get_document("doc-1", "other@example.com") is None
+
+    updated = await repo.update_document_status("doc-2", "buyer@example.com", "COMPLETED")
+    assert updated["status"] == "COMPLETED"
+    completed = await repo.get_documents_by_status("buyer@example.com", "COMPLETED")
+    assert [doc["id"] for doc in completed] == ["doc-2"]
+
+    assert len(await repo.get_user_documents("buyer@example.com")) == 5
+    assert await repo.get_user_documents_count("buyer@example.com") == 5
+
+    assert await repo.delete_document("doc-0", "buyer@example.com") is True
+    assert await repo.delete_document("doc-0", "buyer@example.com") is False
+
+
+async def test_query_results_arrive_page_by_page(cosmos):
+    """Queries are read in pages, and the service helper pages the same way"""
+    repo = DocumentRepository()
+    for index in range(7):
+        await repo.create_document(f"doc-{index}", "buyer@example.com", f"{index}.pdf", "RFQ")
+
+    query = "SELECT c.id FROM c WHERE c.owner_email = @email ORDER BY c.filename"
+    params = [{"name": "@email", "value": "buyer@example.com"}]
+    pages = [page async for page in repo.iter_query_pages(query, params, max_item_count=3)]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [item["id"] for page in pages for item in page] == [f"doc-{index}" for index in range(7)]
+
+    service_pages = [page async for page in cosmos.iter_query_pages("documents", query, params, max_item_count=5)]
+    assert [len(page) for page in service_pages] == [5, 2]
+    assert len(await cosmos.query_items("documents", query, params)) == 7
+
+
+async def test_slow_cosmos_calls_do_not_block_each_other(cosmos, monkeypatch):
+    """Concurrent repository calls overlap their round trips instead of queuing on the event loop"""
+    original_read = InMemoryContainer.read_item
+
+    async def slow_read(self, *args, **kwargs):
+        await asyncio.sleep(0.1)
+        return await original_read(self, *args, **kwargs)
+
+    monkeypatch.setattr(InMemoryContainer, "read_item", slow_read)
+    repo = DocumentRepository()
+    await repo.create_document("doc-1", "buyer@example.com", "rfq.pdf", "RFQ")
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(repo.get_document("doc-1", "buyer@example.com") for _ in range(10)))
+    elapsed = time.perf_counter() - start
+
+    assert all(result["id"] == "doc-1" for result in results)
+    assert elapsed < 0.5
+
+
+async def test_update_is_a_single_patch(cosmos, monkeypatch):
+    """Field updates go out as one patch call: no read, no full-document replace"""
+    repo = DocumentRepository()
+    await repo.create_document("doc-1", "buyer@example.com", "rfq.pdf", "RFQ", metadata={"notes": "x" * 2000})
+
+    calls = []
+    for name in ("read_item", "replace_item", "patch_item"):
+        original = getattr(InMemoryContainer, name)
+
+        async def record(self, *args, _name=name, _original=original, **kwargs):
+            calls.append(_name)
+            return await _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(InMemoryContainer, name, record)
+
+    before = get_patch_stats().get_stats()
+    updated = await repo.update_document_status("doc-1", "buyer@example.com", "COMPLETED")
+    after = get_patch_stats().get_stats()
+
+    assert calls == ["patch_item"]
+    assert updated["status"] == "COMPLETED" and updated["metadata"]["notes"] == "x" * 2000
+    assert after["patches"] == before["patches"] + 1
+    assert after["bytes_saved"] - before["bytes_saved"] > 4000
+
+    with pytest.raises(ValueError):
+        await repo.update_document_status("missing", "buyer@example.com", "COMPLETED")
+
+
+async def test_optimistic_update_retries_on_etag_conflict(cosmos, monkeypatch):
+    """Concurrent read-decide-patch updates re-read on a 412 instead of overwriting each other"""
+    original_read = InMemoryContainer.read_item
+
+    async def yielding_read(self, *args, **kwargs):
+        item = await original_read(self, *args, **kwargs)
+        await asyncio.sleep(0)
+        return item
+
+    monkeypatch.setattr(InMemoryContainer, "read_item", yielding_read)
+    repo = DocumentRepository()
+    await repo.create_document("doc-1", "buyer@example.com", "rfq.pdf", "RFQ", metadata={"tags": []})
+
+    async def tag(name):
+        def build(current):
+            tags = current["metadata"]["tags"]
+            if name in tags:
+                return None
+            return [patch_op("set", "/metadata/tags", tags + [name])]
+
+        return await repo.update_optimistic("doc-1", "buyer@example.com", build)
+
+    before = get_patch_stats().get_stats()["precondition_retries"]
+    await asyncio.gather(*(tag(f"t{index}") for index in range(5)))
+
+    document = await repo.get_document("doc-1", "buyer@example.com")
+    assert sorted(document["metadata"]["tags"]) == [f"t{index}" for index in range(5)]
+    assert get_patch_stats().get_stats()["precondition_retries"] > before
+
+
+async def test_quota_increment_is_atomic(cosmos):
+    """Concurrent usage increments all land, via in-place incr"""
+    quotas = QuotaService(cosmos)
+    await quotas.get_or_create_quota("buyer@example.com")
+
+    await asyncio.gather(*(quotas.increment_usage("buyer@example.com", "documents_uploaded") for _ in range(20)))
+
+    usage = await quotas.get_usage("buyer@example.com")
+    assert usage["usage"]["documents_uploaded"] == 20
+
+
+async def test_list_documents_pages_with_continuation_tokens(cosmos):
+    """Pages chain through continuation tokens, with filters and projection applied"""
+    repo = DocumentRepository()
+    for index in range(7):
+        await repo.create_document(f"doc-{index}", "buyer@example.com", f"{index}.pdf", "PO" if index % 2 else "RFQ")
+    await repo.create_document("doc-other", "other@example.com", "x.pdf", "RFQ")
+
+    pages, token = [], None
+    while True:
+        documents, token = await repo.list_documents("buyer@example.com", document_type="RFQ",
+                                                     fields=["filename"], max_items=3, continuation_token=token)
+        pages.append(documents)
+        if token is None:
+            break
+
+    assert [len(page) for page in pages] == [3, 1]
+    assert all(set(document) == {"id", "filename"} for page in pages for document in page)
+    assert sorted(document["id"] for page in pages for document in page) == ["doc-0", "doc-2", "doc-4", "doc-6"]
+
+    with pytest.raises(ValueError):
+        await repo.list_documents("buyer@example.com", fields=["filename) FROM c --"])
+    with pytest.raises(ValueError):
+        await repo.list_documents("buyer@example.com", continuation_token="not-a-token")
+
+
+async def test_document_list_route_returns_cursor(cosmos, monkeypatch):
+    """GET /documents returns one page plus the cursor for the next"""
+    from routes import documents as documents_routes
+
+    monkeypatch.setattr(documents_routes, "get_current_user_email", lambda authorization: "buyer@example.com")
+    repo = DocumentRepository()
+    for index in range(5):
+        await repo.create_document(f"doc-{index}", "buyer@example.com", f"{index}.pdf", "RFQ")
+
+    first = await documents_routes.list_documents(None, "Bearer token", None, None, "status", 2, None)
+    second = await documents_routes.list_documents(None, "Bearer token", None, None, "status", 2, first["continuation_token"])
+
+    assert first["count"] == 2 and first["continuation_token"]
+    assert {document["id"] for document in first["documents"]}.isdisjoint(document["id"] for document in second["documents"])
+
+
+async def test_audit_events_page_within_tenant_partition(monkeypatch):
+    """Audit events page by continuation token inside the tenant's partition"""
+    from services.audit_service import AuditService, AuditEventType, AuditResult
+
+    container = InMemoryContainer("audit_events", "/tenant_id")
+    monkeypatch.setattr(AuditService, "_use_cosmos", True)
+    monkeypatch.setattr(AuditService, "_cosmos_container", container)
+    for index in range(5):
+        await container.create_item({
+            "id": f"event-{index}", "tenant_id": "tenant-1", "timestamp": f"2026-01-0{index + 1}T00:00:00Z",
+            "event_type": AuditEventType.RESOURCE_READ.value, "result": AuditResult.SUCCESS.value,
+        })
+    await container.create_item({
+        "id": "event-x", "tenant_id": "tenant-2", "timestamp": "2026-01-09T00:00:00Z",
+        "event_type": AuditEventType.RESOURCE_READ.value, "result": AuditResult.SUCCESS.value,
+    })
+
+    first, token = await AuditService.get_events_page("tenant-1", max_items=3)
+    second, last = await AuditService.get_events_page("tenant-1", max_items=3, continuation_token=token)
+
+    assert [event.id for event in first + second] == [f"event-{index}" for index in range(4, -1, -1)]
+    assert last is None
@@ -0,0 +1,134 @@
+"""
+Test the streaming pub/sub: broadcasts and price points reaching other workers, batched and serialized once.
+"""
+
+import asyncio
+import json
+import os
+import socket
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+from models.signals import PricePoint
+from services.event_broadcaster import EventBroadcasterService, serialize_event
+from services.event_bus import MemoryEventBus, SocketEventBus
+from services.signals_broadcaster_bridge import SignalsBroadcasterBridge
+from services.signals_service import SignalsService
+
+
+def worker(hub):
+    """A broadcaster with one prices client filtering on ITEM-1, wired to the hub"""
+    broadcaster, ws = EventBroadcasterService(), AsyncMock()
+    client = broadcaster.register_client(ws, "user@example.com")
+    broadcaster.subscribe(client.client_id, "prices", {"item_id": ["ITEM-1"]})
+    bus = MemoryEventBus(hub, batch_interval=0.01)
+    broadcaster.attach_bus(bus)
+    return broadcaster, bus, ws
+
+
+async def test_broadcast_reaches_clients_of_other_workers_in_one_batch():
+    hub = []
+    (a, bus_a, ws_a), (b, bus_b, ws_b) = worker(hub), worker(hub)
+    events = [{"item_id": f"ITEM-{n % 2}", "price": n} for n in range(6)]
+
+    # Delivered to this worker's client right away, to the other worker's once the batch goes out
+    assert [await a.broadcast_event(event, "prices") for event in events] == [0, 1] * 3
+    assert ws_b.send_text.call_count == 0
+    await asyncio.sleep(0.05)
+
+    sent = [call.args[0] for call in ws_b.send_text.call_args_list]
+    assert sent == [serialize_event(event) for event in events if event["item_id"] == "ITEM-1"]
+    assert ws_a.send_text.call_count == 3  # No echo of its own batch
+    assert bus_a.stats()["batches_sent"] == 1 and bus_a.stats()["messages_published"] == 6
+    assert bus_b.stats()["batches_received"] == 1 and bus_b.stats()["messages_received"] == 6
+    assert b.get_stats()["pubsub"]["backend"] == "MemoryEventBus"
+    await bus_a.close()
+    await bus_b.close()
+    assert hub == []
+
+
+async def test_price_points_are_replicated(monkeypatch):
+    SignalsService.clear_all()
+    hub = []
+    bus_a, bus_b = MemoryEventBus(hub), MemoryEventBus(hub)
+    monkeypatch.setattr(SignalsBroadcasterBridge, "_bus", None)
+    SignalsBroadcasterBridge.attach_bus(bus_a)
+    # The other worker (sharing this process's history here, so the point is recorded twice)
+    bus_b.subscribe("price_point", SignalsBroadcasterBridge._on_bus_price_point)
+
+    point = PricePoint(timestamp=datetime(2026, 3, 1, 12, 30), price=42.5, supplier_id="SUP-1")
+    SignalsBroadcasterBridge.record_price_point("ITEM-9", point)
+    assert len(SignalsService._price_history["ITEM-9"]) == 1
+    await bus_a.flush()
+
+    assert list(SignalsService._price_history["ITEM-9"]) == [point, point]
+    SignalsService.clear_all()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets only")
+async def test_socket_bus_between_workers_of_a_host(tmp_path):
+    received = []
+
+    async def handler(name, payload):
+        received.append((name, json.loads(payload)))
+
+    directory = str(tmp_path / "stream")
+    publisher, subscriber = SocketEventBus(directory), SocketEventBus(directory)
+    subscriber.subscribe("topic", handler)
+    await publisher.start()
+    await subscriber.start()
+    # A worker that exited without cleaning up
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    stale.bind(os.path.join(directory, "gone.sock"))
+    stale.close()
+
+    for n in range(3):
+        publisher.publish("topic:prices", serialize_event({"item_id": "ITEM-1", "price": n}))
+    await publisher.flush()
+    for _ in range(50):
+        if len(received) == 3:
+            break
+        await asyncio.sleep(0.01)
+
+    assert received == [("prices", {"item_id": "ITEM-1", "price": n}) for n in range(3)]
+    assert subscriber.stats()["batches_received"] == 1
+    assert not os.path.exists(os.path.join(directory, "gone.sock"))
+    await publisher.close()
+    await subscriber.close()
+    assert os.listdir(directory) == []
+
+
+async def test_socket_bus_keeps_the_framing_of_any_channel_and_rejects_oversize(tmp_path):
+    received = []
+
+    async def handler(name, payload):
+        received.append((name, payload))
+
+    directory = str(tmp_path / "stream")
+    publisher, subscriber = SocketEventBus(directory), SocketEventBus(directory)
+    subscriber.subscribe("price_point", handler)
+    await publisher.start()
+    await subscriber.start()
+
+    publisher.publish("price_point:ITEM\t1\nX%09", '{"price": 1}')
+    publisher.publish("price_point:ITEM-2", "x" * SocketEventBus.max_batch_bytes)
+    publisher.publish("price_point:ITEM-3", '{"price": 3}')
+    with pytest.raises(ValueError):
+        publisher.publish("price_point:ITEM-4", '{"price":\n4}')
+    await publisher.flush()
+    # A batch larger than the receiver accepts, sent by a peer with another limit
+    raw = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    raw.sendto(b"peer\nprice_point:ITEM-5\t" + b"y" * SocketEventBus.max_batch_bytes, subscriber.path)
+    raw.close()
+    for _ in range(50):
+        if len(received) == 2 and subscriber.truncated:
+            break
+        await asyncio.sleep(0.01)
+
+    assert received == [("ITEM\t1\nX%09", '{"price": 1}'), ("ITEM-3", '{"price": 3}')]
+    assert publisher.stats()["oversized"] == 1
+    assert subscriber.stats()["truncated"] == 1
+    await publisher.close()
+    await subscriber.close()
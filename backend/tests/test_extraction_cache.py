@@ -0,0 +1,137 @@
+"""
+Test the content-addressed extraction cache.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from document_processing.orchestrator import get_pipeline, WARM_UP_TEXT, PIPELINE_VERSION
+from services.extraction_cache import ExtractionCache, get_extraction_cache, hash_file
+
+OWNER = "buyer@example.com"
+SAMPLE_PDF = Path(__file__).parent.parent / "test_documents" / "Procurement of portable working at height fixture (1).pdf"
+
+
+def make_cache(**kwargs) -> ExtractionCache:
+    return ExtractionCache(persistent=False, **kwargs)
+
+
+async def test_hit_returns_fresh_result():
+    """A hit rebuilds the stored result; mutating it does not touch the cache"""
+    cache = make_cache()
+    result = get_pipeline().process_document(WARM_UP_TEXT)
+
+    assert await cache.get("abc", OWNER) is None
+    await cache.put("abc", OWNER, result, [{"rows": [["Item", "Qty"]]}])
+
+    cached, tables = await cache.get("abc", OWNER)
+    assert cached.document == result.document
+    assert cached.get_summary() == result.get_summary()
+    assert tables == [{"rows": [["Item", "Qty"]]}]
+
+    cached.document.document_id = "changed"
+    again, _ = await cache.get("abc", OWNER)
+    assert again.document.document_id == result.document.document_id
+
+    stats = cache.get_stats()
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 66.67
+    assert stats["pipeline_version"] == PIPELINE_VERSION
+
+
+async def test_ttl_and_size_eviction():
+    """Entries expire after the TTL and the least recently used go first"""
+    result = get_pipeline().process_document(WARM_UP_TEXT)
+
+    expired = make_cache(ttl_seconds=0)
+    await expired.put("abc", OWNER, result)
+    assert await expired.get("abc", OWNER) is None
+    assert expired.get_stats()["expirations"] == 1
+
+    lru = make_cache(max_entries=2)
+    for file_hash in ("a", "b"):
+        await lru.put(file_hash, OWNER, result)
+    await lru.get("a", OWNER)
+    await lru.put("c", OWNER, result)
+
+    assert await lru.get("b", OWNER) is None
+    assert await lru.get("a", OWNER) is not None
+    assert lru.get_stats()["evictions"] == 1
+
+    entry_bytes = lru.get_stats()["bytes"] // 2
+    small = make_cache(max_bytes=entry_bytes * 2 - 1)
+    await small.put("a", OWNER, result)
+    await small.put("b", OWNER, result)
+    assert small.get_stats()["entries"] == 1
+
+
+async def test_failed_results_are_not_cached():
+    """Only successful pipeline runs are stored"""
+    cache = make_cache()
+    failed = get_pipeline().process_document(WARM_UP_TEXT)
+    failed.success = False
+
+    await cache.put("abc", OWNER, failed)
+    assert cache.get_stats()["entries"] == 0
+
+
+async def test_results_are_scoped_to_their_owner():
+    """Another owner uploading the same bytes does not get the first owner's result"""
+    cache = make_cache()
+    result = get_pipeline().process_document(WARM_UP_TEXT, source_file="/uploads/buyer-rfq.pdf")
+
+    await cache.put("abc", OWNER, result)
+
+    assert await cache.get("abc", "other@example.com") is None
+    cached, _ = await cache.get("abc", OWNER)
+    assert cached.source_file == "/uploads/buyer-rfq.pdf"
+
+
+async def test_persistent_entries_live_in_their_owners_partition(cosmos):
+    """Cosmos entries are stored under the owner's partition key, not one shared partition"""
+    cache = ExtractionCache()
+    result = get_pipeline().process_document(WARM_UP_TEXT)
+
+    await cache.put("abc", OWNER, result)
+    entry = await cosmos.read_item("extractions", f"cache:{cache.cache_key('abc', OWNER)}", OWNER)
+    assert entry["owner_email"] == OWNER
+
+    cache.clear()
+    assert await cache.get("abc", "other@example.com") is None
+    assert await cache.get("abc", OWNER) is not None
+    assert cache.get_stats()["persistent_hits"] == 1
+
+
+async def test_reupload_under_new_name_hits_cache():
+    """Upload stores the SHA-256; re-extracting the same bytes skips the pipeline"""
+    import main
+
+    os.makedirs(main.UPLOAD_DIR, exist_ok=True)
+    get_extraction_cache().clear()
+    client = TestClient(main.app)
+    content = SAMPLE_PDF.read_bytes()
+
+    responses = []
+    for name in ("rfq.pdf", "rfq-copy.pdf"):
+        upload = client.post("/api/v1/docs/upload", files={"file": (name, content, "application/pdf")})
+        assert upload.status_code == 200
+        assert upload.json()["file_hash"] == hashlib.sha256(content).hexdigest()
+        # The pipeline endpoint is called directly: the extraction router mounts a
+        # placeholder on the same path
+        response = await main.extract_intelligence(upload.json()["document_id"], wait=True)
+        responses.append(json.loads(response.body))
+
+    first, second = responses
+    assert first["extraction_metrics"]["cache_hit"] is False
+    assert second["extraction_metrics"]["cache_hit"] is True
+    assert second["document_type"] == first["document_type"]
+    assert second["document"]["document_id"] != first["document"]["document_id"]
+    assert hash_file(str(SAMPLE_PDF)) == hashlib.sha256(content).hexdigest()
+
+    metrics = client.get("/api/v1/metrics").json()
+    assert metrics["extraction_cache"]["memory_hits"] >= 1
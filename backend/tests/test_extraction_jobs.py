@@ -0,0 +1,159 @@
+"""
+Test the extraction job queue: scheduling, retries, cancellation, leases and the /extract job flow.
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.extraction_cache import get_extraction_cache
+from services.extraction_jobs import (
+    ExtractionJob, ExtractionWorkerPool, JobError, JobStatus, MemoryJobQueue, SQLiteJobQueue
+)
+
+SAMPLE_PDF = Path(__file__).parent.parent / "test_documents" / "Procurement of portable working at height fixture (1).pdf"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_queue(request, tmp_path):
+    queues = []
+
+    def make(**kwargs):
+        if request.param == "memory":
+            queue = MemoryJobQueue(**kwargs)
+        else:
+            queue = SQLiteJobQueue(str(tmp_path / f"jobs-{len(queues)}.db"), **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        asyncio.run(queue.close())
+
+
+async def drain(queue):
+    order = []
+    while (job := await queue.claim(lease_seconds=60)) is not None:
+        order.append(job.document_id)
+        job.status = JobStatus.COMPLETED.value
+        assert await queue.update(job)
+    return order
+
+
+async def test_priority_then_tenants_take_turns(make_queue):
+    queue = make_queue()
+    for n in range(4):
+        await queue.put(ExtractionJob(document_id=f"a{n}", tenant="a", owner_email="a@x"))
+    for n in range(2):
+        await queue.put(ExtractionJob(document_id=f"b{n}", tenant="b", owner_email="b@x"))
+    await queue.put(ExtractionJob(document_id="c0", tenant="c", owner_email="c@x", priority=5))
+
+    assert await drain(queue) == ["c0", "a0", "b0", "a1", "b1", "a2", "a3"]
+    assert (await queue.stats()) == {"completed": 7}
+
+
+async def test_cancel_and_expired_lease(make_queue):
+    now = [1000.0]
+    queue = make_queue(clock=lambda: now[0])
+    cancelled = ExtractionJob(document_id="d1", tenant="t", owner_email="t@x")
+    await queue.put(cancelled)
+    await queue.put(ExtractionJob(document_id="d2", tenant="t", owner_email="t@x", max_attempts=2))
+
+    assert (await queue.cancel(cancelled.job_id)).status == JobStatus.CANCELLED.value
+    job = await queue.claim(lease_seconds=30)
+    assert job.document_id == "d2" and job.attempts == 1
+
+    # The worker dies: once the lease expires the job is claimed again, and the old claim is void
+    now[0] += 31
+    again = await queue.claim(lease_seconds=30)
+    assert again.job_id == job.job_id and again.attempts == 2
+    job.status = JobStatus.COMPLETED.value
+    assert await queue.update(job) is False
+
+    # Out of attempts: the next expiry fails it
+    now[0] += 31
+    assert await queue.claim(lease_seconds=30) is None
+    lost = await queue.get(job.job_id)
+    assert lost.status == JobStatus.FAILED.value and "lease expired" in lost.error
+
+
+async def test_pool_retries_with_backoff_and_cancels_running_jobs():
+    attempts = {}
+    updates = []
+    release = asyncio.Event()
+
+    async def handler(job, context):
+        attempts[job.document_id] = job.attempts
+        if job.document_id == "flaky" and job.attempts < 3:
+            raise RuntimeError("storage unavailable")
+        if job.document_id == "bad":
+            raise JobError("Unsupported file type: txt", retryable=False)
+        if job.document_id == "slow":
+            await context.progress(10, "parse")
+            await release.wait()
+        return {"pages": job.attempts}
+
+    async def on_update(job):
+        updates.append((job.document_id, job.status, job.progress))
+
+    pool = ExtractionWorkerPool(MemoryJobQueue(), handler, workers=2, mode="thread", on_update=on_update,
+                                max_attempts=3, retry_base_seconds=0.05, poll_interval=0.02)
+    assert [pool.retry_delay(attempt) for attempt in (1, 2, 3)] == [0.05, 0.1, 0.2]
+    flaky = await pool.submit("flaky", "t", "t@x")
+    bad = await pool.submit("bad", "t", "t@x")
+    slow = await pool.submit("slow", "u", "u@x")
+
+    for _ in range(200):
+        if ("slow", "running", 10) in updates and (await pool.get(flaky.job_id)).finished:
+            break
+        await asyncio.sleep(0.02)
+    cancelled = await pool.cancel(slow.job_id)
+    await asyncio.sleep(0.05)
+    await pool.stop()
+
+    flaky, bad = await pool.get(flaky.job_id), await pool.get(bad.job_id)
+    assert flaky.status == "completed" and flaky.attempts == 3 and flaky.result == {"pages": 3}
+    assert [status for document, status, _ in updates if document == "flaky"].count("queued") == 3
+    assert bad.status == "failed" and bad.attempts == 1 and bad.error == "Unsupported file type: txt"
+    assert cancelled.status == "cancelled" and (await pool.get(slow.job_id)).status == "cancelled"
+    assert updates[-1] == ("slow", "cancelled", 10)
+
+
+async def test_extract_enqueues_and_status_reports_progress(monkeypatch):
+    import main
+
+    os.makedirs(main.UPLOAD_DIR, exist_ok=True)
+    get_extraction_cache().clear()
+    monkeypatch.setattr(main.extraction_workers, "mode", "thread")
+    client = TestClient(main.app)
+    document_id = client.post(
+        "/api/v1/docs/upload", files={"file": ("rfq.pdf", SAMPLE_PDF.read_bytes(), "application/pdf")}
+    ).json()["document_id"]
+
+    accepted = await main.extract_intelligence(document_id, priority=3)
+    job = json.loads(accepted.body)
+    assert accepted.status_code == 202 and job["status"] == "queued" and job["priority"] == 3
+    # Asking again while the job is pending returns the same job
+    assert json.loads((await main.extract_intelligence(document_id)).body)["job_id"] == job["job_id"]
+
+    for _ in range(300):
+        status = json.loads((await main.get_document_status(document_id)).body)
+        if status["job"]["status"] not in ("queued", "running"):
+            break
+        assert status["status"] == "processing"
+        await asyncio.sleep(0.05)
+    await main.extraction_workers.stop()
+
+    assert status["status"] == "extracted"
+    assert status["job"]["status"] == "completed" and status["job"]["progress"] == 100
+    assert status["job"]["result"]["document_type"] == "RFQ"
+    assert main.documents_db[document_id]["status"] == "COMPLETED"
+    finished = json.loads((await main.get_extraction_job(job["job_id"])).body)
+    assert finished["result"]["extraction_metrics"]["cache_hit"] is False
+    with pytest.raises(main.HTTPException) as conflict:
+        await main.cancel_extraction_job(job["job_id"])
+    assert conflict.value.status_code == 409
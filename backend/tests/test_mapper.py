@@ -6,6 +6,10 @@ from pathlib import Path
 from document_processing.mapper import map_document, DocumentMapper
 from document_processing.classifier import classify_document
 from document_processing.pdf_processor import PDFProcessor
+from document_processing.parsed_document import ParsedDocument
+from document_processing.context import DocumentContext
+from document_processing.mapper import FieldExtractor
+from document_processing.schemas import UnitOfMeasure
 
 
 def test_rfq_mapping():
@@ -280,3 +284,76 @@ if __name__ == "__main__":
         print(f"\n✗ TEST FAILED: {e}")
         import traceback
         traceback.print_exc()
+
+
+def test_parsed_document_from_excel_result():
+    """Excel parse results become one page per sheet with string cells"""
+    parsed = ParsedDocument.from_parse_result({
+        "sheet_names": ["BOQ"],
+        "sheets": [{
+            "sheet_name": "BOQ",
+            "rows": 2,
+            "columns": 3,
+            "data": [
+                {"Description": "Steel Pipes", "Qty": 500.0, "Rate": 450},
+                {"Description": "Gaskets", "Qty": float("nan"), "Rate": None},
+            ]
+        }]
+    }, "excel")
+
+    assert parsed.error is None
+    assert parsed.page_count == 1
+    assert parsed.tables[0].name == "BOQ"
+    assert parsed.tables[0].rows == [
+        ["Description", "Qty", "Rate"],
+        ["Steel Pipes", "500", "450"],
+        ["Gaskets", "", ""],
+    ]
+    assert parsed.text.startswith("Sheet: BOQ\nDescription | Qty | Rate")
+    assert "{" not in parsed.text
+
+
+def test_parsed_document_from_pdf_result():
+    """PDF parse results keep per-page text and tables, errors are surfaced"""
+    parsed = ParsedDocument.from_parse_result({
+        "total_pages": 2,
+        "text": "Page one\nPage two\n",
+        "tables": [[["Item", "Qty"], ["1", "2"]]],
+        "pages": [
+            {"page_number": 1, "text": "Page one", "tables_count": 0, "tables": []},
+            {"page_number": 2, "text": "Page two", "tables_count": 1, "tables": [[["Item", "Qty"], ["1", "2"]]]},
+        ]
+    }, "pdf")
+
+    assert parsed.text == "Page one\nPage two"
+    assert [page.page_number for page in parsed.pages] == [1, 2]
+    assert parsed.tables[0].page_number == 2
+    assert parsed.tables[0].rows == [["Item", "Qty"], ["1", "2"]]
+
+    failed = ParsedDocument.from_parse_result({"error": "Failed to parse PDF: bad file"}, "pdf")
+    assert failed.error == "Failed to parse PDF: bad file"
+
+
+def test_line_items_from_parsed_tables():
+    """Line items are read from table cells using the header to map columns"""
+    parsed = ParsedDocument.from_parse_result({
+        "text": "Bill of quantities",
+        "tables": [{"table_number": 1, "data": [
+            ["S/N", "Description", "Unit", "Qty", "Unit Price", "Amount"],
+            ["1", "Steel Pipes ASTM A36", "kg", "500", "450", "225,000"],
+            ["", "Civil works", "", "", "", ""],
+            ["2", "Flanges 4\" Class 300", "pcs", "50", "8,000", "400,000"],
+            ["", "Total", "", "", "", "625,000"],
+        ]}]
+    }, "word")
+    context = DocumentContext.from_parsed(parsed)
+
+    items = FieldExtractor().extract_line_items(context.text, context)
+
+    assert [item.line_number for item in items] == [1, 2]
+    assert items[0].description == "Steel Pipes ASTM A36"
+    assert items[0].unit_of_measure == UnitOfMeasure.KILOGRAM
+    assert items[1].unit_of_measure == UnitOfMeasure.PIECE
+    assert items[1].quantity == 50
+    assert items[1].unit_price == 8000
+    assert items[1].total_price == 400000
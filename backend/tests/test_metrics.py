@@ -0,0 +1,83 @@
+"""
+Test the ring-buffer MetricsCollector: rolling aggregates, latency percentiles and Prometheus output.
+"""
+
+import random
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from metrics import LatencyHistogram, MetricsCollector, MetricsMiddleware
+
+
+def test_aggregates_follow_the_ring_window():
+    """After the ring wraps, every aggregate matches a recount of the metrics still held"""
+    collector = MetricsCollector(max_metrics=100)
+    rng = random.Random(3)
+    for index in range(357):
+        kind = index % 3
+        if kind == 0:
+            collector.record_request(f"/ep{index % 4}", rng.choice([200, 200, 404]), rng.uniform(1, 50))
+        elif kind == 1:
+            collector.record_extraction(f"doc-{index}", 200, rng.uniform(100, 900), 0.5, 0.8, "RFQ",
+                                        {"mapper": 1000 + index})
+        else:
+            collector.record_error("/extract", "boom")
+
+    held = collector.metrics
+    assert len(held) == 100 and held[-1].metric_type == "error"
+    stats = collector.get_stats()
+    timed = [m for m in held if m.metric_type != "error"]
+    extractions = [m for m in held if m.metric_type == "extraction"]
+    assert stats["total_requests"] == 100
+    assert stats["total_errors"] == sum(m.metric_type == "error" for m in held)
+    assert stats["avg_response_time_ms"] == round(sum(m.duration_ms for m in timed) / len(timed), 2)
+    assert stats["extraction_metrics"]["total_extractions"] == len(extractions)
+    assert stats["extraction_metrics"]["avg_bytes_scanned_estimate_per_stage"]["mapper"] == round(
+        sum(m.details["bytes_scanned_estimate"]["mapper"] for m in extractions) / len(extractions), 2)
+
+    extract = [m for m in held if m.endpoint == "/extract"]
+    endpoint = stats["endpoint_stats"]["/extract"]
+    assert endpoint["count"] == len(extract)
+    assert endpoint["errors"] == len(extract) - len(extractions)
+    assert endpoint["avg_duration_ms"] == round(sum(m.duration_ms for m in extract) / len(extract), 2)
+
+
+def test_percentiles_are_within_two_percent():
+    rng = random.Random(11)
+    values = [rng.lognormvariate(3, 1.2) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.add(value)
+    for value in values[:5000]:
+        histogram.remove(value)
+
+    remaining = sorted(values[5000:])
+    for quantile, estimate in zip((0.5, 0.95, 0.99), histogram.quantiles()):
+        exact = remaining[int(quantile * len(remaining)) - 1]
+        assert abs(estimate - exact) / exact < 0.02
+
+
+def test_middleware_and_prometheus_exposition():
+    collector = MetricsCollector()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, collector=collector)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: str):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    for item_id in ("a", "b", "c"):
+        client.get(f"/items/{item_id}")
+    client.get("/missing")
+
+    stats = collector.get_stats()["endpoint_stats"]
+    assert stats["/items/{item_id}"]["count"] == 3
+    assert stats["unmatched"]["errors"] == 1
+
+    text = collector.to_prometheus()
+    assert 'kraftd_requests_total{endpoint="/items/{item_id}"} 3' in text
+    assert 'kraftd_request_errors_total{endpoint="unmatched"} 1' in text
+    assert 'kraftd_request_duration_milliseconds{endpoint="/items/{item_id}",quantile="0.99"}' in text
+    assert "# TYPE kraftd_request_duration_milliseconds summary" in text
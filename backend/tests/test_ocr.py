@@ -0,0 +1,89 @@
+"""
+Test the pooled, cached OCR engine and the scanned-PDF processor on top of it.
+
+Tesseract itself is replaced by a recorder so the tests run without the binary.
+"""
+
+import pdfplumber
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from document_processing import ImageProcessor
+from document_processing import ocr
+from document_processing.image_processor import OCR_FAILED_TEXT
+from document_processing.ocr import OCREngine, image_hash, preprocess_image
+
+
+def make_scanned_pdf(path, shapes):
+    """PDF whose pages have no text layer, one drawn rectangle per page (same x = same page image)"""
+    pdf = canvas.Canvas(str(path), pagesize=A4)
+    for x in shapes:
+        pdf.rect(x, 400, 200, 100, fill=1)
+        pdf.showPage()
+    pdf.save()
+    return path
+
+
+def record_tesseract(monkeypatch, fail_on=None):
+    """Replace tesseract with a counter; images whose hash is in fail_on time out"""
+    calls = []
+
+    def run(image, lang, timeout):
+        calls.append(image.size)
+        if fail_on and image_hash(image) in fail_on:
+            raise RuntimeError("Tesseract process timeout")
+        return f"page text {len(calls)}"
+
+    monkeypatch.setattr(ocr, "_run_tesseract", run)
+    return calls
+
+
+def test_repeated_pages_are_ocred_once(monkeypatch, tmp_path):
+    """Identical pages share one OCR run, and extract_text after parse does not OCR again"""
+    calls = record_tesseract(monkeypatch)
+    engine = OCREngine(max_workers=2, dpi=50)
+    processor = ImageProcessor(str(make_scanned_pdf(tmp_path / "scan.pdf", [50, 300, 50, 50])), ocr_engine=engine)
+
+    parsed = processor.parse()
+
+    assert len(calls) == 2
+    texts = [page["text"] for page in parsed["pages"]]
+    assert texts[0] == texts[2] == texts[3] != texts[1]
+    assert processor.extract_text() == parsed["full_text"]
+    assert len(calls) == 2
+
+    # A new document with the same letterhead page is served from the cache
+    ImageProcessor(str(make_scanned_pdf(tmp_path / "other.pdf", [300])), ocr_engine=engine).parse()
+    stats = engine.get_stats()
+    assert len(calls) == 2
+    assert stats["pages"] == 5 and stats["cache_hits"] == 3 and stats["recognized"] == 2
+
+
+def test_page_timeout_does_not_fail_document(monkeypatch, tmp_path):
+    """A page whose OCR times out gets a placeholder; the rest of the document is kept and the failure is not cached"""
+    engine = OCREngine(max_workers=2, dpi=50)
+    path = make_scanned_pdf(tmp_path / "scan.pdf", [50, 300])
+    with pdfplumber.open(path) as pdf:
+        slow_page = preprocess_image(engine.render_page(pdf.pages[1]))
+    record_tesseract(monkeypatch, fail_on={image_hash(slow_page)})
+
+    parsed = ImageProcessor(str(path), ocr_engine=engine).parse()
+
+    assert [page["text"] for page in parsed["pages"]] == ["page text 1", OCR_FAILED_TEXT]
+    stats = engine.get_stats()
+    assert stats["timeouts"] == 1
+    assert stats["cache_entries"] == 1
+
+
+def test_preprocess_grayscale_and_binarize():
+    """Pages are converted to grayscale and, with a threshold, to pure black and white"""
+    image = Image.new("RGB", (4, 1))
+    image.putdata([(0, 0, 0), (100, 100, 100), (200, 200, 200), (255, 255, 255)])
+
+    assert preprocess_image(image, grayscale=True, binarize_threshold=0).mode == "L"
+    assert preprocess_image(image, grayscale=False, binarize_threshold=0).mode == "RGB"
+
+    binary = preprocess_image(image, grayscale=True, binarize_threshold=128)
+    assert binary.mode == "1"
+    assert [bool(value) for value in binary.getdata()] == [False, False, True, True]
@@ -6,7 +6,16 @@ Tests the complete 4-stage pipeline: Classifier → Mapper → Inferencer → Va
 import sys
 sys.path.insert(0, '.')
 
-from document_processing.orchestrator import ExtractionPipeline, process_document
+import threading
+
+from document_processing import orchestrator
+from document_processing.orchestrator import (
+    ExtractionPipeline, PageClassifier, process_document, get_pipeline, warm_up_pipeline
+)
+from document_processing.parsed_document import ParsedDocument, ParsedPage
+from document_processing.timing import StageTimer
+from document_processing.mapper import FieldExtractor
+from document_processing.context import DocumentContext
 
 
 def test_rfq_pipeline_complete():
@@ -347,6 +356,112 @@ def test_pipeline_summary_output():
     print("\n✓ Summary output test PASSED\n")
 
 
+def test_shared_pipeline_singleton():
+    """Test that the pipeline and its stages are built once per process"""
+    pipelines = []
+    threads = [threading.Thread(target=lambda: pipelines.append(get_pipeline())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert all(pipeline is get_pipeline() for pipeline in pipelines)
+    
+    # New pipelines reuse the same stage objects and compiled rule tables
+    pipeline = ExtractionPipeline()
+    assert pipeline.classifier is get_pipeline().classifier
+    assert pipeline.mapper is get_pipeline().mapper
+    assert FieldExtractor().patterns is pipeline.mapper.extractor.patterns
+    assert all(hasattr(p, "search") for patterns in FieldExtractor().patterns.values() for p in patterns)
+
+
+def test_warm_up_pipeline():
+    """Test that warm-up runs a document through every stage"""
+    result = warm_up_pipeline()
+    
+    assert result.success
+    assert result.stages_completed == ["classifier", "mapper", "inferencer", "validator"]
+
+
+def test_pipeline_classifies_once():
+    """Test that the mapper reuses the stage 1 classification via the context"""
+    from unittest.mock import patch
+    
+    text = """
+    PURCHASE ORDER
+    PO Number: PO-2024-001
+    Date: 15 January 2024
+    Item | Description | Qty | Unit Price | Total
+    1 | Steel Plate | 10 | 500 | 5000
+    """
+    pipeline = get_pipeline()
+    with patch.object(pipeline.classifier, "classify", wraps=pipeline.classifier.classify) as classify:
+        result = pipeline.process_document(text)
+    
+    assert result.success
+    assert classify.call_count == 1
+    
+    context = DocumentContext(text)
+    assert result.bytes_scanned_estimate["classifier"] == context.normalized_bytes
+    assert result.bytes_scanned_estimate["mapper"] == context.text_bytes
+    assert result.bytes_scanned_estimate["inferencer"] == context.text_bytes
+    assert result.get_summary()["bytes_scanned_estimate"] == result.bytes_scanned_estimate
+
+
+def test_page_classifier_runs_while_pages_still_parse(monkeypatch):
+    """The first pages are classified on the classifier's thread before the last page is parsed"""
+    pages = [
+        ParsedPage(page_number=1, text="PURCHASE ORDER\nPO Number: PO-2024-001\nDate: 15 January 2024"),
+        ParsedPage(page_number=2, text="Item | Description | Qty | Unit Price | Total\n1 | Steel Plate | 10 | 500 | 5000"),
+    ]
+    pipeline = get_pipeline()
+    classified = threading.Event()
+    original_classify = pipeline.classifier.classify
+    
+    def classify(*args, **kwargs):
+        result = original_classify(*args, **kwargs)
+        classified.set()
+        return result
+    
+    monkeypatch.setattr(orchestrator, "CLASSIFY_PREFIX_CHARS", 40)
+    monkeypatch.setattr(pipeline.classifier, "classify", classify)
+    timer = StageTimer()
+    page_classifier = PageClassifier(pipeline, "po.pdf", timer)
+    page_classifier.feed(pages[0])
+    # Page 1 is classified before page 2 has been parsed
+    assert classified.wait(timeout=10)
+    page_classifier.feed(pages[1])
+    prefix = page_classifier.finish()
+    
+    assert prefix.text == pages[0].text
+    result = pipeline.process_document(ParsedDocument.from_pages(pages), "po.pdf", timer, prefix=prefix)
+    assert result.success
+    assert result.document.metadata.document_type.value == "PO"
+    assert len(result.document.line_items) == 1
+    assert result.bytes_scanned_estimate["classifier"] == prefix.normalized_bytes
+    assert [timing.name for timing in timer.stages].count("classifier") == 1
+
+
+def test_short_documents_are_classified_by_the_pipeline():
+    """Below CLASSIFY_PREFIX_CHARS nothing is classified early and the result matches process_document"""
+    pages = [
+        ParsedPage(page_number=1, text="REQUEST FOR QUOTATION\nRFQ Number: RFQ-2024-001"),
+        ParsedPage(page_number=2, text="Submission Deadline: 30 January 2024\nCurrency: SAR"),
+    ]
+    page_classifier = PageClassifier(get_pipeline())
+    for page in pages:
+        page_classifier.feed(page)
+    prefix = page_classifier.finish()
+    
+    streamed = get_pipeline().process_document(ParsedDocument.from_pages(pages), prefix=prefix)
+    direct = get_pipeline().process_document("\n".join(page.text for page in pages))
+    
+    assert prefix is None
+    assert streamed.document.metadata.document_type == direct.document.metadata.document_type
+    assert streamed.classifier_confidence == direct.classifier_confidence
+    assert streamed.bytes_scanned_estimate == direct.bytes_scanned_estimate
+
+
 if __name__ == "__main__":
     print("\n" + "="*80)
     print("ORCHESTRATOR STAGE - END-TO-END PIPELINE TESTS")
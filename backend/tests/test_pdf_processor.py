@@ -0,0 +1,57 @@
+"""
+Test the PDF processor - sequential and page-parallel parsing.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from document_processing.pdf_processor import PDFProcessor, shutdown_parse_pool
+
+SAMPLE_PDF = Path(__file__).parent.parent / "test_documents" / "Procurement of portable working at height fixture (1).pdf"
+
+
+@pytest.mark.slow
+def test_parallel_parse_matches_sequential():
+    """Page ranges parsed in worker processes merge back in page order"""
+    sequential = PDFProcessor(str(SAMPLE_PDF), max_workers=1).parse()
+    try:
+        parallel = PDFProcessor(str(SAMPLE_PDF), max_workers=2, parallel_min_pages=2).parse()
+    finally:
+        shutdown_parse_pool()
+
+    assert "error" not in parallel
+    assert parallel == sequential
+    assert [page["page_number"] for page in parallel["pages"]] == list(range(1, parallel["total_pages"] + 1))
+
+
+@pytest.mark.slow
+def test_parallel_iter_pages_matches_sequential():
+    """Pages parsed in worker processes are yielded in page order"""
+    sequential = list(PDFProcessor(str(SAMPLE_PDF), max_workers=1).iter_pages())
+    try:
+        parallel = list(PDFProcessor(str(SAMPLE_PDF), max_workers=2, parallel_min_pages=2).iter_pages())
+    finally:
+        shutdown_parse_pool()
+
+    assert parallel == sequential
+
+
+def test_small_pdf_parses_in_process():
+    """PDFs below the page threshold never start a worker pool"""
+    processor = PDFProcessor(str(SAMPLE_PDF), max_workers=4, parallel_min_pages=100)
+
+    assert not processor._use_parallel(4)
+    assert processor._use_parallel(100)
+    assert not PDFProcessor(str(SAMPLE_PDF), max_workers=1)._use_parallel(1000)
+
+
+def test_page_ranges_cover_every_page_once():
+    """Ranges are contiguous, ordered and cover all pages"""
+    processor = PDFProcessor(str(SAMPLE_PDF), max_workers=4)
+
+    for total_pages in (2, 7, 40, 203, 1000):
+        ranges = processor._page_ranges(total_pages)
+        assert ranges[0][0] == 0 and ranges[-1][1] == total_pages
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert len(ranges) <= processor.max_workers * 2
@@ -0,0 +1,81 @@
+"""
+Test per-stage pipeline timings, profiling and their export to metrics and trace spans.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+import monitoring as monitoring_module
+from document_processing.orchestrator import get_pipeline, WARM_UP_TEXT
+from document_processing.timing import StageTimer
+from services.extraction_cache import get_extraction_cache
+
+SAMPLE_PDF = Path(__file__).parent.parent / "test_documents" / "Procurement of portable working at height fixture (1).pdf"
+STAGES = ["classifier", "mapper", "inferencer", "validator"]
+
+
+def test_every_stage_and_rule_is_timed():
+    result = get_pipeline().process_document(WARM_UP_TEXT)
+    timings = result.stage_timings
+
+    assert list(timings) == STAGES
+    assert all(timings[stage]["duration_ms"] > 0 for stage in STAGES)
+    assert timings["mapper"]["bytes"] > 0 and timings["mapper"]["lines"] == WARM_UP_TEXT.count("\n") + 1
+    assert set(timings["inferencer"]["rules_ms"]) == set(get_pipeline().inferencer.inferencer.inference_rules)
+    assert "profile" not in timings["mapper"]
+    assert result.processing_time_seconds * 1000 >= sum(timing["duration_ms"] for timing in timings.values())
+
+
+def test_profiled_run_keeps_top_functions_per_stage():
+    timer = StageTimer(profile=True)
+    get_pipeline().process_document(WARM_UP_TEXT, timer=timer)
+
+    assert all("function calls" in timer.get(stage).profile for stage in STAGES)
+
+
+def test_stage_spans_are_exported(monkeypatch):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monitor = monitoring_module.MonitoringMetrics.__new__(monitoring_module.MonitoringMetrics)
+    monitor.enabled = True
+    timer = StageTimer()
+    get_pipeline().process_document(WARM_UP_TEXT, timer=timer)
+
+    monkeypatch.setattr(monitoring_module.trace, "get_tracer", provider.get_tracer)
+    monitor.record_pipeline_stages("doc-1", timer)
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    parent = spans["extraction_pipeline"]
+    assert [name for name in spans if name.startswith("pipeline.")] == [f"pipeline.{stage}" for stage in STAGES]
+    assert all(spans[f"pipeline.{stage}"].parent.span_id == parent.context.span_id for stage in STAGES)
+    assert "pipeline.rule.calculate_totals_ms" in spans["pipeline.inferencer"].attributes
+
+
+async def test_extract_debug_flag_returns_timings():
+    import main
+
+    os.makedirs(main.UPLOAD_DIR, exist_ok=True)
+    get_extraction_cache().clear()
+    client = TestClient(main.app)
+    upload = client.post(
+        "/api/v1/docs/upload", files={"file": ("rfq.pdf", SAMPLE_PDF.read_bytes(), "application/pdf")}
+    )
+
+    response = json.loads((await main.extract_intelligence(upload.json()["document_id"], debug=True, wait=True)).body)
+
+    timings = response["debug"]["stage_timings"]
+    assert list(timings) == ["parse"] + STAGES
+    assert timings["parse"]["bytes"] == SAMPLE_PDF.stat().st_size and timings["parse"]["lines"] > 1
+    assert response["debug"]["profiled"] is False
+
+    stages = client.get("/api/v1/metrics").json()["pipeline_stages"]
+    assert stages["parse"]["count"] >= 1 and "inferencer.infer_currency" in stages
+    assert 'kraftd_pipeline_stage_duration_milliseconds_count{stage="mapper"}' in client.get(
+        "/api/v1/metrics/prometheus").text
@@ -0,0 +1,111 @@
+"""
+Test the streaming page API (iter_pages / iter_chunks) of the file processors.
+"""
+
+from pathlib import Path
+
+import openpyxl
+from docx import Document
+
+from document_processing import PDFProcessor, WordProcessor, ExcelProcessor, ParsedDocument
+from document_processing import orchestrator
+from document_processing.worker import parse_file, run_pipeline
+
+SAMPLE_PDF = Path(__file__).parent.parent / "test_documents" / "Procurement of portable working at height fixture (1).pdf"
+
+
+def make_workbook(path: Path) -> Path:
+    workbook = openpyxl.Workbook()
+    boq = workbook.active
+    boq.title = "BOQ"
+    boq.append(["Item", "Description", "Qty", "Unit Price"])
+    boq.append([1, "Steel Pipes", 500, 450.5])
+    boq.append([2, "Gaskets", None, 12])
+    notes = workbook.create_sheet("Notes")
+    notes.append(["Remarks"])
+    notes.append(["Delivery within 4 weeks"])
+    workbook.save(path)
+    return path
+
+
+def test_pdf_iter_pages_matches_parse():
+    """Streaming pages carry the same text and tables as a full parse"""
+    processor = PDFProcessor(str(SAMPLE_PDF), max_workers=1)
+    pages = list(processor.iter_pages())
+    parsed = processor.parse_document()
+
+    assert [page.page_number for page in pages] == [page.page_number for page in parsed.pages]
+    assert [page.text for page in pages] == [page.text for page in parsed.pages]
+    assert [table.rows for page in pages for table in page.tables] == [table.rows for table in parsed.tables]
+
+
+def test_iter_chunks_rebuilds_text():
+    """Chunks are cut at line boundaries and join back into the document text"""
+    processor = PDFProcessor(str(SAMPLE_PDF), max_workers=1)
+    chunks = list(processor.iter_chunks(chunk_chars=500))
+
+    assert len(chunks) > 1
+    assert "\n".join(chunks) == ParsedDocument.from_pages(list(processor.iter_pages())).text
+
+
+def test_excel_iter_pages_one_page_per_sheet(tmp_path):
+    """Each sheet becomes a page with its cells as a table, matching parse()"""
+    processor = ExcelProcessor(str(make_workbook(tmp_path / "boq.xlsx")))
+    pages = list(processor.iter_pages())
+
+    assert [page.tables[0].name for page in pages] == ["BOQ", "Notes"]
+    assert pages[0].tables[0].rows == [
+        ["Item", "Description", "Qty", "Unit Price"],
+        ["1", "Steel Pipes", "500", "450.5"],
+        ["2", "Gaskets", "", "12"],
+    ]
+    assert [page.text for page in pages] == [page.text for page in processor.parse_document().pages]
+
+
+def test_excel_row_and_column_limits(tmp_path):
+    """max_rows/max_cols cap every sheet at read time; parse() still returns records"""
+    processor = ExcelProcessor(str(make_workbook(tmp_path / "boq.xlsx")), max_rows=1, max_cols=2)
+
+    boq = processor.parse_document().tables[0]
+    assert boq.rows == [["Item", "Description"], ["1", "Steel Pipes"]]
+
+    parsed = processor.parse()
+    assert parsed["sheet_names"] == ["BOQ", "Notes"]
+    assert parsed["sheets"][0]["data"] == [{"Item": 1, "Description": "Steel Pipes"}]
+    assert processor.get_sheet_data("Notes")["data"] == [{"Remarks": "Delivery within 4 weeks"}]
+
+
+def test_word_iter_pages_keeps_tables_in_body_order(tmp_path):
+    """Word tables are rendered where they appear in the body"""
+    doc = Document()
+    doc.add_paragraph("Request for Quotation")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text, table.cell(0, 1).text = "Description", "Qty"
+    table.cell(1, 0).text, table.cell(1, 1).text = "Steel Pipes", "500"
+    doc.add_paragraph("Submission deadline: 30 January 2024")
+    path = tmp_path / "rfq.docx"
+    doc.save(path)
+
+    pages = list(WordProcessor(str(path)).iter_pages())
+
+    assert len(pages) == 1
+    assert pages[0].text == (
+        "Request for Quotation\n"
+        "Description | Qty\nSteel Pipes | 500\n"
+        "Submission deadline: 30 January 2024"
+    )
+    assert pages[0].tables[0].rows == [["Description", "Qty"], ["Steel Pipes", "500"]]
+
+
+def test_parse_file_classifies_the_first_pages(tmp_path, monkeypatch):
+    """The parse step hands the classified prefix to the pipeline step, which does not classify again"""
+    monkeypatch.setattr(orchestrator, "CLASSIFY_PREFIX_CHARS", 40)
+    path = make_workbook(tmp_path / "boq.xlsx")
+
+    parsed, prefix, timer = parse_file(str(path), "xlsx")
+    result = run_pipeline(parsed, str(path), timer, prefix)
+
+    assert parsed.source_format == "excel" and parsed.page_count == 2
+    assert prefix.classification is not None
+    assert result.success
+    assert [timing.name for timing in timer.stages].count("classifier") == 1
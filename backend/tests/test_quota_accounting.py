@@ -0,0 +1,172 @@
+"""
+Test write-behind quota accounting and cross-worker leases against the in-memory Cosmos stand-in.
+"""
+
+import asyncio
+
+import pytest
+
+import services.quota_accounting as accounting_module
+from services.cosmos_service import patch_op
+from services.quota_accounting import QuotaAccounting
+from services.quota_service import QuotaService, limit_for
+
+USER = "buyer@example.com"
+
+
+QUOTA_CALLS = ("read_item", "create_item", "replace_item", "patch_item")
+
+
+async def stored_quota(cosmos):
+    return await cosmos.read_item("quota", f"quota-{USER}", USER)
+
+
+async def test_usage_is_counted_in_memory_and_flushed_in_one_patch(cosmos, count_calls):
+    """Many increments cost no round trips until the flush, which writes them all at once"""
+    quotas = QuotaService(cosmos, write_behind=True)
+    await quotas.get_or_create_quota(USER)
+    await cosmos.patch_item("quota", f"quota-{USER}", USER, [patch_op("set", "/limits/exports_per_month", 500)])
+    calls = count_calls(*QUOTA_CALLS)
+
+    for _ in range(50):
+        await quotas.increment_usage(USER, "exports_generated")
+
+    assert calls.count("patch_item") == 5  # Lease reservations of 10 units only
+    reservations = calls.count("patch_item")
+    await quotas.accounting.flush()
+
+    assert calls.count("patch_item") == reservations + 1
+    assert (await stored_quota(cosmos))["usage"]["exports_generated"] == 50
+
+    await quotas.accounting.close()
+    assert (await stored_quota(cosmos))["reserved"]["exports_generated"] == 0
+
+
+async def test_checks_are_served_from_the_local_cache(cosmos, count_calls):
+    """check_limits reads the quota once per TTL and counts this worker's unflushed usage"""
+    quotas = QuotaService(cosmos, write_behind=True)
+    await quotas.get_or_create_quota(USER)
+    calls = count_calls(*QUOTA_CALLS)
+
+    for _ in range(3):
+        await quotas.increment_usage(USER, "documents_uploaded")
+    round_trips = len(calls)
+    results = [await quotas.check_limits(USER, "documents_uploaded") for _ in range(20)]
+
+    assert len(calls) == round_trips
+    assert results[-1]["usage"] == 3 and results[-1]["limit"] == 10
+    await quotas.accounting.close()
+
+
+async def test_leases_keep_workers_within_the_limit(cosmos):
+    """Two workers sharing a 10-document limit hand out exactly 10, however requests interleave"""
+    quotas = QuotaService(cosmos)
+    await quotas.get_or_create_quota(USER)
+    workers = [QuotaAccounting(quotas, check_ttl=0), QuotaAccounting(quotas, check_ttl=0)]
+
+    granted = await asyncio.gather(*(
+        workers[index % 2].consume(USER, "documents_uploaded") for index in range(30)
+    ))
+    for worker in workers:
+        await worker.close()
+
+    assert sum(granted) == 10
+    quota = await stored_quota(cosmos)
+    assert quota["usage"]["documents_uploaded"] == 10
+    assert quota["reserved"]["documents_uploaded"] == 0
+    assert (await quotas.check_limits(USER, "documents_uploaded"))["exceeded"]
+
+
+async def test_reservations_of_a_dead_worker_are_reclaimed(cosmos, monkeypatch):
+    """A lease never handed back stops blocking other workers once it goes stale"""
+    quotas = QuotaService(cosmos)
+    await quotas.get_or_create_quota(USER)
+    crashed, survivor = QuotaAccounting(quotas, lease_size=10), QuotaAccounting(quotas)
+
+    assert await crashed.consume(USER, "documents_uploaded")
+    assert (await stored_quota(cosmos))["reserved"]["documents_uploaded"] >= 2
+    for _ in range(8):
+        await survivor.consume(USER, "documents_uploaded")
+
+    monkeypatch.setattr(accounting_module, "QUOTA_STALE_RESERVATION_SECONDS", 0)
+    assert await survivor.consume(USER, "documents_uploaded")
+    assert survivor.get_stats()["reservations_reclaimed"] == 1
+    await survivor.close()
+
+
+async def test_reclaiming_a_dead_worker_leaves_live_leases_reserved(cosmos):
+    """Only the stale worker's units come off reserved; a live worker keeps spending its lease"""
+    quotas = QuotaService(cosmos)
+    await quotas.get_or_create_quota(USER)
+    live, crashed, survivor = QuotaAccounting(quotas), QuotaAccounting(quotas), QuotaAccounting(quotas)
+
+    assert await live.consume(USER, "documents_uploaded")
+    assert await crashed.consume(USER, "documents_uploaded")
+    while await survivor.consume(USER, "documents_uploaded"):
+        pass
+    live_units = (await stored_quota(cosmos))["leases"][live.worker_id]["units"]["documents_uploaded"]
+
+    await cosmos.patch_item("quota", f"quota-{USER}", USER, [
+        patch_op("set", f"/leases/{crashed.worker_id}/at", "2000-01-01T00:00:00Z")
+    ])
+    assert await survivor.consume(USER, "documents_uploaded")
+    assert survivor.get_stats()["reservations_reclaimed"] == 1
+
+    quota = await stored_quota(cosmos)
+    assert crashed.worker_id not in quota["leases"]
+    assert quota["leases"][live.worker_id]["units"]["documents_uploaded"] == live_units
+    assert quota["reserved"]["documents_uploaded"] == sum(
+        lease["units"]["documents_uploaded"] for lease in quota["leases"].values()
+    )
+    assert await live.consume(USER, "documents_uploaded")
+
+    await live.close()
+    await survivor.close()
+    quota = await stored_quota(cosmos)
+    assert quota["usage"]["documents_uploaded"] == 2 + survivor.get_stats()["units_counted"]
+    assert quota["reserved"]["documents_uploaded"] == 0
+    assert quota["leases"] == {}
+
+
+@pytest.mark.parametrize("write_behind", [True, False])
+async def test_usage_reserved_for_failed_work_is_released(cosmos, write_behind):
+    """release_on_failure gives the reservation back when the gated work raises"""
+    quotas = QuotaService(cosmos, write_behind=write_behind)
+    await quotas.get_or_create_quota(USER)
+
+    assert await quotas.reserve_usage(USER, "documents_uploaded")
+    with pytest.raises(RuntimeError):
+        async with quotas.release_on_failure(USER, "documents_uploaded"):
+            raise RuntimeError("create failed")
+    assert await quotas.reserve_usage(USER, "documents_uploaded")
+    async with quotas.release_on_failure(USER, "documents_uploaded"):
+        pass
+
+    if quotas.accounting:
+        await quotas.accounting.close()
+    quota = await stored_quota(cosmos)
+    assert quota["usage"]["documents_uploaded"] == 1
+    assert quota.get("reserved", {}).get("documents_uploaded", 0) == 0
+
+
+@pytest.mark.parametrize("field", ["documents_uploaded", "conversions_created", "exports_generated", "daily_api_calls"])
+async def test_route_fields_are_limited_across_workers(cosmos, field):
+    """The usage fields the gated routes reserve have limits, shared by every worker"""
+    first, second = QuotaService(cosmos, write_behind=True), QuotaService(cosmos, write_behind=True)
+    limit = limit_for(await first.get_or_create_quota(USER), field)
+    assert limit is not None
+
+    for _ in range(limit):
+        assert await first.reserve_usage(USER, field)
+    assert not await second.reserve_usage(USER, field)
+    assert not await first.reserve_usage(USER, field)
+
+    await first.accounting.close()
+    await second.accounting.close()
+    assert (await stored_quota(cosmos))["usage"][field] == limit
+
+
+def test_limits_missing_from_older_quotas_come_from_the_tier():
+    assert limit_for({"tier": "pro", "limits": {"documents_per_month": 5}}, "conversions_created") == 100
+    assert limit_for({"tier": "pro", "limits": {"documents_per_month": 5}}, "documents_uploaded") == 5
+    assert limit_for({"tier": "enterprise", "limits": {}}, "exports_generated") is None
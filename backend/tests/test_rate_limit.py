@@ -0,0 +1,80 @@
+"""
+Test the GCRA rate limiter: exact remaining/reset/retry values, bounded memory and shared stores.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from rate_limit import MemoryRateLimitStore, RateLimit, RateLimitMiddleware, SQLiteRateLimitStore
+
+LIMITS = (RateLimit("minute", 60, 60), RateLimit("hour", 1000, 3600))
+
+
+def test_burst_then_exact_refill():
+    """A full burst is allowed, then one request refills every period / limit seconds"""
+    store = MemoryRateLimitStore()
+    results = [store.hit_now("10.0.0.1", LIMITS, 1000.0) for _ in range(61)]
+
+    assert all(result.allowed for result in results[:60])
+    assert [result.remaining[0] for result in results[:3]] == [59, 58, 57]
+    assert results[0].remaining[1] == 999
+    denied = results[60]
+    assert not denied.allowed and denied.retry_after == 1.0
+    assert denied.headers()["Retry-After"] == "1" and denied.headers()["X-RateLimit-Remaining"] == "0"
+    assert denied.headers()["X-RateLimit-Reset-Minute"] == "60"
+
+    # The denied request consumed nothing: the hour limit still counts 60
+    assert store.hit_now("10.0.0.1", LIMITS, 1000.5).remaining[1] == 940
+    assert not store.hit_now("10.0.0.1", LIMITS, 1000.999).allowed
+    assert store.hit_now("10.0.0.1", LIMITS, 1001.0).allowed
+
+
+def test_hour_limit_binds_after_the_minute_refills():
+    limits = (RateLimit("minute", 60, 60), RateLimit("hour", 100, 3600))
+    store = MemoryRateLimitStore()
+    allowed = sum(store.hit_now("10.0.0.1", limits, now).allowed for now in range(0, 600, 2))
+
+    assert allowed == 100 + 600 // 36
+    result = store.hit_now("10.0.0.1", limits, 600.0)
+    assert not result.allowed and result.headers()["X-RateLimit-Limit"] == "100"
+
+
+def test_idle_clients_are_forgotten():
+    """Memory stays bounded by the clients active within the longest period"""
+    store = MemoryRateLimitStore()
+    for index in range(1000):
+        store.hit_now(f"10.0.{index // 256}.{index % 256}", LIMITS, 0.0)
+    assert len(store) == 1000
+
+    for index in range(600):
+        store.hit_now("10.1.0.1", LIMITS, 3600.0 + index * 6)
+    assert len(store) == 1
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    """Two stores on one file (two uvicorn workers) enforce one limit together"""
+    path = str(tmp_path / "limits.db")
+    workers = [SQLiteRateLimitStore(path), SQLiteRateLimitStore(path)]
+    limits = (RateLimit("minute", 10, 60),)
+
+    allowed = [workers[index % 2].hit_now("10.0.0.1", limits, 50.0).allowed for index in range(15)]
+
+    assert allowed == [True] * 10 + [False] * 5
+    assert workers[1].hit_now("10.0.0.1", limits, 56.0).allowed
+
+
+def test_middleware_headers():
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, requests_per_minute=2, requests_per_hour=100)
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    client = TestClient(app)
+    first, second, third = (client.get("/ping") for _ in range(3))
+
+    assert first.headers["X-RateLimit-Remaining"] == "1" and first.headers["X-RateLimit-Limit-Hour"] == "100"
+    assert second.headers["X-RateLimit-Remaining-Minute"] == "0"
+    assert third.status_code == 429
+    assert third.headers["Retry-After"] == "30" and third.json()["retry_after_seconds"] == 30
@@ -17,6 +17,7 @@ from services.signals_service import (
     TrendAnalysisService, RiskScoringService, SupplierAnalyticsService,
     AnomalyDetectionService, SignalsService
 )
+from services.price_stats import SIGNALS_STATS_RETENTION_DAYS, PriceSeries
 
 
 class TestTrendAnalysisService:
@@ -346,6 +347,83 @@ class TestSignalsService:
         """Test retrieving trend for non-existent item"""
         trend = SignalsService.get_price_trend("NONEXISTENT", days_back=30)
         assert trend is None
+
+    def test_rolling_trend_matches_full_analysis(self):
+        """Trends from the rolling statistics equal analyze_trend over the filtered history"""
+        now = datetime.utcnow()
+        prices = [100 + (i % 7) * 1.5 + i * 0.05 for i in range(300)]
+        for i, price in enumerate(prices):
+            timestamp = now - timedelta(hours=6 * (len(prices) - i))
+            SignalsService.add_price_point("ITEM-001", PricePoint(timestamp=timestamp, price=price))
+            if i % 50 != 49:
+                continue
+            for days_back in (7, 30, 90):
+                trend = SignalsService.get_price_trend("ITEM-001", days_back=days_back)
+                recent = [p.price for p in SignalsService._recent_price_points("ITEM-001", days_back)]
+                if not recent:
+                    assert trend is None
+                    continue
+                expected = TrendAnalysisService.analyze_trend(recent, [])
+                assert trend.data_points == expected["data_points"]
+                assert trend.direction == expected["direction"]
+                for field in ("current_price", "previous_price", "volatility", "min_price", "max_price",
+                              "moving_average_7d", "moving_average_30d", "forecasted_price"):
+                    assert getattr(trend, field) == pytest.approx(expected[field]), field
+
+        # Windows are kept per item and brought up to date incrementally
+        assert set(SignalsService._price_series["ITEM-001"]._windows) == {7, 30, 90}
+
+    def test_out_of_order_points_fall_back_to_history(self):
+        """A point older than the previous one disables the rolling windows, not correctness"""
+        now = datetime.utcnow()
+        for hours, price in [(3, 100.0), (1, 104.0), (2, 102.0)]:
+            SignalsService.add_price_point("ITEM-001", PricePoint(timestamp=now - timedelta(hours=hours), price=price))
+
+        trend = SignalsService.get_price_trend("ITEM-001", days_back=1)
+        assert not SignalsService._price_series["ITEM-001"].ordered
+        assert (trend.data_points, trend.current_price, trend.min_price, trend.max_price) == (3, 102.0, 100.0, 104.0)
+
+    def test_detect_latest_price_anomaly(self):
+        """Only the newest price is checked, against its window"""
+        now = datetime.utcnow()
+        for i in range(30):
+            price = 100.0 + (i % 2)
+            SignalsService.add_price_point("ITEM-001", PricePoint(timestamp=now - timedelta(hours=30 - i), price=price))
+        assert SignalsService.detect_latest_price_anomaly("ITEM-001") is None
+
+        SignalsService.add_price_point("ITEM-001", PricePoint(timestamp=now, price=180.0))
+        deviation, z_score, mean = SignalsService.detect_latest_price_anomaly("ITEM-001")
+        assert z_score > 2.5 and mean == pytest.approx((30 * 100.5 + 180) / 31)
+        assert deviation == pytest.approx((180 - mean) / mean * 100)
+    
+    def test_history_is_bounded_by_the_statistics_retention(self):
+        """Points past SIGNALS_STATS_RETENTION_DAYS leave the history and the series together"""
+        now = datetime.utcnow()
+        days = SIGNALS_STATS_RETENTION_DAYS + 100
+        for day in range(days):
+            point = PricePoint(timestamp=now - timedelta(days=days - 1 - day), price=100.0 + day % 5)
+            SignalsService.add_price_point("ITEM-001", point)
+
+        history = SignalsService._price_history["ITEM-001"]
+        assert len(history) == len(SignalsService._price_series["ITEM-001"]) == SIGNALS_STATS_RETENTION_DAYS + 1
+        assert history[0].timestamp == now - timedelta(days=SIGNALS_STATS_RETENTION_DAYS)
+        trend = SignalsService.get_price_trend("ITEM-001", days_back=90)
+        recent = [p.price for p in SignalsService._recent_price_points("ITEM-001", 90)]
+        assert trend.data_points == len(recent) and trend.min_price == min(recent)
+
+    def test_unread_window_does_not_hold_back_retention(self):
+        """A window last read long ago is dropped with the points it held and rebuilt on its next read"""
+        series, day = PriceSeries(retention_days=30), 86400.0
+        for n in range(10):
+            series.append(n * day, 100.0 + n)
+        assert series.window(7, now=9 * day).count == 8
+
+        for n in range(10, 100):
+            series.append(n * day, 100.0 + n)
+        assert len(series) == 31
+
+        window = series.window(7, now=99 * day)
+        assert (window.count, window.min_price, window.max_price) == (8, 192.0, 199.0)
     
     def test_create_and_retrieve_alert(self):
         """Test creating and retrieving risk alert"""
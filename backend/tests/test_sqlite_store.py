@@ -0,0 +1,29 @@
+"""
+Test the SQLite connection helper shared by the SQLite rate limit store and job queue.
+"""
+
+import pytest
+
+from services.sqlite_store import SQLiteStore
+
+
+async def test_transactions_commit_or_roll_back(tmp_path):
+    """A transaction that raises leaves nothing behind; other connections see committed writes"""
+    path = str(tmp_path / "state.db")
+    store = SQLiteStore(path, schema=["CREATE TABLE IF NOT EXISTS items (name TEXT PRIMARY KEY)"])
+    other = SQLiteStore(path, schema=["CREATE TABLE IF NOT EXISTS items (name TEXT PRIMARY KEY)"])
+
+    def insert(name: str, fail: bool = False) -> None:
+        store.db.execute("INSERT INTO items (name) VALUES (?)", (name,))
+        if fail:
+            raise RuntimeError("abort")
+
+    await store.run(insert, "kept")
+    with pytest.raises(RuntimeError):
+        await store.run(insert, "dropped", True)
+
+    names = await other.run_read(lambda: [row[0] for row in other.db.execute("SELECT name FROM items")])
+    assert names == ["kept"]
+    assert store.db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    store.close()
+    other.close()
@@ -25,7 +25,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import services
 from services.event_broadcaster import (
-    EventBroadcasterService, ClientConnection, broadcaster
+    EventBroadcasterService, ClientConnection, OverflowPolicy, broadcaster, serialize_event
 )
 from models.streaming import (
     PriceUpdate, RiskAlert, AnomalyDetected, TrendChange, SupplierSignal,
@@ -333,7 +333,7 @@ async def test_broadcast_price_update_single_client(test_broadcaster, sample_pri
     count = await test_broadcaster.broadcast_event(sample_price_update, "prices")
     
     assert count >= 1  # At least one client received it
-    assert mock_ws.send_json.called
+    assert mock_ws.send_text.called
 
 
 @pytest.mark.asyncio
@@ -374,8 +374,8 @@ async def test_broadcast_excludes_specified_client(test_broadcaster, sample_pric
     )
     
     # Only client2 should receive it
-    assert mock_ws1.send_json.call_count == 0
-    assert mock_ws2.send_json.called
+    assert mock_ws1.send_text.call_count == 0
+    assert mock_ws2.send_text.called
 
 
 @pytest.mark.asyncio
@@ -404,6 +404,66 @@ async def test_broadcast_respects_filters(test_broadcaster):
     # Note: in actual implementation, filter matching is tested here
 
 
+@pytest.mark.asyncio
+async def test_broadcast_serializes_once_for_all_subscribers(test_broadcaster, sample_price_update):
+    """Every subscriber gets the same pre-serialized text frame"""
+    sockets = []
+    for i in range(5):
+        mock_ws = AsyncMock()
+        client_conn = test_broadcaster.register_client(mock_ws, f"user-{i}")
+        test_broadcaster.subscribe(client_conn.client_id, "prices")
+        sockets.append(mock_ws)
+    
+    with patch("services.event_broadcaster.serialize_event", wraps=serialize_event) as serialize:
+        count = await test_broadcaster.broadcast_event(sample_price_update, "prices")
+    
+    assert count == 5 and serialize.call_count == 1
+    payloads = [mock_ws.send_text.call_args.args[0] for mock_ws in sockets]
+    assert len(set(payloads)) == 1 and not sockets[0].send_json.called
+    sent = json.loads(payloads[0])
+    assert sent["item_id"] == "ITEM-001" and sent["trend_direction"] == "UPTREND"
+    assert sent["timestamp"].startswith(str(sample_price_update.timestamp.date()))
+
+
+@pytest.mark.asyncio
+async def test_filter_index_matches_like_filter_scan(test_broadcaster):
+    """Index lookups give the same recipients as checking every client's filters"""
+    import random
+    rng = random.Random(3)
+    items = [f"ITEM-{n}" for n in range(5)]
+    for i in range(200):
+        client_conn = test_broadcaster.register_client(AsyncMock(), f"user-{i}")
+        filters = {}
+        if rng.random() < 0.7:
+            filters["item_id"] = rng.sample(items, rng.randint(1, 2))
+        if rng.random() < 0.5:
+            filters["tenant_id"] = rng.choice(["t1", "t2"])
+        if rng.random() < 0.2:
+            filters["risk_level"] = [AlertLevel.HIGH, "CRITICAL"]
+        test_broadcaster.subscribe(client_conn.client_id, "prices", filters)
+        if rng.random() < 0.2:
+            test_broadcaster.unsubscribe(client_conn.client_id, "prices")
+        elif rng.random() < 0.1:
+            test_broadcaster.subscribe(client_conn.client_id, "prices", {"item_id": "ITEM-0"})
+    
+    index = test_broadcaster.topic_indexes["prices"]
+    for _ in range(100):
+        event = {"item_id": rng.choice(items + ["ITEM-X"])}
+        if rng.random() < 0.7:
+            event["tenant_id"] = rng.choice(["t1", "t2"])
+        if rng.random() < 0.5:
+            event["risk_level"] = rng.choice([AlertLevel.HIGH, AlertLevel.LOW, "CRITICAL"])
+        expected = {
+            client_id for client_id in test_broadcaster.topic_subscriptions["prices"]
+            if test_broadcaster._matches_filters(event, test_broadcaster.clients[client_id].filters["prices"])
+        }
+        assert index.match(event) == expected
+    
+    for client_id in list(test_broadcaster.clients):
+        test_broadcaster.unregister_client(client_id)
+    assert not index.subscribers and not index.filtering and not index.filters
+
+
 @pytest.mark.asyncio
 async def test_broadcast_parallel_delivery(test_broadcaster):
     """Test parallel delivery to multiple clients"""
@@ -477,6 +537,146 @@ async def test_broadcast_different_event_types(test_broadcaster):
     assert count2 >= 1
 
 
+def price_event(item_id: str, price: float) -> dict:
+    return {"event_type": "price_update", "item_id": item_id, "price": price}
+
+
+class HungWebSocket:
+    """A socket whose sends block until released (a slow or half-dead client)"""
+    
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.frames = []
+        self.close = AsyncMock()
+    
+    async def send_text(self, payload):
+        await self.release.wait()
+        self.frames.append(json.loads(payload))
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_delay_the_topic():
+    """Broadcast only queues; a hung socket holds up nobody but itself"""
+    test_broadcaster = EventBroadcasterService()
+    hung, fast = HungWebSocket(), AsyncMock()
+    for ws in (hung, fast):
+        client_conn = test_broadcaster.register_client(ws, "user-1")
+        test_broadcaster.subscribe(client_conn.client_id, "signals")
+    
+    for n in range(20):
+        count = await asyncio.wait_for(test_broadcaster.broadcast_event(price_event("ITEM-1", n), "signals"), 1)
+        assert count == 2
+    
+    assert fast.send_text.call_count == 20
+    stats = test_broadcaster.get_stats()
+    assert stats["send_queues"]["queued"] == 19 and stats["send_queues"]["clients_backlogged"] == 1
+    hung.release.set()
+    await asyncio.sleep(0.01)
+    assert [frame["price"] for frame in hung.frames] == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_and_coalesces_per_item():
+    """Prices coalesce to the latest per item_id; when full, the oldest pending event is dropped"""
+    test_broadcaster = EventBroadcasterService(send_queue_size=2)
+    hung = HungWebSocket()
+    client_conn = test_broadcaster.register_client(hung, "user-1")
+    test_broadcaster.subscribe(client_conn.client_id, "prices")
+    
+    # A1 goes out (and hangs), then B, A2 queue, C overflows (drops B), A3 replaces A2
+    for item_id, price in [("A", 1), ("B", 1), ("A", 2), ("C", 1), ("A", 3)]:
+        assert await test_broadcaster.broadcast_event(price_event(item_id, price), "prices") == 1
+    
+    client_stats = test_broadcaster.get_clients_stats()[0]
+    assert client_stats["queue_depth"] == 2 and client_stats["max_queue_depth"] == 2
+    assert client_stats["messages_dropped"] == 1 and client_stats["messages_coalesced"] == 1
+    stats = test_broadcaster.get_stats()
+    assert stats["messages_dropped_total"] == 1 and stats["messages_coalesced_total"] == 1
+    assert stats["overflow_policies"]["prices"] == "coalesce_latest:item_id"
+    
+    hung.release.set()
+    await asyncio.sleep(0.01)
+    assert [(frame["item_id"], frame["price"]) for frame in hung.frames] == [("A", 1), ("A", 3), ("C", 1)]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_disconnects_under_disconnect_policy():
+    """Alerts are never dropped silently: a client that falls behind is disconnected"""
+    test_broadcaster = EventBroadcasterService(send_queue_size=1)
+    hung, fast = HungWebSocket(), AsyncMock()
+    clients = []
+    for ws in (hung, fast):
+        client_conn = test_broadcaster.register_client(ws, "user-1")
+        test_broadcaster.subscribe(client_conn.client_id, "alerts")
+        clients.append(client_conn)
+    
+    counts = [await test_broadcaster.broadcast_event({"risk_level": "HIGH", "n": n}, "alerts") for n in range(3)]
+    await asyncio.sleep(0.01)
+    
+    assert counts == [2, 2, 1]
+    assert clients[0].client_id not in test_broadcaster.clients and clients[0].overflowed
+    hung.close.assert_awaited_once_with(code=1013, reason="Send queue overflow")
+    assert test_broadcaster.get_stats()["overflow_disconnects_total"] == 1
+    assert fast.send_text.call_count == 3
+    
+    with pytest.raises(ValueError):
+        test_broadcaster.set_topic_policy("trends", OverflowPolicy.COALESCE_LATEST)
+    test_broadcaster.set_topic_policy("alerts", "drop_oldest")
+    assert test_broadcaster.get_stats()["overflow_policies"]["alerts"] == "drop_oldest"
+
+
+@pytest.mark.asyncio
+async def test_batch_window_coalesces_prices_into_one_frame(mock_websocket):
+    """A client with a batch window gets one frame per window with the latest price per item"""
+    test_broadcaster = EventBroadcasterService()
+    client_conn = test_broadcaster.register_client(mock_websocket, "user-1")
+    test_broadcaster.subscribe(client_conn.client_id, "prices", batch_window_ms=50)
+    assert client_conn.batch_windows == {"prices": 50}
+
+    for n in range(1000):
+        assert await test_broadcaster.broadcast_event(price_event(f"ITEM-{n % 10}", n), "prices") == 1
+    assert mock_websocket.send_text.call_count == 0
+    await asyncio.sleep(0.1)
+
+    assert mock_websocket.send_text.call_count == 1
+    frame = json.loads(mock_websocket.send_text.call_args.args[0])
+    assert frame["type"] == "batch" and frame["topic"] == "prices" and frame["count"] == 10
+    assert [(event["item_id"], event["price"]) for event in frame["events"]] == [
+        (f"ITEM-{n}", 990 + n) for n in range(10)
+    ]
+    stats = test_broadcaster.get_stats()["batching"]
+    assert stats["messages_batched_total"] == 10 and stats["batches_sent_total"] == 1
+    assert test_broadcaster.get_stats()["messages_coalesced_total"] == 990
+
+
+@pytest.mark.asyncio
+async def test_batch_window_keeps_every_anomaly_and_is_negotiated(mock_websocket):
+    """Anomalies are batched but not coalesced; windows are clamped and only for batchable topics"""
+    test_broadcaster = EventBroadcasterService()
+    client_conn = test_broadcaster.register_client(mock_websocket, "user-1")
+    test_broadcaster.subscribe(client_conn.client_id, "anomalies", batch_window_ms=1)
+    assert client_conn.batch_windows["anomalies"] == 50
+
+    for n in range(3):
+        await test_broadcaster.broadcast_event({"item_id": "ITEM-1", "z_score": n}, "anomalies")
+    await asyncio.sleep(0.1)
+    frame = json.loads(mock_websocket.send_text.call_args.args[0])
+    assert [event["z_score"] for event in frame["events"]] == [0, 1, 2]
+
+    assert test_broadcaster.negotiate_batch_window("prices", 10 ** 6) == 5000
+    assert test_broadcaster.negotiate_batch_window("prices", 0) == 0
+    assert test_broadcaster.negotiate_batch_window("prices") == 0
+    assert test_broadcaster.negotiate_batch_window("alerts", 250) == 0
+    assert EventBroadcasterService(default_batch_window_ms=250).negotiate_batch_window("trends") == 250
+
+    # Unsubscribing drops what is pending
+    await test_broadcaster.broadcast_event({"item_id": "ITEM-1", "z_score": 3}, "anomalies")
+    test_broadcaster.unsubscribe(client_conn.client_id, "anomalies")
+    await asyncio.sleep(0.1)
+    assert mock_websocket.send_text.call_count == 1 and not client_conn.batch_windows
+    assert SubscriptionRequest(action="subscribe", batch_window_ms=250).batch_window_ms == 250
+
+
 # ============================================================================
 # TEST SUITE 4: Error Handling (6 tests)
 # ============================================================================
@@ -643,7 +843,7 @@ async def test_handle_high_event_frequency(test_broadcaster, mock_websocket):
         assert count >= 1
     
     # Verify all messages received
-    assert mock_websocket.send_json.call_count == 100
+    assert mock_websocket.send_text.call_count == 100
 
 
 @pytest.mark.asyncio
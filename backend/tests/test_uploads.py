@@ -0,0 +1,170 @@
+"""
+Test streamed uploads and the concurrent batch upload endpoint.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi import UploadFile
+
+import services.uploads as uploads_module
+from services.cosmos_memory import InMemoryContainer
+from services.uploads import UploadTooLarge, stream_upload_to_file
+
+
+async def test_stream_hashes_and_enforces_the_limit(tmp_path):
+    content = os.urandom(300_000)
+    path = str(tmp_path / "ok.pdf")
+    size, digest = await stream_upload_to_file(UploadFile(io.BytesIO(content)), path, 300_000, chunk_size=65536)
+    assert size == 300_000 and digest == hashlib.sha256(content).hexdigest()
+    assert open(path, "rb").read() == content
+
+    # Size unknown up front: the limit is enforced while streaming and the partial file removed
+    with pytest.raises(UploadTooLarge):
+        await stream_upload_to_file(UploadFile(io.BytesIO(content)), str(tmp_path / "big.pdf"), 100_000, 65536)
+    assert not (tmp_path / "big.pdf").exists()
+    # Declared size over the limit: rejected before anything is written
+    with pytest.raises(UploadTooLarge):
+        await stream_upload_to_file(UploadFile(io.BytesIO(content), size=300_000), str(tmp_path / "x.pdf"), 1000)
+    assert not (tmp_path / "x.pdf").exists()
+
+
+async def test_batch_upload_is_concurrent_and_batches_records(cosmos, monkeypatch):
+    import main
+
+    os.makedirs(main.UPLOAD_DIR, exist_ok=True)
+    monkeypatch.setattr(main, "MAX_UPLOAD_SIZE_MB", 1)
+    writers, peak, lock = [0], [0], threading.Lock()
+    write_chunk = uploads_module._write_chunk
+
+    def slow_write(handle, digest, chunk):
+        with lock:
+            writers[0] += 1
+            peak[0] = max(peak[0], writers[0])
+        time.sleep(0.05)
+        write_chunk(handle, digest, chunk)
+        with lock:
+            writers[0] -= 1
+
+    monkeypatch.setattr(uploads_module, "_write_chunk", slow_write)
+    calls = []
+    execute_item_batch = InMemoryContainer.execute_item_batch
+
+    async def record_batch(self, *args, **kwargs):
+        calls.append(len(kwargs["batch_operations"]))
+        return await execute_item_batch(self, *args, **kwargs)
+
+    monkeypatch.setattr(InMemoryContainer, "execute_item_batch", record_batch)
+
+    monkeypatch.setattr(main.extraction_workers, "mode", "thread")
+    files = [(f"quote-{n}.pdf", b"%PDF-" + bytes([n]) * 1000) for n in range(6)]
+    files.insert(2, ("notes.txt", b"text"))
+    files.append(("huge.pdf", b"0" * (1024 * 1024 + 1)))
+    response = await main.upload_documents(
+        [UploadFile(io.BytesIO(content), filename=name) for name, content in files], extract=True, priority=2
+    )
+    results = json.loads(response.body)
+
+    assert [result["filename"] for result in results] == [name for name, _ in files]
+    assert [result["status"] for result in results] == ["uploaded"] * 2 + ["error"] + ["uploaded"] * 4 + ["error"]
+    assert results[-1]["error_message"] == "File size exceeds 1MB limit"
+    assert peak[0] > 1
+    # One transactional batch for all six records
+    assert calls == [6]
+
+    uploaded = [result for result in results if result["status"] == "uploaded"]
+    for result, (_, content) in zip(uploaded, files[:2] + files[3:7]):
+        record = await main.get_document_record(result["document_id"])
+        assert record["file_hash"] == result["file_hash"] == hashlib.sha256(content).hexdigest()
+        job = await main.extraction_workers.get(result["job_id"])
+        assert job.document_id == result["document_id"] and job.priority == 2
+    await main.extraction_workers.stop()
+
+
+async def test_failed_record_batch_falls_back_for_its_own_records_only(cosmos, monkeypatch):
+    """Batches commit one after another; only the records of a failed batch are created again"""
+    import main
+    import repositories.base as base_module
+    from repositories import BatchCreateError
+
+    monkeypatch.setattr(base_module, "MAX_BATCH_OPERATIONS", 2)
+    owner = "buyer@example.com"
+    repo = await main.get_document_repository()
+    await repo.create_document(document_id="doc-3", owner_email=owner, filename="taken.pdf", document_type="BOQ")
+
+    running, peak = [0], [0]
+    execute_item_batch = InMemoryContainer.execute_item_batch
+
+    async def record_batch(self, *args, **kwargs):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        try:
+            return await execute_item_batch(self, *args, **kwargs)
+        finally:
+            running[0] -= 1
+
+    monkeypatch.setattr(InMemoryContainer, "execute_item_batch", record_batch)
+    records = [{"document_id": f"doc-{n}", "filename": f"quote-{n}.pdf", "document_type": "BOQ"} for n in range(6)]
+
+    with pytest.raises(BatchCreateError) as failure:
+        await repo.create_documents(owner, records)
+    assert [item["id"] for item in failure.value.created] == ["doc-0", "doc-1", "doc-4", "doc-5"]
+    assert [item["id"] for item in failure.value.failed] == ["doc-2", "doc-3"]
+    assert peak[0] == 1
+
+    created = []
+    create_document = repo.create_document
+
+    async def record_create(**kwargs):
+        created.append(kwargs["document_id"])
+        return await create_document(**kwargs)
+
+    monkeypatch.setattr(type(repo), "create_document", lambda self, **kwargs: record_create(**kwargs))
+    uploads = [{
+        "document_id": f"up-{n}", "filename": f"quote-{n}.pdf", "file_path": f"/tmp/up-{n}.pdf",
+        "file_type": "pdf", "file_hash": "0" * 64, "document": {}
+    } for n in range(4)]
+    await repo.create_document(document_id="up-1", owner_email=owner, filename="taken.pdf", document_type="BOQ")
+    created.clear()
+    await main._register_uploads(uploads, owner)
+
+    assert sorted(created) == ["up-0", "up-1"]
+    assert not any(upload["document_id"] in main.documents_db for upload in uploads)
+    for upload in uploads:
+        assert await repo.get_document(upload["document_id"], owner)
+
+
+async def test_upload_is_refused_once_another_worker_used_the_quota(cosmos, monkeypatch):
+    """/api/v1/docs/upload reserves documents_uploaded; the limit holds across workers"""
+    import main
+    import services.quota_service as quota_module
+    from fastapi import HTTPException
+    from services.quota_service import QuotaService
+
+    os.makedirs(main.UPLOAD_DIR, exist_ok=True)
+    owner = "default@kraftdintel.com"
+    this_worker, other_worker = QuotaService(cosmos, write_behind=True), QuotaService(cosmos, write_behind=True)
+    monkeypatch.setattr(quota_module, "_quota_service_instance", this_worker)
+    await this_worker.get_or_create_quota(owner)
+    limit = quota_module.QUOTA_LIMITS["free"]["documents_per_month"]
+
+    while await other_worker.reserve_usage(owner, "documents_uploaded"):
+        pass
+    before = set(os.listdir(main.UPLOAD_DIR))
+    with pytest.raises(HTTPException) as refused:
+        await main.upload_document(UploadFile(io.BytesIO(b"%PDF-2"), filename="first.pdf"))
+    assert refused.value.status_code == 429
+    with pytest.raises(HTTPException) as refused:
+        await main.upload_documents([UploadFile(io.BytesIO(b"%PDF-3"), filename="second.pdf")])
+    assert refused.value.status_code == 429
+    assert set(os.listdir(main.UPLOAD_DIR)) == before
+
+    await this_worker.accounting.close()
+    await other_worker.accounting.close()
+    quota = await cosmos.read_item("quota", f"quota-{owner}", owner)
+    assert quota["usage"]["documents_uploaded"] == limit